@@ -84,6 +84,21 @@ DATABASES = {
 }
 
 
+# Cache de vistas (prototipo.service.cache_vistas). Las entradas se invalidan
+# por versión de datos, no por tiempo. Con varios procesos de servidor conviene
+# un backend compartido (Redis/Memcached) para compartir entradas y estadísticas.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'academicpredict-vistas',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -125,6 +140,12 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Exportaciones en segundo plano (prototipo.service.trabajos_exportacion).
+# Fuera de MEDIA_ROOT: los archivos solo se descargan a través de la vista,
+# que comprueba el alcance del usuario.
+EXPORTACIONES_ROOT = BASE_DIR / 'exportaciones'
+EXPORTACIONES_HILOS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
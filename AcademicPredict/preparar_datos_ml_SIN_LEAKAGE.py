@@ -12,6 +12,9 @@ PREPARACIÓN DE DATOS ML - VERSIÓN CORREGIDA FINAL
 
 Ejecuta desde el mismo directorio que manage.py
 
+Opcional: --staging=ruta/dataset_ultra_limpio.parquet lee los registros
+directamente del staging columnar en vez de consultar toda la BD.
+
 Autor: Bastián
 Fecha: 25 de noviembre de 2024
 ===============================================================================
@@ -25,6 +28,11 @@ print("=" * 80)
 print("🧹 PREPARACIÓN DE DATOS ML - VERSIÓN CORREGIDA FINAL")
 print("=" * 80)
 
+RUTA_STAGING = next(
+    (arg.split('=', 1)[1] for arg in sys.argv[1:] if arg.startswith('--staging=')),
+    None
+)
+
 # ============================================================================
 # CONFIGURAR DJANGO
 # ============================================================================
@@ -57,7 +65,6 @@ else:
 # ============================================================================
 
 import pandas as pd
-import numpy as np
 import pickle
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
@@ -72,26 +79,36 @@ print("\n" + "=" * 80)
 print("📊 PASO 1: EXTRAER DATOS")
 print("=" * 80)
 
-try:
-    from prototipo.models import RegistroAcademicoUniversitario, EstudianteUniversitario
-    print("✅ Modelos importados")
-except ImportError as e:
-    print(f"❌ Error: {e}")
-    sys.exit(1)
+if RUTA_STAGING:
+    from prototipo.service.staging_columnar import leer_registros_staging
+
+    print(f"\n⏳ Leyendo staging columnar: {RUTA_STAGING}")
+    data = leer_registros_staging(RUTA_STAGING)
 
-print("\n⏳ Extrayendo datos...")
+    if len(data) == 0:
+        print("❌ El staging no contiene registros")
+        sys.exit(1)
+else:
+    try:
+        from prototipo.models import RegistroAcademicoUniversitario, EstudianteUniversitario
+        print("✅ Modelos importados")
+    except ImportError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
 
-total = RegistroAcademicoUniversitario.objects.count()
-print(f"✅ Registros en BD: {total:,}")
+    print("\n⏳ Extrayendo datos...")
 
-if total == 0:
-    print("❌ No hay datos en la BD")
-    sys.exit(1)
+    total = RegistroAcademicoUniversitario.objects.count()
+    print(f"✅ Registros en BD: {total:,}")
+
+    if total == 0:
+        print("❌ No hay datos en la BD")
+        sys.exit(1)
 
-queryset = RegistroAcademicoUniversitario.objects.all()
-data = pd.DataFrame(list(queryset.values()))
+    queryset = RegistroAcademicoUniversitario.objects.all()
+    data = pd.DataFrame(list(queryset.values()))
 
-print(f"✅ Datos extraídos: {len(data):,} registros × {len(data.columns)} columnas")
+    print(f"✅ Datos extraídos: {len(data):,} registros × {len(data.columns)} columnas")
 
 # ============================================================================
 # PASO 2: CREAR TARGET (CON MAPEO CORREGIDO)
@@ -104,18 +121,25 @@ print("=" * 80)
 print("\n⏳ Obteniendo estado de abandono...")
 
 try:
-    estudiantes = EstudianteUniversitario.objects.all().values('id', 'estado_abandono')
-    
-    # ✅ MAPEO CORREGIDO: Solo 'Abandono' (exacto) es clase 1
-    estado_dict = {
-        e['id']: 1 if str(e['estado_abandono']).strip() == 'Abandono' else 0
-        for e in estudiantes
-    }
-    
-    print(f"✅ Mapeo creado: {len(estado_dict):,} estudiantes")
-    
-    # Mapear al dataframe
-    data['abandono'] = data['estudiante_id'].map(estado_dict)
+    if RUTA_STAGING:
+        # ✅ MAPEO CORREGIDO: Solo 'Abandono' (exacto) es clase 1
+        data['abandono'] = (data.pop('estado_abandono') == 'Abandono').astype(int)
+        print(f"✅ Target leído del staging")
+    else:
+        from prototipo.models import EstudianteUniversitario
+
+        estudiantes = EstudianteUniversitario.objects.all().values('id', 'estado_abandono')
+        
+        # ✅ MAPEO CORREGIDO: Solo 'Abandono' (exacto) es clase 1
+        estado_dict = {
+            e['id']: 1 if str(e['estado_abandono']).strip() == 'Abandono' else 0
+            for e in estudiantes
+        }
+        
+        print(f"✅ Mapeo creado: {len(estado_dict):,} estudiantes")
+        
+        # Mapear al dataframe
+        data['abandono'] = data['estudiante_id'].map(estado_dict)
     
     # Verificar distribución
     n_total = len(data)
@@ -150,17 +174,20 @@ print("\n" + "=" * 80)
 print("🔍 PASO 3: SELECCIONAR FEATURES")
 print("=" * 80)
 
-# Seleccionar todas las columnas numéricas (excepto IDs y target)
-features_numericas = data.select_dtypes(include=[np.number]).columns.tolist()
-excluir = ['id', 'estudiante_id', 'asignatura_id', 'abandono']
-features_disponibles = [f for f in features_numericas if f not in excluir]
-
-print(f"\n✅ Features numéricas disponibles: {len(features_disponibles)}")
+# Lista explícita y compartida con el predictor: elegir por dtype daba otro
+# conjunto según el origen (desde el staging los Decimal llegan como float y
+# entraban rendimientos y créditos aprobados)
+from prototipo.ml.predictor import FEATURES_MODELO
 
-if len(features_disponibles) == 0:
-    print("❌ No hay features numéricas disponibles")
+faltantes = [f for f in FEATURES_MODELO if f not in data.columns]
+if faltantes:
+    print(f"❌ Faltan features del modelo: {', '.join(faltantes)}")
     sys.exit(1)
 
+features_disponibles = list(FEATURES_MODELO)
+
+print(f"\n✅ Features del modelo: {len(features_disponibles)}")
+
 print("\n📋 Lista de features:")
 for i, feat in enumerate(features_disponibles, 1):
     print(f"   {i}. {feat}")
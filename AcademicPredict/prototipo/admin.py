@@ -5,13 +5,18 @@ from .models import (
     EstudianteUniversitario,
     AsignaturaUniversitaria,
     RegistroAcademicoUniversitario,
+    ActividadMensualLMS,
     PrediccionDesercionUniversitaria,
     AsignaturaCriticaUniversitaria,
     TrazabilidadPrediccionDesercion,
     AlertaEstudiante,
     IntervencionEstudiante,
     FichaSeguimientoEstudiante,
-    PerfilUsuario
+    AsignacionAnalista,
+    TrabajoExportacion,
+    PerfilUsuario,
+    SketchCohorte,
+    VersionDatos,
 )
 
 # =============================================================================
@@ -162,6 +167,27 @@ class RegistroAcademicoUniversitarioAdmin(admin.ModelAdmin):
     progreso_carrera_visual.short_description = "Progreso"
 
 
+@admin.register(ActividadMensualLMS)
+class ActividadMensualLMSAdmin(admin.ModelAdmin):
+    list_display = ['estudiante', 'mes', 'metrica', 'valor']
+    list_filter = ['metrica', 'mes']
+    search_fields = ['estudiante__codigo_estudiante']
+    raw_id_fields = ['estudiante']
+
+
+@admin.register(SketchCohorte)
+class SketchCohorteAdmin(admin.ModelAdmin):
+    list_display = ['variable', 'anio_academico', 'carrera', 'dedicacion', 'anio_ingreso', 'n']
+    list_filter = ['variable', 'anio_academico', 'dedicacion']
+    exclude = ['sketch']
+
+
+@admin.register(VersionDatos)
+class VersionDatosAdmin(admin.ModelAdmin):
+    list_display = ['dominio', 'version', 'fecha_actualizacion']
+    readonly_fields = ['dominio', 'version', 'fecha_actualizacion']
+
+
 @admin.register(PrediccionDesercionUniversitaria)
 class PrediccionDesercionUniversitariaAdmin(admin.ModelAdmin):
     list_display = [
@@ -270,6 +296,22 @@ class FichaSeguimientoEstudianteAdmin(admin.ModelAdmin):
     search_fields = ['estudiante__codigo_estudiante']
 
 
+@admin.register(AsignacionAnalista)
+class AsignacionAnalistaAdmin(admin.ModelAdmin):
+    list_display = ['estudiante', 'analista', 'activa', 'fecha_asignacion', 'asignada_por']
+    list_filter = ['activa']
+    search_fields = ['estudiante__codigo_estudiante', 'analista__username']
+    raw_id_fields = ['estudiante', 'analista', 'asignada_por']
+
+
+@admin.register(TrabajoExportacion)
+class TrabajoExportacionAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'estado', 'solicitado_por', 'fecha_solicitud', 'fecha_fin', 'archivo']
+    list_filter = ['tipo', 'estado']
+    readonly_fields = ['clave', 'filtros', 'alcance', 'versiones', 'archivo', 'error', 'fecha_inicio', 'fecha_fin']
+    raw_id_fields = ['solicitado_por']
+
+
 @admin.register(PerfilUsuario)
 class PerfilUsuarioAdmin(admin.ModelAdmin):
     list_display = ['user', 'rol', 'carrera_asignada']
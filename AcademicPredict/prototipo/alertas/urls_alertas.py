@@ -82,4 +82,8 @@ urlpatterns = [
     # API JSON para obtener alertas urgentes (para dropdown en sidebar)
     # Retorna: {'total': 5, 'alertas': [...]}
     path('api/urgentes/', views.api_alertas_urgentes, name='api_urgentes'),
+
+    # URL: /alertas/api/urgentes/stream/
+    # Server-sent events: lista al conectar y deltas {altas, bajas, total} (requiere ASGI)
+    path('api/urgentes/stream/', views.stream_alertas_urgentes, name='stream_urgentes'),
 ]
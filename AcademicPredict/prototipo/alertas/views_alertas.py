@@ -1,20 +1,47 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required,user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-import openpyxl
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import Q, Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.views.decorators.gzip import gzip_page
 from datetime import datetime
 
 from prototipo.models import (
     AlertaEstudiante,
+    AsignacionAnalista,
     FichaSeguimientoEstudiante,
     IntervencionEstudiante,
     TrazabilidadPrediccionDesercion,
-    EstudianteUniversitario
+    EstudianteUniversitario,
+    VersionDatos,
 )
+from prototipo.service.busqueda_estudiantes import filtro_codigo
+from prototipo.service.cache_vistas import obtener_o_calcular, alcance_usuario, condicional_por_version
+from prototipo.service.kpis import kpis, kpis_combinados, porcentaje
+from prototipo.service.exportacion_excel import LibroExcel
+from prototipo.service.paginacion import paginar_keyset, recorrer_keyset
+from prototipo.service.eventos_alertas import alertas_urgentes, centro_alertas
+
+
+# Fichas por índice de riesgo descendente (las que no tienen índice al final)
+ORDEN_SEGUIMIENTO = ['-indice_orden', 'estudiante_id']
+
+# (estado, prioridad) / (riesgo, intervenciones) del filtro -> KPI que ya cuenta ese listado
+KPI_POR_FILTRO_ALERTAS = {
+    ('', ''): 'total_alertas',
+    ('pendiente', ''): 'alertas_pendientes',
+    ('', 'critica'): 'alertas_criticas',
+    ('', 'alta'): 'alertas_altas',
+}
+KPI_POR_FILTRO_SEGUIMIENTO = {
+    ('', ''): 'total_seguimiento',
+    ('critico', ''): 'riesgo_critico',
+    ('alto', ''): 'riesgo_alto',
+    ('', 'si'): 'con_intervenciones',
+}
 
 
 # ================================================================
@@ -29,13 +56,6 @@ def dashboard(request):
     """
 
     user_rol = request.user.perfil.rol
-    
-    if user_rol == 'analista':
-        alertas = alertas.filter(analista_asignado=request.user)
-    elif user_rol == 'coordinador_carrera':
-        carrera = request.user.perfil.carrera_asignada
-        if carrera:
-            alertas = alertas.filter(estudiante__carrera=carrera)
 
     # Obtener filtros
     estado = request.GET.get('estado', '')
@@ -46,7 +66,14 @@ def dashboard(request):
     alertas = AlertaEstudiante.objects.select_related(
         'estudiante', 
         'prediccion'
-    ).order_by('-fecha_creacion')
+    )
+    
+    if user_rol == 'analista':
+        alertas = alertas.filter(estudiante__in=AsignacionAnalista.estudiantes_de(request.user))
+    elif user_rol == 'coordinador_carrera':
+        carrera = request.user.perfil.carrera_asignada
+        if carrera:
+            alertas = alertas.filter(estudiante__carrera=carrera)
     
     # Aplicar filtros
     if estado:
@@ -56,34 +83,41 @@ def dashboard(request):
         alertas = alertas.filter(prioridad=prioridad)
     
     if busqueda:
-        alertas = alertas.filter(
-            Q(estudiante__codigo_estudiante__icontains=busqueda)
-        )
-    
-    # Calcular KPIs
-    total_alertas = AlertaEstudiante.objects.count()
-    alertas_criticas = AlertaEstudiante.objects.filter(prioridad='critica').count()
-    alertas_altas = AlertaEstudiante.objects.filter(prioridad='alta').count()
-    alertas_pendientes = AlertaEstudiante.objects.filter(estado='pendiente').count()
-    estudiantes_seguimiento = FichaSeguimientoEstudiante.objects.filter(
-        en_seguimiento=True
-    ).count()
+        alertas = alertas.filter(filtro_codigo(busqueda, 'estudiante__'))
+    
+    # Calcular KPIs (una sola consulta)
+    conteos = kpis_combinados(
+        (AlertaEstudiante.objects.all(), {
+            'total_alertas': None,
+            'alertas_criticas': Q(prioridad='critica'),
+            'alertas_altas': Q(prioridad='alta'),
+            'alertas_pendientes': Q(estado='pendiente'),
+        }),
+        (FichaSeguimientoEstudiante.objects.all(), {'estudiantes_seguimiento': Q(en_seguimiento=True)}),
+    )
     
     # Calcular porcentajes
-    pct_criticas = (alertas_criticas / total_alertas * 100) if total_alertas > 0 else 0
-    pct_altas = (alertas_altas / total_alertas * 100) if total_alertas > 0 else 0
-    
-    # Paginación
-    paginator = Paginator(alertas, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    pct_criticas = porcentaje(conteos['alertas_criticas'], conteos['total_alertas'])
+    pct_altas = porcentaje(conteos['alertas_altas'], conteos['total_alertas'])
+    
+    # Los KPIs ya tienen el total cuando el listado no está acotado por rol ni búsqueda;
+    # si no, conteo acotado (no recorre la tabla entera)
+    total = None
+    if user_rol in ('admin', 'coordinador') and not busqueda and (estado, prioridad) in KPI_POR_FILTRO_ALERTAS:
+        total = conteos[KPI_POR_FILTRO_ALERTAS[(estado, prioridad)]]
+    
+    # Paginación por cursor sobre el índice (-fecha_creacion, -id)
+    page_obj = paginar_keyset(
+        alertas, AlertaEstudiante.ORDEN_LISTADO,
+        cursor=request.GET.get('cursor'), tam_pagina=20, total=total, estimar_total=True,
+    )
     
     context = {
         'alertas': page_obj,
-        'alertas_criticas': alertas_criticas,
-        'alertas_altas': alertas_altas,
-        'alertas_pendientes': alertas_pendientes,
-        'estudiantes_seguimiento': estudiantes_seguimiento,
+        'alertas_criticas': conteos['alertas_criticas'],
+        'alertas_altas': conteos['alertas_altas'],
+        'alertas_pendientes': conteos['alertas_pendientes'],
+        'estudiantes_seguimiento': conteos['estudiantes_seguimiento'],
         'pct_criticas': pct_criticas,
         'pct_altas': pct_altas,
         'page_obj': page_obj,
@@ -207,10 +241,10 @@ def listado_seguimiento(request):
     
     fichas = FichaSeguimientoEstudiante.objects.select_related(
         'estudiante'
-    ).filter(en_seguimiento=True).order_by('-ultimo_indice_riesgo')
+    ).filter(en_seguimiento=True)
     
     if busqueda:
-        fichas = fichas.filter(estudiante__codigo_estudiante__icontains=busqueda)
+        fichas = fichas.filter(filtro_codigo(busqueda, 'estudiante__'))
     
     if riesgo:
         if riesgo == 'critico':
@@ -222,40 +256,45 @@ def listado_seguimiento(request):
         elif riesgo == 'bajo':
             fichas = fichas.filter(ultimo_indice_riesgo__lt=30)
     
-    fichas = fichas.annotate(
-        num_intervenciones=Count('estudiante__intervenciones')  # Nombre diferente
-    )
-
+    # Filtro por semi-join; el número de intervenciones solo se calcula para las filas de la página
+    tiene_intervenciones = Exists(IntervencionEstudiante.objects.filter(estudiante=OuterRef('estudiante')))
     if intervenciones == 'si':
-        fichas = fichas.filter(num_intervenciones__gt=0)
+        fichas = fichas.filter(tiene_intervenciones)
     elif intervenciones == 'no':
-        fichas = fichas.filter(num_intervenciones=0)
-    
-    # Estadísticas
-    total_seguimiento = FichaSeguimientoEstudiante.objects.filter(en_seguimiento=True).count()
-    riesgo_critico = FichaSeguimientoEstudiante.objects.filter(
-        en_seguimiento=True, ultimo_indice_riesgo__gte=70
-    ).count()
-    riesgo_alto = FichaSeguimientoEstudiante.objects.filter(
-        en_seguimiento=True, ultimo_indice_riesgo__gte=50, ultimo_indice_riesgo__lt=70
-    ).count()
-    con_intervenciones = FichaSeguimientoEstudiante.objects.filter(
-        en_seguimiento=True
-    ).annotate(total_int=Count('estudiante__intervenciones')).filter(total_int__gt=0).count()
-    
-    # Paginación
-    paginator = Paginator(fichas, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+        fichas = fichas.filter(~tiene_intervenciones)
+    
+    fichas = fichas.annotate(
+        indice_orden=Coalesce('ultimo_indice_riesgo', Value(-1.0)),
+        num_intervenciones=Coalesce(Subquery(
+            IntervencionEstudiante.objects.filter(estudiante=OuterRef('estudiante')).order_by().values(
+                'estudiante'
+            ).annotate(total=Count('id')).values('total')
+        ), 0),
+    )
+    
+    # Estadísticas (una sola consulta)
+    estadisticas = kpis(
+        FichaSeguimientoEstudiante.objects.filter(en_seguimiento=True),
+        total_seguimiento=None,
+        riesgo_critico=Q(ultimo_indice_riesgo__gte=70),
+        riesgo_alto=Q(ultimo_indice_riesgo__gte=50, ultimo_indice_riesgo__lt=70),
+        con_intervenciones=tiene_intervenciones,
+    )
+    
+    # Con un solo filtro de los que cuentan los KPIs, el total ya está calculado
+    total = None
+    if not busqueda and (riesgo, intervenciones) in KPI_POR_FILTRO_SEGUIMIENTO:
+        total = estadisticas[KPI_POR_FILTRO_SEGUIMIENTO[(riesgo, intervenciones)]]
+    
+    page_obj = paginar_keyset(
+        fichas, ORDEN_SEGUIMIENTO,
+        cursor=request.GET.get('cursor'), tam_pagina=20, total=total, estimar_total=True,
+    )
     
     context = {
         'estudiantes': page_obj,
-        'total_seguimiento': total_seguimiento,
-        'riesgo_critico': riesgo_critico,
-        'riesgo_alto': riesgo_alto,
-        'con_intervenciones': con_intervenciones,
+        **estadisticas,
         'page_obj': page_obj,
-        'is_paginated': page_obj.has_other_pages(),
     }
     
     return render(request, 'alertas/listado_seguimiento.html', context)
@@ -265,43 +304,36 @@ def listado_seguimiento(request):
 def reportes(request):
     """Vista de generación de reportes"""
     
-    total_alertas = AlertaEstudiante.objects.count()
-    alertas_pendientes = AlertaEstudiante.objects.filter(estado='pendiente').count()
-    alertas_resueltas = AlertaEstudiante.objects.filter(estado='resuelta').count()
-    alertas_revision = AlertaEstudiante.objects.filter(estado='en_revision').count()
-    alertas_descartadas = AlertaEstudiante.objects.filter(estado='descartada').count()
-    
-    estudiantes_seguimiento = FichaSeguimientoEstudiante.objects.filter(
-        en_seguimiento=True
-    ).count()
-    
-    alertas_criticas = AlertaEstudiante.objects.filter(prioridad='critica').count()
-    alertas_altas = AlertaEstudiante.objects.filter(prioridad='alta').count()
-    alertas_medias = AlertaEstudiante.objects.filter(prioridad='media').count()
-    alertas_bajas = AlertaEstudiante.objects.filter(prioridad='baja').count()
-    
-    pct_criticas = (alertas_criticas / total_alertas * 100) if total_alertas > 0 else 0
-    pct_altas = (alertas_altas / total_alertas * 100) if total_alertas > 0 else 0
-    pct_medias = (alertas_medias / total_alertas * 100) if total_alertas > 0 else 0
-    pct_bajas = (alertas_bajas / total_alertas * 100) if total_alertas > 0 else 0
-    
-    context = {
-        'total_alertas': total_alertas,
-        'alertas_pendientes': alertas_pendientes,
-        'alertas_resueltas': alertas_resueltas,
-        'alertas_revision': alertas_revision,
-        'alertas_descartadas': alertas_descartadas,
-        'estudiantes_seguimiento': estudiantes_seguimiento,
-        'alertas_criticas': alertas_criticas,
-        'alertas_altas': alertas_altas,
-        'alertas_medias': alertas_medias,
-        'alertas_bajas': alertas_bajas,
-        'pct_criticas': pct_criticas,
-        'pct_altas': pct_altas,
-        'pct_medias': pct_medias,
-        'pct_bajas': pct_bajas,
-        'historial_reportes': [],
-    }
+    def calcular():
+        conteos = kpis_combinados(
+            (AlertaEstudiante.objects.all(), {
+                'total_alertas': None,
+                'alertas_pendientes': Q(estado='pendiente'),
+                'alertas_resueltas': Q(estado='resuelta'),
+                'alertas_revision': Q(estado='en_revision'),
+                'alertas_descartadas': Q(estado='descartada'),
+                'alertas_criticas': Q(prioridad='critica'),
+                'alertas_altas': Q(prioridad='alta'),
+                'alertas_medias': Q(prioridad='media'),
+                'alertas_bajas': Q(prioridad='baja'),
+            }),
+            (FichaSeguimientoEstudiante.objects.all(), {'estudiantes_seguimiento': Q(en_seguimiento=True)}),
+        )
+        total_alertas = conteos['total_alertas']
+
+        return {
+            **conteos,
+            'pct_criticas': porcentaje(conteos['alertas_criticas'], total_alertas),
+            'pct_altas': porcentaje(conteos['alertas_altas'], total_alertas),
+            'pct_medias': porcentaje(conteos['alertas_medias'], total_alertas),
+            'pct_bajas': porcentaje(conteos['alertas_bajas'], total_alertas),
+        }
+
+    resumen = obtener_o_calcular(
+        'alertas_reportes', [VersionDatos.ALERTAS], calcular,
+        alcance=alcance_usuario(request.user),
+    )
+    context = {**resumen, 'historial_reportes': []}
     
     return render(request, 'alertas/reporte_seguimiento.html', context)
 
@@ -325,59 +357,59 @@ def generar_reporte(request):
 
 
 @login_required
+@gzip_page
+@condicional_por_version('alertas_urgentes', [VersionDatos.ALERTAS, VersionDatos.PREDICCIONES])
 def api_alertas_urgentes(request):
     """
     API para obtener alertas urgentes
-    Usado por el dropdown de alertas en el sidebar
+    Usado por el dropdown de alertas en el sidebar cuando no hay flujo SSE
+    (sondeo periódico: con datos sin cambios responde 304)
     """
     
-    alertas = AlertaEstudiante.objects.filter(
-        estado__in=['pendiente', 'en_revision'],
-        prioridad__in=['critica', 'alta']
-    ).select_related('estudiante', 'prediccion').order_by(
-        '-prioridad',
-        '-fecha_creacion'
-    )[:10]
-    
-    alertas_data = []
-    for alerta in alertas:
-        # Obtener índice de riesgo de la predicción (puede ser None)
-        indice_riesgo = None
-        if alerta.prediccion and alerta.prediccion.indice_riesgo is not None:
-            indice_riesgo = float(alerta.prediccion.indice_riesgo)
-        
-        alertas_data.append({
-            'id': alerta.id,
-            'estudiante': alerta.estudiante.codigo_estudiante,
-            'prioridad': alerta.get_prioridad_display(),
-            'prioridad_codigo': alerta.prioridad,
-            'titulo': alerta.titulo,
-            'indice_riesgo': indice_riesgo, 
-            'fecha_creacion': alerta.fecha_creacion.isoformat(),
-        })
-    
+    alertas_data = alertas_urgentes()
     return JsonResponse({
         'total': len(alertas_data),
         'alertas': alertas_data
     })
 
+
+@login_required
+async def stream_alertas_urgentes(request):
+    """
+    Alertas urgentes del sidebar como server-sent events: la lista al
+    conectar y después solo los cambios (ver service.eventos_alertas).
+    Necesita un servidor ASGI; con WSGI responde 204 y el navegador sigue
+    con el sondeo de api_alertas_urgentes.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(centro_alertas.eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Sin buffer en nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required
 def exportar_seguimiento(request):
-    """Exporta listado de seguimiento a Excel"""
-    
-    # Obtener fichas en seguimiento
-    fichas = FichaSeguimientoEstudiante.objects.select_related(
-        'estudiante'
-    ).filter(en_seguimiento=True).annotate(
-        num_intervenciones=Count('estudiante__intervenciones')
-    ).order_by('-ultimo_indice_riesgo')
+    """Exporta listado de seguimiento a Excel (hoja write-only, fichas por lotes de keyset)"""
+    
+    # Fichas en seguimiento, solo las columnas exportadas; sin índice de riesgo van al final
+    fichas = FichaSeguimientoEstudiante.objects.filter(en_seguimiento=True).annotate(
+        indice_orden=Coalesce('ultimo_indice_riesgo', Value(-1.0))
+    ).values(
+        'estudiante_id',
+        'estudiante__codigo_estudiante',
+        'ultimo_indice_riesgo',
+        'fecha_inicio_seguimiento',
+        'fecha_actualizacion',
+        'en_seguimiento',
+        'indice_orden',
+    ).annotate(num_intervenciones=Count('estudiante__intervenciones'))
+    
+    libro = LibroExcel()
+    ws = libro.hoja("Seguimiento Estudiantes", [20, 20, 15, 20, 20, 20, 15])
     
-    # Crear workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Seguimiento Estudiantes"
-    
-    # Headers
     headers = [
         'Código Estudiante',
         'Último Índice Riesgo (%)',
@@ -387,57 +419,33 @@ def exportar_seguimiento(request):
         'Total Intervenciones',
         'Estado'
     ]
-    ws.append(headers)
+    ws.fila(*(ws.celda(header, 'cabecera') for header in headers))
     
-    # Datos
-    for ficha in fichas:
+    for ficha in recorrer_keyset(fichas, ORDEN_SEGUIMIENTO):
+        indice = ficha['ultimo_indice_riesgo'] or 0
+        
         # Clasificación de riesgo
-        if ficha.ultimo_indice_riesgo >= 70:
+        if indice >= 70:
             clasificacion = 'Crítico'
-        elif ficha.ultimo_indice_riesgo >= 50:
+        elif indice >= 50:
             clasificacion = 'Alto'
-        elif ficha.ultimo_indice_riesgo >= 30:
+        elif indice >= 30:
             clasificacion = 'Medio'
         else:
             clasificacion = 'Bajo'
         
-        ws.append([
-            ficha.estudiante.codigo_estudiante,
-            round(ficha.ultimo_indice_riesgo, 1) if ficha.ultimo_indice_riesgo else 0,
+        ws.fila(
+            ficha['estudiante__codigo_estudiante'],
+            round(indice, 1),
             clasificacion,
-            ficha.fecha_inicio_seguimiento.strftime('%d/%m/%Y') if ficha.fecha_inicio_seguimiento else '',
-            ficha.ultima_actualizacion.strftime('%d/%m/%Y %H:%M') if ficha.ultima_actualizacion else '',
-            ficha.num_intervenciones,
-            'Activo' if ficha.en_seguimiento else 'Inactivo'
-        ])
-    
-    # Estilos
-    from openpyxl.styles import Font, PatternFill, Alignment
-    
-    # Header styling
-    for cell in ws[1]:
-        cell.font = Font(bold=True, color="FFFFFF")
-        cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        cell.alignment = Alignment(horizontal="center")
-    
-    # Ajustar anchos de columna
-    ws.column_dimensions['A'].width = 20
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 20
-    ws.column_dimensions['E'].width = 20
-    ws.column_dimensions['F'].width = 20
-    ws.column_dimensions['G'].width = 15
-    
-    # Preparar respuesta
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    fecha = datetime.now().strftime('%Y%m%d_%H%M%S')
-    response['Content-Disposition'] = f'attachment; filename=seguimiento_estudiantes_{fecha}.xlsx'
+            ficha['fecha_inicio_seguimiento'].strftime('%d/%m/%Y') if ficha['fecha_inicio_seguimiento'] else '',
+            ficha['fecha_actualizacion'].strftime('%d/%m/%Y %H:%M') if ficha['fecha_actualizacion'] else '',
+            ficha['num_intervenciones'],
+            'Activo' if ficha['en_seguimiento'] else 'Inactivo'
+        )
     
-    wb.save(response)
-    return response
+    fecha = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return libro.respuesta(f'seguimiento_estudiantes_{fecha}.xlsx')
 
 
 
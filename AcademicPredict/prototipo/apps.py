@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class PrototipoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prototipo'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from prototipo.service.eventos_alertas import alerta_modificada
+        from prototipo.service.sincronizacion import registrar_funciones_sqlite
+
+        connection_created.connect(registrar_funciones_sqlite, dispatch_uid='prototipo_funciones_sqlite')
+        for senal in (post_save, post_delete):
+            senal.connect(alerta_modificada, sender='prototipo.AlertaEstudiante', dispatch_uid='prototipo_eventos_alertas')
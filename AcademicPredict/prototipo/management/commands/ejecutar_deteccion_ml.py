@@ -4,8 +4,11 @@ from django.utils import timezone
 from prototipo.models import (
     RegistroAcademicoUniversitario,
     PrediccionDesercionUniversitaria,
+    VersionDatos,
 )
 from prototipo.ml.predictor import PredictorML
+from prototipo.service.ranking_riesgo import recalcular_rankings
+from prototipo.service.exportacion_parquet import anexar_ejecucion
 import logging
 
 logger = logging.getLogger(__name__)
@@ -172,6 +175,7 @@ class Command(BaseCommand):
         predicciones_creadas = 0
         predicciones_actualizadas = 0
         errores = 0
+        inicio_guardado = timezone.now()
         
         try:
             # Usar transacción para consistencia
@@ -221,6 +225,11 @@ class Command(BaseCommand):
                             f"{resultado['estudiante'].id}: {e}"
                         )
             
+            # Puestos en cohorte/universidad para la ficha de cada estudiante
+            recalcular_rankings()
+
+            VersionDatos.incrementar(VersionDatos.PREDICCIONES)
+
             self.stdout.write(self.style.SUCCESS(
                 f"   ✅ Predicciones guardadas correctamente"
             ))
@@ -235,6 +244,18 @@ class Command(BaseCommand):
         except Exception as e:
             raise CommandError(f"❌ Error guardando en BD: {e}")
         
+        # Histórico Parquet para BI: un archivo nuevo por ejecución
+        try:
+            ruta = anexar_ejecucion(
+                PrediccionDesercionUniversitaria.objects.filter(fecha_prediccion__gte=inicio_guardado),
+                inicio_guardado,
+            )
+            self.stdout.write(f"   🗂️  Histórico Parquet: {ruta}")
+        except Exception as e:
+            # Las predicciones ya están guardadas; el histórico no debe tumbar la ejecución
+            logger.error(f"Error anexando la ejecución al histórico Parquet: {e}")
+            self.stdout.write(self.style.WARNING(f"   ⚠️  Histórico Parquet no actualizado: {e}"))
+        
         self.stdout.write("")
         
         # =====================================================================
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from prototipo.models import CarreraUniversitaria, PrediccionDesercionUniversitaria
+from prototipo.service.reportes_detalle import MAX_REPORTES, datos_detalle, zip_reportes
+
+
+class Command(BaseCommand):
+    help = 'Genera en un zip el reporte Excel de detalle de cada estudiante de un nivel de riesgo (en paralelo).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--carrera', help='Código de carrera (por defecto, todas)')
+        parser.add_argument(
+            '--nivel', default='Critico',
+            choices=[nivel for nivel, _ in PrediccionDesercionUniversitaria.NIVEL_RIESGO_CHOICES],
+            help='Nivel de riesgo (por defecto Critico)'
+        )
+        parser.add_argument('--salida', default='reportes_detalle.zip', help='Ruta del zip')
+        parser.add_argument('--procesos', type=int, help='Procesos de render (por defecto, uno por CPU)')
+
+    def handle(self, *args, **options):
+        predicciones = PrediccionDesercionUniversitaria.objects.filter(nivel_riesgo=options['nivel'])
+
+        if options['carrera']:
+            carrera = CarreraUniversitaria.objects.filter(codigo_carrera=options['carrera']).first()
+            if carrera is None:
+                raise CommandError(f"No existe la carrera {options['carrera']}")
+            predicciones = predicciones.filter(estudiante__carrera=carrera)
+
+        datos = datos_detalle(predicciones)
+        if len(datos) > MAX_REPORTES:
+            raise CommandError(f"{len(datos)} estudiantes superan el máximo de {MAX_REPORTES} reportes por lote")
+
+        total = zip_reportes(datos, options['salida'], procesos=options['procesos'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} reportes de detalle en {options['salida']}"))
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from prototipo.models import TrabajoExportacion
+from prototipo.service.trabajos_exportacion import ejecutar_trabajo, purgar_obsoletos, reencolar_interrumpidos
+
+
+class Command(BaseCommand):
+    help = 'Termina las exportaciones pendientes (p. ej. tras un reinicio) y purga archivos de datos ya superados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interrumpidos-minutos', type=int, default=60,
+            help='Reencola los trabajos que llevan más de estos minutos en proceso (por defecto 60)'
+        )
+        parser.add_argument(
+            '--purgar-horas', type=int, default=24,
+            help='Borra los trabajos obsoletos terminados hace más de estas horas (por defecto 24)'
+        )
+
+    def handle(self, *args, **options):
+        reencolados = reencolar_interrumpidos(timedelta(minutes=options['interrumpidos_minutos']))
+        if reencolados:
+            print(f"🔁 {reencolados} trabajos interrumpidos vueltos a pendiente")
+
+        pendientes = TrabajoExportacion.objects.filter(
+            estado=TrabajoExportacion.PENDIENTE
+        ).order_by('fecha_solicitud').values_list('pk', flat=True)
+
+        procesados = sum(ejecutar_trabajo(trabajo_id) for trabajo_id in list(pendientes))
+        self.stdout.write(self.style.SUCCESS(f"✅ {procesados} exportaciones generadas"))
+
+        purgados = purgar_obsoletos(timedelta(hours=options['purgar_horas']))
+        self.stdout.write(self.style.SUCCESS(f"🧹 {purgados} exportaciones obsoletas purgadas"))
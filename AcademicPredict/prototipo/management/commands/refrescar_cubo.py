@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+import time
+
+from prototipo.service.cubo_analitico import refrescar_cubo
+from prototipo.service.cuantiles_cohorte import reconstruir_sketches
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el cubo analítico que alimenta los dashboards (se ejecuta solo tras cada importación).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sketches', action='store_true',
+            help='Reconstruye también todos los sketches de cuantiles (la importación solo actualiza las particiones tocadas)'
+        )
+
+    def handle(self, *args, **options):
+        if options['sketches']:
+            print("📦 Reconstruyendo sketches de cuantiles...")
+            inicio = time.time()
+            sketches = reconstruir_sketches()
+            self.stdout.write(self.style.SUCCESS(f"✅ {sketches} sketches escritos en {time.time() - inicio:.1f}s"))
+
+        print("🧊 Refrescando cubo analítico...")
+        inicio = time.time()
+        celdas = refrescar_cubo()
+        self.stdout.write(self.style.SUCCESS(f"✅ {celdas} celdas escritas en {time.time() - inicio:.1f}s"))
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+import pandas as pd
+import time
+
+from prototipo.service.staging_columnar import leer_dataset_limpio
+from prototipo.service.reconciliacion import columnas_necesarias, reconciliar, escribir_reporte
+from prototipo.service.sincronizacion import (
+    checksums_db,
+    checksums_fuente,
+    comparar_particiones,
+)
+
+
+class Command(BaseCommand):
+    help = 'Comprueba por checksums de partición (carrera × año) si la BD está sincronizada con el extracto limpio.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', type=str, help='Ruta al archivo CSV ultra limpio o a su staging Parquet')
+        parser.add_argument('--anio', type=int, default=None, help='Verificar solo un año académico')
+        parser.add_argument('--sin-detalle', action='store_true', help='No reconciliar fila a fila las particiones distintas')
+        parser.add_argument('--reporte', type=str, default=None, help='Ruta del reporte CSV de discrepancias')
+
+    def handle(self, *args, **options):
+        ruta_csv = options['csv_path']
+        anio_filtro = options['anio']
+        ruta_reporte = options['reporte'] or f"reporte_sincronizacion_{timezone.now():%Y%m%d_%H%M%S}.csv"
+        inicio = time.time()
+
+        print(f"📂 Cargando extracto: {ruta_csv} ...")
+        filtros = [('Anio_Academico', '=', anio_filtro)] if anio_filtro is not None else None
+        columnas = list(dict.fromkeys(columnas_necesarias() + ['Id_Carrera']))
+        df = leer_dataset_limpio(ruta_csv, columnas=columnas, filtros=filtros)
+        print(f"📊 Filas en extracto: {len(df)}")
+
+        print("🔢 Calculando checksums por partición...")
+        resumen_fuente = checksums_fuente(df)
+        resumen_db = checksums_db(filtro_db=Q(anio_academico=anio_filtro) if anio_filtro is not None else None)
+        particiones = comparar_particiones(resumen_fuente, resumen_db)
+
+        conteo = particiones['estado'].value_counts()
+        print("\n" + "="*60)
+        print("📊 RESULTADO DE LA VERIFICACIÓN POR PARTICIONES")
+        print("="*60)
+        print(f"✅ Particiones sincronizadas: {conteo.get('OK', 0)}")
+        print(f"❌ Particiones con diferencias: {conteo.get('DIFERENTE', 0)}")
+        print(f"⚠️  Solo en extracto: {conteo.get('SOLO_FUENTE', 0)}")
+        print(f"⚠️  Solo en BD: {conteo.get('SOLO_DB', 0)}")
+        print(f"⏱️  {time.time() - inicio:.1f}s")
+
+        pendientes = particiones[particiones['estado'] != 'OK']
+        if pendientes.empty:
+            print("\n🎉 La base de datos está sincronizada con el extracto.")
+            return
+
+        print("\n⚠️  PARTICIONES A REVISAR:")
+        for fila in pendientes.itertuples():
+            filas_fuente = 0 if pd.isna(fila.filas_fuente) else int(fila.filas_fuente)
+            filas_db = 0 if pd.isna(fila.filas_db) else int(fila.filas_db)
+            print(f"   - {fila.Id_Carrera} / {fila.Anio_Academico}: {fila.estado} "
+                  f"(extracto {filas_fuente} filas, BD {filas_db} filas)")
+
+        if options['sin_detalle']:
+            return
+
+        # Solo las particiones distintas se reconcilian fila a fila
+        print("\n🔍 Reconciliando particiones con diferencias...")
+        claves_fuente = df['Id_Carrera'].astype(str).str.strip() + '|' + pd.to_numeric(
+            df['Anio_Academico'].astype(str).str.replace(',', '.', regex=False), errors='coerce'
+        ).fillna(0).astype(int).astype(str)
+
+        partes = []
+        for fila in pendientes[pendientes['estado'] != 'SOLO_DB'].itertuples():
+            subconjunto = df[claves_fuente == f"{fila.Id_Carrera}|{fila.Anio_Academico}"]
+            resultado = reconciliar(
+                subconjunto,
+                incluir_solo_db=True,
+                filtro_db=Q(estudiante__carrera__codigo_carrera=fila.Id_Carrera, anio_academico=fila.Anio_Academico)
+            )
+            if len(resultado['discrepancias']):
+                partes.append(resultado['discrepancias'].assign(Id_Carrera=fila.Id_Carrera))
+
+        if partes:
+            discrepancias = pd.concat(partes, ignore_index=True)
+            escribir_reporte(discrepancias, ruta_reporte)
+            print(f"❌ Discrepancias encontradas: {len(discrepancias)}")
+            print(f"📝 Reporte completo: {ruta_reporte}")
+        else:
+            print("✅ Sin discrepancias en las columnas comparadas (revisar particiones SOLO_DB).")
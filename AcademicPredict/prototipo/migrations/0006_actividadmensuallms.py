@@ -0,0 +1,105 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:05
+
+import datetime
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Clave del antiguo JSON detalle_mensual_lms -> ActividadMensualLMS.metrica
+METRICAS_JSON = {
+    'eventos': 1,
+    'visitas': 2,
+    'tareas': 3,
+    'examenes': 4,
+    'minutos': 5,
+    'wifi_dias': 6,
+    'eventos_recursos': 7,
+    'dias_recursos': 8,
+}
+
+
+def migrar_detalle_mensual(apps, schema_editor):
+    """Pasa el JSON mensual de cada registro a filas estudiante × mes × métrica."""
+    Registro = apps.get_model('prototipo', 'RegistroAcademicoUniversitario')
+    Actividad = apps.get_model('prototipo', 'ActividadMensualLMS')
+
+    # El LMS es por estudiante: el mismo detalle se repite en cada asignatura
+    valores = {}
+    detalles = Registro.objects.exclude(detalle_mensual_lms={}).order_by('id').values_list(
+        'estudiante_id', 'detalle_mensual_lms'
+    )
+    for estudiante_id, detalle in detalles.iterator(chunk_size=2000):
+        for mes, info in (detalle or {}).items():
+            try:
+                anio, num_mes = (int(x) for x in mes.split('_'))
+                fecha = datetime.date(anio, num_mes, 1)
+            except (ValueError, AttributeError):
+                continue
+            for clave, metrica in METRICAS_JSON.items():
+                valor = int(round(float(info.get(clave) or 0)))
+                if valor:
+                    valores[(estudiante_id, fecha, metrica)] = valor
+
+    Actividad.objects.bulk_create(
+        [
+            Actividad(estudiante_id=est, mes=fecha, metrica=metrica, valor=valor)
+            for (est, fecha, metrica), valor in valores.items()
+        ],
+        batch_size=5000
+    )
+
+
+def restaurar_detalle_mensual(apps, schema_editor):
+    """
+    Inverso: rehace el JSON {'YYYY_MM': {clave: valor}} de cada registro a
+    partir de las filas del estudiante. Los meses llevan todas las claves
+    (0 si no había fila); los minutos vuelven redondeados a entero.
+    """
+    Registro = apps.get_model('prototipo', 'RegistroAcademicoUniversitario')
+    Actividad = apps.get_model('prototipo', 'ActividadMensualLMS')
+    claves = {metrica: clave for clave, metrica in METRICAS_JSON.items()}
+
+    detalles = defaultdict(dict)
+    filas = Actividad.objects.order_by().values_list('estudiante_id', 'mes', 'metrica', 'valor')
+    for estudiante_id, fecha, metrica, valor in filas.iterator(chunk_size=5000):
+        mes = detalles[estudiante_id].setdefault(
+            f"{fecha.year}_{fecha.month:02d}", dict.fromkeys(METRICAS_JSON, 0)
+        )
+        mes[claves[metrica]] = valor
+
+    # Como antes de 0006, el mismo detalle en cada asignatura del estudiante
+    for estudiante_id, detalle in detalles.items():
+        Registro.objects.filter(estudiante_id=estudiante_id).update(detalle_mensual_lms=detalle)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0005_perfilusuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActividadMensualLMS',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('metrica', models.PositiveSmallIntegerField(choices=[(1, 'Eventos LMS'), (2, 'Visitas LMS'), (3, 'Tareas entregadas'), (4, 'Exámenes enviados'), (5, 'Minutos en LMS'), (6, 'Días con wifi en campus'), (7, 'Eventos en recursos'), (8, 'Días con acceso a recursos')])),
+                ('valor', models.IntegerField(default=0)),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actividad_mensual', to='prototipo.estudianteuniversitario')),
+            ],
+            options={
+                'verbose_name': 'Actividad Mensual LMS',
+                'verbose_name_plural': 'Actividad Mensual LMS',
+                'db_table': 'actividad_mensual_lms',
+                'indexes': [models.Index(fields=['estudiante', 'mes'], name='actividad_m_estudia_a7b2a5_idx'), models.Index(fields=['mes', 'metrica'], name='actividad_m_mes_503bc0_idx')],
+                'unique_together': {('estudiante', 'mes', 'metrica')},
+            },
+        ),
+        migrations.RunPython(migrar_detalle_mensual, restaurar_detalle_mensual),
+        migrations.RemoveField(
+            model_name='registroacademicouniversitario',
+            name='detalle_mensual_lms',
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0006_actividadmensuallms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CuboAnalitico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio_academico', models.IntegerField(blank=True, null=True)),
+                ('campus', models.CharField(max_length=50)),
+                ('dedicacion', models.CharField(max_length=20)),
+                ('anio_ingreso', models.IntegerField()),
+                ('n_estudiantes', models.IntegerField(default=0)),
+                ('n_abandonos', models.IntegerField(default=0)),
+                ('n_registros', models.IntegerField(default=0)),
+                ('n_registros_con_creditos', models.IntegerField(default=0)),
+                ('suma_creditos_aprobados', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('suma_creditos_matriculados', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('rendimiento_tramo_0', models.IntegerField(default=0)),
+                ('rendimiento_tramo_1', models.IntegerField(default=0)),
+                ('rendimiento_tramo_2', models.IntegerField(default=0)),
+                ('rendimiento_tramo_3', models.IntegerField(default=0)),
+                ('rendimiento_tramo_4', models.IntegerField(default=0)),
+                ('rendimiento_tramo_5', models.IntegerField(default=0)),
+                ('rendimiento_tramo_6', models.IntegerField(default=0)),
+                ('rendimiento_tramo_7', models.IntegerField(default=0)),
+                ('rendimiento_tramo_8', models.IntegerField(default=0)),
+                ('rendimiento_tramo_9', models.IntegerField(default=0)),
+                ('carrera', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='prototipo.carrerauniversitaria')),
+            ],
+            options={
+                'verbose_name': 'Celda del Cubo Analítico',
+                'verbose_name_plural': 'Cubo Analítico',
+                'db_table': 'cubo_analitico',
+                'indexes': [models.Index(fields=['anio_academico', 'carrera'], name='cubo_analit_anio_ac_a8e3b9_idx'), models.Index(fields=['anio_academico', 'campus', 'dedicacion'], name='cubo_analit_anio_ac_1c42f2_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CuboAsignatura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio_academico', models.IntegerField(blank=True, null=True)),
+                ('campus', models.CharField(max_length=50)),
+                ('dedicacion', models.CharField(max_length=20)),
+                ('n_estudiantes', models.IntegerField(default=0)),
+                ('asignatura', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='prototipo.asignaturauniversitaria')),
+                ('carrera', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='prototipo.carrerauniversitaria')),
+            ],
+            options={
+                'verbose_name': 'Celda del Cubo de Asignaturas',
+                'verbose_name_plural': 'Cubo de Asignaturas',
+                'db_table': 'cubo_asignatura',
+                'indexes': [models.Index(fields=['anio_academico', 'carrera'], name='cubo_asigna_anio_ac_9b0373_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:16
+
+from django.db import migrations, models
+
+
+def crear_dominios(apps, schema_editor):
+    VersionDatos = apps.get_model('prototipo', 'VersionDatos')
+    for dominio in ['academico', 'predicciones', 'alertas']:
+        VersionDatos.objects.get_or_create(dominio=dominio)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0007_cubo_analitico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dominio', models.CharField(choices=[('academico', 'Datos académicos'), ('predicciones', 'Predicciones ML'), ('alertas', 'Alertas y seguimiento')], max_length=20, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versión de Datos',
+                'verbose_name_plural': 'Versiones de Datos',
+                'db_table': 'version_datos',
+            },
+        ),
+        migrations.RunPython(crear_dominios, migrations.RunPython.noop),
+    ]
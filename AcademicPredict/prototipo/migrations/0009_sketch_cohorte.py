@@ -0,0 +1,37 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0008_version_datos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SketchCohorte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio_academico', models.IntegerField()),
+                ('campus', models.CharField(max_length=50)),
+                ('dedicacion', models.CharField(max_length=20)),
+                ('anio_ingreso', models.IntegerField()),
+                ('variable', models.CharField(max_length=50)),
+                ('n', models.IntegerField(default=0)),
+                ('suma', models.FloatField(default=0)),
+                ('suma_cuadrados', models.FloatField(default=0)),
+                ('sketch', models.BinaryField()),
+                ('carrera', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='prototipo.carrerauniversitaria')),
+            ],
+            options={
+                'verbose_name': 'Sketch de Cohorte',
+                'verbose_name_plural': 'Sketches de Cohorte',
+                'db_table': 'sketch_cohorte',
+                'indexes': [models.Index(fields=['variable', 'anio_ingreso'], name='sketch_coho_variabl_f0082e_idx')],
+                'unique_together': {('anio_academico', 'carrera', 'dedicacion', 'anio_ingreso', 'variable')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0009_sketch_cohorte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cuboanalitico',
+            name='momentos_correlacion',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='cuboanalitico',
+            name='perfil_alto_activo',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cuboanalitico',
+            name='perfil_alto_pasivo',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cuboanalitico',
+            name='perfil_bajo_activo',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cuboanalitico',
+            name='perfil_bajo_pasivo',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:30
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+ORDEN_NIVEL_RIESGO = {'Critico': 1, 'Alto': 2, 'Medio': 3, 'Bajo': 4}
+
+
+def calcular_orden_riesgo(apps, schema_editor):
+    Prediccion = apps.get_model('prototipo', 'PrediccionDesercionUniversitaria')
+    Prediccion.objects.update(orden_riesgo=Case(
+        *[When(nivel_riesgo=nivel, then=Value(orden)) for nivel, orden in ORDEN_NIVEL_RIESGO.items()],
+        default=Value(5),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0010_cubo_perfiles_momentos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predicciondesercionuniversitaria',
+            name='orden_riesgo',
+            field=models.PositiveSmallIntegerField(default=5, editable=False),
+        ),
+        migrations.RunPython(calcular_orden_riesgo, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='predicciondesercionuniversitaria',
+            index=models.Index(fields=['orden_riesgo', '-probabilidad_desercion', 'id'], name='prediccion_orden_listado_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0011_prediccion_orden_riesgo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predicciondesercionuniversitaria',
+            name='promedio_cohorte',
+            field=models.FloatField(blank=True, help_text='Probabilidad media de su cohorte (0-1)', null=True),
+        ),
+        migrations.AddField(
+            model_name='predicciondesercionuniversitaria',
+            name='ranking_cohorte',
+            field=models.PositiveIntegerField(blank=True, help_text='Puesto por probabilidad en su carrera × año de ingreso', null=True),
+        ),
+        migrations.AddField(
+            model_name='predicciondesercionuniversitaria',
+            name='ranking_universidad',
+            field=models.PositiveIntegerField(blank=True, help_text='Puesto por probabilidad en toda la universidad', null=True),
+        ),
+        migrations.AddField(
+            model_name='predicciondesercionuniversitaria',
+            name='total_cohorte',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predicciondesercionuniversitaria',
+            name='total_universidad',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
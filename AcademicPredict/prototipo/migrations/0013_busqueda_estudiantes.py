@@ -0,0 +1,53 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def normalizar_codigo(texto):
+    return ''.join(c for c in (texto or '').upper() if c.isascii() and c.isalnum())
+
+
+def indexar_estudiantes(apps, schema_editor):
+    Estudiante = apps.get_model('prototipo', 'EstudianteUniversitario')
+    Trigrama = apps.get_model('prototipo', 'TrigramaEstudiante')
+
+    estudiantes = list(Estudiante.objects.only('id', 'codigo_estudiante'))
+    for estudiante in estudiantes:
+        estudiante.codigo_busqueda = normalizar_codigo(estudiante.codigo_estudiante)
+    Estudiante.objects.bulk_update(estudiantes, ['codigo_busqueda'], batch_size=2000)
+
+    Trigrama.objects.bulk_create([
+        Trigrama(trigrama=trigrama, estudiante_id=estudiante.id)
+        for estudiante in estudiantes
+        for trigrama in {estudiante.codigo_busqueda[i:i + 3] for i in range(len(estudiante.codigo_busqueda) - 2)}
+    ], batch_size=5000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0012_prediccion_rankings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estudianteuniversitario',
+            name='codigo_busqueda',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=50),
+        ),
+        migrations.CreateModel(
+            name='TrigramaEstudiante',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigrama', models.CharField(max_length=3)),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigramas', to='prototipo.estudianteuniversitario')),
+            ],
+            options={
+                'verbose_name': 'Trigrama de Estudiante',
+                'verbose_name_plural': 'Trigramas de Estudiantes',
+                'db_table': 'trigrama_estudiante',
+                'unique_together': {('trigrama', 'estudiante')},
+            },
+        ),
+        migrations.RunPython(indexar_estudiantes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-19 06:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0013_busqueda_estudiantes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsignacionAnalista',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activa', models.BooleanField(default=True, help_text='False cuando el caso se reasigna a otro analista')),
+                ('fecha_asignacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fecha_fin', models.DateTimeField(blank=True, help_text='Momento en que dejó de estar activa', null=True)),
+                ('analista', models.ForeignKey(help_text='Analista responsable del caso', on_delete=django.db.models.deletion.CASCADE, related_name='asignaciones_estudiantes', to=settings.AUTH_USER_MODEL)),
+                ('asignada_por', models.ForeignKey(blank=True, help_text='Usuario que hizo la asignación', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('estudiante', models.ForeignKey(help_text='Estudiante asignado', on_delete=django.db.models.deletion.CASCADE, related_name='asignaciones_analista', to='prototipo.estudianteuniversitario')),
+            ],
+            options={
+                'verbose_name': 'Asignación de Analista',
+                'verbose_name_plural': 'Asignaciones de Analistas',
+                'db_table': 'asignacion_analista',
+                'indexes': [models.Index(fields=['analista', 'activa', 'estudiante'], name='asignacion_activa_idx')],
+                'unique_together': {('analista', 'estudiante')},
+            },
+        ),
+    ]
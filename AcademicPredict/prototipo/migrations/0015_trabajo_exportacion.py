@@ -0,0 +1,41 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0014_asignacion_analista'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoExportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('predicciones_csv', 'Predicciones ML (CSV)'), ('predicciones_excel', 'Predicciones ML (Excel)')], max_length=30)),
+                ('clave', models.CharField(help_text='SHA-1 de filtros, alcance y versiones de datos', max_length=40)),
+                ('filtros', models.JSONField(blank=True, default=dict)),
+                ('alcance', models.JSONField(blank=True, default=dict, help_text='Rol, carrera y usuario (analistas) de alcance_usuario()')),
+                ('versiones', models.JSONField(blank=True, default=dict)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('archivo', models.CharField(blank=True, help_text='Nombre del archivo en el almacenamiento de exportaciones', max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_solicitud', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_exportacion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Exportación',
+                'verbose_name_plural': 'Trabajos de Exportación',
+                'db_table': 'trabajo_exportacion',
+                'indexes': [models.Index(fields=['estado', 'fecha_solicitud'], name='trabajo_estado_idx')],
+                'unique_together': {('tipo', 'clave')},
+            },
+        ),
+    ]
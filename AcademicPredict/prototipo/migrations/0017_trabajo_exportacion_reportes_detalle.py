@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0016_trabajo_exportacion_parquet'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trabajoexportacion',
+            name='tipo',
+            field=models.CharField(choices=[('predicciones_csv', 'Predicciones ML (CSV)'), ('predicciones_excel', 'Predicciones ML (Excel)'), ('predicciones_parquet', 'Predicciones ML (Parquet)'), ('reportes_detalle', 'Reportes de detalle por estudiante (ZIP)')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prototipo', '0017_trabajo_exportacion_reportes_detalle'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='alertaestudiante',
+            name='alerta_estu_fecha_c_763224_idx',
+        ),
+        migrations.AddIndex(
+            model_name='alertaestudiante',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='alerta_orden_listado_idx'),
+        ),
+    ]
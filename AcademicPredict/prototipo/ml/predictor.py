@@ -16,6 +16,22 @@ from django.utils import timezone
 warnings.filterwarnings('ignore')
 logger = logging.getLogger(__name__)
 
+# Columnas de RegistroAcademicoUniversitario con las que se entrena y predice.
+# Solo actividad y contexto del año: los rendimientos y créditos aprobados son
+# el resultado que se quiere anticipar (leakage).
+FEATURES_MODELO = [
+    'anio_academico',
+    'anio_carrera_minimo',
+    'anio_carrera_maximo',
+    'eventos_lms_total',
+    'visitas_lms_total',
+    'tareas_entregadas_total',
+    'examenes_enviados_total',
+    'dias_wifi_total',
+    'eventos_recursos_total',
+    'dias_recursos_total',
+]
+
 class PredictorML:
     """Predictor ML con carga usando joblib (compatible con modelos entrenados)"""
     
@@ -27,18 +43,7 @@ class PredictorML:
         self.scaler = None
         
         # Features que usa el modelo (IMPORTANTE: mismo orden que entrenamiento)
-        self.feature_names = [
-            'anio_academico',
-            'anio_carrera_minimo',
-            'anio_carrera_maximo',
-            'eventos_lms_total',
-            'visitas_lms_total',
-            'tareas_entregadas_total',
-            'examenes_enviados_total',
-            'dias_wifi_total',
-            'eventos_recursos_total',
-            'dias_recursos_total',
-        ]
+        self.feature_names = list(FEATURES_MODELO)
         
         self.modelos_dir = Path(settings.BASE_DIR) / 'modelos_ml'
         logger.info("🤖 PredictorML inicializado")
@@ -9,6 +9,10 @@ urlpatterns = [
     path('ejecutar/', views_ml.ejecutar_deteccion_api, name='ejecutar_deteccion_api'),
     path('exportar/csv/', views_ml.exportar_csv, name='exportar_csv'),
     path('exportar/excel/', views_ml.exportar_excel, name='exportar_excel'),
+    path('exportar/parquet/', views_ml.exportar_parquet, name='exportar_parquet'),
+    path('exportar/trabajos/', views_ml.solicitar_exportacion, name='solicitar_exportacion'),
+    path('exportar/trabajos/<int:trabajo_id>/', views_ml.estado_exportacion, name='estado_exportacion'),
+    path('exportar/trabajos/<int:trabajo_id>/descargar/', views_ml.descargar_exportacion, name='descargar_exportacion'),
     
     path('estudiante/<int:estudiante_id>/', views_ml.estudiante_detalle_ml, name='estudiante_detalle_ml'),
     path('estudiante/<int:estudiante_id>/excel/', views_ml.exportar_detalle_excel, name='exportar_detalle_excel'),
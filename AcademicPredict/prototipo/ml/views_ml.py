@@ -1,28 +1,51 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
-from django.db.models import Avg
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.contrib.auth.models import User
+from django.db.models import Count, Max, Q
 from django.core.management import call_command
 from django.utils import timezone
-import csv
+from django.urls import reverse
+import json
 import logging
+import tempfile
 from io import StringIO
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 
 from prototipo.models import (
     PrediccionDesercionUniversitaria, 
     RegistroAcademicoUniversitario,
     TrazabilidadPrediccionDesercion,
     AlertaEstudiante,
-    FichaSeguimientoEstudiante
+    AsignacionAnalista,
+    FichaSeguimientoEstudiante,
+    TrabajoExportacion,
+    VersionDatos,
 )
 
+from prototipo.service.estadisticas_sql import histograma_sql, etiquetas_histograma
+from prototipo.service.cache_vistas import obtener_o_calcular, alcance_usuario
+from prototipo.service.kpis import kpis, porcentaje
+from prototipo.service.paginacion import paginar_keyset
+from prototipo.service.busqueda_estudiantes import filtro_codigo
+from prototipo.service.exportacion_predicciones import (
+    predicciones_exportables, filas_exportacion, csv_por_bloques, libro_excel,
+)
+from prototipo.service.exportacion_parquet import escribir_parquet
+from prototipo.service.reportes_detalle import datos_detalle, libro_detalle, nombre_reporte
+from prototipo.service.trabajos_exportacion import almacenamiento, nombre_descarga, solicitar
+
 logger = logging.getLogger(__name__)
 
+def _analistas_disponibles():
+    """Analistas con su número de casos activos, en una consulta."""
+    return list(User.objects.filter(perfil__rol='analista').annotate(
+        casos_activos=Count('asignaciones_estudiantes', filter=Q(asignaciones_estudiantes__activa=True))
+    ).order_by('first_name', 'username'))
+
+# Filtro de nivel del listado -> KPI del resumen con su total
+KPI_POR_NIVEL = {'': 'total_estudiantes', 'Critico': 'criticos', 'Alto': 'altos', 'Medio': 'medios', 'Bajo': 'bajos'}
+
 @login_required
 @user_passes_test(lambda u: hasattr(u, 'perfil'))
 def dashboard_ml(request):
@@ -34,10 +57,10 @@ def dashboard_ml(request):
     
     # FILTRO POR ROL
     if user_rol == 'analista':
-        # Solo predicciones de estudiantes asignados al analista
+        # Solo predicciones de estudiantes asignados al analista (semi-join sin DISTINCT)
         predicciones = predicciones.filter(
-            estudiante__alertas__analista_asignado=request.user
-        ).distinct()
+            estudiante__in=AsignacionAnalista.estudiantes_de(request.user)
+        )
     
     elif user_rol == 'coordinador_carrera':
         # Solo predicciones de estudiantes de su carrera
@@ -47,28 +70,44 @@ def dashboard_ml(request):
         else:
             messages.error(request, "No tienes carrera asignada")
             return redirect('home')
+    predicciones_rol = predicciones
 
     nivel_riesgo_filtro = request.GET.get('nivel_riesgo', '')
     busqueda = request.GET.get('busqueda', '')
     solo_anomalias = request.GET.get('anomalias', '')
     
-    todas_predicciones = PrediccionDesercionUniversitaria.objects.all()
-    
-    criticos = todas_predicciones.filter(nivel_riesgo='Critico').count()
-    altos = todas_predicciones.filter(nivel_riesgo='Alto').count()
-    medios = todas_predicciones.filter(nivel_riesgo='Medio').count()
-    bajos = todas_predicciones.filter(nivel_riesgo='Bajo').count()
-    total_estudiantes = todas_predicciones.count()
-    
-    pct_criticos = (criticos / total_estudiantes * 100) if total_estudiantes > 0 else 0
-    pct_altos = (altos / total_estudiantes * 100) if total_estudiantes > 0 else 0
-    pct_medios = (medios / total_estudiantes * 100) if total_estudiantes > 0 else 0
-    pct_bajos = (bajos / total_estudiantes * 100) if total_estudiantes > 0 else 0 
-    
-    ultima_prediccion = todas_predicciones.order_by('-fecha_prediccion').first()
-    ultima_fecha = ultima_prediccion.fecha_prediccion if ultima_prediccion else None
+    def calcular():
+        conteos = kpis(
+            PrediccionDesercionUniversitaria.objects.all(),
+            criticos=Q(nivel_riesgo='Critico'),
+            altos=Q(nivel_riesgo='Alto'),
+            medios=Q(nivel_riesgo='Medio'),
+            bajos=Q(nivel_riesgo='Bajo'),
+            total_estudiantes=None,
+            ultima_prediccion=Max('fecha_prediccion'),
+        )
+        total_estudiantes = conteos['total_estudiantes']
+
+        return {
+            **conteos,
+
+            'pct_criticos': porcentaje(conteos['criticos'], total_estudiantes),
+            'pct_altos': porcentaje(conteos['altos'], total_estudiantes),
+            'pct_medios': porcentaje(conteos['medios'], total_estudiantes),
+            'pct_bajos': porcentaje(conteos['bajos'], total_estudiantes),
+
+            # Distribución de probabilidades (en SQL, sobre las predicciones visibles para el rol)
+            'distribucion_labels': json.dumps(etiquetas_histograma(0, 1, 10, escala=100, sufijo='%')),
+            'distribucion_data': json.dumps(histograma_sql(predicciones_rol, 'probabilidad_desercion', 0, 1, 10)),
+        }
+
+    # El alcance del analista depende de sus asignaciones (se versionan con las alertas)
+    dominios = [VersionDatos.PREDICCIONES]
+    if user_rol == 'analista':
+        dominios.append(VersionDatos.ALERTAS)
+    resumen = obtener_o_calcular('dashboard_ml', dominios, calcular, alcance=alcance_usuario(request.user))
     
-    predicciones = PrediccionDesercionUniversitaria.objects.select_related(
+    predicciones = predicciones_rol.select_related(
         'estudiante',
         'estudiante__carrera',
         'registro_academico'
@@ -78,42 +117,27 @@ def dashboard_ml(request):
         predicciones = predicciones.filter(nivel_riesgo=nivel_riesgo_filtro)
     
     if busqueda:
-        estudiantes_ids = list(
-            predicciones.filter(
-                estudiante__codigo_estudiante__icontains=busqueda
-            ).values_list('estudiante_id', flat=True).distinct()
-        )
-        predicciones = predicciones.filter(estudiante_id__in=estudiantes_ids)
+        predicciones = predicciones.filter(filtro_codigo(busqueda, 'estudiante__'))
     
     if solo_anomalias == '1':
         predicciones = predicciones.filter(es_anomalia=True)
     
-    orden_riesgo = {
-        'Critico': 1,
-        'Alto': 2,
-        'Medio': 3,
-        'Bajo': 4
-    }
-    predicciones_lista = list(predicciones)
-    predicciones_lista.sort(key=lambda x: (orden_riesgo.get(x.nivel_riesgo, 5), -x.probabilidad_desercion))
+    # Los KPIs cacheados ya tienen el total cuando el listado no está acotado por rol ni búsqueda
+    sin_acotar = user_rol in ('admin', 'coordinador') and not busqueda and solo_anomalias != '1'
+    if sin_acotar and nivel_riesgo_filtro in KPI_POR_NIVEL:
+        total = resumen[KPI_POR_NIVEL[nivel_riesgo_filtro]]
+    else:
+        total = predicciones.count()
     
-    paginator = Paginator(predicciones_lista, 25)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Orden en SQL sobre el índice (orden_riesgo, -probabilidad, id) y paginación por cursor
+    page_obj = paginar_keyset(
+        predicciones, PrediccionDesercionUniversitaria.ORDEN_LISTADO,
+        cursor=request.GET.get('cursor'), tam_pagina=25, total=total,
+    )
     
     context = {
-        'criticos': criticos,
-        'altos': altos,
-        'medios': medios,
-        'bajos': bajos,
-        'total_estudiantes': total_estudiantes,
-
-        'pct_criticos': pct_criticos,
-        'pct_altos': pct_altos,
-        'pct_medios': pct_medios,
-        'pct_bajos': pct_bajos,
-        
-        'ultima_prediccion': ultima_fecha,
+        **resumen,
+
         'page_obj': page_obj,
         
         'nivel_riesgo_actual': nivel_riesgo_filtro,
@@ -123,6 +147,7 @@ def dashboard_ml(request):
         'user_rol': user_rol,  
         'puede_ejecutar_ml': user_rol == 'admin',  
         'puede_asignar': user_rol in ['admin', 'coordinador'], 
+        'analistas_disponibles': _analistas_disponibles() if user_rol in ['admin', 'coordinador'] else [],
     
     }
     
@@ -133,7 +158,7 @@ def dashboard_ml(request):
 def estudiante_detalle_ml(request, estudiante_id):
 
     prediccion = get_object_or_404(
-        PrediccionDesercionUniversitaria,
+        PrediccionDesercionUniversitaria.objects.select_related('estudiante__carrera', 'registro_academico'),
         estudiante_id=estudiante_id
     )
     estudiante = prediccion.estudiante
@@ -142,56 +167,23 @@ def estudiante_detalle_ml(request, estudiante_id):
 
     if user_rol == 'coordinador_carrera':
         # Solo puede ver estudiantes de su carrera
-        if estudiante.carrera != request.user.perfil.carrera_asignada:
+        if estudiante.carrera_id != request.user.perfil.carrera_asignada_id:
             messages.error(request, "⛔ No tienes acceso a este estudiante de otra carrera")
-            return redirect('dashboard_ml')
+            return redirect('ml:dashboard_ml')
     
     elif user_rol == 'analista':
         # Solo puede ver estudiantes asignados a él
-        from prototipo.models import AlertaEstudiante
-        alerta = AlertaEstudiante.objects.filter(
-            estudiante=estudiante,
-            analista_asignado=request.user
-        ).first()
-        
-        if not alerta:
+        if not AsignacionAnalista.esta_asignado(request.user, estudiante.id):
             messages.error(request, "⛔ Este estudiante no está asignado a ti")
-            return redirect('dashboard_ml')
+            return redirect('ml:dashboard_ml')
 
-    promedio_cohorte = PrediccionDesercionUniversitaria.objects.filter(
-        estudiante__carrera=estudiante.carrera,
-        estudiante__anio_ingreso_universidad=estudiante.anio_ingreso_universidad
-    ).aggregate(promedio=Avg('probabilidad_desercion'))['promedio']
-    
-    if promedio_cohorte is None:
-        promedio_cohorte = PrediccionDesercionUniversitaria.objects.aggregate(
-            promedio=Avg('probabilidad_desercion')
-        )['promedio']
-    
-    promedio_cohorte_pct = (promedio_cohorte * 100) if promedio_cohorte else 0
-    
-    estudiantes_cohorte = PrediccionDesercionUniversitaria.objects.filter(
-        estudiante__carrera=estudiante.carrera,
-        estudiante__anio_ingreso_universidad=estudiante.anio_ingreso_universidad
-    )
-    
-    total_cohorte = estudiantes_cohorte.count()
-    
-    peores_que_este = estudiantes_cohorte.filter(
-        probabilidad_desercion__gt=prediccion.probabilidad_desercion
-    ).count()
-    
-    ranking = peores_que_este + 1
-    
-    total_universidad = PrediccionDesercionUniversitaria.objects.count()
-    
-    estudiantes_con_mayor_riesgo = PrediccionDesercionUniversitaria.objects.filter(
-        probabilidad_desercion__gt=prediccion.probabilidad_desercion
-    ).count()
-    
-    top_percentil = ((estudiantes_con_mayor_riesgo + 1) / total_universidad) * 100 if total_universidad > 0 else 0
-
-    ranking_absoluto = estudiantes_con_mayor_riesgo + 1
+    # Puestos precalculados por ejecutar_deteccion_ml; NULL hasta la próxima ejecución
+    promedio_cohorte_pct = (prediccion.promedio_cohorte or 0) * 100
+    ranking = prediccion.ranking_cohorte
+    total_cohorte = prediccion.total_cohorte
+    ranking_absoluto = prediccion.ranking_universidad
+    total_universidad = prediccion.total_universidad
+    top_percentil = (ranking_absoluto / total_universidad) * 100 if ranking_absoluto and total_universidad else 0
     
     recomendaciones = obtener_recomendaciones_accion(prediccion.nivel_riesgo)
     
@@ -236,9 +228,28 @@ def estudiante_detalle_ml(request, estudiante_id):
         'lms': tendencia_lms,
     }
 
+    puede_asignar = user_rol in ['admin', 'coordinador']
+    es_analista_asignado = user_rol == 'analista'  # ya comprobado arriba
+    asignacion = None
+    if puede_asignar:
+        asignacion = AsignacionAnalista.objects.select_related('analista').filter(
+            estudiante=estudiante, activa=True
+        ).first()
+    alerta = None
+    if es_analista_asignado:
+        alerta = AlertaEstudiante.objects.filter(
+            estudiante=estudiante, estado__in=['pendiente', 'en_revision']
+        ).first()
+
     context = {
         'prediccion': prediccion,
         'estudiante': estudiante,
+        'user_rol': user_rol,
+        'puede_asignar': puede_asignar,
+        'analistas_disponibles': _analistas_disponibles() if puede_asignar else [],
+        'asignacion': asignacion,
+        'es_analista_asignado': es_analista_asignado,
+        'alerta': alerta,
         'promedio_cohorte': promedio_cohorte_pct,
         'ranking': ranking,
         'total_cohorte': total_cohorte,
@@ -335,10 +346,14 @@ def ejecutar_deteccion_api(request):
         alertas_generadas = generar_alertas_desde_predicciones()
 
         # Obtener estadísticas actualizadas
-        total = PrediccionDesercionUniversitaria.objects.count()
-        criticos = PrediccionDesercionUniversitaria.objects.filter(nivel_riesgo='Critico').count()
-        altos = PrediccionDesercionUniversitaria.objects.filter(nivel_riesgo='Alto').count()
-        medios = PrediccionDesercionUniversitaria.objects.filter(nivel_riesgo='Medio').count()
+        conteos = kpis(
+            PrediccionDesercionUniversitaria.objects.all(),
+            total=None,
+            criticos=Q(nivel_riesgo='Critico'),
+            altos=Q(nivel_riesgo='Alto'),
+            medios=Q(nivel_riesgo='Medio'),
+        )
+        total = conteos['total']
         
         logger.info(f"✅ Detección completada: {total} estudiantes procesados")
         logger.info(f"🔔 Alertas generadas: {alertas_generadas}")
@@ -347,9 +362,9 @@ def ejecutar_deteccion_api(request):
             'success': True,
             'mensaje': 'Detección ML completada exitosamente',
             'estudiantes_procesados': total,
-            'criticos': criticos,
-            'altos': altos,
-            'medios': medios,
+            'criticos': conteos['criticos'],
+            'altos': conteos['altos'],
+            'medios': conteos['medios'],
             'alertas_generadas': alertas_generadas,
             'fecha': timezone.now().strftime('%d/%m/%Y %H:%M:%S')
         })
@@ -371,227 +386,192 @@ def generar_alertas_desde_predicciones():
         nivel_riesgo__in=['Alto', 'Critico']
     ).select_related('estudiante')
     
-    for pred_uni in predicciones_criticas:
-        try:
-            estudiante = pred_uni.estudiante
-            
-            # Convertir nivel_riesgo a clasificacion
-            clasificacion_mapa = {
-                'Critico': 'critico',
-                'Alto': 'alto',
-                'Medio': 'medio',
-                'Bajo': 'bajo'
-            }
-            clasificacion = clasificacion_mapa.get(pred_uni.nivel_riesgo, 'medio')
+    # Cada alerta y ficha guardada incrementaría la versión de ALERTAS: una sola vez por lote
+    with VersionDatos.agrupar_incrementos():
+        for pred_uni in predicciones_criticas:
+            try:
+                estudiante = pred_uni.estudiante
             
-            # 1. Crear TrazabilidadPrediccionDesercion (registro histórico)
-            trazabilidad = TrazabilidadPrediccionDesercion.objects.create(
-                estudiante=estudiante,
-                probabilidad_desercion=pred_uni.probabilidad_desercion,
-                indice_riesgo=pred_uni.probabilidad_desercion * 100,
-                clasificacion_riesgo=clasificacion,
-                factores_riesgo=[],  # Puedes agregar factores si los tienes
-                modelo_usado='XGBoost',
-                version_modelo='1.0',
-                activa=True
-            )
+                # Convertir nivel_riesgo a clasificacion
+                clasificacion_mapa = {
+                    'Critico': 'critico',
+                    'Alto': 'alto',
+                    'Medio': 'medio',
+                    'Bajo': 'bajo'
+                }
+                clasificacion = clasificacion_mapa.get(pred_uni.nivel_riesgo, 'medio')
             
-            # 2. Crear AlertaEstudiante
-            prioridad = 'critica' if clasificacion == 'critico' else 'alta'
+                # 1. Crear TrazabilidadPrediccionDesercion (registro histórico)
+                trazabilidad = TrazabilidadPrediccionDesercion.objects.create(
+                    estudiante=estudiante,
+                    probabilidad_desercion=pred_uni.probabilidad_desercion,
+                    indice_riesgo=pred_uni.probabilidad_desercion * 100,
+                    clasificacion_riesgo=clasificacion,
+                    factores_riesgo=[],  # Puedes agregar factores si los tienes
+                    modelo_usado='XGBoost',
+                    version_modelo='1.0',
+                    activa=True
+                )
             
-            # Verificar si ya existe alerta pendiente para evitar duplicados
-            alerta_existente = AlertaEstudiante.objects.filter(
-                estudiante=estudiante,
-                estado__in=['pendiente', 'en_revision'],
-                visible=True
-            ).exists()
+                # 2. Crear AlertaEstudiante
+                prioridad = 'critica' if clasificacion == 'critico' else 'alta'
             
-            if not alerta_existente:
-                AlertaEstudiante.objects.create(
+                # Verificar si ya existe alerta pendiente para evitar duplicados
+                alerta_existente = AlertaEstudiante.objects.filter(
                     estudiante=estudiante,
-                    prediccion=trazabilidad,
-                    tipo_alerta='riesgo_alto',
-                    prioridad=prioridad,
-                    titulo=f"Estudiante en Riesgo {pred_uni.nivel_riesgo}",
-                    mensaje=f"El modelo ML detectó probabilidad de deserción de {pred_uni.probabilidad_desercion:.1%}",
-                    indice_riesgo_momento=pred_uni.probabilidad_desercion * 100,
-                    estado='pendiente'
-                )
-                
-                # 3. Actualizar/crear FichaSeguimientoEstudiante
-                ficha, created = FichaSeguimientoEstudiante.objects.get_or_create(
-                    estudiante=estudiante
-                )
-                ficha.en_seguimiento = True
-                ficha.ultimo_indice_riesgo = pred_uni.probabilidad_desercion * 100
-                ficha.ultima_clasificacion = clasificacion
-                ficha.ultima_fecha_prediccion = timezone.now()
-                
-                # Actualizar contadores
-                ficha.alertas_activas = estudiante.alertas.filter(
                     estado__in=['pendiente', 'en_revision'],
                     visible=True
-                ).count()
-                ficha.save()
+                ).exists()
+            
+                if not alerta_existente:
+                    AlertaEstudiante.objects.create(
+                        estudiante=estudiante,
+                        prediccion=trazabilidad,
+                        tipo_alerta='riesgo_alto',
+                        prioridad=prioridad,
+                        titulo=f"Estudiante en Riesgo {pred_uni.nivel_riesgo}",
+                        mensaje=f"El modelo ML detectó probabilidad de deserción de {pred_uni.probabilidad_desercion:.1%}",
+                        indice_riesgo_momento=pred_uni.probabilidad_desercion * 100,
+                        estado='pendiente'
+                    )
+                
+                    # 3. Actualizar/crear FichaSeguimientoEstudiante
+                    ficha, created = FichaSeguimientoEstudiante.objects.get_or_create(
+                        estudiante=estudiante
+                    )
+                    ficha.en_seguimiento = True
+                    ficha.ultimo_indice_riesgo = pred_uni.probabilidad_desercion * 100
+                    ficha.ultima_clasificacion = clasificacion
+                    ficha.ultima_fecha_prediccion = timezone.now()
                 
-                alertas_creadas += 1
-                logger.info(f"✅ Alerta generada: {estudiante.codigo_estudiante} - {prioridad.upper()}")
+                    # Actualizar contadores
+                    ficha.alertas_activas = estudiante.alertas.filter(
+                        estado__in=['pendiente', 'en_revision'],
+                        visible=True
+                    ).count()
+                    ficha.save()
+                
+                    alertas_creadas += 1
+                    logger.info(f"✅ Alerta generada: {estudiante.codigo_estudiante} - {prioridad.upper()}")
         
-        except Exception as e:
-            logger.error(f"❌ Error generando alerta para {pred_uni.estudiante.codigo_estudiante}: {e}")
-            continue
+            except Exception as e:
+                logger.error(f"❌ Error generando alerta para {pred_uni.estudiante.codigo_estudiante}: {e}")
+                continue
     
     return alertas_creadas
 
 @login_required
 @user_passes_test(lambda u: hasattr(u, 'perfil'))
 def exportar_csv(request):
-    """Exporta predicciones a archivo CSV."""
-    
-    user_rol = request.user.perfil.rol
-    nivel_riesgo = request.GET.get('nivel_riesgo', '')
-    solo_anomalias = request.GET.get('anomalias', '')
-    
-    # ✅ CORRECCIÓN: Primero crear el queryset base
-    predicciones = PrediccionDesercionUniversitaria.objects.select_related(
-        'estudiante',
-        'registro_academico'
-    ).order_by('-probabilidad_desercion')
-    
-    if user_rol == 'analista':
-        predicciones = predicciones.filter(
-            estudiante__alertas__analista_asignado=request.user
-        ).distinct()
-    elif user_rol == 'coordinador_carrera':
-        carrera = request.user.perfil.carrera_asignada
-        if carrera:
-            predicciones = predicciones.filter(estudiante__carrera=carrera)
+    """Exporta predicciones a CSV en streaming (memoria constante para cualquier número de filas)."""
     
-    # Aplicar filtros de búsqueda
-    if nivel_riesgo:
-        predicciones = predicciones.filter(nivel_riesgo=nivel_riesgo)
-    
-    if solo_anomalias == '1':
-        predicciones = predicciones.filter(es_anomalia=True)
+    predicciones = predicciones_exportables(
+        request.user,
+        nivel_riesgo=request.GET.get('nivel_riesgo', ''),
+        solo_anomalias=request.GET.get('anomalias', ''),
+    )
     
-    # El resto queda igual
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
+    response = StreamingHttpResponse(
+        csv_por_bloques(filas_exportacion(predicciones)),
+        content_type='text/csv; charset=utf-8',
+    )
     response['Content-Disposition'] = 'attachment; filename="estudiantes_riesgo.csv"'
-    
-    response.write('\ufeff')
-    
-    writer = csv.writer(response)
-    
-    writer.writerow([
-        'ID Estudiante',
-        'Código',
-        'Probabilidad Deserción (%)',
-        'Nivel Riesgo',
-        'Es Anomalía',
-        'Score Anomalía',
-        'Rendimiento Predicho (%)',
-        'Cantidad Factores Riesgo',
-        'Factores Principales',
-        'Fecha Predicción',
-        'Año Académico'
-    ])
-    
-    for pred in predicciones:
-        factores_top = pred.factores_riesgo[:3] if pred.factores_riesgo else []
-        factores_str = '; '.join([f.get('factor', '') for f in factores_top])
-        
-        writer.writerow([
-            pred.estudiante.id,
-            pred.estudiante.codigo_estudiante or '',
-            f"{pred.probabilidad_desercion * 100:.2f}",
-            pred.nivel_riesgo,
-            'Sí' if pred.es_anomalia else 'No',
-            f"{pred.score_anomalia:.4f}" if pred.score_anomalia else '',
-            f"{pred.rendimiento_predicho_futuro:.2f}" if pred.rendimiento_predicho_futuro else '',
-            len(pred.factores_riesgo) if pred.factores_riesgo else 0,
-            factores_str,
-            pred.fecha_prediccion.strftime('%d/%m/%Y %H:%M'),
-            pred.registro_academico.anio_academico if pred.registro_academico else ''
-        ])
-    
     return response
 
 @login_required
 @user_passes_test(lambda u: hasattr(u, 'perfil'))
 def exportar_excel(request):
-    """Exporta predicciones a archivo Excel con formato."""
-    
-    user_rol = request.user.perfil.rol
-    nivel_riesgo = request.GET.get('nivel_riesgo', '')
+    """Exporta predicciones a Excel con formato (hoja write-only, memoria constante)."""
     
-    predicciones = PrediccionDesercionUniversitaria.objects.select_related(
-        'estudiante',
-        'registro_academico'
-    ).order_by('-probabilidad_desercion')
+    predicciones = predicciones_exportables(
+        request.user,
+        nivel_riesgo=request.GET.get('nivel_riesgo', ''),
+        solo_anomalias=request.GET.get('anomalias', ''),
+    )
     
-    if user_rol == 'analista':
-        predicciones = predicciones.filter(
-            estudiante__alertas__analista_asignado=request.user
-        ).distinct()
-    elif user_rol == 'coordinador_carrera':
-        carrera = request.user.perfil.carrera_asignada
-        if carrera:
-            predicciones = predicciones.filter(estudiante__carrera=carrera)
+    return libro_excel(predicciones).respuesta('predicciones_ml.xlsx')
 
-    if nivel_riesgo:
-        predicciones = predicciones.filter(nivel_riesgo=nivel_riesgo)
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Predicciones ML"
-    
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    
-    headers = [
-        'ID', 'Código', 'Probabilidad (%)', 
-        'Nivel Riesgo', 'Anomalía', 'Factores', 'Fecha'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'perfil'))
+def exportar_parquet(request):
+    """
+    Exporta predicciones con atributos de estudiante y registro a Parquet
+    (columnas tipadas, zstd) para notebooks y herramientas de BI.
+    """
+    
+    predicciones = predicciones_exportables(
+        request.user,
+        nivel_riesgo=request.GET.get('nivel_riesgo', ''),
+        solo_anomalias=request.GET.get('anomalias', ''),
+    )
     
-    for row, pred in enumerate(predicciones, 2):
-        ws.cell(row=row, column=1, value=pred.estudiante.id)
-        ws.cell(row=row, column=2, value=pred.estudiante.codigo_estudiante or '')
-        ws.cell(row=row, column=3, value=round(pred.probabilidad_desercion * 100, 2))
-        
-        nivel_cell = ws.cell(row=row, column=4, value=pred.nivel_riesgo)
-        
-        if pred.nivel_riesgo == 'Critico':
-            nivel_cell.fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-            nivel_cell.font = Font(color="FFFFFF", bold=True)
-        elif pred.nivel_riesgo == 'Alto':
-            nivel_cell.fill = PatternFill(start_color="FFA500", end_color="FFA500", fill_type="solid")
-        elif pred.nivel_riesgo == 'Medio':
-            nivel_cell.fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-        else:
-            nivel_cell.fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-        
-        ws.cell(row=row, column=5, value='Sí' if pred.es_anomalia else 'No')
-        ws.cell(row=row, column=6, value=len(pred.factores_riesgo) if pred.factores_riesgo else 0)
-        ws.cell(row=row, column=7, value=pred.fecha_prediccion.strftime('%d/%m/%Y'))
+    temporal = tempfile.TemporaryFile()
+    escribir_parquet(predicciones, temporal)
+    temporal.seek(0)
+    return FileResponse(
+        temporal, as_attachment=True, filename='predicciones_ml.parquet',
+        content_type='application/vnd.apache.parquet',
+    )
+
+def _estado_trabajo(trabajo):
+    datos = {
+        'success': True,
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'url_estado': reverse('ml:estado_exportacion', args=[trabajo.pk]),
+    }
+    if trabajo.estado == TrabajoExportacion.COMPLETADO:
+        datos['url_descarga'] = reverse('ml:descargar_exportacion', args=[trabajo.pk])
+    elif trabajo.estado == TrabajoExportacion.ERROR:
+        datos['error'] = trabajo.error
+    return datos
+
+def _trabajo_del_usuario(request, trabajo_id):
+    """Trabajo solo si se generó con el mismo alcance (rol, carrera, analista) que el del usuario."""
+    trabajo = get_object_or_404(TrabajoExportacion, pk=trabajo_id)
+    if trabajo.alcance != alcance_usuario(request.user):
+        raise Http404
+    return trabajo
+
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'perfil'))
+def solicitar_exportacion(request):
+    """
+    Encola una exportación de predicciones (tipo + filtros del dashboard) o
+    devuelve la ya generada para los mismos datos, filtros y alcance.
+    """
     
-    for col in range(1, 8):
-        ws.column_dimensions[get_column_letter(col)].width = 15
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
     
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="predicciones_ml.xlsx"'
+    tipo = request.POST.get('tipo', '')
+    if tipo not in dict(TrabajoExportacion.TIPOS):
+        return JsonResponse({'success': False, 'error': 'Tipo de exportación no válido'}, status=400)
     
-    wb.save(response)
+    trabajo = solicitar(request.user, tipo, request.POST)
+    return JsonResponse(_estado_trabajo(trabajo), status=200 if trabajo.estado == TrabajoExportacion.COMPLETADO else 202)
+
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'perfil'))
+def estado_exportacion(request, trabajo_id):
+    """Estado de un trabajo de exportación (el navegador lo consulta hasta que termina)."""
+    return JsonResponse(_estado_trabajo(_trabajo_del_usuario(request, trabajo_id)))
+
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'perfil'))
+def descargar_exportacion(request, trabajo_id):
+    """Descarga el archivo de un trabajo completado."""
+    trabajo = _trabajo_del_usuario(request, trabajo_id)
+    if trabajo.estado != TrabajoExportacion.COMPLETADO:
+        raise Http404
     
-    return response
+    try:
+        archivo = almacenamiento().open(trabajo.archivo, 'rb')
+    except FileNotFoundError:
+        # Purgado o borrado a mano: la próxima solicitud lo regenera
+        raise Http404
+    return FileResponse(archivo, as_attachment=True, filename=nombre_descarga(trabajo))
 
 def calcular_tendencias(registros_historicos):
     """Calcula tendencias en el historial académico."""
@@ -639,10 +619,8 @@ def exportar_detalle_excel(request, estudiante_id):
     """ Exporta el detalle completo de un estudiante a Excel."""
     
     prediccion = get_object_or_404(
-        PrediccionDesercionUniversitaria.objects.select_related(
-            'estudiante',
-            'registro_academico'
-        ),estudiante_id=estudiante_id)
+        PrediccionDesercionUniversitaria.objects.select_related('estudiante'),
+        estudiante_id=estudiante_id)
     
     estudiante = prediccion.estudiante
     
@@ -653,151 +631,15 @@ def exportar_detalle_excel(request, estudiante_id):
         # Solo puede exportar estudiantes de su carrera
         if estudiante.carrera != request.user.perfil.carrera_asignada:
             messages.error(request, "⛔ No tienes acceso a este estudiante de otra carrera")
-            return redirect('dashboard_ml')
+            return redirect('ml:dashboard_ml')
     
     elif user_rol == 'analista':
         # Solo puede exportar estudiantes asignados a él
-        from prototipo.models import AlertaEstudiante
-        alerta = AlertaEstudiante.objects.filter(
-            estudiante=estudiante,
-            analista_asignado=request.user
-        ).first()
-        
-        if not alerta:
+        if not AsignacionAnalista.esta_asignado(request.user, estudiante.id):
             messages.error(request, "⛔ Este estudiante no está asignado a ti")
-            return redirect('dashboard_ml')
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Detalle Estudiante"
-    
-    header_fill = PatternFill(start_color="667eea", end_color="667eea", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True, size=12)
-    title_font = Font(bold=True, size=14)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    row = 1
-    ws.merge_cells(f'A{row}:D{row}')
-    cell = ws.cell(row=row, column=1)
-    cell.value = f"REPORTE DE RIESGO - ESTUDIANTE {estudiante.codigo_estudiante}"
-    cell.font = title_font
-    cell.fill = PatternFill(start_color="E7F3FF", end_color="E7F3FF", fill_type="solid")
-    cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    row += 2
-    ws.cell(row=row, column=1, value="Código:").font = Font(bold=True)
-    ws.cell(row=row, column=2, value=estudiante.codigo_estudiante)
-    
-    row += 1
-    ws.cell(row=row, column=1, value="Carrera:").font = Font(bold=True)
-    ws.cell(row=row, column=2, value=estudiante.carrera.nombre)
-    
-    row += 1
-    ws.cell(row=row, column=1, value="Año Académico:").font = Font(bold=True)
-    ws.cell(row=row, column=2, value=prediccion.registro_academico.anio_academico)
-    
-    row += 1
-    ws.cell(row=row, column=1, value="Fecha Predicción:").font = Font(bold=True)
-    ws.cell(row=row, column=2, value=prediccion.fecha_prediccion.strftime('%d/%m/%Y %H:%M'))
-    
-    row += 2
-    ws.merge_cells(f'A{row}:D{row}')
-    cell = ws.cell(row=row, column=1)
-    cell.value = "MÉTRICAS DE RIESGO"
-    cell.font = header_font
-    cell.fill = header_fill
-    cell.alignment = Alignment(horizontal='center')
-    
-    row += 1
-    headers = ["Métrica", "Valor", "Interpretación", "Nivel"]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col)
-        cell.value = header
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill(start_color="D9E2F3", end_color="D9E2F3", fill_type="solid")
-        cell.border = border
-    
-    row += 1
-    prob_pct = prediccion.probabilidad_desercion * 100
-    ws.cell(row=row, column=1, value="Probabilidad Deserción").border = border
-    ws.cell(row=row, column=2, value=f"{prob_pct:.1f}%").border = border
-    if prob_pct > 80:
-        ws.cell(row=row, column=3, value="MUY ALTO RIESGO").border = border
-        ws.cell(row=row, column=4, value="CRÍTICO").fill = PatternFill(start_color="FF6B6B", end_color="FF6B6B", fill_type="solid")
-    elif prob_pct > 60:
-        ws.cell(row=row, column=3, value="ALTO RIESGO").border = border
-        ws.cell(row=row, column=4, value="ALTO").fill = PatternFill(start_color="FFC107", end_color="FFC107", fill_type="solid")
-    else:
-        ws.cell(row=row, column=3, value="Riesgo moderado").border = border
-        ws.cell(row=row, column=4, value="MEDIO").fill = PatternFill(start_color="4FACFE", end_color="4FACFE", fill_type="solid")
-    ws.cell(row=row, column=4).border = border
-    
-    row += 1
-    ws.cell(row=row, column=1, value="Nivel de Riesgo").border = border
-    ws.cell(row=row, column=2, value=prediccion.nivel_riesgo).border = border
-    ws.cell(row=row, column=3, value="Clasificación ML").border = border
-    ws.cell(row=row, column=4, value=prediccion.nivel_riesgo).border = border
-    
-    row += 1
-    ws.cell(row=row, column=1, value="Es Anomalía").border = border
-    ws.cell(row=row, column=2, value="Sí" if prediccion.es_anomalia else "No").border = border
-    ws.cell(row=row, column=3, value="Patrón atípico" if prediccion.es_anomalia else "Patrón normal").border = border
-    ws.cell(row=row, column=4, value="⚠️" if prediccion.es_anomalia else "✓").border = border
-    
-    if prediccion.factores_riesgo:
-        row += 2
-        ws.merge_cells(f'A{row}:E{row}')
-        cell = ws.cell(row=row, column=1)
-        cell.value = "FACTORES DE RIESGO IDENTIFICADOS"
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-        
-        row += 1
-        headers = ["Factor", "Valor Actual", "Valor Esperado", "Impacto", "Peso (%)"]
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=row, column=col)
-            cell.value = header
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color="D9E2F3", end_color="D9E2F3", fill_type="solid")
-            cell.border = border
-        
-        for factor in prediccion.factores_riesgo:
-            row += 1
-            ws.cell(row=row, column=1, value=factor['factor']).border = border
-            ws.cell(row=row, column=2, value=str(factor['valor_actual'])).border = border
-            ws.cell(row=row, column=3, value=factor['valor_esperado']).border = border
-            ws.cell(row=row, column=4, value=factor['impacto']).border = border
-            ws.cell(row=row, column=5, value=f"{factor['peso']:.1f}%").border = border
-            
-            if factor['impacto'] == 'ALTO':
-                ws.cell(row=row, column=4).fill = PatternFill(start_color="FFCDD2", end_color="FFCDD2", fill_type="solid")
-            
-            row += 1
-            ws.merge_cells(f'A{row}:E{row}')
-            cell = ws.cell(row=row, column=1)
-            cell.value = f"💡 Recomendación: {factor['recomendacion']}"
-            cell.fill = PatternFill(start_color="FFF9C4", end_color="FFF9C4", fill_type="solid")
-            cell.alignment = Alignment(wrap_text=True)
-    
-    ws.column_dimensions['A'].width = 25
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 25
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 12
-    
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="detalle_estudiante_{estudiante.codigo_estudiante}.xlsx"'
-    
-    wb.save(response)
-    
-    return response
+            return redirect('ml:dashboard_ml')
+
+    datos = datos_detalle(PrediccionDesercionUniversitaria.objects.filter(pk=prediccion.pk))[0]
+    return libro_detalle(datos).respuesta(nombre_reporte(datos))
 
 
@@ -1,10 +1,13 @@
-from django.db import models
+import threading
+from contextlib import contextmanager
+
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 class CarreraUniversitaria(models.Model):
@@ -45,10 +48,55 @@ class EstudianteUniversitario(models.Model):
     tiene_impagos_matricula = models.BooleanField(default=False)
     
     fecha_registro = models.DateTimeField(auto_now_add=True)
+
+    # Clave normalizada del código (mayúsculas, solo A-Z y 0-9) para búsquedas por índice
+    codigo_busqueda = models.CharField(max_length=50, db_index=True, editable=False, default='')
     
     def __str__(self):
         return f"{self.codigo_estudiante} - {self.estado_abandono}"
 
+    @staticmethod
+    def normalizar_codigo(texto):
+        """'e-00 12' -> 'E0012'. Solo ASCII para que el orden sea el mismo con cualquier colación."""
+        return ''.join(c for c in (texto or '').upper() if c.isascii() and c.isalnum())
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Clave con la que están indexados sus trigramas (ver indexar_trigramas_estudiante)
+        instancia._codigo_busqueda_indexado = instancia.__dict__.get('codigo_busqueda')
+        return instancia
+
+    def save(self, *args, **kwargs):
+        self.codigo_busqueda = self.normalizar_codigo(self.codigo_estudiante)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'codigo_estudiante' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'codigo_busqueda'}
+        super().save(*args, **kwargs)
+
+
+class TrigramaEstudiante(models.Model):
+    """
+    Índice invertido de trigramas de codigo_busqueda: permite buscar un
+    fragmento del código por índice en lugar de recorrer la tabla con LIKE '%x%'.
+    """
+    trigrama = models.CharField(max_length=3)
+    estudiante = models.ForeignKey(EstudianteUniversitario, on_delete=models.CASCADE, related_name='trigramas')
+
+    class Meta:
+        db_table = 'trigrama_estudiante'
+        verbose_name = 'Trigrama de Estudiante'
+        verbose_name_plural = 'Trigramas de Estudiantes'
+        unique_together = ['trigrama', 'estudiante']
+
+    def __str__(self):
+        return f"{self.trigrama} -> {self.estudiante_id}"
+
+    @staticmethod
+    def de_clave(clave):
+        """Trigramas distintos de una clave ya normalizada."""
+        return sorted({clave[i:i + 3] for i in range(len(clave) - 2)})
+
 class AsignaturaUniversitaria(models.Model):
     codigo_asignatura = models.CharField(max_length=50, unique=True)
     nombre = models.CharField(max_length=300, blank=True)
@@ -130,8 +178,6 @@ class RegistroAcademicoUniversitario(models.Model):
     
     eventos_recursos_total = models.IntegerField(default=0) 
     dias_recursos_total = models.IntegerField(default=0)    
-
-    detalle_mensual_lms = models.JSONField(default=dict)
     
     class Meta:
         unique_together = ['estudiante', 'asignatura', 'anio_academico']
@@ -158,6 +204,248 @@ class RegistroAcademicoUniversitario(models.Model):
             return float(self.tiempo_total_minutos) / float(self.visitas_lms_total)
         return 0.0
 
+class ActividadMensualLMS(models.Model):
+    """
+    Actividad LMS de un estudiante en un mes, una fila por métrica.
+    Sustituye al antiguo JSON detalle_mensual_lms del registro académico:
+    solo se guardan valores distintos de cero.
+    """
+    EVENTOS = 1
+    VISITAS = 2
+    TAREAS = 3
+    EXAMENES = 4
+    MINUTOS = 5
+    DIAS_WIFI = 6
+    EVENTOS_RECURSOS = 7
+    DIAS_RECURSOS = 8
+
+    METRICAS = [
+        (EVENTOS, 'Eventos LMS'),
+        (VISITAS, 'Visitas LMS'),
+        (TAREAS, 'Tareas entregadas'),
+        (EXAMENES, 'Exámenes enviados'),
+        (MINUTOS, 'Minutos en LMS'),
+        (DIAS_WIFI, 'Días con wifi en campus'),
+        (EVENTOS_RECURSOS, 'Eventos en recursos'),
+        (DIAS_RECURSOS, 'Días con acceso a recursos'),
+    ]
+
+    estudiante = models.ForeignKey(
+        EstudianteUniversitario,
+        on_delete=models.CASCADE,
+        related_name='actividad_mensual'
+    )
+    mes = models.DateField(help_text='Primer día del mes')
+    metrica = models.PositiveSmallIntegerField(choices=METRICAS)
+    valor = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'actividad_mensual_lms'
+        verbose_name = 'Actividad Mensual LMS'
+        verbose_name_plural = 'Actividad Mensual LMS'
+        unique_together = ['estudiante', 'mes', 'metrica']
+        indexes = [
+            models.Index(fields=['estudiante', 'mes']),
+            models.Index(fields=['mes', 'metrica']),
+        ]
+
+    def __str__(self):
+        return f"{self.estudiante} - {self.mes:%Y-%m} - {self.get_metrica_display()}: {self.valor}"
+
+
+class CuboAnalitico(models.Model):
+    """
+    Resumen precalculado para los dashboards, una fila por celda
+    año académico × carrera × dedicación × año de ingreso (el campus va
+    desnormalizado desde la carrera para poder filtrar sin join).
+
+    Las filas con anio_academico NULL son la celda "todos los años": guardan
+    los conteos de estudiantes, que no se pueden sumar entre años. El resto
+    de medidas (registros, créditos, histograma, perfiles, momentos) son aditivas.
+    Se regenera con prototipo.service.cubo_analitico.refrescar_cubo().
+    """
+    anio_academico = models.IntegerField(null=True, blank=True)
+    carrera = models.ForeignKey(CarreraUniversitaria, on_delete=models.CASCADE, related_name='+')
+    campus = models.CharField(max_length=50)
+    dedicacion = models.CharField(max_length=20)
+    anio_ingreso = models.IntegerField()
+
+    n_estudiantes = models.IntegerField(default=0)
+    n_abandonos = models.IntegerField(default=0)
+
+    n_registros = models.IntegerField(default=0)
+    n_registros_con_creditos = models.IntegerField(default=0)
+    suma_creditos_aprobados = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    suma_creditos_matriculados = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Histograma de rendimiento_total_anio en tramos de 10 puntos (0-10 ... 90-100)
+    rendimiento_tramo_0 = models.IntegerField(default=0)
+    rendimiento_tramo_1 = models.IntegerField(default=0)
+    rendimiento_tramo_2 = models.IntegerField(default=0)
+    rendimiento_tramo_3 = models.IntegerField(default=0)
+    rendimiento_tramo_4 = models.IntegerField(default=0)
+    rendimiento_tramo_5 = models.IntegerField(default=0)
+    rendimiento_tramo_6 = models.IntegerField(default=0)
+    rendimiento_tramo_7 = models.IntegerField(default=0)
+    rendimiento_tramo_8 = models.IntegerField(default=0)
+    rendimiento_tramo_9 = models.IntegerField(default=0)
+
+    # Perfiles del dashboard avanzado (registros con rendimiento > 0):
+    # alto = rendimiento >= 70, activo = eventos LMS >= 100
+    perfil_alto_activo = models.IntegerField(default=0)
+    perfil_alto_pasivo = models.IntegerField(default=0)
+    perfil_bajo_activo = models.IntegerField(default=0)
+    perfil_bajo_pasivo = models.IntegerField(default=0)
+
+    # Momentos n, Σx, Σxy de las variables de correlación (decimales como texto);
+    # son aditivos, así que la matriz de cualquier filtro sale de sumar celdas
+    momentos_correlacion = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        db_table = 'cubo_analitico'
+        verbose_name = 'Celda del Cubo Analítico'
+        verbose_name_plural = 'Cubo Analítico'
+        indexes = [
+            models.Index(fields=['anio_academico', 'carrera']),
+            models.Index(fields=['anio_academico', 'campus', 'dedicacion']),
+        ]
+
+    def __str__(self):
+        return f"{self.anio_academico or 'Todos'} - {self.carrera_id} - {self.dedicacion} - {self.anio_ingreso}"
+
+
+class CuboAsignatura(models.Model):
+    """
+    Estudiantes distintos por asignatura para el top de asignaturas del
+    dashboard. Igual que en CuboAnalitico, anio_academico NULL = todos los años.
+    """
+    anio_academico = models.IntegerField(null=True, blank=True)
+    asignatura = models.ForeignKey(AsignaturaUniversitaria, on_delete=models.CASCADE, related_name='+')
+    carrera = models.ForeignKey(CarreraUniversitaria, on_delete=models.CASCADE, related_name='+')
+    campus = models.CharField(max_length=50)
+    dedicacion = models.CharField(max_length=20)
+    n_estudiantes = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'cubo_asignatura'
+        verbose_name = 'Celda del Cubo de Asignaturas'
+        verbose_name_plural = 'Cubo de Asignaturas'
+        indexes = [
+            models.Index(fields=['anio_academico', 'carrera']),
+        ]
+
+    def __str__(self):
+        return f"{self.anio_academico or 'Todos'} - {self.asignatura_id}: {self.n_estudiantes}"
+
+
+class SketchCohorte(models.Model):
+    """
+    Sketch KLL de cuantiles de una variable por celda año académico × carrera
+    × dedicación × año de ingreso (mismas celdas que CuboAnalitico). Los
+    sketches se fusionan para cualquier combinación de filtros; suma y
+    suma_cuadrados dan media y desviación exactas.
+    Se mantiene con prototipo.service.cuantiles_cohorte.
+    """
+    anio_academico = models.IntegerField()
+    carrera = models.ForeignKey(CarreraUniversitaria, on_delete=models.CASCADE, related_name='+')
+    campus = models.CharField(max_length=50)
+    dedicacion = models.CharField(max_length=20)
+    anio_ingreso = models.IntegerField()
+    variable = models.CharField(max_length=50)
+
+    n = models.IntegerField(default=0)
+    suma = models.FloatField(default=0)
+    suma_cuadrados = models.FloatField(default=0)
+    sketch = models.BinaryField()
+
+    class Meta:
+        db_table = 'sketch_cohorte'
+        verbose_name = 'Sketch de Cohorte'
+        verbose_name_plural = 'Sketches de Cohorte'
+        unique_together = ['anio_academico', 'carrera', 'dedicacion', 'anio_ingreso', 'variable']
+        indexes = [
+            models.Index(fields=['variable', 'anio_ingreso']),
+        ]
+
+    def __str__(self):
+        return f"{self.variable} - {self.anio_academico} - {self.carrera_id} - {self.dedicacion} - {self.anio_ingreso}: {self.n}"
+
+
+class VersionDatos(models.Model):
+    """
+    Contador de versión por dominio de datos. Las importaciones, las
+    ejecuciones de detección y las escrituras de alertas lo incrementan;
+    la caché de vistas incluye la versión en la clave, así que un cambio
+    invalida las entradas sin depender de un TTL.
+    """
+    ACADEMICO = 'academico'
+    PREDICCIONES = 'predicciones'
+    ALERTAS = 'alertas'
+    DOMINIOS = [
+        (ACADEMICO, 'Datos académicos'),
+        (PREDICCIONES, 'Predicciones ML'),
+        (ALERTAS, 'Alertas y seguimiento'),
+    ]
+
+    dominio = models.CharField(max_length=20, choices=DOMINIOS, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'version_datos'
+        verbose_name = 'Versión de Datos'
+        verbose_name_plural = 'Versiones de Datos'
+
+    def __str__(self):
+        return f"{self.dominio} v{self.version}"
+
+    @classmethod
+    def actuales(cls):
+        """{dominio: versión} en una sola consulta."""
+        return dict(cls.objects.values_list('dominio', 'version'))
+
+    @classmethod
+    def incrementar(cls, *dominios):
+        pendientes = getattr(_incrementos_agrupados, 'dominios', None)
+        if pendientes is not None:
+            # Dentro de agrupar_incrementos(): se aplica una vez al salir del bloque
+            pendientes.update(dominios)
+            return
+        actualizadas = cls.objects.filter(dominio__in=dominios).update(
+            version=models.F('version') + 1,
+            fecha_actualizacion=timezone.now(),
+        )
+        if actualizadas < len(dominios):
+            for dominio in dominios:
+                cls.objects.get_or_create(dominio=dominio, defaults={'version': 1})
+
+    @classmethod
+    @contextmanager
+    def agrupar_incrementos(cls):
+        """
+        Acumula los incrementos del bloque (p. ej. las señales de cada alerta
+        de un lote) y sube cada dominio una sola vez al salir, en lugar de
+        un UPDATE sobre la misma fila por cada save. Anidado, manda el
+        bloque exterior.
+        """
+        if getattr(_incrementos_agrupados, 'dominios', None) is not None:
+            yield
+            return
+        _incrementos_agrupados.dominios = set()
+        try:
+            yield
+        finally:
+            # También si el bloque falla: lo ya escrito debe invalidar la caché
+            dominios = _incrementos_agrupados.dominios
+            _incrementos_agrupados.dominios = None
+            if dominios:
+                cls.incrementar(*sorted(dominios))
+
+
+# Dominios pendientes de VersionDatos.agrupar_incrementos() en el hilo actual
+_incrementos_agrupados = threading.local()
+
+
 class PrediccionDesercionUniversitaria(models.Model):
     estudiante = models.ForeignKey(EstudianteUniversitario,on_delete=models.CASCADE, related_name='predicciones_desercion')
     
@@ -185,6 +473,12 @@ class PrediccionDesercionUniversitaria(models.Model):
     ]
     
     nivel_riesgo = models.CharField(max_length=10, choices=NIVEL_RIESGO_CHOICES, help_text="Nivel de riesgo calculado")
+
+    # Posición del nivel en el listado del dashboard ML (Crítico primero).
+    # Desnormalizado para ordenar y paginar por índice; lo mantiene save().
+    ORDEN_NIVEL_RIESGO = {'Critico': 1, 'Alto': 2, 'Medio': 3, 'Bajo': 4}
+    ORDEN_SIN_NIVEL = 5
+    orden_riesgo = models.PositiveSmallIntegerField(default=ORDEN_SIN_NIVEL, editable=False)
     
     # =================================================================
     # RESULTADOS DE REGRESIÓN LINEAL
@@ -201,14 +495,40 @@ class PrediccionDesercionUniversitaria(models.Model):
     fecha_prediccion = models.DateTimeField(auto_now_add=True)
     modelo_usado = models.CharField(max_length=50, default='XGBoost')
     version_modelo = models.CharField(max_length=20, default='1.0')
+
+    # =================================================================
+    # POSICIÓN EN LA COHORTE Y EN LA UNIVERSIDAD
+    # =================================================================
+    # Se recalculan en cada ejecución de detección
+    # (prototipo.service.ranking_riesgo); NULL = aún sin calcular.
+
+    ranking_cohorte = models.PositiveIntegerField(null=True, blank=True, help_text="Puesto por probabilidad en su carrera × año de ingreso")
+    total_cohorte = models.PositiveIntegerField(null=True, blank=True)
+    promedio_cohorte = models.FloatField(null=True, blank=True, help_text="Probabilidad media de su cohorte (0-1)")
+    ranking_universidad = models.PositiveIntegerField(null=True, blank=True, help_text="Puesto por probabilidad en toda la universidad")
+    total_universidad = models.PositiveIntegerField(null=True, blank=True)
     
+    # Orden del listado: nivel de riesgo, probabilidad descendente y id como desempate
+    ORDEN_LISTADO = ['orden_riesgo', '-probabilidad_desercion', 'id']
+
     class Meta:
         verbose_name = "Predicción de Deserción"
         verbose_name_plural = "Predicciones de Deserción"
         ordering = ['-fecha_prediccion']
+        indexes = [
+            models.Index(fields=['orden_riesgo', '-probabilidad_desercion', 'id'], name='prediccion_orden_listado_idx'),
+        ]
     
     def __str__(self):
         return f"{self.estudiante.codigo_estudiante} - {self.get_nivel_riesgo_display()}"
+
+    def save(self, *args, **kwargs):
+        self.orden_riesgo = self.ORDEN_NIVEL_RIESGO.get(self.nivel_riesgo, self.ORDEN_SIN_NIVEL)
+        # update_or_create guarda solo los campos de defaults
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nivel_riesgo' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'orden_riesgo'}
+        super().save(*args, **kwargs)
     
     def get_riesgo_color(self):
         """Retorna un color para visualización según el riesgo"""
@@ -425,6 +745,9 @@ class AlertaEstudiante(models.Model):
     
     visible = models.BooleanField(default=True, help_text='True si la alerta debe mostrarse')
     
+    # Orden de los listados paginados por cursor: más recientes primero, id como desempate
+    ORDEN_LISTADO = ['-fecha_creacion', '-id']
+    
     class Meta:
         db_table = 'alerta_estudiante'
         verbose_name = 'Alerta de Estudiante'
@@ -433,7 +756,7 @@ class AlertaEstudiante(models.Model):
         indexes = [
             models.Index(fields=['estado', 'prioridad', '-fecha_creacion']),
             models.Index(fields=['estudiante', '-fecha_creacion']),
-            models.Index(fields=['-fecha_creacion']),
+            models.Index(fields=['-fecha_creacion', '-id'], name='alerta_orden_listado_idx'),
         ]
     
     def __str__(self):
@@ -678,6 +1001,108 @@ class FichaSeguimientoEstudiante(models.Model):
             fecha_prediccion__gte=fecha_limite
         ).order_by('fecha_prediccion')
 
+class AsignacionAnalista(models.Model):
+    """
+    Analista responsable de un estudiante. Acota lo que ve cada analista:
+    un semi-join por el índice (analista, activa, estudiante) en lugar de
+    recorrer el historial de alertas con DISTINCT.
+    """
+    analista = models.ForeignKey(User, on_delete=models.CASCADE, related_name='asignaciones_estudiantes', help_text='Analista responsable del caso')
+    estudiante = models.ForeignKey('EstudianteUniversitario', on_delete=models.CASCADE, related_name='asignaciones_analista', help_text='Estudiante asignado')
+    activa = models.BooleanField(default=True, help_text='False cuando el caso se reasigna a otro analista')
+    asignada_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', help_text='Usuario que hizo la asignación')
+    fecha_asignacion = models.DateTimeField(default=timezone.now)
+    fecha_fin = models.DateTimeField(null=True, blank=True, help_text='Momento en que dejó de estar activa')
+
+    class Meta:
+        db_table = 'asignacion_analista'
+        verbose_name = 'Asignación de Analista'
+        verbose_name_plural = 'Asignaciones de Analistas'
+        unique_together = ['analista', 'estudiante']
+        indexes = [
+            models.Index(fields=['analista', 'activa', 'estudiante'], name='asignacion_activa_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.analista.username} -> {self.estudiante_id}{'' if self.activa else ' (inactiva)'}"
+
+    @classmethod
+    def estudiantes_de(cls, analista):
+        """Subconsulta con los ids de los estudiantes asignados al analista (para __in)."""
+        return cls.objects.filter(analista=analista, activa=True).values('estudiante_id')
+
+    @classmethod
+    def esta_asignado(cls, analista, estudiante_id):
+        return cls.objects.filter(analista=analista, estudiante_id=estudiante_id, activa=True).exists()
+
+    @classmethod
+    @transaction.atomic
+    def asignar(cls, estudiante, analista, asignada_por=None):
+        """Deja a `analista` como único responsable activo del estudiante."""
+        ahora = timezone.now()
+        cls.objects.filter(estudiante=estudiante, activa=True).exclude(analista=analista).update(
+            activa=False, fecha_fin=ahora,
+        )
+        asignacion, _ = cls.objects.update_or_create(
+            analista=analista,
+            estudiante=estudiante,
+            defaults={'activa': True, 'asignada_por': asignada_por, 'fecha_asignacion': ahora, 'fecha_fin': None},
+        )
+        return asignacion
+
+class TrabajoExportacion(models.Model):
+    """
+    Exportación generada en segundo plano. La clave resume el tipo, los
+    filtros, el alcance del usuario y las versiones de datos: mientras los
+    datos no cambian, quien pida la misma exportación reutiliza el archivo.
+    """
+    PREDICCIONES_CSV = 'predicciones_csv'
+    PREDICCIONES_EXCEL = 'predicciones_excel'
+    PREDICCIONES_PARQUET = 'predicciones_parquet'
+    REPORTES_DETALLE = 'reportes_detalle'
+    TIPOS = [
+        (PREDICCIONES_CSV, 'Predicciones ML (CSV)'),
+        (PREDICCIONES_EXCEL, 'Predicciones ML (Excel)'),
+        (PREDICCIONES_PARQUET, 'Predicciones ML (Parquet)'),
+        (REPORTES_DETALLE, 'Reportes de detalle por estudiante (ZIP)'),
+    ]
+
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADO, 'Completado'),
+        (ERROR, 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=30, choices=TIPOS)
+    clave = models.CharField(max_length=40, help_text='SHA-1 de filtros, alcance y versiones de datos')
+    filtros = models.JSONField(default=dict, blank=True)
+    alcance = models.JSONField(default=dict, blank=True, help_text='Rol, carrera y usuario (analistas) de alcance_usuario()')
+    versiones = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    archivo = models.CharField(max_length=255, blank=True, help_text='Nombre del archivo en el almacenamiento de exportaciones')
+    error = models.TextField(blank=True)
+    solicitado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='trabajos_exportacion')
+    fecha_solicitud = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'trabajo_exportacion'
+        verbose_name = 'Trabajo de Exportación'
+        verbose_name_plural = 'Trabajos de Exportación'
+        unique_together = ['tipo', 'clave']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_solicitud'], name='trabajo_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} [{self.estado}] {self.clave[:8]}"
+
 # ============================================================================
 # SIGNALS PARA MANTENER SINCRONIZACIÓN
 # ============================================================================
@@ -703,6 +1128,27 @@ def actualizar_contadores_intervencion(sender, instance, created, **kwargs):
     if hasattr(instance.estudiante, 'ficha_seguimiento'):
         instance.estudiante.ficha_seguimiento.actualizar_contadores()
 
+@receiver(post_save, sender=EstudianteUniversitario)
+def indexar_trigramas_estudiante(sender, instance, created, raw=False, **kwargs):
+    """Rehace los trigramas del estudiante solo si su clave de búsqueda ha cambiado."""
+    if raw or (not created and getattr(instance, '_codigo_busqueda_indexado', None) == instance.codigo_busqueda):
+        return
+    if not created:
+        TrigramaEstudiante.objects.filter(estudiante=instance).delete()
+    TrigramaEstudiante.objects.bulk_create([
+        TrigramaEstudiante(trigrama=trigrama, estudiante=instance)
+        for trigrama in TrigramaEstudiante.de_clave(instance.codigo_busqueda)
+    ])
+    instance._codigo_busqueda_indexado = instance.codigo_busqueda
+
+@receiver([post_save, post_delete], sender=AlertaEstudiante)
+@receiver([post_save, post_delete], sender=IntervencionEstudiante)
+@receiver([post_save, post_delete], sender=FichaSeguimientoEstudiante)
+@receiver([post_save, post_delete], sender=AsignacionAnalista)
+def invalidar_cache_alertas(sender, **kwargs):
+    """Cualquier escritura de alertas o seguimiento invalida las vistas cacheadas que dependen de ellas."""
+    VersionDatos.incrementar(VersionDatos.ALERTAS)
+
 def generar_reporte_estudiante(estudiante):
     ficha = getattr(estudiante, 'ficha_seguimiento', None)
     
@@ -0,0 +1,141 @@
+"""
+Actividad mensual LMS normalizada (tabla ActividadMensualLMS).
+
+Una fila por estudiante × mes × métrica, solo para valores distintos de cero.
+Las series por estudiante, las curvas por cohorte y las variaciones mes a mes
+se calculan agrupando en SQL en lugar de recorrer JSON en Python.
+"""
+
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import Lag
+
+from prototipo.models import ActividadMensualLMS
+
+# Clave usada por el importador (y el antiguo JSON) -> código de métrica
+METRICAS_DETALLE = {
+    'eventos': ActividadMensualLMS.EVENTOS,
+    'visitas': ActividadMensualLMS.VISITAS,
+    'tareas': ActividadMensualLMS.TAREAS,
+    'examenes': ActividadMensualLMS.EXAMENES,
+    'minutos': ActividadMensualLMS.MINUTOS,
+    'wifi_dias': ActividadMensualLMS.DIAS_WIFI,
+    'eventos_recursos': ActividadMensualLMS.EVENTOS_RECURSOS,
+    'dias_recursos': ActividadMensualLMS.DIAS_RECURSOS,
+}
+NOMBRES_METRICA = {codigo: nombre for nombre, codigo in METRICAS_DETALLE.items()}
+
+
+def fecha_mes(mes):
+    """'2021_09' -> date(2021, 9, 1)"""
+    anio, num_mes = (int(x) for x in str(mes).split('_'))
+    return datetime.date(anio, num_mes, 1)
+
+
+def filas_desde_detalle(datos_mensuales):
+    """
+    Convierte el detalle mensual del importador ({'2021_09': {'eventos': 3, ...}})
+    en {(mes, metrica): valor} entero, descartando ceros.
+    """
+    filas = {}
+    for mes, info in datos_mensuales.items():
+        fecha = fecha_mes(mes)
+        for clave, metrica in METRICAS_DETALLE.items():
+            valor = int(round(float(info.get(clave) or 0)))
+            if valor:
+                filas[(fecha, metrica)] = valor
+    return filas
+
+
+@transaction.atomic
+def reemplazar_actividad(actividad_por_estudiante, batch_size=5000):
+    """
+    Sustituye la actividad mensual de los estudiantes dados.
+
+    Args:
+        actividad_por_estudiante: {estudiante_id: {(mes, metrica): valor}}
+
+    Returns:
+        Número de filas insertadas.
+    """
+    ids = list(actividad_por_estudiante)
+    for i in range(0, len(ids), batch_size):
+        ActividadMensualLMS.objects.filter(estudiante_id__in=ids[i:i + batch_size]).delete()
+
+    objetos = [
+        ActividadMensualLMS(estudiante_id=estudiante_id, mes=mes, metrica=metrica, valor=valor)
+        for estudiante_id, filas in actividad_por_estudiante.items()
+        for (mes, metrica), valor in filas.items()
+    ]
+    ActividadMensualLMS.objects.bulk_create(objetos, batch_size=batch_size)
+    return len(objetos)
+
+
+def _meses_del_rango(meses):
+    if not meses:
+        return []
+    actual, fin = min(meses), max(meses)
+    rango = []
+    while actual <= fin:
+        rango.append(actual)
+        actual = datetime.date(actual.year + actual.month // 12, actual.month % 12 + 1, 1)
+    return rango
+
+
+def serie_estudiante(estudiante_id, metricas=None):
+    """
+    Serie mensual de un estudiante: {'meses': [...], 'series': {metrica: [...]}}.
+    Los meses sin fila valen 0.
+    """
+    qs = ActividadMensualLMS.objects.filter(estudiante_id=estudiante_id)
+    if metricas:
+        qs = qs.filter(metrica__in=metricas)
+
+    filas = list(qs.order_by('mes').values_list('mes', 'metrica', 'valor'))
+    meses = _meses_del_rango([mes for mes, _, _ in filas])
+    posicion = {mes: i for i, mes in enumerate(meses)}
+
+    codigos = metricas or sorted(NOMBRES_METRICA)
+    series = {NOMBRES_METRICA[c]: [0] * len(meses) for c in codigos}
+    for mes, metrica, valor in filas:
+        series[NOMBRES_METRICA[metrica]][posicion[mes]] = valor
+
+    return {
+        'meses': [mes.strftime('%Y-%m') for mes in meses],
+        'series': series,
+    }
+
+
+def curva_cohorte(estudiantes_qs, metrica):
+    """
+    Curva mensual de una cohorte (queryset de estudiantes) para una métrica:
+    total, estudiantes activos, media por estudiante de la cohorte y variación
+    respecto al mes anterior, todo calculado en una consulta agrupada.
+    """
+    tamano = estudiantes_qs.count()
+
+    filas = ActividadMensualLMS.objects.filter(
+        metrica=metrica,
+        estudiante__in=estudiantes_qs.values('pk')
+    ).values('mes').annotate(
+        total=Sum('valor'),
+        activos=Count('estudiante_id'),
+    ).annotate(
+        total_anterior=Window(Lag('total'), order_by=F('mes').asc()),
+    ).order_by('mes')
+
+    curva = []
+    for fila in filas:
+        anterior = fila['total_anterior']
+        curva.append({
+            'mes': fila['mes'].strftime('%Y-%m'),
+            'total': fila['total'],
+            'activos': fila['activos'],
+            'media': round(fila['total'] / tamano, 2) if tamano else 0,
+            'variacion_pct': round((fila['total'] - anterior) * 100 / anterior, 1) if anterior else None,
+        })
+
+    return {'tamano_cohorte': tamano, 'metrica': NOMBRES_METRICA[metrica], 'curva': curva}
+
@@ -0,0 +1,112 @@
+"""
+Búsqueda de estudiantes por código.
+
+En lugar de codigo_estudiante__icontains (LIKE '%x%', que recorre toda la
+tabla) se busca sobre la clave normalizada codigo_busqueda:
+
+- prefijo: rango [clave, clave + 'ZZ…'] sobre su índice;
+- fragmento de 3 o más caracteres: los candidatos son los estudiantes con
+  el trigrama menos frecuente del fragmento (lista corta en el índice
+  único trigrama × estudiante de TrigramaEstudiante) y de ellos se quedan
+  los que contienen el fragmento de verdad.
+
+La frecuencia de cada trigrama se guarda en la caché: solo sirve para
+elegir el candidato más barato, así que un valor algo antiguo no cambia
+los resultados.
+
+Fragmentos de 1-2 caracteres no tienen trigramas y se resuelven con
+contains sobre la clave.
+"""
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from prototipo.models import EstudianteUniversitario, TrigramaEstudiante
+
+LONGITUD_CLAVE = EstudianteUniversitario._meta.get_field('codigo_busqueda').max_length
+MIN_AUTOCOMPLETAR = 2
+LIMITE_AUTOCOMPLETAR = 10
+TIEMPO_VIDA_FRECUENCIAS = 3600
+
+normalizar_codigo = EstudianteUniversitario.normalizar_codigo
+
+
+def _rango_prefijo(clave, prefijo=''):
+    # 'Z' es el mayor carácter de la clave (A-Z, 0-9) con colación binaria y con las *_ci de MySQL
+    return Q(**{
+        f'{prefijo}codigo_busqueda__gte': clave,
+        f'{prefijo}codigo_busqueda__lte': clave + 'Z' * (LONGITUD_CLAVE - len(clave)),
+    })
+
+
+def _frecuencias(trigramas):
+    """{trigrama: nº de estudiantes}, de la caché o con un COUNT agrupado sobre el índice."""
+    claves = {f'busqueda:trigrama:{trigrama}': trigrama for trigrama in trigramas}
+    frecuencias = {claves[clave]: n for clave, n in cache.get_many(claves).items()}
+
+    pendientes = [trigrama for trigrama in trigramas if trigrama not in frecuencias]
+    if pendientes:
+        contados = dict.fromkeys(pendientes, 0)
+        contados.update(
+            TrigramaEstudiante.objects.filter(trigrama__in=pendientes)
+            .values_list('trigrama').annotate(n=Count('id')).order_by()
+        )
+        cache.set_many({f'busqueda:trigrama:{t}': n for t, n in contados.items()}, TIEMPO_VIDA_FRECUENCIAS)
+        frecuencias.update(contados)
+    return frecuencias
+
+
+def _candidatos(clave):
+    """Subconsulta de ids de estudiante que tienen el trigrama más selectivo de la clave."""
+    frecuencias = _frecuencias(TrigramaEstudiante.de_clave(clave))
+    trigrama = min(frecuencias, key=frecuencias.get)
+    return TrigramaEstudiante.objects.filter(trigrama=trigrama).values('estudiante_id')
+
+
+def filtro_codigo(texto, prefijo=''):
+    """
+    Q equivalente a codigo_estudiante__icontains=texto (ignorando separadores).
+
+    Args:
+        texto: lo que escribió el usuario.
+        prefijo: ruta hasta el estudiante desde el modelo filtrado, p. ej. 'estudiante__'.
+    """
+    clave = normalizar_codigo(texto)
+    if not clave:
+        return Q(pk__in=[])
+
+    contiene = Q(**{f'{prefijo}codigo_busqueda__contains': clave})
+    if len(clave) < 3:
+        return contiene
+    return Q(**{f'{prefijo}id__in': _candidatos(clave)}) & contiene
+
+
+def autocompletar(texto, estudiantes=None, limite=LIMITE_AUTOCOMPLETAR):
+    """
+    Hasta `limite` estudiantes cuyo código coincide con `texto`: primero los
+    que empiezan por él (en orden de clave) y después los que lo contienen.
+
+    Args:
+        estudiantes: queryset de EstudianteUniversitario visible para el usuario.
+
+    Returns:
+        Lista de dicts con id, codigo_estudiante y carrera. Una consulta (dos
+        si los prefijos no llenan el límite).
+    """
+    clave = normalizar_codigo(texto)
+    if len(clave) < MIN_AUTOCOMPLETAR:
+        return []
+
+    base = (estudiantes if estudiantes is not None else EstudianteUniversitario.objects.all()).order_by('codigo_busqueda')
+    campos = ('id', 'codigo_estudiante', 'carrera__codigo_carrera')
+
+    por_prefijo = _rango_prefijo(clave)
+    resultados = list(base.filter(por_prefijo).values(*campos)[:limite])
+
+    if len(resultados) < limite and len(clave) >= 3:
+        resultados += base.filter(filtro_codigo(clave)).exclude(por_prefijo).values(*campos)[:limite - len(resultados)]
+
+    return [
+        {'id': fila['id'], 'codigo': fila['codigo_estudiante'], 'carrera': fila['carrera__codigo_carrera']}
+        for fila in resultados
+    ]
@@ -0,0 +1,186 @@
+"""
+Caché de los contextos calculados por las vistas de lectura intensiva
+(home, dashboards, dashboard ML, reportes de alertas).
+
+La clave combina la vista, el alcance del usuario (rol, carrera y, para
+analistas, el propio usuario), los filtros y la versión actual de cada
+dominio de datos del que depende la vista (VersionDatos). Importaciones,
+detecciones ML y escrituras de alertas incrementan esas versiones, así que
+una entrada nunca se sirve desactualizada: las claves viejas simplemente
+dejan de consultarse y el backend las descarta.
+
+Las versiones se leen antes de calcular; si los datos cambian durante el
+cálculo, el resultado queda guardado bajo la versión anterior y no se
+vuelve a servir.
+
+La misma clave sirve de ETag para los endpoints JSON que se consultan
+periódicamente (condicional_por_version): si el cliente ya tiene la versión
+actual recibe un 304 sin que la vista llegue a ejecutarse.
+"""
+
+import hashlib
+import json
+import logging
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from prototipo.models import VersionDatos
+
+logger = logging.getLogger(__name__)
+
+PREFIJO = 'vista'
+PREFIJO_ESTADISTICAS = 'cache_vistas'
+# Solo para liberar memoria de claves huérfanas; la validez la dan las versiones
+TIEMPO_VIDA = 60 * 60 * 24
+
+VISTAS_CACHEADAS = [
+    'home',
+    'dashboard_universidad',
+    'dashboard_filtrado',
+    'dashboard_avanzado',
+    'dashboard_avanzado_filtrado',
+    'serie_cohortes',
+    'dashboard_ml',
+    'alertas_reportes',
+]
+
+
+def alcance_usuario(usuario):
+    """Parte de la clave que depende de quién consulta."""
+    perfil = getattr(usuario, 'perfil', None)
+    rol = perfil.rol if perfil else None
+    return {
+        'rol': rol,
+        'carrera': perfil.carrera_asignada_id if rol == 'coordinador_carrera' else None,
+        'usuario': usuario.pk if rol == 'analista' else None,
+    }
+
+
+def clave_cache(vista, versiones, alcance=None, filtros=None):
+    contenido = json.dumps(
+        {'versiones': versiones, 'alcance': alcance or {}, 'filtros': filtros or {}},
+        sort_keys=True, default=str
+    )
+    resumen = hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+    return f"{PREFIJO}:{vista}:{resumen}"
+
+
+def _contar(vista, resultado):
+    clave = f"{PREFIJO_ESTADISTICAS}:{vista}:{resultado}"
+    cache.add(clave, 0, timeout=None)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # El backend pudo descartar la clave entre add e incr
+        cache.set(clave, 1, timeout=None)
+
+
+def obtener_o_calcular(vista, dominios, calcular, alcance=None, filtros=None, versiones=None):
+    """
+    Devuelve el valor cacheado de `vista` o lo calcula con `calcular()`.
+
+    Args:
+        vista: nombre de la vista (uno de VISTAS_CACHEADAS).
+        dominios: dominios de VersionDatos de los que depende el resultado.
+        calcular: función sin argumentos que devuelve un valor serializable
+            (sin querysets perezosos: listas, dicts, instancias ya cargadas).
+        alcance: dict de alcance_usuario().
+        filtros: dict con los filtros GET aplicados.
+        versiones: {dominio: versión} ya leídas en esta petición
+            (versiones_leidas()); si es None se consultan.
+    """
+    todas = VersionDatos.actuales() if versiones is None else versiones
+    versiones = {dominio: todas.get(dominio, 0) for dominio in dominios}
+    clave = clave_cache(vista, versiones, alcance, filtros)
+
+    valor = cache.get(clave)
+    if valor is not None:
+        _contar(vista, 'aciertos')
+        return valor
+
+    _contar(vista, 'fallos')
+    valor = calcular()
+    cache.set(clave, valor, TIEMPO_VIDA)
+    return valor
+
+
+def estadisticas_cache():
+    """{vista: {aciertos, fallos, ratio_aciertos}} de este backend de caché."""
+    claves = [
+        f"{PREFIJO_ESTADISTICAS}:{vista}:{resultado}"
+        for vista in VISTAS_CACHEADAS
+        for resultado in ('aciertos', 'fallos')
+    ]
+    valores = cache.get_many(claves)
+
+    estadisticas = {}
+    for vista in VISTAS_CACHEADAS:
+        aciertos = valores.get(f"{PREFIJO_ESTADISTICAS}:{vista}:aciertos", 0)
+        fallos = valores.get(f"{PREFIJO_ESTADISTICAS}:{vista}:fallos", 0)
+        total = aciertos + fallos
+        estadisticas[vista] = {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'ratio_aciertos': round(aciertos / total, 4) if total else None,
+        }
+    return estadisticas
+
+
+# =============================================================================
+# RESPUESTAS CONDICIONALES (ETag / Last-Modified)
+# =============================================================================
+
+def _estado_versiones(request, dominios):
+    """(versiones, última modificación) de los dominios, leídos una vez por petición."""
+    estado = getattr(request, '_estado_versiones', None)
+    if estado is None:
+        filas = VersionDatos.objects.filter(dominio__in=dominios).values_list(
+            'dominio', 'version', 'fecha_actualizacion'
+        )
+        versiones, fechas = {dominio: 0 for dominio in dominios}, []
+        for dominio, version, fecha in filas:
+            versiones[dominio] = version
+            fechas.append(fecha)
+        estado = (versiones, max(fechas) if fechas else None)
+        request._estado_versiones = estado
+    return estado
+
+
+def versiones_leidas(request):
+    """Versiones que condicional_por_version ya leyó para esta petición, o None."""
+    estado = getattr(request, '_estado_versiones', None)
+    return estado[0] if estado else None
+
+
+def condicional_por_version(vista, dominios, parametros=()):
+    """
+    Decorador: ETag y Last-Modified a partir de VersionDatos.
+
+    El ETag es el resumen de la clave de caché (vista, versiones, alcance del
+    usuario y los `parametros` GET que cambian la respuesta); con datos sin
+    cambios Django responde 304 sin ejecutar la vista. Cache-Control
+    no-cache hace que el navegador revalide siempre en lugar de reutilizar
+    la respuesta por heurística.
+    """
+    def etag(request, *args, **kwargs):
+        versiones, _ = _estado_versiones(request, dominios)
+        filtros = {parametro: request.GET.get(parametro) for parametro in parametros}
+        return clave_cache(vista, versiones, alcance_usuario(request.user), filtros).rsplit(':', 1)[1]
+
+    def ultima_modificacion(request, *args, **kwargs):
+        return _estado_versiones(request, dominios)[1]
+
+    def decorador(funcion_vista):
+        condicionada = condition(etag_func=etag, last_modified_func=ultima_modificacion)(funcion_vista)
+
+        @wraps(funcion_vista)
+        def envoltura(request, *args, **kwargs):
+            respuesta = condicionada(request, *args, **kwargs)
+            patch_cache_control(respuesta, private=True, no_cache=True)
+            return respuesta
+        return envoltura
+
+    return decorador
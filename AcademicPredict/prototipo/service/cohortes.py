@@ -0,0 +1,64 @@
+"""
+Series de abandono y retención por cohorte de ingreso.
+
+Una sola consulta agrupada (año de ingreso × estado_abandono, opcionalmente
+× carrera o campus) sustituye a los dos COUNT por año de ingreso; el resto
+(tasas, orden, una serie por grupo) se arma en Python sobre unas decenas de
+filas.
+"""
+
+from django.db.models import Count
+
+ESTADO_ABANDONO = 'Abandono'
+
+# Desglose admitido -> campo de agrupación sobre EstudianteUniversitario
+DESGLOSES = {
+    'carrera': 'carrera__codigo_carrera',
+    'campus': 'carrera__campus',
+}
+
+
+def serie_abandono_cohortes(estudiantes_qs, desglose=None):
+    """
+    Serie por año de ingreso de una población de estudiantes.
+
+    Args:
+        estudiantes_qs: queryset de EstudianteUniversitario ya filtrado.
+        desglose: None (una sola serie) o una clave de DESGLOSES.
+
+    Returns:
+        {'desglose', 'series': [{'grupo', 'puntos': [...]}]}; cada punto
+        tiene anio, total_estudiantes, abandonos, tasa_abandono,
+        tasa_retencion y el conteo por estado.
+    """
+    campo_grupo = DESGLOSES.get(desglose)
+    campos = ['anio_ingreso_universidad', 'estado_abandono']
+    if campo_grupo:
+        campos.insert(0, campo_grupo)
+
+    filas = estudiantes_qs.values(*campos).annotate(total=Count('id')).order_by(*campos)
+
+    series = {}
+    for fila in filas:
+        grupo = fila[campo_grupo] if campo_grupo else 'Todos'
+        anio = fila['anio_ingreso_universidad']
+        punto = series.setdefault(grupo, {}).setdefault(anio, {
+            'anio': str(anio),
+            'total_estudiantes': 0,
+            'abandonos': 0,
+            'estados': {},
+        })
+        punto['total_estudiantes'] += fila['total']
+        punto['estados'][fila['estado_abandono']] = fila['total']
+        if fila['estado_abandono'] == ESTADO_ABANDONO:
+            punto['abandonos'] += fila['total']
+
+    resultado = []
+    for grupo, puntos in series.items():
+        for punto in puntos.values():
+            total = punto['total_estudiantes']
+            punto['tasa_abandono'] = round(punto['abandonos'] / total * 100, 2) if total else 0
+            punto['tasa_retencion'] = round(100 - punto['tasa_abandono'], 2) if total else 0
+        resultado.append({'grupo': grupo, 'puntos': list(puntos.values())})
+
+    return {'desglose': desglose, 'series': resultado}
@@ -0,0 +1,153 @@
+"""
+Sketches de cuantiles (KLL) por celda de cohorte para los box plots.
+
+reconstruir_sketches() recorre los registros una sola vez, ordenados por
+celda, y guarda un SketchCohorte por celda y variable. La importación solo
+reconstruye las particiones (año académico × carrera) que ha tocado. Para
+leer, los sketches de las celdas que cumplen el filtro se fusionan: los
+cuartiles salen de toda la población leyendo unas pocas filas pequeñas.
+"""
+
+import logging
+from collections import defaultdict
+from itertools import groupby, islice
+from operator import itemgetter
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+
+from prototipo.models import RegistroAcademicoUniversitario, SketchCohorte
+from prototipo.service.sketches import KLL
+
+logger = logging.getLogger(__name__)
+
+# Variable -> población que entra en el sketch (mismo criterio que el dashboard)
+VARIABLES_SKETCH = {
+    'rendimiento_total_anio': Q(rendimiento_total_anio__gt=0),
+}
+DIMENSIONES_CELDA = [
+    'anio_academico',
+    'estudiante__carrera_id',
+    'estudiante__carrera__campus',
+    'estudiante__dedicacion_estudios',
+    'estudiante__anio_ingreso_universidad',
+]
+CUANTILES_CAJA = [0, 0.25, 0.5, 0.75, 1]
+
+
+def _filtro_particiones(particiones, campo_anio, campo_carrera):
+    """OR de (año, carrera) agrupado por año para no generar un Q por partición."""
+    por_anio = defaultdict(set)
+    for anio, carrera_id in particiones:
+        por_anio[anio].add(carrera_id)
+    filtro = Q()
+    for anio, carreras in por_anio.items():
+        filtro |= Q(**{campo_anio: anio, f'{campo_carrera}__in': carreras})
+    return filtro
+
+
+def _sketches_variable(variable, filtro_registros, tam_lote):
+    qs = RegistroAcademicoUniversitario.objects.filter(VARIABLES_SKETCH[variable], filtro_registros)
+    filas = qs.order_by(*DIMENSIONES_CELDA).values_list(*DIMENSIONES_CELDA, variable).iterator(chunk_size=tam_lote)
+
+    clave_celda = itemgetter(*range(len(DIMENSIONES_CELDA)))
+    for celda, grupo in groupby(filas, key=clave_celda):
+        anio_academico, carrera_id, campus, dedicacion, anio_ingreso = celda
+        kll = KLL()
+        n, suma, suma_cuadrados = 0, 0.0, 0.0
+        while True:
+            lote = np.array([float(fila[-1]) for fila in islice(grupo, tam_lote)], dtype=np.float64)
+            if lote.size == 0:
+                break
+            kll.agregar(lote)
+            n += int(lote.size)
+            suma += float(lote.sum())
+            suma_cuadrados += float(np.square(lote).sum())
+
+        yield SketchCohorte(
+            anio_academico=anio_academico,
+            carrera_id=carrera_id,
+            campus=campus or '',
+            dedicacion=dedicacion or '',
+            anio_ingreso=anio_ingreso,
+            variable=variable,
+            n=n,
+            suma=suma,
+            suma_cuadrados=suma_cuadrados,
+            sketch=kll.a_bytes(),
+        )
+
+
+@transaction.atomic
+def reconstruir_sketches(particiones=None, tam_lote=20000):
+    """
+    Recalcula los sketches de las particiones indicadas.
+
+    Args:
+        particiones: iterable de (anio_academico, carrera_id); None = todas.
+
+    Returns:
+        Número de sketches escritos.
+    """
+    if particiones is not None:
+        particiones = set(particiones)
+        if not particiones:
+            return 0
+        filtro_registros = _filtro_particiones(particiones, 'anio_academico', 'estudiante__carrera_id')
+        filtro_sketches = _filtro_particiones(particiones, 'anio_academico', 'carrera_id')
+    else:
+        filtro_registros = filtro_sketches = Q()
+
+    SketchCohorte.objects.filter(filtro_sketches).delete()
+
+    total = 0
+    for variable in VARIABLES_SKETCH:
+        sketches = list(_sketches_variable(variable, filtro_registros, tam_lote))
+        SketchCohorte.objects.bulk_create(sketches, batch_size=1000)
+        total += len(sketches)
+
+    alcance = 'todas las particiones' if particiones is None else f'{len(particiones)} particiones'
+    logger.info(f"📦 Sketches de cuantiles reconstruidos ({alcance}): {total}")
+    return total
+
+
+def caja_desde_sketches(sketches):
+    """Estadísticos del box plot fusionando sketches (media y desviación exactas)."""
+    kll = KLL()
+    n, suma, suma_cuadrados = 0, 0.0, 0.0
+    for sketch in sketches:
+        kll.merge(KLL.desde_bytes(sketch.sketch))
+        n += sketch.n
+        suma += sketch.suma
+        suma_cuadrados += sketch.suma_cuadrados
+
+    if n == 0:
+        return None
+
+    minimo, q1, mediana, q3, maximo = kll.cuantiles(CUANTILES_CAJA)
+    media = suma / n
+    return {
+        'min': minimo,
+        'q1': q1,
+        'median': mediana,
+        'q3': q3,
+        'max': maximo,
+        'mean': media,
+        'std': max(suma_cuadrados / n - media * media, 0.0) ** 0.5,
+        'n': n,
+    }
+
+
+def box_plot_por_anio_ingreso(anios_ingreso, filtro=None, variable='rendimiento_total_anio'):
+    """{anio_ingreso: caja} con una sola consulta sobre los sketches de las celdas filtradas."""
+    sketches = SketchCohorte.objects.filter(
+        filtro or Q(), variable=variable, anio_ingreso__in=list(anios_ingreso)
+    ).only('anio_ingreso', 'n', 'suma', 'suma_cuadrados', 'sketch').order_by('anio_ingreso')
+
+    resultado = {}
+    for anio, grupo in groupby(sketches, key=lambda sketch: sketch.anio_ingreso):
+        caja = caja_desde_sketches(grupo)
+        if caja:
+            resultado[anio] = caja
+    return resultado
@@ -0,0 +1,387 @@
+"""
+Cubo analítico precalculado para dashboard_universidad, dashboard_filtrado_ajax
+y el dashboard avanzado (con y sin filtros).
+
+refrescar_cubo() recalcula las celdas con unas pocas consultas agrupadas
+sobre estudiantes y registros; los dashboards leen después solo las tablas
+del cubo (cientos/miles de filas), así que un cambio de filtro no depende
+del tamaño de RegistroAcademicoUniversitario.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from prototipo.models import (
+    CuboAnalitico,
+    CuboAsignatura,
+    EstudianteUniversitario,
+    RegistroAcademicoUniversitario,
+    VersionDatos,
+)
+from prototipo.service.cuantiles_cohorte import box_plot_por_anio_ingreso
+from prototipo.service.estadisticas_sql import (
+    correlacion_desde_momentos,
+    expresiones_momentos,
+    histograma_sql,
+    sumar_momentos,
+)
+
+logger = logging.getLogger(__name__)
+
+TRAMOS_RENDIMIENTO = 10
+ETIQUETAS_RENDIMIENTO = ["0-10%", "10-20%", "20-30%", "30-40%", "40-50%", "50-60%", "60-70%", "70-80%", "80-90%", "90-100%"]
+CAMPOS_TRAMO = [f'rendimiento_tramo_{i}' for i in range(TRAMOS_RENDIMIENTO)]
+
+# Variables del mapa de calor de correlaciones del dashboard avanzado
+VARIABLES_CORRELACION = [
+    'creditos_aprobados_total_anio',
+    'creditos_matriculados_total_anio',
+    'rendimiento_total_anio',
+    'eventos_lms_total',
+    'visitas_lms_total',
+    'dias_wifi_total',
+]
+ETIQUETAS_CORRELACION = [
+    'Créditos Aprobados',
+    'Créditos Matriculados',
+    'Rendimiento',
+    'Eventos LMS',
+    'Visitas LMS',
+    'Días WiFi'
+]
+POBLACION_AVANZADA = Q(rendimiento_total_anio__gt=0)
+
+# Etiqueta del gráfico de perfiles -> campo del cubo
+PERFILES = {
+    'alto_rendimiento_activo': 'perfil_alto_activo',
+    'alto_rendimiento_pasivo': 'perfil_alto_pasivo',
+    'bajo_rendimiento_activo': 'perfil_bajo_activo',
+    'bajo_rendimiento_pasivo': 'perfil_bajo_pasivo',
+}
+ALTO_RENDIMIENTO = Q(rendimiento_total_anio__gte=70)
+ACTIVO_LMS = Q(eventos_lms_total__gte=100)
+
+# Dimensiones de la celda vistas desde el registro académico
+DIMENSIONES_REGISTRO = {
+    'carrera_id': 'estudiante__carrera_id',
+    'campus': 'estudiante__carrera__campus',
+    'dedicacion': 'estudiante__dedicacion_estudios',
+    'anio_ingreso': 'estudiante__anio_ingreso_universidad',
+}
+
+
+# =============================================================================
+# REFRESCO
+# =============================================================================
+
+def _celdas_estudiantes():
+    filas = EstudianteUniversitario.objects.values(
+        'carrera_id', 'carrera__campus', 'dedicacion_estudios', 'anio_ingreso_universidad'
+    ).annotate(
+        n_estudiantes=Count('id'),
+        n_abandonos=Count('id', filter=Q(estado_abandono='Abandono')),
+    ).order_by()
+
+    return [
+        CuboAnalitico(
+            anio_academico=None,
+            carrera_id=fila['carrera_id'],
+            campus=fila['carrera__campus'] or '',
+            dedicacion=fila['dedicacion_estudios'] or '',
+            anio_ingreso=fila['anio_ingreso_universidad'],
+            n_estudiantes=fila['n_estudiantes'],
+            n_abandonos=fila['n_abandonos'],
+        )
+        for fila in filas
+    ]
+
+
+def _medidas_registro():
+    return {
+        'n_estudiantes': Count('estudiante', distinct=True),
+        'n_abandonos': Count('estudiante', distinct=True, filter=Q(estudiante__estado_abandono='Abandono')),
+        'n_registros': Count('id'),
+        'n_registros_con_creditos': Count('id', filter=Q(creditos_aprobados_total_anio__gt=0)),
+        'suma_creditos_aprobados': Sum('creditos_aprobados_total_anio', filter=Q(creditos_aprobados_total_anio__gt=0)),
+        'suma_creditos_matriculados': Sum('creditos_matriculados_total_anio'),
+        'perfil_alto_activo': Count('id', filter=POBLACION_AVANZADA & ALTO_RENDIMIENTO & ACTIVO_LMS),
+        'perfil_alto_pasivo': Count('id', filter=POBLACION_AVANZADA & ALTO_RENDIMIENTO & ~ACTIVO_LMS),
+        'perfil_bajo_activo': Count('id', filter=POBLACION_AVANZADA & ~ALTO_RENDIMIENTO & ACTIVO_LMS),
+        'perfil_bajo_pasivo': Count('id', filter=POBLACION_AVANZADA & ~ALTO_RENDIMIENTO & ~ACTIVO_LMS),
+    }
+
+
+def _momentos_a_json(momentos):
+    return {clave: str(valor or 0) for clave, valor in momentos.items()}
+
+
+def _momentos_desde_json(datos):
+    return {clave: int(valor) if clave == 'n' else Decimal(valor) for clave, valor in datos.items()}
+
+
+def _celdas_registros():
+    """Celdas por año académico (medidas aditivas) y agregado de registros de las celdas 'todos los años'."""
+    medidas_registro = _medidas_registro()
+    momentos = expresiones_momentos(VARIABLES_CORRELACION, filtro=POBLACION_AVANZADA)
+    filas = RegistroAcademicoUniversitario.objects.values(
+        'anio_academico', *DIMENSIONES_REGISTRO.values()
+    ).annotate(**medidas_registro, **momentos).order_by()
+
+    # Mismo criterio que el histograma original: 0 < rendimiento <= 100, tramos de 10
+    agrupacion = ['anio_academico', *DIMENSIONES_REGISTRO.values()]
+    histogramas = histograma_sql(
+        RegistroAcademicoUniversitario.objects.all(), 'rendimiento_total_anio',
+        0, 100, TRAMOS_RENDIMIENTO, incluir_minimo=False, agrupar_por=agrupacion
+    )
+
+    celdas = []
+    for fila in filas:
+        medidas = {campo: fila[campo] or 0 for campo in medidas_registro}
+        tramos = histogramas.get(tuple(fila[c] for c in agrupacion), [0] * TRAMOS_RENDIMIENTO)
+        medidas.update(zip(CAMPOS_TRAMO, tramos))
+        medidas['momentos_correlacion'] = _momentos_a_json({clave: fila[clave] for clave in momentos})
+        celdas.append(CuboAnalitico(
+            anio_academico=fila['anio_academico'],
+            carrera_id=fila['estudiante__carrera_id'],
+            campus=fila['estudiante__carrera__campus'] or '',
+            dedicacion=fila['estudiante__dedicacion_estudios'] or '',
+            anio_ingreso=fila['estudiante__anio_ingreso_universidad'],
+            **medidas
+        ))
+    return celdas
+
+
+def _acumular_todos_los_anios(celdas_estudiantes, celdas_anio):
+    """Las medidas aditivas de las filas por año se suman en la fila NULL de su celda."""
+    por_clave = {
+        (c.carrera_id, c.dedicacion, c.anio_ingreso): c for c in celdas_estudiantes
+    }
+    aditivas = ['n_registros', 'n_registros_con_creditos', 'suma_creditos_aprobados',
+                'suma_creditos_matriculados'] + CAMPOS_TRAMO + list(PERFILES.values())
+
+    for celda in celdas_anio:
+        clave = (celda.carrera_id, celda.dedicacion, celda.anio_ingreso)
+        destino = por_clave.get(clave)
+        if destino is None:
+            continue
+        for campo in aditivas:
+            setattr(destino, campo, getattr(destino, campo) + getattr(celda, campo))
+        destino.momentos_correlacion = _momentos_a_json(sumar_momentos([
+            _momentos_desde_json(destino.momentos_correlacion),
+            _momentos_desde_json(celda.momentos_correlacion),
+        ]))
+
+
+def _celdas_asignaturas():
+    dimensiones = ['asignatura_id', 'estudiante__carrera_id', 'estudiante__carrera__campus',
+                   'estudiante__dedicacion_estudios']
+    celdas = []
+    for por_anio in (True, False):
+        campos = (['anio_academico'] if por_anio else []) + dimensiones
+        filas = RegistroAcademicoUniversitario.objects.values(*campos).annotate(
+            n_estudiantes=Count('estudiante', distinct=True)
+        ).order_by()
+        celdas.extend(
+            CuboAsignatura(
+                anio_academico=fila['anio_academico'] if por_anio else None,
+                asignatura_id=fila['asignatura_id'],
+                carrera_id=fila['estudiante__carrera_id'],
+                campus=fila['estudiante__carrera__campus'] or '',
+                dedicacion=fila['estudiante__dedicacion_estudios'] or '',
+                n_estudiantes=fila['n_estudiantes'],
+            )
+            for fila in filas
+        )
+    return celdas
+
+
+@transaction.atomic
+def refrescar_cubo():
+    """Recalcula el cubo completo. Devuelve el número de celdas escritas."""
+    celdas_estudiantes = _celdas_estudiantes()
+    celdas_anio = _celdas_registros()
+    _acumular_todos_los_anios(celdas_estudiantes, celdas_anio)
+    celdas_asignatura = _celdas_asignaturas()
+
+    CuboAnalitico.objects.all().delete()
+    CuboAsignatura.objects.all().delete()
+    CuboAnalitico.objects.bulk_create(celdas_estudiantes + celdas_anio, batch_size=2000)
+    CuboAsignatura.objects.bulk_create(celdas_asignatura, batch_size=2000)
+    # Invalida las vistas cacheadas que dependen de los datos académicos
+    VersionDatos.incrementar(VersionDatos.ACADEMICO)
+
+    total = len(celdas_estudiantes) + len(celdas_anio) + len(celdas_asignatura)
+    logger.info(f"🧊 Cubo analítico refrescado: {total} celdas")
+    return total
+
+
+# =============================================================================
+# CONSULTA
+# =============================================================================
+
+def filtro_celdas(carrera=None, campus=None, dedicacion=None, carrera_rol=None):
+    """
+    Q sobre las celdas del cubo. Los valores 'todos'/'todas' (o vacíos)
+    no filtran, como en los selects del dashboard. carrera_rol limita a la
+    carrera asignada de un coordinador de carrera.
+    """
+    filtro = Q()
+    if carrera_rol is not None:
+        filtro &= Q(carrera=carrera_rol)
+    if carrera and carrera != 'todas':
+        filtro &= Q(carrera__codigo_carrera=carrera)
+    if campus and campus != 'todos':
+        filtro &= Q(campus=campus)
+    if dedicacion and dedicacion != 'todas':
+        filtro &= Q(dedicacion=dedicacion)
+    return filtro
+
+
+def _filtro_anio(anio):
+    if anio and anio != 'todos':
+        return Q(anio_academico=anio)
+    return Q(anio_academico__isnull=True)
+
+
+def datos_dashboard(filtro, anio=None):
+    """
+    KPIs y series de los dashboards a partir del cubo.
+
+    Las medidas de estudiantes (totales, abandono, por año de ingreso y por
+    carrera) usan siempre las celdas 'todos los años', igual que antes; las de
+    registros (créditos, histograma, top asignaturas) respetan el año.
+    """
+    estudiantes = CuboAnalitico.objects.filter(filtro, anio_academico__isnull=True)
+    registros = CuboAnalitico.objects.filter(filtro, _filtro_anio(anio))
+
+    totales = estudiantes.aggregate(
+        total_estudiantes=Sum('n_estudiantes'),
+        total_abandonos=Sum('n_abandonos'),
+    )
+    total_estudiantes = totales['total_estudiantes'] or 0
+    total_abandonos = totales['total_abandonos'] or 0
+
+    agregados_registro = registros.aggregate(
+        suma_creditos=Sum('suma_creditos_aprobados'),
+        n_con_creditos=Sum('n_registros_con_creditos'),
+        **{campo: Sum(campo) for campo in CAMPOS_TRAMO}
+    )
+    n_con_creditos = agregados_registro['n_con_creditos'] or 0
+    promedio_creditos = float(agregados_registro['suma_creditos'] or 0) / n_con_creditos if n_con_creditos else 0.0
+
+    abandono_por_anio = estudiantes.filter(
+        anio_ingreso__gt=2000
+    ).values('anio_ingreso').annotate(
+        total=Sum('n_abandonos')
+    ).filter(total__gt=0).order_by('anio_ingreso')
+
+    abandono_por_carrera = estudiantes.values('carrera__codigo_carrera').annotate(
+        total=Sum('n_abandonos')
+    ).filter(total__gt=0).order_by('-total')[:10]
+
+    top_asignaturas = CuboAsignatura.objects.filter(filtro, _filtro_anio(anio)).values(
+        'asignatura__codigo_asignatura'
+    ).annotate(
+        total=Sum('n_estudiantes')
+    ).order_by('-total')[:10]
+
+    pie_labels, pie_data = [], []
+    if total_estudiantes - total_abandonos > 0:
+        pie_labels.append('Activos')
+        pie_data.append(total_estudiantes - total_abandonos)
+    if total_abandonos > 0:
+        pie_labels.append('Desertores')
+        pie_data.append(total_abandonos)
+
+    return {
+        'kpis': {
+            'total_estudiantes': total_estudiantes,
+            'total_abandonos': total_abandonos,
+            'tasa_abandono': round(total_abandonos / total_estudiantes * 100, 2) if total_estudiantes else 0,
+            'promedio_creditos': round(promedio_creditos, 2),
+        },
+        'graficos': {
+            'abandono_pie': {'labels': pie_labels, 'data': pie_data},
+            'abandono_anio': {
+                'labels': [str(x['anio_ingreso']) for x in abandono_por_anio],
+                'data': [x['total'] for x in abandono_por_anio],
+            },
+            'abandono_carrera': {
+                'labels': [x['carrera__codigo_carrera'] for x in abandono_por_carrera],
+                'data': [x['total'] for x in abandono_por_carrera],
+            },
+            'rendimiento': {
+                'labels': ETIQUETAS_RENDIMIENTO,
+                'data': [agregados_registro[campo] or 0 for campo in CAMPOS_TRAMO],
+            },
+            'top_asignaturas': {
+                'labels': [x['asignatura__codigo_asignatura'] for x in top_asignaturas],
+                'data': [x['total'] for x in top_asignaturas],
+            },
+        },
+    }
+
+
+def anios_disponibles():
+    return CuboAnalitico.objects.filter(
+        anio_academico__isnull=False
+    ).values_list('anio_academico', flat=True).distinct().order_by('-anio_academico')
+
+
+def estadisticas_avanzadas(filtro, anio=None):
+    """
+    Correlaciones, box plots, serie temporal y perfiles del dashboard avanzado.
+
+    Todo sale de tablas precalculadas: los momentos y perfiles se suman sobre
+    las celdas del cubo y los cuartiles fusionan los sketches KLL de las
+    cohortes, así que el coste no depende del número de registros. `filtro`
+    es un filtro_celdas(), válido tanto para el cubo como para los sketches.
+    """
+    celdas = CuboAnalitico.objects.filter(filtro, _filtro_anio(anio))
+
+    momentos = sumar_momentos(
+        _momentos_desde_json(datos) for datos in celdas.values_list('momentos_correlacion', flat=True)
+    )
+    matriz_correlacion = correlacion_desde_momentos(momentos, VARIABLES_CORRELACION)
+
+    # Cohortes recientes: las 5 últimas con ingreso posterior a 2015
+    cohortes = list(
+        celdas.filter(anio_ingreso__gt=2015).values('anio_ingreso').annotate(
+            total=Sum('n_estudiantes'),
+            abandonos=Sum('n_abandonos'),
+        ).order_by('-anio_ingreso')[:5]
+    )
+
+    filtro_sketches = filtro & Q(anio_academico=anio) if anio and anio != 'todos' else filtro
+    cajas = box_plot_por_anio_ingreso([c['anio_ingreso'] for c in cohortes], filtro=filtro_sketches)
+    box_plot_data = {
+        str(c['anio_ingreso']): {
+            clave: cajas[c['anio_ingreso']][clave] for clave in ['min', 'q1', 'median', 'q3', 'max', 'mean', 'std']
+        }
+        for c in cohortes if c['anio_ingreso'] in cajas
+    }
+
+    serie_temporal = [
+        {
+            'anio': str(c['anio_ingreso']),
+            'tasa_abandono': round(c['abandonos'] / c['total'] * 100, 2) if c['total'] else 0,
+            'total_estudiantes': c['total'],
+            'abandonos': c['abandonos'],
+        }
+        for c in reversed(cohortes)
+    ]
+
+    perfiles = celdas.aggregate(**{etiqueta: Sum(campo) for etiqueta, campo in PERFILES.items()})
+
+    return {
+        'matriz_correlacion': matriz_correlacion,
+        'variables_labels': ETIQUETAS_CORRELACION,
+        'box_plot_data': box_plot_data,
+        'serie_temporal': serie_temporal,
+        'perfiles_labels': list(perfiles),
+        'perfiles_data': [valor or 0 for valor in perfiles.values()],
+        'total_registros': momentos.get('n', 0),
+    }
@@ -0,0 +1,148 @@
+"""
+Estadísticas calculadas dentro de la base de datos.
+
+histograma_sql agrupa por tramo (división entera del valor) y cuenta en una
+sola consulta sobre toda la población filtrada, sin traer los valores a Python.
+momentos_sql obtiene n, sumas y sumas de productos para calcular la matriz de
+correlación de toda la población sin materializar las filas.
+"""
+
+from django.db.models import (
+    Count, DecimalField, ExpressionWrapper, F, FloatField, IntegerField, Q, Sum, Value,
+)
+from django.db.models.functions import Cast, Floor, Least
+
+
+def expresion_tramo(campo, minimo, maximo, tramos):
+    """Índice de tramo 0..tramos-1; el máximo cae en el último tramo."""
+    # Multiplicar antes de dividir: dividir entre el ancho ya redondeado
+    # (0.1) manda los bordes al tramo anterior (0.7 / 0.1 = 6.999…)
+    indice = Floor(
+        (Cast(F(campo), FloatField()) - Value(float(minimo))) * Value(tramos) / Value(float(maximo - minimo))
+    )
+    return Least(Cast(indice, IntegerField()), Value(tramos - 1))
+
+
+def histograma_sql(qs, campo, minimo, maximo, tramos=10, incluir_minimo=True, agrupar_por=None):
+    """
+    Histograma de `campo` en `tramos` intervalos iguales entre minimo y maximo.
+
+    Args:
+        qs: queryset ya filtrado (la población completa a contar).
+        incluir_minimo: si es False, el valor mínimo exacto queda fuera
+            (p. ej. rendimiento > 0).
+        agrupar_por: lista de campos; si se indica, devuelve un histograma por
+            combinación en la misma consulta.
+
+    Returns:
+        Lista de `tramos` conteos, o {tupla_grupo: lista} si hay agrupar_por.
+    """
+    rango = Q(**{f'{campo}__lte': maximo})
+    rango &= Q(**{f'{campo}__gte' if incluir_minimo else f'{campo}__gt': minimo})
+
+    agrupar_por = list(agrupar_por or [])
+    filas = qs.filter(rango).annotate(
+        tramo_histograma=expresion_tramo(campo, minimo, maximo, tramos)
+    ).values(*agrupar_por, 'tramo_histograma').annotate(
+        total_tramo=Count('pk')
+    ).order_by()
+
+    if not agrupar_por:
+        conteos = [0] * tramos
+        for fila in filas:
+            conteos[fila['tramo_histograma']] += fila['total_tramo']
+        return conteos
+
+    resultado = {}
+    for fila in filas:
+        clave = tuple(fila[c] for c in agrupar_por)
+        conteos = resultado.setdefault(clave, [0] * tramos)
+        conteos[fila['tramo_histograma']] += fila['total_tramo']
+    return resultado
+
+
+def etiquetas_histograma(minimo, maximo, tramos=10, escala=1, sufijo=''):
+    """Etiquetas 'a-b' de cada tramo; escala permite mostrar 0-1 como 0-100."""
+    ancho = (maximo - minimo) / tramos
+    return [
+        f"{(minimo + i * ancho) * escala:g}-{(minimo + (i + 1) * ancho) * escala:g}{sufijo}"
+        for i in range(tramos)
+    ]
+
+
+# =============================================================================
+# MOMENTOS Y CORRELACIONES
+# =============================================================================
+
+def _clave_producto(campo_a, campo_b):
+    return f'sxy__{campo_a}__{campo_b}'
+
+
+def expresiones_momentos(campos, filtro=None):
+    """
+    Agregados n, Σx, Σx·y (incluye Σx²) de `campos` para aggregate()/annotate().
+    Los productos se acumulan como decimales para no perder precisión con
+    columnas DecimalField (en MySQL la suma es exacta).
+
+    filtro (Q) restringe la población dentro de cada grupo, para poder
+    calcular los momentos junto a otras medidas en un mismo annotate().
+    """
+    expresiones = {'n': Count('pk', filter=filtro)}
+    for i, campo_a in enumerate(campos):
+        expresiones[f'sx__{campo_a}'] = Sum(
+            Cast(F(campo_a), DecimalField(max_digits=20, decimal_places=4)), filter=filtro
+        )
+        for campo_b in campos[i:]:
+            expresiones[_clave_producto(campo_a, campo_b)] = Sum(ExpressionWrapper(
+                F(campo_a) * F(campo_b), output_field=DecimalField(max_digits=30, decimal_places=4)
+            ), filter=filtro)
+    return expresiones
+
+
+def momentos_sql(qs, campos):
+    """Momentos de primer y segundo orden de toda la población en una consulta."""
+    return qs.order_by().aggregate(**expresiones_momentos(campos))
+
+
+def sumar_momentos(lista_momentos):
+    """Los momentos son aditivos: los de varias particiones se suman sin más."""
+    total = {}
+    for momentos in lista_momentos:
+        for clave, valor in momentos.items():
+            total[clave] = total.get(clave, 0) + (valor or 0)
+    return total
+
+
+def correlacion_desde_momentos(momentos, campos):
+    """
+    Matriz de correlación de Pearson a partir de momentos_sql().
+
+    cov(a, b) ∝ n·Σab − Σa·Σb; con sumas exactas (enteros o Decimal) la
+    resta no pierde precisión y solo el cociente final pasa a float.
+    Las variables sin varianza dan 0 fuera de la diagonal, como antes.
+    """
+    n = momentos.get('n') or 0
+    if n < 2:
+        return []
+
+    def numerador(campo_a, campo_b):
+        if campos.index(campo_a) > campos.index(campo_b):
+            campo_a, campo_b = campo_b, campo_a
+        sxy = momentos.get(_clave_producto(campo_a, campo_b)) or 0
+        sx = momentos.get(f'sx__{campo_a}') or 0
+        sy = momentos.get(f'sx__{campo_b}') or 0
+        return n * sxy - sx * sy
+
+    varianzas = [float(numerador(campo, campo)) for campo in campos]
+    matriz = []
+    for i, campo_a in enumerate(campos):
+        fila = []
+        for j, campo_b in enumerate(campos):
+            if i == j:
+                fila.append(1.0 if varianzas[i] > 0 else 0)
+            elif varianzas[i] > 0 and varianzas[j] > 0:
+                fila.append(float(numerador(campo_a, campo_b)) / (varianzas[i] * varianzas[j]) ** 0.5)
+            else:
+                fila.append(0)
+        matriz.append(fila)
+    return matriz
@@ -0,0 +1,213 @@
+"""
+Alertas urgentes del sidebar en tiempo real (server-sent events).
+
+El centro de eventos guarda en memoria la lista de alertas urgentes que
+muestra el dropdown y, cuando cambia, calcula una sola vez el delta
+(alertas que entran o cambian y alertas que salen) y lo reparte a todas
+las conexiones abiertas del proceso. Cada conexión nueva recibe la lista
+guardada sin consultar la base de datos: la carga ya no crece con
+pestañas × frecuencia de sondeo.
+
+Lo alimentan:
+- las escrituras de AlertaEstudiante de este proceso (señales, tras el
+  commit), al instante;
+- un vigilante por proceso que cada INTERVALO_VERSIONES segundos lee
+  VersionDatos y refresca si cambiaron alertas o predicciones en otro
+  proceso (p. ej. `ejecutar_deteccion_ml` o de otro worker).
+
+Las conexiones viven en el bucle de eventos ASGI; las señales llegan desde
+los hilos de las vistas síncronas, así que publicar() entrega con
+call_soon_threadsafe.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from prototipo.models import AlertaEstudiante, VersionDatos
+
+logger = logging.getLogger(__name__)
+
+LIMITE_URGENTES = 10
+INTERVALO_VERSIONES = 15
+LATIDO = 25
+MAX_PENDIENTES = 100
+DOMINIOS = [VersionDatos.ALERTAS, VersionDatos.PREDICCIONES]
+
+
+def alertas_urgentes():
+    """Alertas pendientes o en revisión de prioridad crítica o alta, las más urgentes primero."""
+    alertas = AlertaEstudiante.objects.filter(
+        estado__in=['pendiente', 'en_revision'],
+        prioridad__in=['critica', 'alta']
+    ).select_related('estudiante', 'prediccion').order_by(
+        '-prioridad',
+        '-fecha_creacion'
+    )[:LIMITE_URGENTES]
+
+    alertas_data = []
+    for alerta in alertas:
+        # Obtener índice de riesgo de la predicción (puede ser None)
+        indice_riesgo = None
+        if alerta.prediccion and alerta.prediccion.indice_riesgo is not None:
+            indice_riesgo = float(alerta.prediccion.indice_riesgo)
+
+        alertas_data.append({
+            'id': alerta.id,
+            'estudiante': alerta.estudiante.codigo_estudiante,
+            'prioridad': alerta.get_prioridad_display(),
+            'prioridad_codigo': alerta.prioridad,
+            'titulo': alerta.titulo,
+            'indice_riesgo': indice_riesgo,
+            'fecha_creacion': alerta.fecha_creacion.isoformat(),
+        })
+    return alertas_data
+
+
+def mensaje_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos)}\n\n"
+
+
+class Suscripcion:
+    """Cola de eventos de una conexión, atada al bucle en el que se creó."""
+
+    def __init__(self, bucle):
+        self.bucle = bucle
+        self.cola = asyncio.Queue(maxsize=MAX_PENDIENTES)
+
+    def entregar(self, evento):
+        # Solo desde el bucle de la suscripción
+        try:
+            self.cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Cliente que no lee: se descartan sus deltas y se le reenvía la lista entera (None)
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait(None)
+
+
+class CentroAlertas:
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._refresco = threading.Lock()
+        self._suscripciones = set()
+        self._vigilante = None
+        self.actuales = None
+        self.versiones = None
+
+    def hay_suscriptores(self):
+        return bool(self._suscripciones)
+
+    def suscribir(self):
+        """Nueva suscripción en el bucle en curso; arranca el vigilante si no hay uno en este bucle."""
+        bucle = asyncio.get_running_loop()
+        suscripcion = Suscripcion(bucle)
+        with self._candado:
+            self._suscripciones.add(suscripcion)
+            if self._vigilante is None or self._vigilante.done() or self._vigilante.get_loop() is not bucle:
+                self._vigilante = bucle.create_task(self._vigilar())
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        """Quita una suscripción (desde su bucle); con la última se para el vigilante."""
+        with self._candado:
+            self._suscripciones.discard(suscripcion)
+            if not self._suscripciones:
+                # Sin oyentes nadie refresca la lista: la próxima conexión la recalcula
+                self.actuales = self.versiones = None
+                if self._vigilante is not None:
+                    self._vigilante.cancel()
+                    self._vigilante = None
+
+    def publicar(self, evento):
+        with self._candado:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.bucle.call_soon_threadsafe(suscripcion.entregar, evento)
+            except RuntimeError:
+                # Bucle cerrado (conexión de un bucle que ya terminó)
+                with self._candado:
+                    self._suscripciones.discard(suscripcion)
+
+    def _versiones(self):
+        actuales = VersionDatos.actuales()
+        return {dominio: actuales.get(dominio, 0) for dominio in DOMINIOS}
+
+    def refrescar(self):
+        """
+        Recalcula la lista y publica el delta respecto a la guardada, si lo
+        hay. Síncrono (consulta la base de datos). Devuelve la lista.
+        """
+        with self._refresco:
+            versiones = self._versiones()
+            nuevas = alertas_urgentes()
+            # La primera lista no es un cambio: cada conexión la recibe entera al conectar
+            conocida = self.actuales is not None
+            anteriores = {alerta['id']: alerta for alerta in self.actuales or []}
+
+            delta = {
+                'altas': [alerta for alerta in nuevas if anteriores.get(alerta['id']) != alerta],
+                'bajas': sorted(set(anteriores) - {alerta['id'] for alerta in nuevas}),
+                'total': len(nuevas),
+            }
+            self.actuales, self.versiones = nuevas, versiones
+
+        if conocida and self.hay_suscriptores() and (delta['altas'] or delta['bajas']):
+            self.publicar(('delta', delta))
+        return nuevas
+
+    async def _vigilar(self):
+        while self.hay_suscriptores():
+            await asyncio.sleep(INTERVALO_VERSIONES)
+            try:
+                if await sync_to_async(self._versiones)() != self.versiones:
+                    await sync_to_async(self.refrescar)()
+            except Exception:
+                logger.exception("❌ Error refrescando alertas urgentes")
+
+    async def eventos(self):
+        """
+        Flujo SSE de una conexión: la lista completa al conectar (y tras un
+        desborde), luego los deltas y un latido cada LATIDO segundos.
+        """
+        suscripcion = self.suscribir()
+        try:
+            yield f"retry: {LATIDO * 1000}\n\n"
+            # Se suscribe antes de leer la lista: un delta que llegue entre
+            # medias se aplica de nuevo sobre ella sin efecto
+            actuales = self.actuales
+            if actuales is None:
+                actuales = await sync_to_async(self.refrescar)()
+            yield mensaje_sse('lista', {'total': len(actuales), 'alertas': actuales})
+
+            while True:
+                try:
+                    evento = await asyncio.wait_for(suscripcion.cola.get(), LATIDO)
+                except asyncio.TimeoutError:
+                    yield ": latido\n\n"
+                    continue
+
+                if evento is None:
+                    actuales = self.actuales
+                    if actuales is None:
+                        actuales = await sync_to_async(self.refrescar)()
+                    yield mensaje_sse('lista', {'total': len(actuales), 'alertas': actuales})
+                else:
+                    yield mensaje_sse(*evento)
+        finally:
+            self.cancelar(suscripcion)
+
+
+centro_alertas = CentroAlertas()
+
+
+def alerta_modificada(sender, **kwargs):
+    """Señal de AlertaEstudiante: refresca tras el commit, solo si hay alguien escuchando."""
+    if centro_alertas.hay_suscriptores():
+        transaction.on_commit(centro_alertas.refrescar)
@@ -0,0 +1,109 @@
+"""
+Libros Excel en modo write-only para las exportaciones.
+
+En modo normal openpyxl mantiene todas las celdas del libro en memoria y
+cada PatternFill/Font creado por celda se deduplica al guardar. Aquí cada
+fila se serializa en cuanto se añade (openpyxl la escribe a un temporal) y
+los formatos son NamedStyle registrados una vez por libro que las celdas
+referencian por nombre. El .xlsx final se guarda en otro temporal que
+FileResponse envía por bloques.
+"""
+
+import tempfile
+
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _relleno(color):
+    return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+
+_BORDE = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+
+# Nombre -> atributos del NamedStyle; se registra en el libro la primera vez que se usa
+ESTILOS = {
+    'cabecera': dict(font=Font(color='FFFFFF', bold=True), fill=_relleno('4472C4'),
+                     alignment=Alignment(horizontal='center', vertical='center')),
+    'riesgo_Critico': dict(font=Font(color='FFFFFF', bold=True), fill=_relleno('FF0000')),
+    'riesgo_Alto': dict(fill=_relleno('FFA500')),
+    'riesgo_Medio': dict(fill=_relleno('FFFF00')),
+    'riesgo_Bajo': dict(fill=_relleno('90EE90')),
+
+    # Ficha de un estudiante
+    'titulo': dict(font=Font(bold=True, size=14), fill=_relleno('E7F3FF'),
+                   alignment=Alignment(horizontal='center', vertical='center')),
+    'seccion': dict(font=Font(color='FFFFFF', bold=True, size=12), fill=_relleno('667eea'),
+                    alignment=Alignment(horizontal='center')),
+    'subcabecera': dict(font=Font(bold=True), fill=_relleno('D9E2F3'), border=_BORDE),
+    'etiqueta': dict(font=Font(bold=True)),
+    'celda': dict(border=_BORDE),
+    'nivel_critico': dict(fill=_relleno('FF6B6B'), border=_BORDE),
+    'nivel_alto': dict(fill=_relleno('FFC107'), border=_BORDE),
+    'nivel_medio': dict(fill=_relleno('4FACFE'), border=_BORDE),
+    'impacto_alto': dict(fill=_relleno('FFCDD2'), border=_BORDE),
+    'recomendacion': dict(fill=_relleno('FFF9C4'), alignment=Alignment(wrap_text=True)),
+}
+
+
+class HojaExcel:
+    """Hoja write-only: las filas se añaden en orden y no se pueden releer."""
+
+    def __init__(self, libro, hoja):
+        self._libro = libro
+        self._hoja = hoja
+        self.filas = 0
+
+    def celda(self, valor, estilo):
+        """Valor con un estilo de ESTILOS, para pasarlo a fila()."""
+        celda = WriteOnlyCell(self._hoja, value=valor)
+        celda.style = self._libro.estilo(estilo)
+        return celda
+
+    def fila(self, *valores):
+        self._hoja.append(valores)
+        self.filas += 1
+
+    def filas_en_blanco(self, cantidad=1):
+        for _ in range(cantidad):
+            self.fila()
+
+    def fila_fusionada(self, valor, estilo, columnas):
+        """Una celda con estilo que ocupa las `columnas` primeras columnas de la fila."""
+        self.fila(self.celda(valor, estilo))
+        self._hoja.merged_cells.add(f'A{self.filas}:{get_column_letter(columnas)}{self.filas}')
+
+
+class LibroExcel:
+
+    def __init__(self):
+        self._libro = Workbook(write_only=True)
+        self._estilos = set()
+
+    def estilo(self, nombre):
+        if nombre not in self._estilos:
+            self._libro.add_named_style(NamedStyle(name=nombre, **ESTILOS[nombre]))
+            self._estilos.add(nombre)
+        return nombre
+
+    def hoja(self, titulo, anchos=()):
+        """Nueva hoja; los anchos de columna deben fijarse antes de escribir filas."""
+        hoja = self._libro.create_sheet(titulo)
+        for columna, ancho in enumerate(anchos, 1):
+            hoja.column_dimensions[get_column_letter(columna)].width = ancho
+        return HojaExcel(self, hoja)
+
+    def guardar(self, destino):
+        self._libro.save(destino)
+
+    def respuesta(self, nombre_archivo):
+        """Guarda el libro en un temporal y lo devuelve como descarga."""
+        temporal = tempfile.TemporaryFile()
+        self.guardar(temporal)
+        temporal.seek(0)
+        return FileResponse(temporal, as_attachment=True, filename=nombre_archivo, content_type=TIPO_XLSX)
@@ -0,0 +1,164 @@
+"""
+Exportación columnar (Parquet) de predicciones para notebooks y BI.
+
+Cada fila es una predicción con los atributos de su estudiante y de su
+registro académico, con tipos de verdad: enteros, reales, booleanos,
+fechas con zona y categóricos como diccionario (pandas los lee como
+category). Se comprime con zstd, como el staging de datasets limpios.
+
+Las filas se leen por lotes de keyset sobre el id con .values() (los
+decimales se convierten a real en la propia consulta) y se escriben con
+ParquetWriter en row-groups de FILAS_POR_GRUPO: la memoria depende del
+tamaño del grupo, no del total.
+
+Además del archivo completo, anexar_ejecucion() añade tras cada detección
+un archivo con las predicciones de esa ejecución al histórico particionado
+DIRECTORIO_HISTORICO/ejecucion=<fecha>/, que se lee entero con
+pd.read_parquet(directorio).
+"""
+
+import logging
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from prototipo.service.paginacion import recorrer_keyset
+
+logger = logging.getLogger(__name__)
+
+TAM_LOTE = 5000
+FILAS_POR_GRUPO = 100_000
+COMPRESION = 'zstd'
+DIRECTORIO_HISTORICO = 'predicciones_parquet'
+
+_CATEGORIA = pa.dictionary(pa.int32(), pa.string())
+
+# (columna, ruta ORM, tipo Arrow)
+COLUMNAS = [
+    ('prediccion_id', 'id', pa.int64()),
+    ('estudiante_id', 'estudiante_id', pa.int64()),
+    ('codigo_estudiante', 'estudiante__codigo_estudiante', pa.string()),
+    ('carrera', 'estudiante__carrera__codigo_carrera', _CATEGORIA),
+    ('campus', 'estudiante__carrera__campus', _CATEGORIA),
+    ('anio_ingreso_universidad', 'estudiante__anio_ingreso_universidad', pa.int16()),
+    ('tipo_acceso_universidad', 'estudiante__tipo_acceso_universidad', _CATEGORIA),
+    ('nota_selectividad_total', 'estudiante__nota_selectividad_total', pa.float64()),
+    ('dedicacion_estudios', 'estudiante__dedicacion_estudios', _CATEGORIA),
+    ('es_desplazado', 'estudiante__es_desplazado', pa.bool_()),
+    ('estado_abandono', 'estudiante__estado_abandono', _CATEGORIA),
+    ('anio_academico', 'registro_academico__anio_academico', pa.int16()),
+    ('anio_carrera_maximo', 'registro_academico__anio_carrera_maximo', pa.int16()),
+    ('creditos_matriculados_total_anio', 'registro_academico__creditos_matriculados_total_anio', pa.float64()),
+    ('creditos_aprobados_total_anio', 'registro_academico__creditos_aprobados_total_anio', pa.float64()),
+    ('rendimiento_total_anio', 'registro_academico__rendimiento_total_anio', pa.float64()),
+    ('nota_final_asignatura', 'registro_academico__nota_final_asignatura', pa.float64()),
+    ('visitas_lms_total', 'registro_academico__visitas_lms_total', pa.int32()),
+    ('tareas_entregadas_total', 'registro_academico__tareas_entregadas_total', pa.int32()),
+    ('dias_wifi_total', 'registro_academico__dias_wifi_total', pa.int32()),
+    ('probabilidad_desercion', 'probabilidad_desercion', pa.float64()),
+    ('nivel_riesgo', 'nivel_riesgo', _CATEGORIA),
+    ('es_anomalia', 'es_anomalia', pa.bool_()),
+    ('score_anomalia', 'score_anomalia', pa.float64()),
+    ('rendimiento_predicho_futuro', 'rendimiento_predicho_futuro', pa.float64()),
+    ('ranking_cohorte', 'ranking_cohorte', pa.int32()),
+    ('ranking_universidad', 'ranking_universidad', pa.int32()),
+    ('version_modelo', 'version_modelo', _CATEGORIA),
+    ('fecha_prediccion', 'fecha_prediccion', pa.timestamp('us', tz='UTC')),
+]
+
+ESQUEMA = pa.schema(
+    [(columna, tipo) for columna, _, tipo in COLUMNAS] + [('cantidad_factores', pa.int16())]
+)
+
+
+def _proyeccion(predicciones):
+    """
+    (values() con las columnas de COLUMNAS, clave de cada columna en las
+    filas). Los DecimalField se leen ya convertidos a real.
+    """
+    modelo = predicciones.model
+    campos, convertidos, claves = [], {}, []
+    for columna, ruta, _ in COLUMNAS:
+        partes = ruta.split('__')
+        campo = modelo._meta.get_field(partes[0])
+        for parte in partes[1:]:
+            campo = campo.related_model._meta.get_field(parte)
+
+        if campo.get_internal_type() == 'DecimalField':
+            claves.append(f'r_{columna}')
+            convertidos[f'r_{columna}'] = Cast(ruta, FloatField())
+        else:
+            claves.append(ruta)
+            campos.append(ruta)
+    return predicciones.values(*campos, 'factores_riesgo', **convertidos), claves
+
+
+def _lote_arrow(filas, claves):
+    columnas = [
+        pa.array([fila[clave] for fila in filas], type=tipo)
+        for clave, (_, _, tipo) in zip(claves, COLUMNAS)
+    ]
+    columnas.append(pa.array([len(fila['factores_riesgo'] or []) for fila in filas], type=pa.int16()))
+    return pa.RecordBatch.from_arrays(columnas, schema=ESQUEMA)
+
+
+def escribir_parquet(predicciones, destino, tam_lote=TAM_LOTE, filas_por_grupo=FILAS_POR_GRUPO):
+    """
+    Escribe `predicciones` (queryset ya filtrado) como Parquet en `destino`
+    (ruta o archivo binario). Devuelve el número de filas escritas.
+    """
+    proyeccion, claves = _proyeccion(predicciones)
+    total = 0
+    pendientes, filas_pendientes = [], 0
+    lote = []
+
+    with pq.ParquetWriter(destino, ESQUEMA, compression=COMPRESION) as writer:
+        def volcar():
+            nonlocal pendientes, filas_pendientes
+            if pendientes:
+                writer.write_table(pa.Table.from_batches(pendientes), row_group_size=filas_por_grupo)
+            pendientes, filas_pendientes = [], 0
+
+        for fila in recorrer_keyset(proyeccion, ['id'], tam_lote):
+            lote.append(fila)
+            if len(lote) == tam_lote:
+                pendientes.append(_lote_arrow(lote, claves))
+                filas_pendientes += len(lote)
+                total += len(lote)
+                lote = []
+                if filas_pendientes >= filas_por_grupo:
+                    volcar()
+
+        if lote:
+            pendientes.append(_lote_arrow(lote, claves))
+            total += len(lote)
+        volcar()
+
+    return total
+
+
+def anexar_ejecucion(predicciones, fecha_ejecucion):
+    """
+    Añade las predicciones de una ejecución de detección al histórico
+    particionado. Cada ejecución es un archivo nuevo; los anteriores no se
+    reescriben. Devuelve la ruta escrita.
+    """
+    particion = os.path.join(
+        settings.EXPORTACIONES_ROOT, DIRECTORIO_HISTORICO,
+        f"ejecucion={fecha_ejecucion.strftime('%Y%m%dT%H%M%S')}",
+    )
+    os.makedirs(particion, exist_ok=True)
+    ruta = os.path.join(particion, 'predicciones.parquet')
+
+    # Se escribe a un temporal y se renombra: un lector nunca ve un archivo a
+    # medias (pyarrow ignora los archivos que empiezan por punto)
+    temporal = os.path.join(particion, '.predicciones.parquet.tmp')
+    filas = escribir_parquet(predicciones, temporal)
+    os.replace(temporal, ruta)
+
+    logger.info(f"🗂️ Histórico Parquet: {filas} predicciones en {ruta}")
+    return ruta
@@ -0,0 +1,143 @@
+"""
+Exportación del listado de predicciones ML.
+
+Las exportaciones leen solo las columnas que escriben (.values()) y recorren
+el resultado por lotes de keyset en el orden del listado del dashboard
+(índice orden_riesgo, -probabilidad, id), así que la memoria no depende del
+número de filas y la primera fila sale tras una consulta corta.
+
+El Excel se escribe con LibroExcel (modo write-only) fila a fila desde el
+mismo recorrido.
+"""
+
+import csv
+from io import StringIO
+
+from prototipo.models import AsignacionAnalista, PrediccionDesercionUniversitaria
+from prototipo.service.exportacion_excel import LibroExcel
+from prototipo.service.paginacion import recorrer_keyset
+
+TAM_LOTE = 2000
+
+CABECERAS = [
+    'ID Estudiante',
+    'Código',
+    'Probabilidad Deserción (%)',
+    'Nivel Riesgo',
+    'Es Anomalía',
+    'Score Anomalía',
+    'Rendimiento Predicho (%)',
+    'Cantidad Factores Riesgo',
+    'Factores Principales',
+    'Fecha Predicción',
+    'Año Académico',
+]
+
+CAMPOS = [
+    'estudiante_id',
+    'estudiante__codigo_estudiante',
+    'probabilidad_desercion',
+    'nivel_riesgo',
+    'es_anomalia',
+    'score_anomalia',
+    'rendimiento_predicho_futuro',
+    'factores_riesgo',
+    'fecha_prediccion',
+    'registro_academico__anio_academico',
+]
+
+CABECERAS_EXCEL = ['ID', 'Código', 'Probabilidad (%)', 'Nivel Riesgo', 'Anomalía', 'Factores', 'Fecha']
+ANCHOS_EXCEL = [15] * len(CABECERAS_EXCEL)
+NIVELES_CON_ESTILO = {'Critico', 'Alto', 'Medio'}
+
+
+def predicciones_exportables(usuario, nivel_riesgo='', solo_anomalias=''):
+    """Predicciones visibles para el rol del usuario con los filtros del dashboard."""
+    predicciones = PrediccionDesercionUniversitaria.objects.all()
+
+    rol = usuario.perfil.rol
+    if rol == 'analista':
+        predicciones = predicciones.filter(estudiante__in=AsignacionAnalista.estudiantes_de(usuario))
+    elif rol == 'coordinador_carrera':
+        carrera = usuario.perfil.carrera_asignada
+        if carrera:
+            predicciones = predicciones.filter(estudiante__carrera=carrera)
+
+    if nivel_riesgo:
+        predicciones = predicciones.filter(nivel_riesgo=nivel_riesgo)
+    if solo_anomalias == '1':
+        predicciones = predicciones.filter(es_anomalia=True)
+    return predicciones
+
+
+def registros_exportacion(predicciones, tam_lote=TAM_LOTE):
+    """Dicts con CAMPOS (y las columnas de orden) en el orden del listado."""
+    orden = PrediccionDesercionUniversitaria.ORDEN_LISTADO
+    proyeccion = predicciones.values(*dict.fromkeys([*CAMPOS, *(campo.lstrip('-') for campo in orden)]))
+    return recorrer_keyset(proyeccion, orden, tam_lote)
+
+
+def filas_exportacion(predicciones, tam_lote=TAM_LOTE):
+    """Genera una tupla por predicción, en el mismo orden y formato que CABECERAS."""
+    for fila in registros_exportacion(predicciones, tam_lote):
+        factores = fila['factores_riesgo'] or []
+        yield (
+            fila['estudiante_id'],
+            fila['estudiante__codigo_estudiante'] or '',
+            f"{fila['probabilidad_desercion'] * 100:.2f}",
+            fila['nivel_riesgo'],
+            'Sí' if fila['es_anomalia'] else 'No',
+            f"{fila['score_anomalia']:.4f}" if fila['score_anomalia'] else '',
+            f"{fila['rendimiento_predicho_futuro']:.2f}" if fila['rendimiento_predicho_futuro'] else '',
+            len(factores),
+            '; '.join(factor.get('factor', '') for factor in factores[:3]),
+            fila['fecha_prediccion'].strftime('%d/%m/%Y %H:%M'),
+            fila['registro_academico__anio_academico'] or '',
+        )
+
+
+def csv_por_bloques(filas, filas_por_bloque=TAM_LOTE):
+    """
+    Trozos de texto CSV (BOM y cabecera primero) para StreamingHttpResponse.
+    Agrupa las filas en bloques para no emitir un trozo por línea.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    writer.writerow(CABECERAS)
+    yield buffer.getvalue()
+
+    pendientes = 0
+    for fila in filas:
+        if pendientes == 0:
+            buffer.seek(0)
+            buffer.truncate()
+        writer.writerow(fila)
+        pendientes += 1
+        if pendientes == filas_por_bloque:
+            yield buffer.getvalue()
+            pendientes = 0
+
+    if pendientes:
+        yield buffer.getvalue()
+
+
+def libro_excel(predicciones, tam_lote=TAM_LOTE):
+    """LibroExcel con una hoja 'Predicciones ML': cabecera y una fila por predicción."""
+    libro = LibroExcel()
+    hoja = libro.hoja('Predicciones ML', ANCHOS_EXCEL)
+    hoja.fila(*(hoja.celda(cabecera, 'cabecera') for cabecera in CABECERAS_EXCEL))
+
+    for fila in registros_exportacion(predicciones, tam_lote):
+        nivel = fila['nivel_riesgo']
+        hoja.fila(
+            fila['estudiante_id'],
+            fila['estudiante__codigo_estudiante'] or '',
+            round(fila['probabilidad_desercion'] * 100, 2),
+            hoja.celda(nivel, f"riesgo_{nivel if nivel in NIVELES_CON_ESTILO else 'Bajo'}"),
+            'Sí' if fila['es_anomalia'] else 'No',
+            len(fila['factores_riesgo'] or []),
+            fila['fecha_prediccion'].strftime('%d/%m/%Y'),
+        )
+    return libro
@@ -8,6 +8,10 @@ from prototipo.models import (
     AsignaturaUniversitaria,
     RegistroAcademicoUniversitario
 )
+from prototipo.service.staging_columnar import leer_dataset_limpio, MESES_LMS
+from prototipo.service.actividad_lms import filas_desde_detalle, reemplazar_actividad
+from prototipo.service.cubo_analitico import refrescar_cubo
+from prototipo.service.cuantiles_cohorte import reconstruir_sketches
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +26,16 @@ class ImportadorDatosUniversitarios:
             'asignaturas_creadas': 0,
             'registros_creados': 0,
             'registros_actualizados': 0,
+            'actividad_mensual_filas': 0,
             'errores': []
         }
         self.cache_carreras = {}
         self.cache_estudiantes = {}
         self.cache_asignaturas = {}
+        # {estudiante_id: {(mes, metrica): valor}}; el LMS es por estudiante
+        self.actividad_mensual = {}
+        # (anio_academico, carrera_id) con registros creados o actualizados
+        self.particiones_tocadas = set()
     
     def limpiar_decimal(self, valor):
         if pd.isna(valor) or valor == '': return Decimal('0.00')
@@ -55,13 +64,7 @@ class ImportadorDatosUniversitarios:
             'eventos_recursos': 0, 'dias_recursos': 0 
         }
         
-        meses = [
-            '2021_09', '2021_10', '2021_11', '2021_12',
-            '2022_01', '2022_02', '2022_03', '2022_04', 
-            '2022_05', '2022_06', '2022_07', '2022_08'
-        ]
-
-        for mes in meses:
+        for mes in MESES_LMS:
             key_eventos = f'Eventos_LMS_{mes}'
             key_visitas = f'Visitas_LMS_{mes}'
             key_tareas  = f'Tareas_Entregadas_LMS_{mes}'
@@ -101,7 +104,8 @@ class ImportadorDatosUniversitarios:
     def importar_completo(self):
         print(f"🚀 Iniciando importación de: {self.ruta_csv}")
         
-        df = pd.read_csv(self.ruta_csv, sep=';', encoding='utf-8', dtype=str)
+        # Acepta el CSV ultra limpio o su staging Parquet (columnas ya tipadas)
+        df = leer_dataset_limpio(self.ruta_csv)
         total = len(df)
         
         print(f"📊 Filas detectadas: {total}")
@@ -242,7 +246,6 @@ class ImportadorDatosUniversitarios:
                         'examenes_enviados_total': lms_totales['examenes'],
                         'tiempo_total_minutos': Decimal(str(lms_totales['minutos'])),
                         'dias_wifi_total': lms_totales['wifi'],
-                        'detalle_mensual_lms': lms_mensual,
 
                         # Totales LMS calculados 
                         'eventos_recursos_total': lms_totales['eventos_recursos'],
@@ -250,6 +253,11 @@ class ImportadorDatosUniversitarios:
                     }
                 )
                 
+                if lms_mensual:
+                    self.actividad_mensual[est_obj.pk] = filas_desde_detalle(lms_mensual)
+
+                self.particiones_tocadas.add((registro.anio_academico, est_obj.carrera_id))
+
                 if created:
                     self.estadisticas['registros_creados'] += 1
                 else:
@@ -258,6 +266,16 @@ class ImportadorDatosUniversitarios:
             except Exception as e:
                 self.estadisticas['errores'].append(f"Fila {index}: {str(e)}")
 
+        if self.actividad_mensual:
+            print(f"\n📅 Guardando actividad mensual LMS de {len(self.actividad_mensual)} estudiantes...")
+            self.estadisticas['actividad_mensual_filas'] = reemplazar_actividad(self.actividad_mensual)
+
+        print(f"📦 Actualizando sketches de cuantiles de {len(self.particiones_tocadas)} particiones...")
+        reconstruir_sketches(self.particiones_tocadas)
+
+        print(f"🧊 Refrescando cubo analítico...")
+        refrescar_cubo()
+
         print(f"\n✅ Importación finalizada.")
         return self.estadisticas
 
@@ -0,0 +1,98 @@
+"""
+Contadores KPI de las vistas en una sola consulta.
+
+En lugar de una cadena de `.filter(...).count()` (una consulta y un recorrido
+por contador), cada contador es un `COUNT` condicional:
+
+    kpis(AlertaEstudiante.objects.all(),
+         total=None,
+         criticas=Q(prioridad='critica'),
+         pendientes=Q(estado='pendiente'))
+
+kpis_combinados() hace lo mismo para contadores de varias tablas: cada tabla
+es una subconsulta de una fila y se unen con CROSS JOIN en un único SELECT.
+"""
+
+from django.db import connections
+from django.db.models import Aggregate, Case, Count, Func, IntegerField, Value, When
+
+
+class ContarFilas(Func):
+    """
+    COUNT(expr) que el ORM no trata como agregado, así que no añade GROUP BY:
+    sobre un queryset sin agrupar devuelve una sola fila con el conteo.
+    """
+    function = 'COUNT'
+    output_field = IntegerField()
+
+
+def _medida(condicion):
+    """None = total; Q/Exists = conteo condicional; un Aggregate se usa tal cual."""
+    if condicion is None:
+        return Count('pk')
+    if isinstance(condicion, Aggregate):
+        return condicion
+    return Count('pk', filter=condicion)
+
+
+def kpis(qs, **medidas):
+    """
+    Todas las medidas de `qs` en una sola consulta de agregación.
+
+    Args:
+        qs: queryset base (ya filtrado por rol, etc.).
+        medidas: nombre -> None (total), Q/expresión booleana (conteo
+            condicional) o expresión de agregado (Max, Avg...).
+
+    Returns:
+        dict nombre -> valor (los conteos nunca son None).
+    """
+    resultado = qs.order_by().aggregate(**{nombre: _medida(condicion) for nombre, condicion in medidas.items()})
+    for nombre, condicion in medidas.items():
+        if not isinstance(condicion, Aggregate) and resultado[nombre] is None:
+            resultado[nombre] = 0
+    return resultado
+
+
+def kpis_combinados(*grupos):
+    """
+    Contadores de varias tablas en una sola consulta.
+
+    Args:
+        grupos: tuplas (queryset, {nombre: None | Q | expresión booleana}).
+            Aquí solo se admiten conteos, no otros agregados.
+
+    Returns:
+        dict nombre -> conteo con los nombres de todos los grupos.
+    """
+    if not grupos:
+        return {}
+
+    alias = connections[grupos[0][0].db].ops.quote_name
+    subconsultas, parametros, nombres = [], [], []
+
+    for i, (qs, condiciones) in enumerate(grupos):
+        columnas = {}
+        for j, (nombre, condicion) in enumerate(condiciones.items()):
+            # Alias internos: el nombre del KPI puede coincidir con un campo del modelo
+            interno = f'kpi_{i}_{j}'
+            if condicion is None:
+                columnas[interno] = ContarFilas(Value(1))
+            else:
+                columnas[interno] = ContarFilas(Case(When(condicion, then=Value(1))))
+            nombres.append(nombre)
+
+        sql, params = qs.order_by().annotate(**columnas).values(*columnas).query.sql_with_params()
+        subconsultas.append(f"({sql}) {alias(f'grupo_{i}')}")
+        parametros.extend(params)
+
+    consulta = "SELECT * FROM " + " CROSS JOIN ".join(subconsultas)
+    with connections[grupos[0][0].db].cursor() as cursor:
+        cursor.execute(consulta, parametros)
+        fila = cursor.fetchone()
+
+    return {nombre: valor or 0 for nombre, valor in zip(nombres, fila)}
+
+
+def porcentaje(parte, total):
+    return (parte / total * 100) if total > 0 else 0
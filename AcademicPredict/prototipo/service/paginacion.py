@@ -0,0 +1,193 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+En lugar de OFFSET, cada página pide "las N filas siguientes a la última
+que se mostró" con una condición sobre las columnas de orden; con un índice
+que coincide con ese orden, el coste de una página depende solo de su
+tamaño y no de cuántas filas hay antes.
+
+El cursor es un token opaco (base64 de la dirección y los valores de orden
+de la fila frontera) que viaja en el parámetro GET `cursor`.
+
+El total de resultados es opcional. La vista puede pasarlo si ya lo tiene
+(p. ej. de los KPIs) o pedir uno estimado: exacto cuando el resultado cabe
+en la primera página o no pasa de LIMITE_CONTEO filas, y "más de
+LIMITE_CONTEO" si no, sin contar la tabla entera.
+"""
+
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+SIGUIENTE = 's'
+ANTERIOR = 'a'
+LIMITE_CONTEO = 1000
+
+
+def _nombre(campo):
+    return campo.lstrip('-')
+
+
+def _invertir(campo):
+    return _nombre(campo) if campo.startswith('-') else f'-{campo}'
+
+
+class _CodificadorCursor(DjangoJSONEncoder):
+    """DjangoJSONEncoder trunca las fechas a milisegundos: el cursor necesita el valor exacto."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _codificar(direccion, valores):
+    contenido = json.dumps([direccion, valores], cls=_CodificadorCursor, separators=(',', ':'))
+    return base64.urlsafe_b64encode(contenido.encode('utf-8')).decode('ascii')
+
+
+def _decodificar(cursor):
+    """(dirección, valores) del cursor; uno mal formado vuelve a la primera página."""
+    try:
+        direccion, valores = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        return SIGUIENTE, None
+    if direccion not in (SIGUIENTE, ANTERIOR) or not (valores is None or isinstance(valores, list)):
+        return SIGUIENTE, None
+    return direccion, valores
+
+
+def _condicion_despues(orden, valores):
+    """
+    Filas posteriores a `valores` en `orden`, p. ej. para (a, -b, id):
+    a > va OR (a = va AND b < vb) OR (a = va AND b = vb AND id > vid).
+    """
+    condicion = Q()
+    iguales = {}
+    for campo, valor in zip(orden, valores):
+        lookup = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{_nombre(campo)}__{lookup}': valor})
+        iguales[_nombre(campo)] = valor
+    return condicion
+
+
+class PaginaKeyset:
+    """Página de resultados con los cursores para moverse a sus vecinas."""
+
+    def __init__(self, objetos, cursor_siguiente, cursor_anterior, cursor_ultima, total=None, total_exacto=True):
+        self.object_list = objetos
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.cursor_ultima = cursor_ultima
+        self.total = total
+        # False: hay más de `total` resultados (conteo acotado)
+        self.total_exacto = total_exacto
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+
+def contar_acotado(qs, limite=LIMITE_CONTEO):
+    """
+    (total, exacto): COUNT sobre como mucho `limite` + 1 filas. Por encima
+    del límite devuelve (limite, False) en lugar de recorrer el resto.
+    """
+    total = qs.order_by()[:limite + 1].count()
+    return (total, True) if total <= limite else (limite, False)
+
+
+def paginar_keyset(qs, orden, cursor=None, tam_pagina=25, total=None, estimar_total=False):
+    """
+    Una página de `qs` en el orden `orden`.
+
+    Args:
+        qs: queryset ya filtrado.
+        orden: campos del modelo o anotaciones ('-campo' = descendente), sin
+            valores NULL; el último debe ser único (normalmente 'id') para
+            desempatar.
+        cursor: token recibido en GET (None = primera página).
+        total: conteo total a mostrar, si la vista lo tiene.
+        estimar_total: sin `total`, calcularlo con contar_acotado() (no hace
+            falta consulta si todo cabe en la primera página).
+
+    Returns:
+        PaginaKeyset. Cuesta una consulta de tam_pagina + 1 filas, más el
+        conteo acotado si se estima el total.
+    """
+    direccion, valores = _decodificar(cursor) if cursor else (SIGUIENTE, None)
+    qs_total = qs
+
+    orden_consulta = list(orden) if direccion == SIGUIENTE else [_invertir(campo) for campo in orden]
+    if valores is not None:
+        if len(valores) != len(orden):
+            direccion, valores, orden_consulta = SIGUIENTE, None, list(orden)
+        else:
+            qs = qs.filter(_condicion_despues(orden_consulta, valores))
+
+    filas = list(qs.order_by(*orden_consulta)[:tam_pagina + 1])
+    hay_mas = len(filas) > tam_pagina
+    filas = filas[:tam_pagina]
+
+    if direccion == SIGUIENTE:
+        hay_siguiente, hay_anterior = hay_mas, valores is not None
+    else:
+        filas.reverse()
+        # Sin valores es la última página, pedida desde el final
+        hay_siguiente, hay_anterior = valores is not None, hay_mas
+
+    def frontera(fila, nueva_direccion):
+        return _codificar(nueva_direccion, [getattr(fila, _nombre(campo)) for campo in orden])
+
+    total_exacto = True
+    if total is None and estimar_total:
+        if valores is None and direccion == SIGUIENTE and not hay_mas:
+            total = len(filas)
+        else:
+            total, total_exacto = contar_acotado(qs_total)
+
+    return PaginaKeyset(
+        filas,
+        cursor_siguiente=frontera(filas[-1], SIGUIENTE) if hay_siguiente and filas else None,
+        cursor_anterior=frontera(filas[0], ANTERIOR) if hay_anterior and filas else None,
+        cursor_ultima=_codificar(ANTERIOR, None),
+        total=total,
+        total_exacto=total_exacto,
+    )
+
+
+def recorrer_keyset(qs, orden, tam_lote=2000):
+    """
+    Recorre `qs` entero en lotes de `tam_lote` filas, cada uno pedido con la
+    condición de keyset sobre la última fila del anterior.
+
+    A diferencia de .iterator(), la memoria es constante en cualquier backend
+    (con MySQL el driver trae igualmente el resultado completo al cliente) y
+    cada lote es una consulta corta sobre el índice del orden.
+
+    Las filas pueden ser instancias o dicts de .values(); en ese caso los
+    campos de `orden` deben estar entre los seleccionados.
+    """
+    valores = None
+    while True:
+        lote = qs.filter(_condicion_despues(orden, valores)) if valores is not None else qs
+        filas = list(lote.order_by(*orden)[:tam_lote])
+        yield from filas
+        if len(filas) < tam_lote:
+            return
+        ultima = filas[-1]
+        if isinstance(ultima, dict):
+            valores = [ultima[_nombre(campo)] for campo in orden]
+        else:
+            valores = [getattr(ultima, _nombre(campo)) for campo in orden]
@@ -0,0 +1,152 @@
+"""
+Perfilado de calidad de datos en una sola pasada por modelo.
+
+1. Una consulta de agregación condicional con, para todos los campos a la vez,
+   nulos/vacíos, ceros, mínimo, máximo y media.
+2. Un recorrido en streaming (values_list + iterator) de las columnas
+   categóricas alimentando HyperLogLog (distintos aproximados) y TopK
+   (valores más frecuentes aproximados).
+
+Con `fraccion_muestra` ambas fases trabajan sobre una muestra sistemática
+por pk y los conteos se extrapolan al total.
+"""
+
+from itertools import islice
+
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.db.models.functions import Mod
+
+from prototipo.service.sketches import HyperLogLog, TopK
+
+TIPOS_TEXTO = ['CharField', 'TextField']
+TIPOS_NUMERICOS = ['DecimalField', 'IntegerField', 'FloatField', 'PositiveIntegerField',
+                   'PositiveSmallIntegerField', 'SmallIntegerField', 'BigIntegerField']
+TIPOS_CATEGORICOS = ['CharField', 'BooleanField', 'IntegerField']
+# Con menos valores distintos que esto se muestra la distribución completa
+UMBRAL_DISTRIBUCION = 20
+
+
+def es_numerico_analizable(campo):
+    return (campo.get_internal_type() in TIPOS_NUMERICOS
+            and not campo.is_relation
+            and not campo.name.endswith('_id')
+            and 'anio' not in campo.name)
+
+
+def es_categorico_analizable(campo):
+    return (campo.get_internal_type() in TIPOS_CATEGORICOS
+            and not campo.is_relation
+            and not campo.primary_key
+            and not campo.name.startswith('id_')
+            and 'anio' not in campo.name)
+
+
+def _queryset(modelo, fraccion_muestra):
+    qs = modelo.objects.all()
+    if fraccion_muestra and 0 < fraccion_muestra < 1:
+        paso = max(int(round(1 / fraccion_muestra)), 1)
+        qs = qs.annotate(_resto_muestra=Mod(F('pk'), paso)).filter(_resto_muestra=0)
+    return qs
+
+
+def _agregados(qs, campos):
+    """Una sola consulta con todas las métricas de todos los campos."""
+    expresiones = {'_total': Count('pk')}
+    for i, campo in enumerate(campos):
+        filtro_vacio = Q(**{f"{campo.name}__isnull": True})
+        if campo.get_internal_type() in TIPOS_TEXTO:
+            filtro_vacio |= Q(**{campo.name: ''})
+        expresiones[f'c{i}_nulos'] = Count('pk', filter=filtro_vacio)
+
+        if es_numerico_analizable(campo):
+            expresiones[f'c{i}_min'] = Min(campo.name)
+            expresiones[f'c{i}_max'] = Max(campo.name)
+            expresiones[f'c{i}_avg'] = Avg(campo.name)
+            expresiones[f'c{i}_ceros'] = Count('pk', filter=Q(**{campo.name: 0}))
+
+    return qs.aggregate(**expresiones)
+
+
+def _sketches(qs, campos, top_k, tam_lote):
+    """Recorrido único de la tabla alimentando un HLL y un TopK por columna."""
+    # El TopK guarda al menos UMBRAL_DISTRIBUCION valores para poder dar la distribución completa
+    k = max(top_k, UMBRAL_DISTRIBUCION)
+    sketches = {campo.name: (HyperLogLog(), TopK(k=k)) for campo in campos}
+    if not campos:
+        return sketches
+
+    nombres = [campo.name for campo in campos]
+    filas = qs.order_by().values_list(*nombres).iterator(chunk_size=tam_lote)
+
+    while True:
+        lote = list(islice(filas, tam_lote))
+        if not lote:
+            break
+        for nombre, columna in zip(nombres, zip(*lote)):
+            hll, topk = sketches[nombre]
+            hll.agregar(columna)
+            topk.agregar(columna)
+
+    return sketches
+
+
+def perfilar_modelo(modelo, fraccion_muestra=None, top_k=10, tam_lote=20000):
+    """
+    Returns:
+        dict con 'total', 'muestra' (filas leídas) y 'campos':
+        {nombre: {tipo, nulos, llenos, porcentaje_lleno, min, max, avg, ceros,
+                  distintos_aprox, top, distribucion_completa}}
+        Con menos de UMBRAL_DISTRIBUCION valores distintos `top` trae todos
+        (distribucion_completa=True); si no, los `top_k` más frecuentes.
+        Con muestra, nulos/llenos/ceros/top vienen extrapolados al total.
+    """
+    campos = [campo for campo in modelo._meta.concrete_fields]
+    total = modelo.objects.count()
+
+    resultado = {'total': total, 'muestra': total, 'campos': {}}
+    if total == 0:
+        return resultado
+
+    qs = _queryset(modelo, fraccion_muestra)
+    agregados = _agregados(qs, campos)
+    leidas = agregados['_total'] or 0
+    resultado['muestra'] = leidas
+    if leidas == 0:
+        return resultado
+    escala = total / leidas
+
+    categoricos = [campo for campo in campos if es_categorico_analizable(campo)]
+    sketches = _sketches(qs, categoricos, top_k, tam_lote)
+
+    for i, campo in enumerate(campos):
+        nulos = int(round(agregados[f'c{i}_nulos'] * escala))
+        llenos = total - nulos
+        info = {
+            'tipo': campo.get_internal_type(),
+            'nulos': nulos,
+            'llenos': llenos,
+            'porcentaje_lleno': llenos / total * 100,
+        }
+
+        if es_numerico_analizable(campo):
+            info.update({
+                'min': agregados[f'c{i}_min'],
+                'max': agregados[f'c{i}_max'],
+                'avg': agregados[f'c{i}_avg'],
+                'ceros': int(round(agregados[f'c{i}_ceros'] * escala)),
+            })
+
+        if campo.name in sketches:
+            hll, topk = sketches[campo.name]
+            # Mientras no se poda, los candidatos del TopK son exactamente los valores vistos
+            completa = len(topk.candidatos) < UMBRAL_DISTRIBUCION
+            info['distintos_aprox'] = hll.cardinalidad()
+            info['distribucion_completa'] = completa
+            info['top'] = [
+                (valor, int(round(n * escala)))
+                for valor, n in topk.top(len(topk.candidatos) if completa else top_k)
+            ]
+
+        resultado['campos'][campo.name] = info
+
+    return resultado
@@ -0,0 +1,76 @@
+"""
+Posiciones de riesgo precalculadas para la ficha ML de cada estudiante.
+
+Tras cada ejecución de detección, recalcular_rankings() obtiene con funciones
+de ventana (una sola consulta) el puesto de cada predicción en su cohorte
+(carrera × año de ingreso) y en la universidad, el tamaño de ambos grupos y
+la probabilidad media de la cohorte, y los guarda en la propia predicción.
+La ficha lee después una sola fila en lugar de contar la tabla entera.
+
+El puesto es RANK() por probabilidad descendente: 1 + número de
+predicciones con probabilidad estrictamente mayor, igual que el cálculo
+anterior con probabilidad_desercion__gt.
+"""
+
+import logging
+
+from django.db import connections
+from django.db.models import Avg, Count, F, Window
+from django.db.models.functions import Rank
+
+from prototipo.models import PrediccionDesercionUniversitaria
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_RANKING = [
+    'ranking_cohorte',
+    'total_cohorte',
+    'promedio_cohorte',
+    'ranking_universidad',
+    'total_universidad',
+]
+
+
+def _consulta_rankings():
+    """SELECT id + una columna por campo de CAMPOS_RANKING, con funciones de ventana."""
+    cohorte = [F('estudiante__carrera_id'), F('estudiante__anio_ingreso_universidad')]
+    mayor_riesgo = F('probabilidad_desercion').desc()
+
+    return PrediccionDesercionUniversitaria.objects.annotate(
+        r_ranking_cohorte=Window(Rank(), partition_by=cohorte, order_by=mayor_riesgo),
+        r_total_cohorte=Window(Count('id'), partition_by=cohorte),
+        r_promedio_cohorte=Window(Avg('probabilidad_desercion'), partition_by=cohorte),
+        r_ranking_universidad=Window(Rank(), order_by=mayor_riesgo),
+        r_total_universidad=Window(Count('id')),
+    ).values('id', *[f'r_{campo}' for campo in CAMPOS_RANKING]).order_by()
+
+
+def recalcular_rankings():
+    """
+    Recalcula y guarda las posiciones de todas las predicciones en un único
+    UPDATE unido a la consulta de ventana (sin traer filas a Python).
+    Devuelve el número de predicciones actualizadas.
+    """
+    modelo = PrediccionDesercionUniversitaria
+    conexion = connections[modelo.objects.db]
+    q = conexion.ops.quote_name
+
+    subconsulta, parametros = _consulta_rankings().query.sql_with_params()
+    tabla = q(modelo._meta.db_table)
+    asignaciones = ', '.join(
+        f"{q(modelo._meta.get_field(campo).column)} = r.{q(f'r_{campo}')}" for campo in CAMPOS_RANKING
+    )
+
+    # Las columnas de la subconsulta llevan prefijo r_, así que el SET no es ambiguo
+    if conexion.vendor == 'mysql':
+        # MySQL materializa la tabla derivada (tiene funciones de ventana) antes del UPDATE
+        sql = f"UPDATE {tabla} JOIN ({subconsulta}) r ON {tabla}.{q('id')} = r.{q('id')} SET {asignaciones}"
+    else:
+        sql = f"UPDATE {tabla} SET {asignaciones} FROM ({subconsulta}) r WHERE {tabla}.{q('id')} = r.{q('id')}"
+
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        actualizadas = cursor.rowcount
+
+    logger.info(f"🏅 Rankings de riesgo recalculados: {actualizadas} predicciones")
+    return actualizadas
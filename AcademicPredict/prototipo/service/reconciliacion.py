@@ -0,0 +1,210 @@
+"""
+Reconciliación por conjuntos entre un dataset limpio y la base de datos.
+
+En lugar de una consulta por fila, se carga el lado BD por bloques de claves
+(una consulta por bloque), se cruzan ambos DataFrames por la clave
+(estudiante, asignatura, año) y se comparan las columnas de forma vectorizada,
+con tolerancia para los decimales. Las discrepancias se devuelven en formato
+largo (una fila por clave y columna) listas para escribirse a un reporte.
+"""
+
+import numpy as np
+import pandas as pd
+
+from prototipo.models import RegistroAcademicoUniversitario
+from prototipo.service.staging_columnar import CLAVE_REGISTRO
+
+TOLERANCIA_DECIMAL = 0.01
+
+# (Columna del dataset, campo en BD partiendo de RegistroAcademicoUniversitario, tipo)
+REGLAS_COMPARACION = [
+    # Estudiante
+    ('Estado_Abandono', 'estudiante__estado_abandono', 'str'),
+    ('Dedicacion_Estudios', 'estudiante__dedicacion_estudios', 'str'),
+    ('Nota_Selectividad_Total', 'estudiante__nota_selectividad_total', 'decimal'),
+
+    # Registro - Créditos Clave
+    ('Creditos_Matriculados_Total_Anio', 'creditos_matriculados_total_anio', 'decimal'),
+    ('Creditos_Aprobados_Total_Por_Periodo', 'creditos_aprobados_total_anio', 'decimal'),
+    ('Creditos_Matriculados_Movilidad', 'creditos_matriculados_movilidad', 'decimal'),
+
+    # Registro - Rendimiento
+    ('Rendimiento_Academico_Total_Anio', 'rendimiento_total_anio', 'decimal'),
+    ('Nota_Final_Asignatura', 'nota_final_asignatura', 'decimal'),
+]
+
+CAMPOS_CLAVE_DB = {
+    'Id_Estudiante': 'estudiante__codigo_estudiante',
+    'Id_Asignatura': 'asignatura__codigo_asignatura',
+    'Anio_Academico': 'anio_academico',
+}
+
+COLUMNAS_REPORTE = CLAVE_REGISTRO + ['tipo', 'columna', 'valor_fuente', 'valor_db']
+
+
+def columnas_necesarias(reglas=REGLAS_COMPARACION):
+    return CLAVE_REGISTRO + [col for col, _, _ in reglas]
+
+
+def _normalizar(df, reglas):
+    """Claves como texto/entero y valores canónicos: decimales a float, texto sin espacios."""
+    df = df.copy()
+    df['Id_Estudiante'] = df['Id_Estudiante'].astype(str).str.strip()
+    df['Id_Asignatura'] = df['Id_Asignatura'].astype(str).str.strip()
+    df['Anio_Academico'] = pd.to_numeric(
+        df['Anio_Academico'].astype(str).str.replace(',', '.', regex=False), errors='coerce'
+    ).fillna(0).astype(int)
+
+    for columna, _, tipo in reglas:
+        if columna not in df.columns:
+            continue
+        if tipo == 'decimal':
+            serie = df[columna]
+            if not pd.api.types.is_numeric_dtype(serie):
+                serie = pd.to_numeric(serie.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+            df[columna] = serie.astype(float).fillna(0.0)
+        else:
+            df[columna] = df[columna].astype(object).where(df[columna].notna(), '').astype(str).str.strip()
+    return df
+
+
+def cargar_bloque_db(codigos_estudiante, anios, reglas=REGLAS_COMPARACION, filtro_db=None):
+    """Una sola consulta con todos los registros de un bloque de estudiantes."""
+    campos = list(CAMPOS_CLAVE_DB.values()) + [campo for _, campo, _ in reglas]
+    qs = RegistroAcademicoUniversitario.objects.filter(
+        estudiante__codigo_estudiante__in=codigos_estudiante,
+        anio_academico__in=anios,
+    )
+    if filtro_db is not None:
+        qs = qs.filter(filtro_db)
+
+    df = pd.DataFrame.from_records(qs.values_list(*campos), columns=campos)
+    nombres = {campo: col for col, campo in CAMPOS_CLAVE_DB.items()}
+    nombres.update({campo: col for col, campo, _ in reglas})
+    return df.rename(columns=nombres)
+
+
+def comparar_frames(fuente, db, reglas=REGLAS_COMPARACION, incluir_solo_db=False):
+    """
+    Cruza fuente y BD por la clave y compara columna a columna.
+
+    Returns:
+        (discrepancias DataFrame en formato largo, nº de claves idénticas)
+    """
+    fuente = _normalizar(fuente, reglas)
+    db = _normalizar(db, reglas)
+
+    cruce = fuente.merge(db, on=CLAVE_REGISTRO, how='outer', suffixes=('_fuente', '_db'), indicator=True)
+
+    partes = []
+
+    solo_fuente = cruce[cruce['_merge'] == 'left_only']
+    if len(solo_fuente):
+        partes.append(solo_fuente[CLAVE_REGISTRO].assign(tipo='NO_EXISTE_EN_DB', columna='', valor_fuente='', valor_db=''))
+
+    if incluir_solo_db:
+        solo_db = cruce[cruce['_merge'] == 'right_only']
+        if len(solo_db):
+            partes.append(solo_db[CLAVE_REGISTRO].assign(tipo='SOLO_EN_DB', columna='', valor_fuente='', valor_db=''))
+
+    ambos = cruce[cruce['_merge'] == 'both']
+    fila_con_error = np.zeros(len(ambos), dtype=bool)
+
+    for columna, _, tipo in reglas:
+        if f'{columna}_fuente' not in ambos.columns:
+            continue
+        a = ambos[f'{columna}_fuente']
+        b = ambos[f'{columna}_db']
+        if tipo == 'decimal':
+            distinto = (a - b).abs().to_numpy() > TOLERANCIA_DECIMAL + 1e-9
+        else:
+            distinto = (a != b).to_numpy()
+
+        if distinto.any():
+            fila_con_error |= distinto
+            partes.append(ambos.loc[distinto, CLAVE_REGISTRO].assign(
+                tipo='DIFERENCIA', columna=columna,
+                valor_fuente=a[distinto].astype(str), valor_db=b[distinto].astype(str)
+            ))
+
+    discrepancias = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_REPORTE)
+    return discrepancias[COLUMNAS_REPORTE], int((~fila_con_error).sum())
+
+
+def claves_solo_db(codigos_fuente, anios, filtro_db=None, tam_lote=20000):
+    """
+    Registros de los años de la fuente cuyos estudiantes no aparecen en ella.
+    Los bloques de reconciliar() solo consultan estudiantes de la fuente, así
+    que estos se buscan aparte recorriendo las claves de la BD en una consulta.
+    """
+    qs = RegistroAcademicoUniversitario.objects.filter(anio_academico__in=anios)
+    if filtro_db is not None:
+        qs = qs.filter(filtro_db)
+
+    claves = pd.DataFrame.from_records(
+        qs.order_by().values_list(*CAMPOS_CLAVE_DB.values()).iterator(chunk_size=tam_lote),
+        columns=list(CAMPOS_CLAVE_DB),
+    )
+    claves = claves[~claves['Id_Estudiante'].isin(set(codigos_fuente))]
+    return claves.assign(tipo='SOLO_EN_DB', columna='', valor_fuente='', valor_db='')[COLUMNAS_REPORTE]
+
+
+def reconciliar(fuente, reglas=REGLAS_COMPARACION, tam_bloque=2000, incluir_solo_db=False,
+                filtro_db=None, progreso=None):
+    """
+    Reconcilia un DataFrame del dataset limpio contra la BD por bloques de estudiantes.
+
+    Args:
+        fuente: DataFrame con las columnas clave y las de `reglas`.
+        tam_bloque: estudiantes por consulta a la BD.
+        incluir_solo_db: informar también de registros que están en BD y no en la
+            fuente (solo tiene sentido si la fuente es completa, no una muestra).
+        filtro_db: Q opcional para acotar el lado BD (p. ej. una partición).
+        progreso: callable(procesadas, total) opcional.
+
+    Returns:
+        dict con 'total', 'identicos', 'claves_con_error' y 'discrepancias' (DataFrame).
+    """
+    fuente = fuente.drop_duplicates(subset=CLAVE_REGISTRO, keep='last')
+    fuente = _normalizar(fuente, reglas).sort_values(CLAVE_REGISTRO, kind='stable')
+
+    codigos = fuente['Id_Estudiante'].unique()
+    partes = []
+    identicos = 0
+    procesadas = 0
+
+    for i in range(0, len(codigos), tam_bloque):
+        bloque = codigos[i:i + tam_bloque]
+        fuente_bloque = fuente[fuente['Id_Estudiante'].isin(bloque)]
+        anios = fuente_bloque['Anio_Academico'].unique().tolist()
+
+        db_bloque = cargar_bloque_db(list(bloque), anios, reglas, filtro_db)
+        discrepancias, ok = comparar_frames(fuente_bloque, db_bloque, reglas, incluir_solo_db)
+
+        if len(discrepancias):
+            partes.append(discrepancias)
+        identicos += ok
+        procesadas += len(fuente_bloque)
+        if progreso:
+            progreso(procesadas, len(fuente))
+
+    if incluir_solo_db:
+        solo_db = claves_solo_db(codigos, fuente['Anio_Academico'].unique().tolist(), filtro_db)
+        if len(solo_db):
+            partes.append(solo_db)
+
+    discrepancias = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_REPORTE)
+    claves_con_error = len(discrepancias.drop_duplicates(subset=CLAVE_REGISTRO))
+
+    return {
+        'total': len(fuente),
+        'identicos': identicos,
+        'claves_con_error': claves_con_error,
+        'discrepancias': discrepancias,
+    }
+
+
+def escribir_reporte(discrepancias, ruta):
+    """Reporte de discrepancias en el mismo formato ';' que el resto de CSVs del proyecto."""
+    discrepancias.to_csv(ruta, sep=';', index=False, encoding='utf-8')
+    return ruta
@@ -0,0 +1,155 @@
+"""
+Reportes Excel de detalle por estudiante, uno o en lote.
+
+datos_detalle() lee en una sola consulta (predicción + estudiante +
+carrera + registro, con .values()) todo lo que pinta el reporte, así que
+el lote no hace consultas por estudiante. Cada reporte se dibuja desde
+ese dict plano con libro_detalle().
+
+zip_reportes() reparte el dibujo de los libros entre un pool de procesos
+(openpyxl es CPU puro y no libera el GIL) y va escribiendo cada .xlsx en
+el zip en cuanto llega. Los procesos se crean con 'spawn': el servidor
+tiene hilos (exportaciones en segundo plano) y hacer fork de un proceso
+con hilos puede dejar bloqueos heredados.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from django.db.models import F
+
+from prototipo.service.exportacion_excel import LibroExcel
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de esto arrancar el pool cuesta más que dibujar los libros aquí
+MIN_REPORTES_POOL = 20
+MAX_REPORTES = 5000
+
+CAMPOS_DETALLE = {
+    'codigo': F('estudiante__codigo_estudiante'),
+    'carrera': F('estudiante__carrera__nombre'),
+    'anio_academico': F('registro_academico__anio_academico'),
+    'fecha': F('fecha_prediccion'),
+    'probabilidad': F('probabilidad_desercion'),
+    'nivel': F('nivel_riesgo'),
+    'anomalia': F('es_anomalia'),
+    'factores': F('factores_riesgo'),
+}
+
+
+def datos_detalle(predicciones):
+    """Lista de dicts con CAMPOS_DETALLE, una consulta, ordenada por código."""
+    return list(predicciones.order_by('estudiante__codigo_estudiante').values(**CAMPOS_DETALLE))
+
+
+def nombre_reporte(datos):
+    return f"detalle_estudiante_{datos['codigo']}.xlsx"
+
+
+def libro_detalle(datos):
+    """LibroExcel con el reporte de riesgo de un estudiante (dict de datos_detalle)."""
+    libro = LibroExcel()
+    ws = libro.hoja("Detalle Estudiante", [25, 20, 25, 15, 12])
+
+    ws.fila_fusionada(f"REPORTE DE RIESGO - ESTUDIANTE {datos['codigo']}", 'titulo', 4)
+
+    ws.filas_en_blanco()
+    ws.fila(ws.celda("Código:", 'etiqueta'), datos['codigo'])
+    ws.fila(ws.celda("Carrera:", 'etiqueta'), datos['carrera'])
+    ws.fila(ws.celda("Año Académico:", 'etiqueta'), datos['anio_academico'])
+    ws.fila(ws.celda("Fecha Predicción:", 'etiqueta'), datos['fecha'].strftime('%d/%m/%Y %H:%M'))
+
+    ws.filas_en_blanco()
+    ws.fila_fusionada("MÉTRICAS DE RIESGO", 'seccion', 4)
+    ws.fila(*(ws.celda(header, 'subcabecera') for header in ["Métrica", "Valor", "Interpretación", "Nivel"]))
+
+    prob_pct = datos['probabilidad'] * 100
+    if prob_pct > 80:
+        interpretacion, nivel, estilo_nivel = "MUY ALTO RIESGO", "CRÍTICO", 'nivel_critico'
+    elif prob_pct > 60:
+        interpretacion, nivel, estilo_nivel = "ALTO RIESGO", "ALTO", 'nivel_alto'
+    else:
+        interpretacion, nivel, estilo_nivel = "Riesgo moderado", "MEDIO", 'nivel_medio'
+    ws.fila(
+        ws.celda("Probabilidad Deserción", 'celda'),
+        ws.celda(f"{prob_pct:.1f}%", 'celda'),
+        ws.celda(interpretacion, 'celda'),
+        ws.celda(nivel, estilo_nivel),
+    )
+    ws.fila(*(ws.celda(valor, 'celda') for valor in [
+        "Nivel de Riesgo", datos['nivel'], "Clasificación ML", datos['nivel'],
+    ]))
+    ws.fila(*(ws.celda(valor, 'celda') for valor in [
+        "Es Anomalía",
+        "Sí" if datos['anomalia'] else "No",
+        "Patrón atípico" if datos['anomalia'] else "Patrón normal",
+        "⚠️" if datos['anomalia'] else "✓",
+    ]))
+
+    if datos['factores']:
+        ws.filas_en_blanco()
+        ws.fila_fusionada("FACTORES DE RIESGO IDENTIFICADOS", 'seccion', 5)
+        ws.fila(*(ws.celda(header, 'subcabecera') for header in
+                  ["Factor", "Valor Actual", "Valor Esperado", "Impacto", "Peso (%)"]))
+
+        for factor in datos['factores']:
+            ws.fila(
+                ws.celda(factor['factor'], 'celda'),
+                ws.celda(str(factor['valor_actual']), 'celda'),
+                ws.celda(factor['valor_esperado'], 'celda'),
+                ws.celda(factor['impacto'], 'impacto_alto' if factor['impacto'] == 'ALTO' else 'celda'),
+                ws.celda(f"{factor['peso']:.1f}%", 'celda'),
+            )
+            ws.fila_fusionada(f"💡 Recomendación: {factor['recomendacion']}", 'recomendacion', 5)
+
+    return libro
+
+
+def _renderizar(datos):
+    """(nombre, bytes del .xlsx). Se ejecuta en los procesos del pool."""
+    buffer = BytesIO()
+    libro_detalle(datos).guardar(buffer)
+    return nombre_reporte(datos), buffer.getvalue()
+
+
+def zip_reportes(lista_datos, destino, procesos=None):
+    """
+    Escribe en `destino` (ruta o archivo binario) un zip con un reporte por
+    elemento de `lista_datos`. Devuelve el número de reportes.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    inicio = time.time()
+
+    # Los .xlsx ya están comprimidos: se guardan tal cual
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_STORED) as archivo_zip:
+        if procesos == 1 or len(lista_datos) < MIN_REPORTES_POOL:
+            for nombre, contenido in map(_renderizar, lista_datos):
+                archivo_zip.writestr(nombre, contenido)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=procesos,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            ) as pool:
+                lote = max(1, len(lista_datos) // (procesos * 4))
+                for nombre, contenido in pool.map(_renderizar, lista_datos, chunksize=lote):
+                    archivo_zip.writestr(nombre, contenido)
+
+    logger.info(f"🗜️ {len(lista_datos)} reportes de detalle en {time.time() - inicio:.1f}s ({procesos} procesos)")
+    return len(lista_datos)
+
+
+def escribir_zip_reportes(predicciones, destino):
+    """Zip con el reporte de cada predicción de `predicciones` (para trabajos de exportación)."""
+    if predicciones.count() > MAX_REPORTES:
+        raise ValueError(
+            f"Demasiados estudiantes para un lote de reportes (máximo {MAX_REPORTES}); filtra por nivel de riesgo"
+        )
+    return zip_reportes(datos_detalle(predicciones), destino)
@@ -0,0 +1,166 @@
+"""
+Verificación rápida de sincronización extracto ↔ base de datos.
+
+Cada fila se reduce a un texto canónico (clave + columnas comparadas, decimales
+como centésimas enteras) y se le aplica CRC32. Por partición
+(carrera × año académico) se guardan el número de filas y la suma de los CRC:
+en la BD con una única consulta agregada y en el extracto con pandas. Solo las
+particiones cuyo par (filas, suma) no coincide necesitan reconciliarse fila a fila.
+"""
+
+import zlib
+from decimal import Decimal, ROUND_HALF_EVEN
+
+import pandas as pd
+from django.db.models import BigIntegerField, CharField, Count, F, Func, IntegerField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round, Trim
+
+from prototipo.models import RegistroAcademicoUniversitario
+from prototipo.service.reconciliacion import REGLAS_COMPARACION, CAMPOS_CLAVE_DB
+from prototipo.service.staging_columnar import CLAVE_REGISTRO
+
+SEPARADOR = '|'
+CLAVE_PARTICION = ['Id_Carrera', 'Anio_Academico']
+CAMPOS_PARTICION_DB = {
+    'Id_Carrera': 'estudiante__carrera__codigo_carrera',
+    'Anio_Academico': 'anio_academico',
+}
+
+
+class CRC32(Func):
+    """CRC32 de un texto. Nativa en MySQL; en SQLite se registra al conectar."""
+    function = 'CRC32'
+    output_field = BigIntegerField()
+
+
+class ConcatPlano(Func):
+    """
+    CONCAT en un solo nivel. Concat de Django anida pares con COALESCE y con
+    muchas columnas desborda el parser de SQLite; aquí todas las partes ya
+    vienen sin NULL.
+    """
+    function = 'CONCAT'
+    output_field = CharField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='(%(expressions)s)', arg_joiner=' || ', **extra_context)
+
+
+def registrar_funciones_sqlite(sender, connection, **kwargs):
+    """Receptor de connection_created: añade CRC32 a SQLite (desarrollo y tests)."""
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            'CRC32', 1,
+            lambda texto: None if texto is None else zlib.crc32(str(texto).encode('utf-8')),
+            deterministic=True
+        )
+
+
+# =============================================================================
+# LADO BASE DE DATOS
+# =============================================================================
+
+def _expresion_canonica(reglas):
+    partes = [Trim(Cast(F(campo), CharField())) for campo in CAMPOS_CLAVE_DB.values()]
+    for _, campo, tipo in reglas:
+        if tipo == 'decimal':
+            centesimas = Cast(Round(Coalesce(F(campo), Value(0)) * 100), IntegerField())
+            partes.append(Cast(centesimas, CharField()))
+        else:
+            partes.append(Trim(Coalesce(F(campo), Value(''))))
+
+    intercaladas = []
+    for parte in partes:
+        if intercaladas:
+            intercaladas.append(Value(SEPARADOR))
+        intercaladas.append(parte)
+    return ConcatPlano(*intercaladas)
+
+
+def checksums_db(reglas=REGLAS_COMPARACION, filtro_db=None):
+    """DataFrame (Id_Carrera, Anio_Academico, filas, checksum) con una consulta agregada."""
+    qs = RegistroAcademicoUniversitario.objects.all()
+    if filtro_db is not None:
+        qs = qs.filter(filtro_db)
+
+    filas = qs.values(*CAMPOS_PARTICION_DB.values()).annotate(
+        filas=Count('id'),
+        checksum=Sum(CRC32(_expresion_canonica(reglas))),
+    ).order_by()
+
+    df = pd.DataFrame.from_records(
+        filas.values_list(*CAMPOS_PARTICION_DB.values(), 'filas', 'checksum'),
+        columns=CLAVE_PARTICION + ['filas', 'checksum']
+    )
+    return _tipar_particiones(df)
+
+
+# =============================================================================
+# LADO EXTRACTO
+# =============================================================================
+
+def _centesimas(serie):
+    if not pd.api.types.is_numeric_dtype(serie):
+        serie = pd.to_numeric(serie.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+    return serie.astype(float).fillna(0.0).map(
+        lambda v: str(int(Decimal(repr(v)).quantize(Decimal('0.01'), ROUND_HALF_EVEN) * 100))
+    )
+
+
+def _texto(serie):
+    return serie.astype(object).where(serie.notna(), '').astype(str).str.strip()
+
+
+def checksums_fuente(df, reglas=REGLAS_COMPARACION):
+    """
+    Mismo cálculo que checksums_db sobre el dataset limpio. Se deduplica por
+    clave quedándose con la última fila, igual que el importador.
+    """
+    df = df.drop_duplicates(subset=CLAVE_REGISTRO, keep='last')
+
+    anio = pd.to_numeric(df['Anio_Academico'].astype(str).str.replace(',', '.', regex=False), errors='coerce')
+    anio = anio.fillna(0).astype(int)
+
+    partes = [_texto(df['Id_Estudiante']), _texto(df['Id_Asignatura']), anio.astype(str)]
+    for columna, _, tipo in reglas:
+        serie = df[columna] if columna in df.columns else pd.Series('', index=df.index)
+        partes.append(_centesimas(serie) if tipo == 'decimal' else _texto(serie))
+
+    canonica = partes[0].str.cat(partes[1:], sep=SEPARADOR)
+    crc = canonica.map(lambda texto: zlib.crc32(texto.encode('utf-8')))
+
+    resumen = pd.DataFrame({
+        'Id_Carrera': _texto(df['Id_Carrera']),
+        'Anio_Academico': anio,
+        'crc': crc,
+    }).groupby(CLAVE_PARTICION, as_index=False).agg(filas=('crc', 'size'), checksum=('crc', 'sum'))
+    return _tipar_particiones(resumen)
+
+
+def _tipar_particiones(df):
+    df['Id_Carrera'] = df['Id_Carrera'].astype(str)
+    df['Anio_Academico'] = df['Anio_Academico'].astype(int)
+    df['filas'] = df['filas'].astype('int64')
+    # En MySQL SUM() devuelve Decimal: se pasa a int sin pasar por float
+    df['checksum'] = df['checksum'].map(lambda valor: int(valor or 0)).astype('int64')
+    return df
+
+
+# =============================================================================
+# COMPARACIÓN
+# =============================================================================
+
+def comparar_particiones(fuente, db):
+    """
+    Une los resúmenes de ambos lados. Columna 'estado':
+    OK, DIFERENTE, SOLO_FUENTE o SOLO_DB.
+    """
+    cruce = fuente.merge(db, on=CLAVE_PARTICION, how='outer', suffixes=('_fuente', '_db'), indicator=True)
+    mismos = (cruce['filas_fuente'] == cruce['filas_db']) & (cruce['checksum_fuente'] == cruce['checksum_db'])
+
+    cruce['estado'] = 'DIFERENTE'
+    cruce.loc[mismos, 'estado'] = 'OK'
+    cruce.loc[cruce['_merge'] == 'left_only', 'estado'] = 'SOLO_FUENTE'
+    cruce.loc[cruce['_merge'] == 'right_only', 'estado'] = 'SOLO_DB'
+
+    return cruce.drop(columns='_merge').sort_values(CLAVE_PARTICION).reset_index(drop=True)
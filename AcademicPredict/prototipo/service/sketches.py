@@ -0,0 +1,244 @@
+"""
+Sketches probabilísticos para perfilar columnas en una sola pasada.
+
+- HyperLogLog: número aproximado de valores distintos con memoria fija.
+- TopK (Count-Min + candidatos): valores más frecuentes aproximados.
+- KLL: cuantiles aproximados (mediana, cuartiles...) con memoria acotada.
+
+Todos trabajan por lotes (arrays de numpy/pandas) para que el recorrido
+en streaming de tablas grandes no dependa de bucles Python por valor, y
+todos se pueden fusionar (merge) si se calculan por partes.
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+MASCARA_64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def hash_valores(valores):
+    """Hash de 64 bits estable de un lote de valores (None/NaN incluidos)."""
+    serie = pd.Series(valores, dtype=object).map(lambda v: '' if v is None else str(v))
+    return pd.util.hash_array(serie.to_numpy(dtype=object), categorize=False)
+
+
+class HyperLogLog:
+    """HyperLogLog con 2^precision registros (error típico ~ 1.04 / sqrt(m))."""
+
+    def __init__(self, precision=12):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registros = np.zeros(self.m, dtype=np.uint8)
+
+    def agregar_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if hashes.size == 0:
+            return
+        indices = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        resto = (hashes << np.uint64(self.precision)) & MASCARA_64
+        # Posición del primer bit a 1 en los (64 - p) bits restantes
+        bits = 64 - self.precision
+        rho = np.full(hashes.shape, bits + 1, dtype=np.uint8)
+        no_cero = resto != 0
+        if no_cero.any():
+            longitud = np.floor(np.log2(resto[no_cero].astype(np.float64))).astype(np.int64) + 1
+            longitud = np.minimum(longitud, 64)  # el redondeo a float puede dar 2^64
+            rho[no_cero] = (64 - longitud + 1).astype(np.uint8)
+        np.maximum.at(self.registros, indices, rho)
+
+    def agregar(self, valores):
+        self.agregar_hashes(hash_valores(valores))
+
+    def merge(self, otro):
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def cardinalidad(self):
+        m = self.m
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / np.sum(np.power(2.0, -self.registros.astype(np.float64)))
+        vacios = int(np.count_nonzero(self.registros == 0))
+        if estimacion <= 2.5 * m and vacios:
+            # Corrección para cardinalidades pequeñas (linear counting)
+            estimacion = m * np.log(m / vacios)
+        return int(round(estimacion))
+
+
+class CountMinSketch:
+    """Frecuencias aproximadas (nunca por debajo del valor real)."""
+
+    def __init__(self, ancho=2048, profundidad=4):
+        self.ancho = ancho
+        self.profundidad = profundidad
+        self.tabla = np.zeros((profundidad, ancho), dtype=np.int64)
+
+    def _columnas(self, hashes):
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = hashes >> np.uint64(32)
+        return [((h1 + np.uint64(i) * h2) % np.uint64(self.ancho)).astype(np.int64) for i in range(self.profundidad)]
+
+    def agregar_hashes(self, hashes, cuentas=None):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if cuentas is None:
+            cuentas = np.ones(hashes.shape, dtype=np.int64)
+        for fila, columnas in enumerate(self._columnas(hashes)):
+            np.add.at(self.tabla[fila], columnas, cuentas)
+
+    def estimar_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        estimaciones = [self.tabla[fila][columnas] for fila, columnas in enumerate(self._columnas(hashes))]
+        return np.min(np.vstack(estimaciones), axis=0)
+
+    def merge(self, otro):
+        self.tabla += otro.tabla
+        return self
+
+
+class TopK:
+    """
+    Valores más frecuentes: Count-Min para las frecuencias y un conjunto
+    acotado de candidatos (los mejores de cada lote) para saber qué valores
+    consultar.
+    """
+
+    def __init__(self, k=10, ancho=2048, profundidad=4, factor_candidatos=5):
+        self.k = k
+        self.max_candidatos = k * factor_candidatos
+        self.cms = CountMinSketch(ancho, profundidad)
+        self.candidatos = {}  # valor -> hash
+
+    def agregar(self, valores):
+        conteo = pd.Series(valores, dtype=object).map(lambda v: None if pd.isna(v) else v).value_counts(dropna=False)
+        if conteo.empty:
+            return
+        hashes = hash_valores(conteo.index.tolist())
+        self.cms.agregar_hashes(hashes, conteo.to_numpy(dtype=np.int64))
+
+        for valor, h in zip(conteo.index[:self.max_candidatos], hashes[:self.max_candidatos]):
+            self.candidatos[valor] = h
+        self._podar()
+
+    def _podar(self):
+        if len(self.candidatos) <= self.max_candidatos:
+            return
+        valores = list(self.candidatos)
+        estimaciones = self.cms.estimar_hashes(np.array([self.candidatos[v] for v in valores], dtype=np.uint64))
+        mejores = heapq.nlargest(self.max_candidatos, zip(estimaciones.tolist(), range(len(valores))))
+        self.candidatos = {valores[i]: self.candidatos[valores[i]] for _, i in mejores}
+
+    def merge(self, otro):
+        self.cms.merge(otro.cms)
+        self.candidatos.update(otro.candidatos)
+        self._podar()
+        return self
+
+    def top(self, k=None):
+        """Lista [(valor, frecuencia_estimada)] de mayor a menor."""
+        if not self.candidatos:
+            return []
+        valores = list(self.candidatos)
+        estimaciones = self.cms.estimar_hashes(np.array([self.candidatos[v] for v in valores], dtype=np.uint64))
+        orden = sorted(zip(valores, estimaciones.tolist()), key=lambda par: -par[1])
+        return orden[:k or self.k]
+
+
+class KLL:
+    """
+    Sketch de cuantiles KLL. Cada nivel h guarda elementos con peso 2^h;
+    cuando un nivel supera su capacidad se ordena y se promueve al nivel
+    siguiente uno de cada dos elementos (pares o impares al azar). El error
+    de rango es ~ O(1/k) y dos sketches se fusionan concatenando niveles,
+    así que un sketch por celda se puede combinar para cualquier filtro.
+    """
+
+    def __init__(self, k=200, semilla=None):
+        self.k = k
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self.niveles = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(semilla)
+
+    def _capacidad(self, nivel):
+        altura = len(self.niveles)
+        return max(int(np.ceil(self.k * (2 / 3) ** (altura - 1 - nivel))), 2)
+
+    def _compactar(self):
+        nivel = 0
+        while nivel < len(self.niveles):
+            if len(self.niveles[nivel]) > self._capacidad(nivel):
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0, dtype=np.float64))
+                datos = np.sort(self.niveles[nivel])
+                # Con un número impar de elementos el último se queda en el nivel
+                resto = datos[len(datos) - len(datos) % 2:]
+                datos = datos[:len(datos) - len(datos) % 2]
+                promovidos = datos[int(self._rng.integers(2))::2]
+                self.niveles[nivel] = resto
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], promovidos])
+            nivel += 1
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if valores.size == 0:
+            return
+        self.n += int(valores.size)
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        self.niveles[0] = np.concatenate([self.niveles[0], valores])
+        self._compactar()
+
+    def merge(self, otro):
+        if otro.n == 0:
+            return self
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0, dtype=np.float64))
+        for nivel, datos in enumerate(otro.niveles):
+            self.niveles[nivel] = np.concatenate([self.niveles[nivel], datos])
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._compactar()
+        return self
+
+    def cuantiles(self, probabilidades):
+        """Lista de cuantiles aproximados; 0 y 1 devuelven el mínimo y el máximo exactos."""
+        if self.n == 0:
+            return [None for _ in probabilidades]
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(datos), 2.0 ** nivel) for nivel, datos in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind='stable')
+        valores, acumulado = valores[orden], np.cumsum(pesos[orden])
+
+        resultado = []
+        for q in probabilidades:
+            if q <= 0:
+                resultado.append(self.minimo)
+            elif q >= 1:
+                resultado.append(self.maximo)
+            else:
+                indice = int(np.searchsorted(acumulado, q * acumulado[-1], side='left'))
+                resultado.append(float(valores[min(indice, len(valores) - 1)]))
+        return resultado
+
+    def a_bytes(self):
+        cabecera = np.array([self.k, self.n, len(self.niveles)] + [len(datos) for datos in self.niveles], dtype=np.int64)
+        cuerpo = np.concatenate([np.array([self.minimo, self.maximo], dtype=np.float64)] + self.niveles)
+        return cabecera.tobytes() + cuerpo.tobytes()
+
+    @classmethod
+    def desde_bytes(cls, contenido):
+        contenido = bytes(contenido)
+        k, n, altura = np.frombuffer(contenido, dtype=np.int64, count=3)
+        longitudes = np.frombuffer(contenido, dtype=np.int64, count=int(altura), offset=3 * 8)
+        cuerpo = np.frombuffer(contenido, dtype=np.float64, offset=(3 + int(altura)) * 8)
+
+        sketch = cls(k=int(k))
+        sketch.n = int(n)
+        sketch.minimo, sketch.maximo = float(cuerpo[0]), float(cuerpo[1])
+        limites = np.cumsum(np.concatenate([[2], longitudes]))
+        sketch.niveles = [cuerpo[limites[i]:limites[i + 1]].copy() for i in range(int(altura))]
+        return sketch
@@ -0,0 +1,167 @@
+"""
+Lectura del staging de datasets limpios.
+
+`limpiar_dataset_DEFINITIVO.py` deja junto a cada CSV ultra limpio un archivo
+Parquet con columnas tipadas (números como números, categóricos como
+diccionario). El importador, `validar_importacion` y la preparación de datos
+ML leen cualquiera de los dos formatos a través de este módulo; con Parquet se
+aprovecha la proyección de columnas y el filtrado por estadísticas de
+row-group (predicate pushdown) sin re-parsear texto.
+"""
+
+import os
+
+import pandas as pd
+
+EXTENSIONES_COLUMNARES = ('.parquet', '.pq')
+EXTENSIONES_ADMITIDAS = ('.csv',) + EXTENSIONES_COLUMNARES
+
+MESES_LMS = [
+    '2021_09', '2021_10', '2021_11', '2021_12',
+    '2022_01', '2022_02', '2022_03', '2022_04',
+    '2022_05', '2022_06', '2022_07', '2022_08'
+]
+
+# Columna del dataset limpio -> campo de RegistroAcademicoUniversitario
+COLUMNAS_REGISTRO = {
+    'Anio_Academico': 'anio_academico',
+    'Anio_Carrera_Minimo': 'anio_carrera_minimo',
+    'Anio_Carrera_Maximo': 'anio_carrera_maximo',
+    **{f'Creditos_Matriculados_Anio_Carrera_{i}': f'creditos_matriculados_anio_{i}' for i in range(1, 7)},
+    **{f'Creditos_Aprobados_Anio_Carrera_{i}': f'creditos_aprobados_anio_{i}' for i in range(1, 7)},
+    'Creditos_Aprobados_Examen': 'creditos_aprobados_examen',
+    'Creditos_Aprobados_Especiales': 'creditos_aprobados_especiales',
+    'Creditos_Matriculados_Semestre_1': 'creditos_matriculados_semestre_1',
+    'Creditos_Matriculados_Semestre_2': 'creditos_matriculados_semestre_2',
+    'Creditos_Matriculados_Anuales': 'creditos_matriculados_anuales',
+    'Creditos_Aprobados_Semestre_1': 'creditos_aprobados_semestre_1',
+    'Creditos_Aprobados_Semestre_2': 'creditos_aprobados_semestre_2',
+    'Creditos_Aprobados_Anuales': 'creditos_aprobados_anuales',
+    'Creditos_Matriculados_Total_Anio': 'creditos_matriculados_total_anio',
+    'Creditos_Aprobados_Total_Por_Periodo': 'creditos_aprobados_total_anio',
+    'Creditos_Aprobados_Titulo_Global': 'creditos_aprobados_titulo_global',
+    'Creditos_Pendientes_Titulo_Global': 'creditos_pendientes_titulo_global',
+    'Creditos_Pendientes_Acta_Oficial': 'creditos_pendientes_acta_oficial',
+    'Creditos_Matriculados_Oficiales': 'creditos_matriculados_oficiales',
+    'Creditos_Matriculados_Movilidad': 'creditos_matriculados_movilidad',
+    'Creditos_Matriculados_Practicas': 'creditos_matriculados_practicas',
+    'Creditos_Practicas_Empresa': 'creditos_practicas_empresa',
+    'Creditos_Actividades_Extracurriculares': 'creditos_actividades_extracurriculares',
+    'Creditos_Ajuste_Reconocimientos': 'creditos_ajuste_reconocimientos',
+    'Rendimiento_Academico_Semestre_1': 'rendimiento_semestre_1',
+    'Rendimiento_Academico_Semestre_2': 'rendimiento_semestre_2',
+    'Rendimiento_Academico_Total_Anio': 'rendimiento_total_anio',
+    'Rendimiento_Academico_Anio_Previo_1': 'rendimiento_anio_previo_1',
+    'Rendimiento_Academico_Anio_Previo_2': 'rendimiento_anio_previo_2',
+    'Rendimiento_Academico_Anio_Previo_3': 'rendimiento_anio_previo_3',
+    'Nota_Final_Asignatura': 'nota_final_asignatura',
+}
+
+# Prefijo de las columnas mensuales LMS -> total guardado en el registro
+TOTALES_LMS = {
+    'Eventos_LMS': 'eventos_lms_total',
+    'Visitas_LMS': 'visitas_lms_total',
+    'Tareas_Entregadas_LMS': 'tareas_entregadas_total',
+    'Examenes_Enviados_LMS': 'examenes_enviados_total',
+    'Minutos_Totales_LMS': 'tiempo_total_minutos',
+    'Dias_Acceso_Wifi_Campus': 'dias_wifi_total',
+    'Eventos_Recursos_LMS': 'eventos_recursos_total',
+    'Dias_Acceso_Recursos_LMS': 'dias_recursos_total',
+}
+
+CLAVE_REGISTRO = ['Id_Estudiante', 'Id_Asignatura', 'Anio_Academico']
+
+
+def es_staging_columnar(ruta):
+    return os.path.splitext(str(ruta))[1].lower() in EXTENSIONES_COLUMNARES
+
+
+def columnas_disponibles(ruta):
+    """Nombres de columna del archivo sin leer sus datos."""
+    if es_staging_columnar(ruta):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(ruta).names)
+    return list(pd.read_csv(ruta, sep=';', encoding='utf-8', dtype=str, nrows=0).columns)
+
+
+def leer_dataset_limpio(ruta, columnas=None, filtros=None):
+    """
+    Lee un dataset limpio (Parquet o CSV ';').
+
+    Args:
+        columnas: lista de columnas a cargar (proyección). None = todas.
+        filtros: lista de tuplas (columna, operador, valor) combinadas con AND.
+            Operadores: '=', '==', '!=', 'in'. En Parquet se empujan al lector
+            y se descartan row-groups completos; en CSV se aplican tras leer.
+
+    Returns:
+        DataFrame. Desde CSV todas las columnas llegan como texto (igual que
+        antes); desde Parquet llegan con su tipo.
+    """
+    if es_staging_columnar(ruta):
+        return pd.read_parquet(ruta, engine='pyarrow', columns=columnas, filters=filtros or None)
+
+    usecols = None
+    if columnas is not None:
+        usecols = list(dict.fromkeys(list(columnas) + [f[0] for f in (filtros or [])]))
+    df = pd.read_csv(ruta, sep=';', encoding='utf-8', dtype=str, usecols=usecols)
+
+    if filtros:
+        mascara = pd.Series(True, index=df.index)
+        for columna, operador, valor in filtros:
+            serie = df[columna].astype(str).str.strip()
+            if operador in ('=', '=='):
+                mascara &= serie == str(valor)
+            elif operador == '!=':
+                mascara &= serie != str(valor)
+            elif operador == 'in':
+                mascara &= serie.isin([str(v) for v in valor])
+            else:
+                raise ValueError(f"Operador de filtro no soportado en CSV: {operador}")
+        df = df[mascara]
+        if columnas is not None:
+            df = df[list(columnas)]
+
+    return df
+
+
+def _a_numerico(serie):
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie
+    return pd.to_numeric(serie.astype(str).str.replace(',', '.', regex=False), errors='coerce')
+
+
+def leer_registros_staging(ruta):
+    """
+    Devuelve un DataFrame con los nombres de campo de RegistroAcademicoUniversitario
+    (más 'estado_abandono'), tal como quedarían tras la importación, sin pasar
+    por la base de datos.
+    """
+    disponibles = set(columnas_disponibles(ruta))
+
+    columnas_lms = [
+        f'{prefijo}_{mes}' for prefijo in TOTALES_LMS for mes in MESES_LMS
+        if f'{prefijo}_{mes}' in disponibles
+    ]
+    columnas_registro = [c for c in COLUMNAS_REGISTRO if c in disponibles]
+    columnas = list(dict.fromkeys(CLAVE_REGISTRO + ['Estado_Abandono'] + columnas_registro + columnas_lms))
+
+    df = leer_dataset_limpio(ruta, columnas=columnas)
+
+    # El importador hace update_or_create sobre la clave: gana la última fila
+    df = df.drop_duplicates(subset=CLAVE_REGISTRO, keep='last')
+
+    data = pd.DataFrame(index=df.index)
+    for columna, campo in COLUMNAS_REGISTRO.items():
+        if columna in df.columns:
+            data[campo] = _a_numerico(df[columna]).fillna(0)
+
+    for prefijo, campo in TOTALES_LMS.items():
+        mensuales = [c for c in columnas_lms if c.startswith(f'{prefijo}_')]
+        if mensuales:
+            data[campo] = df[mensuales].apply(_a_numerico).fillna(0).sum(axis=1)
+        else:
+            data[campo] = 0
+
+    data['estado_abandono'] = df['Estado_Abandono'].astype(str).str.strip()
+    return data.reset_index(drop=True)
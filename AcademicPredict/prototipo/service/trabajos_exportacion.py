@@ -0,0 +1,200 @@
+"""
+Exportaciones en segundo plano con archivos reutilizables.
+
+solicitar() calcula la clave de la exportación (tipo, filtros, alcance del
+usuario y versiones de los dominios de datos que lee, como la caché de
+vistas) y reutiliza el trabajo que ya tenga esa clave: si está completado
+el archivo se descarga al instante y si está en curso se espera al mismo.
+Solo se encolan los trabajos nuevos y los que fallaron.
+
+Los trabajos corren en un ThreadPoolExecutor del propio proceso cuando la
+petición hace commit. Los que queden pendientes tras un reinicio los
+termina `manage.py procesar_exportaciones`, que también purga los archivos
+de versiones de datos ya superadas.
+
+Los archivos van a EXPORTACIONES_ROOT, fuera de MEDIA_ROOT: solo se
+descargan por la vista, que compara el alcance del usuario con el del
+trabajo.
+"""
+
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from prototipo.models import PrediccionDesercionUniversitaria, TrabajoExportacion, VersionDatos
+from prototipo.service.cache_vistas import alcance_usuario, clave_cache
+from prototipo.service.exportacion_predicciones import (
+    csv_por_bloques, filas_exportacion, libro_excel, predicciones_exportables,
+)
+from prototipo.service.exportacion_parquet import escribir_parquet
+from prototipo.service.reportes_detalle import escribir_zip_reportes
+
+logger = logging.getLogger(__name__)
+
+NIVELES_VALIDOS = {nivel for nivel, _ in PrediccionDesercionUniversitaria.NIVEL_RIESGO_CHOICES}
+
+_ejecutor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'EXPORTACIONES_HILOS', 2), thread_name_prefix='exportacion'
+)
+
+
+def almacenamiento():
+    return FileSystemStorage(location=settings.EXPORTACIONES_ROOT)
+
+
+def _escribir_csv(predicciones, destino):
+    for bloque in csv_por_bloques(filas_exportacion(predicciones)):
+        destino.write(bloque.encode('utf-8'))
+
+
+def _escribir_excel(predicciones, destino):
+    libro_excel(predicciones).guardar(destino)
+
+
+# tipo -> (función que escribe el archivo, nombre de descarga)
+GENERADORES = {
+    TrabajoExportacion.PREDICCIONES_CSV: (_escribir_csv, 'estudiantes_riesgo.csv'),
+    TrabajoExportacion.PREDICCIONES_EXCEL: (_escribir_excel, 'predicciones_ml.xlsx'),
+    TrabajoExportacion.PREDICCIONES_PARQUET: (escribir_parquet, 'predicciones_ml.parquet'),
+    TrabajoExportacion.REPORTES_DETALLE: (escribir_zip_reportes, 'reportes_detalle.zip'),
+}
+
+
+def filtros_exportacion(parametros):
+    """Filtros del dashboard ML normalizados, para que la clave no dependa de valores irrelevantes."""
+    nivel = parametros.get('nivel_riesgo', '')
+    return {
+        'nivel_riesgo': nivel if nivel in NIVELES_VALIDOS else '',
+        'anomalias': '1' if parametros.get('anomalias') == '1' else '',
+    }
+
+
+def _dominios(alcance):
+    dominios = [VersionDatos.ACADEMICO, VersionDatos.PREDICCIONES]
+    if alcance['rol'] == 'analista':
+        # Las asignaciones de analistas versionan con las alertas
+        dominios.append(VersionDatos.ALERTAS)
+    return dominios
+
+
+def _versiones(alcance, actuales=None):
+    actuales = VersionDatos.actuales() if actuales is None else actuales
+    return {dominio: actuales.get(dominio, 0) for dominio in _dominios(alcance)}
+
+
+def nombre_descarga(trabajo):
+    return GENERADORES[trabajo.tipo][1]
+
+
+def solicitar(usuario, tipo, parametros):
+    """
+    Trabajo de exportación para `usuario` con los filtros de `parametros`
+    (QueryDict o dict). Devuelve el existente si ya hay uno con la misma
+    clave; si no, lo crea y lo encola tras el commit.
+    """
+    filtros = filtros_exportacion(parametros)
+    alcance = alcance_usuario(usuario)
+    versiones = _versiones(alcance)
+    clave = clave_cache(tipo, versiones, alcance, filtros).rsplit(':', 1)[1]
+
+    trabajo, encolar = TrabajoExportacion.objects.get_or_create(
+        tipo=tipo,
+        clave=clave,
+        defaults={'filtros': filtros, 'alcance': alcance, 'versiones': versiones, 'solicitado_por': usuario},
+    )
+
+    perdido = trabajo.estado == TrabajoExportacion.COMPLETADO and not almacenamiento().exists(trabajo.archivo)
+    if trabajo.estado == TrabajoExportacion.ERROR or perdido:
+        # Se reintenta una vez: si otra petición ya lo reencoló, update() no toca nada
+        encolar = TrabajoExportacion.objects.filter(pk=trabajo.pk, estado=trabajo.estado).update(
+            estado=TrabajoExportacion.PENDIENTE, archivo='', error='', solicitado_por=usuario,
+            fecha_inicio=None, fecha_fin=None,
+        ) == 1
+        trabajo.refresh_from_db()
+
+    if encolar:
+        trabajo_id = trabajo.pk
+        transaction.on_commit(lambda: _ejecutor.submit(_ejecutar_en_hilo, trabajo_id))
+    return trabajo
+
+
+def _ejecutar_en_hilo(trabajo_id):
+    try:
+        ejecutar_trabajo(trabajo_id)
+    finally:
+        # Cada hilo abre sus propias conexiones
+        connections.close_all()
+
+
+def ejecutar_trabajo(trabajo_id):
+    """
+    Genera el archivo de un trabajo pendiente. Devuelve False si el trabajo
+    no estaba pendiente (otro hilo o proceso ya lo tomó).
+    """
+    tomado = TrabajoExportacion.objects.filter(pk=trabajo_id, estado=TrabajoExportacion.PENDIENTE).update(
+        estado=TrabajoExportacion.EN_PROCESO, fecha_inicio=timezone.now(),
+    )
+    if not tomado:
+        return False
+
+    trabajo = TrabajoExportacion.objects.select_related('solicitado_por__perfil').get(pk=trabajo_id)
+    escribir, nombre = GENERADORES[trabajo.tipo]
+    inicio = time.time()
+
+    try:
+        # Con el mismo alcance cualquier solicitante ve las mismas filas
+        predicciones = predicciones_exportables(
+            trabajo.solicitado_por,
+            nivel_riesgo=trabajo.filtros.get('nivel_riesgo', ''),
+            solo_anomalias=trabajo.filtros.get('anomalias', ''),
+        )
+        with tempfile.TemporaryFile() as temporal:
+            escribir(predicciones, temporal)
+            temporal.seek(0)
+            extension = nombre.rsplit('.', 1)[1]
+            trabajo.archivo = almacenamiento().save(f"{trabajo.tipo}_{trabajo.clave[:12]}.{extension}", File(temporal))
+        trabajo.estado = TrabajoExportacion.COMPLETADO
+        logger.info(f"📦 Exportación {trabajo.tipo} #{trabajo.pk} generada en {time.time() - inicio:.1f}s")
+    except Exception as e:
+        logger.exception(f"❌ Error generando la exportación #{trabajo.pk}")
+        trabajo.estado = TrabajoExportacion.ERROR
+        trabajo.error = str(e)
+
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save(update_fields=['estado', 'archivo', 'error', 'fecha_fin'])
+    return True
+
+
+def reencolar_interrumpidos(antiguedad=timedelta(hours=1)):
+    """Vuelve a pendiente los trabajos en proceso desde hace más de `antiguedad` (proceso caído)."""
+    return TrabajoExportacion.objects.filter(
+        estado=TrabajoExportacion.EN_PROCESO, fecha_inicio__lt=timezone.now() - antiguedad,
+    ).update(estado=TrabajoExportacion.PENDIENTE, fecha_inicio=None)
+
+
+def purgar_obsoletos(antiguedad=timedelta(hours=24)):
+    """
+    Borra los trabajos terminados hace más de `antiguedad` cuyas versiones
+    de datos ya no son las actuales (su clave no se volverá a pedir) y sus
+    archivos. Devuelve cuántos borró.
+    """
+    actuales = VersionDatos.actuales()
+    terminados = TrabajoExportacion.objects.filter(
+        estado__in=[TrabajoExportacion.COMPLETADO, TrabajoExportacion.ERROR],
+        fecha_fin__lt=timezone.now() - antiguedad,
+    )
+
+    obsoletos = [trabajo for trabajo in terminados if trabajo.versiones != _versiones(trabajo.alcance, actuales)]
+    for trabajo in obsoletos:
+        if trabajo.archivo:
+            almacenamiento().delete(trabajo.archivo)
+    TrabajoExportacion.objects.filter(pk__in=[trabajo.pk for trabajo in obsoletos]).delete()
+    return len(obsoletos)
@@ -1,3 +1,1360 @@
-from django.test import TestCase
+import json
+import tempfile
+import zipfile
+import zlib
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Avg, Count, Exists, F, OuterRef, Q, Sum
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from prototipo.models import (
+    ActividadMensualLMS,
+    AlertaEstudiante,
+    AsignacionAnalista,
+    AsignaturaUniversitaria,
+    CarreraUniversitaria,
+    CuboAnalitico,
+    EstudianteUniversitario,
+    FichaSeguimientoEstudiante,
+    IntervencionEstudiante,
+    PrediccionDesercionUniversitaria,
+    RegistroAcademicoUniversitario,
+    SketchCohorte,
+    TrabajoExportacion,
+    TrigramaEstudiante,
+    VersionDatos,
+)
+from prototipo.ml.predictor import FEATURES_MODELO
+from prototipo.ml.views_ml import generar_alertas_desde_predicciones
+from prototipo.service.actividad_lms import filas_desde_detalle, reemplazar_actividad
+from prototipo.service.busqueda_estudiantes import autocompletar, filtro_codigo
+from prototipo.service.cache_vistas import estadisticas_cache, obtener_o_calcular
+from prototipo.service.cubo_analitico import VARIABLES_CORRELACION, datos_dashboard, filtro_celdas, refrescar_cubo
+from prototipo.service.cuantiles_cohorte import reconstruir_sketches
+from prototipo.service.eventos_alertas import alertas_urgentes, centro_alertas
+from prototipo.service.estadisticas_sql import correlacion_desde_momentos, histograma_sql, momentos_sql, sumar_momentos
+from prototipo.service.kpis import kpis, kpis_combinados
+from prototipo.service.exportacion_parquet import DIRECTORIO_HISTORICO, ESQUEMA, anexar_ejecucion, escribir_parquet
+from prototipo.service.exportacion_predicciones import CABECERAS, CABECERAS_EXCEL, filas_exportacion
+from prototipo.service.paginacion import contar_acotado, paginar_keyset, recorrer_keyset
+from prototipo.service.perfilado import perfilar_modelo
+from prototipo.service.ranking_riesgo import recalcular_rankings
+from prototipo.service.reconciliacion import COLUMNAS_REPORTE, comparar_frames, reconciliar
+from prototipo.service.reportes_detalle import MIN_REPORTES_POOL, datos_detalle, nombre_reporte, zip_reportes
+from prototipo.service.sincronizacion import checksums_db, checksums_fuente, comparar_particiones
+from prototipo.service.sketches import HyperLogLog, KLL, TopK
+from prototipo.service.staging_columnar import leer_registros_staging
+from prototipo.service.trabajos_exportacion import ejecutar_trabajo, purgar_obsoletos
+
+PRIORIDADES = ['critica', 'alta', 'media', 'baja']
+ESTADOS = ['pendiente', 'en_revision', 'resuelta', 'descartada']
+NIVELES = [('Critico', 0.9), ('Alto', 0.7), ('Medio', 0.45), ('Bajo', 0.1)]
+
+
+class DatosKPIMixin:
+    """Una carrera con 12 estudiantes, cada uno con registro, predicción, alerta y ficha."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin_test', password='x')
+        cls.usuario.perfil.rol = 'admin'
+        cls.usuario.perfil.save()
+
+        carrera = CarreraUniversitaria.objects.create(codigo_carrera='C1', campus='Valencia')
+        asignatura = AsignaturaUniversitaria.objects.create(codigo_asignatura='A1', carrera=carrera, anio_carrera=1)
+
+        for i in range(12):
+            estudiante = EstudianteUniversitario.objects.create(
+                codigo_estudiante=f'E{i:03d}', carrera=carrera,
+                anio_ingreso_universidad=2020, anio_inicio_estudios=2020,
+                tipo_acceso_universidad='PAU', nivel_educativo_padre='-', nivel_educativo_madre='-',
+                dedicacion_estudios='TiempoCompleto', estado_abandono='NoAbandono',
+            )
+            registro = RegistroAcademicoUniversitario.objects.create(
+                estudiante=estudiante, asignatura=asignatura, anio_academico=2023,
+                anio_carrera_minimo=1, anio_carrera_maximo=1,
+            )
+            nivel, probabilidad = NIVELES[i % 4]
+            PrediccionDesercionUniversitaria.objects.create(
+                estudiante=estudiante, registro_academico=registro,
+                probabilidad_desercion=probabilidad, nivel_riesgo=nivel,
+            )
+            AlertaEstudiante.objects.create(
+                estudiante=estudiante, tipo_alerta='manual', titulo='t', mensaje='m',
+                prioridad=PRIORIDADES[i % 4], estado=ESTADOS[i % 4 if i < 8 else 0],
+            )
+            FichaSeguimientoEstudiante.objects.create(
+                estudiante=estudiante, en_seguimiento=i % 2 == 0, ultimo_indice_riesgo=i * 8,
+            )
+            if i % 3 == 0:
+                IntervencionEstudiante.objects.create(
+                    estudiante=estudiante, tipo_intervencion='llamada', titulo='t',
+                    descripcion='d', resultado='exitosa', responsable=cls.usuario,
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+
+class KPIsTests(DatosKPIMixin, TestCase):
+
+    def test_kpis_coinciden_con_counts_separados(self):
+        base = FichaSeguimientoEstudiante.objects.filter(en_seguimiento=True)
+        with self.assertNumQueries(1):
+            resultado = kpis(
+                base,
+                total=None,
+                critico=Q(ultimo_indice_riesgo__gte=70),
+                con_intervenciones=Exists(IntervencionEstudiante.objects.filter(estudiante=OuterRef('estudiante'))),
+            )
+        self.assertEqual(resultado['total'], base.count())
+        self.assertEqual(resultado['critico'], base.filter(ultimo_indice_riesgo__gte=70).count())
+        self.assertEqual(
+            resultado['con_intervenciones'],
+            base.annotate(n=Count('estudiante__intervenciones')).filter(n__gt=0).count()
+        )
+
+    def test_kpis_combinados_una_consulta_varias_tablas(self):
+        with self.assertNumQueries(1):
+            resultado = kpis_combinados(
+                (AlertaEstudiante.objects.all(), {'total_alertas': None, 'criticas': Q(prioridad='critica')}),
+                # total_alertas también es un campo de la ficha: no debe chocar
+                (FichaSeguimientoEstudiante.objects.all(), {'en_seguimiento': Q(en_seguimiento=True)}),
+                (CarreraUniversitaria.objects.all(), {'carreras': None}),
+            )
+        self.assertEqual(resultado, {
+            'total_alertas': 12,
+            'criticas': AlertaEstudiante.objects.filter(prioridad='critica').count(),
+            'en_seguimiento': 6,
+            'carreras': 1,
+        })
+
+    def test_kpis_sin_filas(self):
+        resultado = kpis(AlertaEstudiante.objects.none(), total=None, criticas=Q(prioridad='critica'))
+        self.assertEqual(resultado, {'total': 0, 'criticas': 0})
+
+
+class PaginacionKeysetTests(DatosKPIMixin, TestCase):
+
+    def test_recorrido_completo_en_ambos_sentidos(self):
+        orden = PrediccionDesercionUniversitaria.ORDEN_LISTADO
+        esperado = list(PrediccionDesercionUniversitaria.objects.order_by(*orden).values_list('id', flat=True))
+
+        vistos, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                pagina = paginar_keyset(PrediccionDesercionUniversitaria.objects.all(), orden, cursor, tam_pagina=5)
+            vistos += [prediccion.id for prediccion in pagina]
+            if not pagina.has_next():
+                break
+            cursor = pagina.cursor_siguiente
+        self.assertEqual(vistos, esperado)
+
+        pagina = paginar_keyset(PrediccionDesercionUniversitaria.objects.all(), orden, pagina.cursor_ultima, tam_pagina=5)
+        hacia_atras = [prediccion.id for prediccion in pagina]
+        while pagina.has_previous():
+            pagina = paginar_keyset(PrediccionDesercionUniversitaria.objects.all(), orden, pagina.cursor_anterior, tam_pagina=5)
+            hacia_atras = [prediccion.id for prediccion in pagina] + hacia_atras
+        self.assertEqual(hacia_atras, esperado)
+
+    def test_orden_riesgo_se_mantiene_en_update_or_create(self):
+        prediccion = PrediccionDesercionUniversitaria.objects.filter(nivel_riesgo='Bajo').first()
+        self.assertEqual(prediccion.orden_riesgo, 4)
+        PrediccionDesercionUniversitaria.objects.update_or_create(
+            estudiante=prediccion.estudiante,
+            defaults={'nivel_riesgo': 'Critico', 'probabilidad_desercion': 0.95},
+        )
+        prediccion.refresh_from_db()
+        self.assertEqual(prediccion.orden_riesgo, 1)
+
+    def test_cursor_no_valido_vuelve_al_inicio(self):
+        pagina = paginar_keyset(
+            PrediccionDesercionUniversitaria.objects.all(), PrediccionDesercionUniversitaria.ORDEN_LISTADO,
+            cursor='no-es-un-cursor', tam_pagina=5,
+        )
+        self.assertFalse(pagina.has_previous())
+        self.assertEqual(pagina.object_list[0].nivel_riesgo, 'Critico')
+
+    def test_total_estimado(self):
+        alertas = AlertaEstudiante.objects.all()
+        orden = AlertaEstudiante.ORDEN_LISTADO
+
+        # Todo cabe en la primera página: el total sale de las filas, sin conteo
+        with self.assertNumQueries(1):
+            pagina = paginar_keyset(alertas, orden, tam_pagina=20, estimar_total=True)
+        self.assertEqual((pagina.total, pagina.total_exacto), (12, True))
+
+        with self.assertNumQueries(2):
+            pagina = paginar_keyset(alertas, orden, tam_pagina=5, estimar_total=True)
+        self.assertEqual((pagina.total, pagina.total_exacto), (12, True))
+        pagina = paginar_keyset(alertas, orden, pagina.cursor_siguiente, tam_pagina=5, estimar_total=True)
+        self.assertEqual(pagina.total, 12)
+
+        self.assertEqual(contar_acotado(alertas, limite=12), (12, True))
+        self.assertEqual(contar_acotado(alertas, limite=10), (10, False))
+
+    def test_cursor_con_fechas_del_mismo_milisegundo(self):
+        base = timezone.now().replace(microsecond=500_000)
+        for i, alerta in enumerate(AlertaEstudiante.objects.order_by('id')):
+            alerta.fecha_creacion = base + timedelta(microseconds=i % 4)
+            alerta.save(update_fields=['fecha_creacion'])
+
+        orden = AlertaEstudiante.ORDEN_LISTADO
+        esperado = list(AlertaEstudiante.objects.order_by(*orden).values_list('id', flat=True))
+        vistos, cursor = [], None
+        while True:
+            pagina = paginar_keyset(AlertaEstudiante.objects.all(), orden, cursor, tam_pagina=5)
+            vistos += [alerta.id for alerta in pagina]
+            if not pagina.has_next():
+                break
+            cursor = pagina.cursor_siguiente
+        self.assertEqual(vistos, esperado)
+
+    def test_listados_de_alertas_por_cursor(self):
+        url = reverse('alertas:listado_seguimiento')
+        # Filtro de intervenciones: semi-join, y cada ficha con su número de intervenciones
+        respuesta = self.client.get(url, {'intervenciones': 'si'})
+        fichas = [(ficha.estudiante.codigo_estudiante, ficha.num_intervenciones) for ficha in respuesta.context['page_obj']]
+        self.assertEqual(fichas, [('E006', 1), ('E000', 1)])
+        self.assertEqual(respuesta.context['page_obj'].total, 2)
+
+        respuesta = self.client.get(reverse('alertas:dashboard'), {'busqueda': 'E00', 'estado': 'pendiente'})
+        alertas = [alerta.estudiante.codigo_estudiante for alerta in respuesta.context['page_obj']]
+        self.assertEqual(alertas, ['E009', 'E008', 'E004', 'E000'])
+        self.assertContains(respuesta, '4 resultados')
+
+
+class RankingRiesgoTests(DatosKPIMixin, TestCase):
+
+    def test_rankings_coinciden_con_conteos(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(recalcular_rankings(), 12)
+
+        todas = PrediccionDesercionUniversitaria.objects.all()
+        for prediccion in todas:
+            mayores = todas.filter(probabilidad_desercion__gt=prediccion.probabilidad_desercion).count()
+            self.assertEqual(prediccion.ranking_cohorte, mayores + 1)
+            self.assertEqual(prediccion.ranking_universidad, mayores + 1)
+            self.assertEqual(prediccion.total_cohorte, 12)
+            self.assertEqual(prediccion.total_universidad, 12)
+            self.assertAlmostEqual(prediccion.promedio_cohorte, (0.9 + 0.7 + 0.45 + 0.1) / 4)
+
+    def test_ficha_lee_rankings_guardados(self):
+        recalcular_rankings()
+        prediccion = PrediccionDesercionUniversitaria.objects.get(estudiante__codigo_estudiante='E001')
+        # sesión/usuario/perfil + predicción + registro anterior + asignación actual + analistas
+        with self.assertNumQueries(7):
+            respuesta = self.client.get(reverse('ml:estudiante_detalle_ml', args=[prediccion.estudiante_id]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['ranking'], 4)
+
+    def test_ficha_sin_rankings_no_escribe(self):
+        # Predicción sin puestos (aún no hubo detección completa): la ficha solo lee
+        prediccion = PrediccionDesercionUniversitaria.objects.get(estudiante__codigo_estudiante='E001')
+        self.assertIsNone(prediccion.ranking_universidad)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('ml:estudiante_detalle_ml', args=[prediccion.estudiante_id]))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse([c['sql'] for c in consultas if c['sql'].lstrip().upper().startswith('UPDATE')])
+        self.assertIsNone(respuesta.context['ranking'])
+        self.assertEqual(respuesta.context['top_percentil'], 0)
+        self.assertContains(respuesta, 'Ranking a nivel universidad: —')
+        prediccion.refresh_from_db()
+        self.assertIsNone(prediccion.ranking_universidad)
+
+
+class BusquedaEstudiantesTests(DatosKPIMixin, TestCase):
+
+    def test_filtro_equivale_a_icontains(self):
+        estudiantes = EstudianteUniversitario.objects.all()
+        for texto in ['e', '01', 'E00', '010', 'e0 1-1', 'E0111', 'X']:
+            esperado = set(estudiantes.filter(codigo_estudiante__icontains=texto.replace(' ', '').replace('-', '')))
+            self.assertEqual(set(estudiantes.filter(filtro_codigo(texto))), esperado, texto)
+
+    def test_autocompletar_prefijo_antes_que_fragmento(self):
+        estudiante = EstudianteUniversitario.objects.get(codigo_estudiante='E000')
+        estudiante.codigo_estudiante = '001X'
+        estudiante.save()
+        # La primera búsqueda cuenta la frecuencia de sus trigramas; después sale de la caché
+        with self.assertNumQueries(3):
+            autocompletar('001', limite=5)
+        with self.assertNumQueries(2):
+            resultados = autocompletar('001', limite=5)
+        self.assertEqual([r['codigo'] for r in resultados], ['001X', 'E001'])
+
+        # Si los prefijos llenan el límite basta una consulta
+        with self.assertNumQueries(1):
+            self.assertEqual(len(autocompletar('E0', limite=3)), 3)
+
+    def test_trigramas_se_rehacen_al_cambiar_codigo(self):
+        estudiante = EstudianteUniversitario.objects.get(codigo_estudiante='E005')
+        estudiante.codigo_estudiante = 'abc-77'
+        estudiante.save()
+        self.assertEqual(estudiante.codigo_busqueda, 'ABC77')
+        self.assertEqual(
+            sorted(TrigramaEstudiante.objects.filter(estudiante=estudiante).values_list('trigrama', flat=True)),
+            ['ABC', 'BC7', 'C77'],
+        )
+        self.assertEqual(list(EstudianteUniversitario.objects.filter(filtro_codigo('bc7'))), [estudiante])
+
+        # Guardar sin cambiar el código no toca el índice
+        estudiante = EstudianteUniversitario.objects.get(pk=estudiante.pk)
+        with self.assertNumQueries(1):
+            estudiante.save()
+
+    def test_api_autocompletar(self):
+        respuesta = self.client.get(reverse('api_buscar_estudiantes'), {'q': 'e01'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([r['codigo'] for r in respuesta.json()['resultados']], ['E010', 'E011'])
+        self.assertEqual(self.client.get(reverse('api_buscar_estudiantes'), {'q': 'e', 'limite': 'x'}).status_code, 400)
+
+
+class AsignacionAnalistaTests(DatosKPIMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.analista = User.objects.create_user('analista_test', password='x')
+        cls.analista.perfil.rol = 'analista'
+        cls.analista.perfil.save()
+        cls.otro_analista = User.objects.create_user('analista_otro', password='x')
+        cls.otro_analista.perfil.rol = 'analista'
+        cls.otro_analista.perfil.save()
+
+    def test_asignar_y_reasignar(self):
+        estudiante = EstudianteUniversitario.objects.get(codigo_estudiante='E003')
+        respuesta = self.client.post(reverse('asignar_analista', args=[estudiante.id]), {'analista_id': self.analista.id})
+        self.assertRedirects(respuesta, reverse('ml:estudiante_detalle_ml', args=[estudiante.id]), fetch_redirect_response=False)
+        self.assertTrue(AsignacionAnalista.esta_asignado(self.analista, estudiante.id))
+
+        AsignacionAnalista.asignar(estudiante, self.otro_analista, asignada_por=self.usuario)
+        self.assertFalse(AsignacionAnalista.esta_asignado(self.analista, estudiante.id))
+        self.assertEqual(AsignacionAnalista.objects.filter(estudiante=estudiante, activa=True).get().analista, self.otro_analista)
+
+    def test_analista_solo_ve_sus_estudiantes(self):
+        asignados = list(EstudianteUniversitario.objects.filter(codigo_estudiante__in=['E000', 'E005']))
+        for estudiante in asignados:
+            AsignacionAnalista.asignar(estudiante, self.analista)
+        AsignacionAnalista.asignar(EstudianteUniversitario.objects.get(codigo_estudiante='E007'), self.otro_analista)
+
+        self.client.force_login(self.analista)
+        respuesta = self.client.get(reverse('ml:dashboard_ml'))
+        self.assertEqual(
+            sorted(prediccion.estudiante.codigo_estudiante for prediccion in respuesta.context['page_obj']),
+            ['E000', 'E005'],
+        )
+        self.assertEqual(respuesta.context['page_obj'].total, 2)
+
+        detalle = self.client.get(reverse('ml:estudiante_detalle_ml', args=[asignados[0].id]))
+        self.assertEqual(detalle.status_code, 200)
+        ajeno = EstudianteUniversitario.objects.get(codigo_estudiante='E007')
+        self.assertRedirects(
+            self.client.get(reverse('ml:estudiante_detalle_ml', args=[ajeno.id])),
+            reverse('ml:dashboard_ml'), fetch_redirect_response=False,
+        )
+
+        alertas = self.client.get(reverse('alertas:dashboard'))
+        self.assertEqual(alertas.status_code, 200)
+
+    def test_analista_no_exporta_estudiante_ajeno(self):
+        ajeno = EstudianteUniversitario.objects.get(codigo_estudiante='E007')
+        AsignacionAnalista.asignar(ajeno, self.otro_analista)
+
+        self.client.force_login(self.analista)
+        self.assertRedirects(
+            self.client.get(reverse('ml:exportar_detalle_excel', args=[ajeno.id])),
+            reverse('ml:dashboard_ml'), fetch_redirect_response=False,
+        )
+
+
+class ExportacionCSVTests(DatosKPIMixin, TestCase):
+
+    def test_recorrer_keyset_por_lotes(self):
+        orden = PrediccionDesercionUniversitaria.ORDEN_LISTADO
+        esperado = list(PrediccionDesercionUniversitaria.objects.order_by(*orden).values_list('id', flat=True))
+        # 12 filas en lotes de 5: tres consultas
+        with self.assertNumQueries(3):
+            recorridas = [fila['id'] for fila in recorrer_keyset(
+                PrediccionDesercionUniversitaria.objects.values('id', 'orden_riesgo', 'probabilidad_desercion'), orden, tam_lote=5
+            )]
+        self.assertEqual(recorridas, esperado)
+
+    def test_csv_en_streaming(self):
+        respuesta = self.client.get(reverse('ml:exportar_csv'), {'nivel_riesgo': 'Critico'})
+        self.assertTrue(respuesta.streaming)
+        lineas = b''.join(respuesta.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lineas[0], '\ufeff' + ','.join(CABECERAS))
+        self.assertEqual(len(lineas), 1 + 3)
+        self.assertTrue(all(',90.00,Critico,' in linea for linea in lineas[1:]))
+
+    def test_filas_iguales_con_cualquier_lote(self):
+        predicciones = PrediccionDesercionUniversitaria.objects.all()
+        self.assertEqual(list(filas_exportacion(predicciones, tam_lote=4)), list(filas_exportacion(predicciones)))
+
+
+class ExportacionExcelTests(DatosKPIMixin, TestCase):
+
+    def _hoja(self, respuesta):
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return load_workbook(BytesIO(b''.join(respuesta.streaming_content))).active
+
+    def test_excel_predicciones(self):
+        hoja = self._hoja(self.client.get(reverse('ml:exportar_excel'), {'nivel_riesgo': 'Critico'}))
+        filas = list(hoja.iter_rows())
+        self.assertEqual([celda.value for celda in filas[0]], CABECERAS_EXCEL)
+        self.assertTrue(all(celda.style == 'cabecera' for celda in filas[0]))
+        self.assertEqual(len(filas), 1 + 3)
+        for fila in filas[1:]:
+            self.assertEqual(fila[2].value, 90)
+            self.assertEqual((fila[3].value, fila[3].style), ('Critico', 'riesgo_Critico'))
+            self.assertEqual(fila[3].fill.fgColor.rgb, '00FF0000')
+        self.assertEqual(hoja.column_dimensions['G'].width, 15)
+
+    def test_excel_seguimiento(self):
+        FichaSeguimientoEstudiante.objects.filter(estudiante__codigo_estudiante='E004').update(ultimo_indice_riesgo=None)
+        hoja = self._hoja(self.client.get(reverse('alertas:exportar_seguimiento')))
+        filas = [[celda.value for celda in fila] for fila in hoja.iter_rows(min_row=2)]
+        # Índice de riesgo descendente y las fichas sin índice al final
+        self.assertEqual([fila[0] for fila in filas], ['E010', 'E008', 'E006', 'E002', 'E000', 'E004'])
+        self.assertEqual(filas[0][1:3], [80, 'Crítico'])
+        self.assertEqual(filas[2][5], 1)
+        self.assertEqual(filas[-1][1:3], [0, 'Bajo'])
+
+    def test_excel_detalle(self):
+        prediccion = PrediccionDesercionUniversitaria.objects.get(estudiante__codigo_estudiante='E000')
+        prediccion.factores_riesgo = [{
+            'factor': 'Asistencia', 'valor_actual': 40, 'valor_esperado': '> 75',
+            'impacto': 'ALTO', 'peso': 30, 'recomendacion': 'Contactar',
+        }]
+        prediccion.save()
+
+        hoja = self._hoja(self.client.get(reverse('ml:exportar_detalle_excel', args=[prediccion.estudiante_id])))
+        self.assertEqual(hoja['A1'].style, 'titulo')
+        self.assertEqual({str(rango) for rango in hoja.merged_cells.ranges}, {'A1:D1', 'A8:D8', 'A14:E14', 'A17:E17'})
+        self.assertEqual((hoja['D10'].value, hoja['D10'].style), ('CRÍTICO', 'nivel_critico'))
+        self.assertEqual((hoja['D16'].value, hoja['D16'].style), ('ALTO', 'impacto_alto'))
+        self.assertEqual(hoja['A17'].value, '💡 Recomendación: Contactar')
+
+
+class TrabajosExportacionTests(DatosKPIMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(EXPORTACIONES_ROOT=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _solicitar(self, **filtros):
+        return self.client.post(reverse('ml:solicitar_exportacion'), {'tipo': 'predicciones_csv', **filtros})
+
+    def test_solicitud_repetida_reutiliza_archivo(self):
+        with self.captureOnCommitCallbacks() as encolados:
+            respuesta = self._solicitar(nivel_riesgo='Critico')
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(len(encolados), 1)
+        trabajo_id = respuesta.json()['id']
+        self.assertTrue(ejecutar_trabajo(trabajo_id))
+        self.assertFalse(ejecutar_trabajo(trabajo_id))
+
+        # Misma clave (los filtros irrelevantes se normalizan): completado al instante y sin encolar
+        with self.captureOnCommitCallbacks() as encolados:
+            repetida = self._solicitar(nivel_riesgo='Critico', anomalias='0')
+        self.assertEqual(repetida.status_code, 200)
+        self.assertEqual(encolados, [])
+        self.assertEqual(repetida.json()['id'], trabajo_id)
+
+        descarga = self.client.get(repetida.json()['url_descarga'])
+        lineas = b''.join(descarga.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(lineas[0], '\ufeff' + ','.join(CABECERAS))
+        self.assertEqual(len(lineas), 1 + 3)
+
+    def test_datos_nuevos_generan_otro_trabajo(self):
+        primero = self._solicitar().json()['id']
+        ejecutar_trabajo(primero)
+        VersionDatos.incrementar(VersionDatos.PREDICCIONES)
+
+        segundo = self._solicitar().json()['id']
+        self.assertNotEqual(segundo, primero)
+        TrabajoExportacion.objects.filter(pk=primero).update(fecha_fin=timezone.now() - timedelta(days=2))
+        self.assertEqual(purgar_obsoletos(), 1)
+        self.assertFalse(TrabajoExportacion.objects.filter(pk=primero).exists())
+
+    def test_solo_descarga_el_mismo_alcance(self):
+        trabajo_id = self._solicitar().json()['id']
+        ejecutar_trabajo(trabajo_id)
+
+        coordinador = User.objects.create_user('coordinador_test', password='x')
+        coordinador.perfil.rol = 'coordinador_carrera'
+        coordinador.perfil.save()
+        self.client.force_login(coordinador)
+        self.assertEqual(self.client.get(reverse('ml:descargar_exportacion', args=[trabajo_id])).status_code, 404)
+
+
+class ExportacionParquetTests(DatosKPIMixin, TestCase):
+
+    def test_columnas_tipadas_por_grupos(self):
+        destino = BytesIO()
+        filas = escribir_parquet(PrediccionDesercionUniversitaria.objects.all(), destino, tam_lote=5, filas_por_grupo=10)
+        self.assertEqual(filas, 12)
+
+        archivo = pq.ParquetFile(BytesIO(destino.getvalue()))
+        self.assertTrue(archivo.schema_arrow.equals(ESQUEMA))
+        self.assertEqual(archivo.metadata.num_row_groups, 2)
+
+        tabla = archivo.read().to_pandas()
+        self.assertEqual(str(tabla['nivel_riesgo'].dtype), 'category')
+        self.assertEqual(sorted(tabla['codigo_estudiante']), [f'E{i:03d}' for i in range(12)])
+        self.assertEqual((tabla['nivel_riesgo'] == 'Critico').sum(), 3)
+        self.assertTrue((tabla['anio_academico'] == 2023).all())
+
+    def test_endpoint_y_historico_por_ejecucion(self):
+        respuesta = self.client.get(reverse('ml:exportar_parquet'), {'nivel_riesgo': 'Alto'})
+        tabla = pq.read_table(BytesIO(b''.join(respuesta.streaming_content)))
+        self.assertEqual(tabla.num_rows, 3)
+
+        with tempfile.TemporaryDirectory() as directorio, override_settings(EXPORTACIONES_ROOT=directorio):
+            ahora = timezone.now()
+            anexar_ejecucion(PrediccionDesercionUniversitaria.objects.filter(nivel_riesgo='Critico'), ahora - timedelta(days=1))
+            anexar_ejecucion(PrediccionDesercionUniversitaria.objects.all(), ahora)
+
+            historico = pd.read_parquet(f'{directorio}/{DIRECTORIO_HISTORICO}')
+            self.assertEqual(len(historico), 3 + 12)
+            self.assertEqual(historico['ejecucion'].nunique(), 2)
+
+
+class StagingColumnarTests(DatosKPIMixin, TestCase):
+
+    def test_mismas_features_desde_staging_y_desde_bd(self):
+        registros = RegistroAcademicoUniversitario.objects.order_by('id')
+        for i, registro in enumerate(registros):
+            registro.eventos_lms_total, registro.dias_wifi_total = 10 * i, i
+            registro.rendimiento_total_anio, registro.creditos_aprobados_total_anio = 5 * i, 3 * i
+            registro.save()
+
+        # El mismo contenido en un staging Parquet con las columnas del dataset limpio
+        staging = pd.DataFrame([{
+            'Id_Estudiante': registro.estudiante.codigo_estudiante,
+            'Id_Asignatura': registro.asignatura.codigo_asignatura,
+            'Anio_Academico': registro.anio_academico,
+            'Estado_Abandono': registro.estudiante.estado_abandono,
+            'Anio_Carrera_Minimo': registro.anio_carrera_minimo,
+            'Anio_Carrera_Maximo': registro.anio_carrera_maximo,
+            'Rendimiento_Academico_Total_Anio': float(registro.rendimiento_total_anio),
+            'Creditos_Aprobados_Total_Por_Periodo': float(registro.creditos_aprobados_total_anio),
+            'Eventos_LMS_2021_09': registro.eventos_lms_total,
+            'Dias_Acceso_Wifi_Campus_2021_09': registro.dias_wifi_total,
+        } for registro in registros.select_related('estudiante', 'asignatura')])
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = f'{directorio}/dataset_ultra_limpio.parquet'
+            staging.to_parquet(ruta, index=False)
+            desde_staging = leer_registros_staging(ruta)
+        desde_bd = pd.DataFrame(list(registros.values()))
+
+        # El staging trae los Decimal como float: la selección no puede depender del dtype
+        self.assertIn('rendimiento_total_anio', desde_staging.select_dtypes('number').columns)
+        pd.testing.assert_frame_equal(
+            desde_staging[FEATURES_MODELO].astype(float),
+            desde_bd[FEATURES_MODELO].astype(float),
+        )
+
+
+class DatasetLimpioMixin(DatosKPIMixin):
+    """Los registros de DatosKPIMixin con valores en las columnas que se comparan con el extracto."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i, registro in enumerate(RegistroAcademicoUniversitario.objects.order_by('id')):
+            registro.creditos_matriculados_total_anio = 60
+            registro.rendimiento_total_anio = 5 * i + 0.25
+            registro.nota_final_asignatura = None if i % 4 == 0 else 6.5
+            registro.save()
+
+    def _fuente(self):
+        """El dataset limpio tal como llega del CSV: todo texto y decimales con coma."""
+        filas = []
+        for registro in RegistroAcademicoUniversitario.objects.select_related(
+            'estudiante__carrera', 'asignatura'
+        ).order_by('id'):
+            filas.append({
+                'Id_Estudiante': registro.estudiante.codigo_estudiante,
+                'Id_Asignatura': registro.asignatura.codigo_asignatura,
+                'Id_Carrera': registro.estudiante.carrera.codigo_carrera,
+                'Anio_Academico': str(registro.anio_academico),
+                'Estado_Abandono': registro.estudiante.estado_abandono,
+                'Dedicacion_Estudios': f' {registro.estudiante.dedicacion_estudios} ',
+                'Nota_Selectividad_Total': '',
+                'Creditos_Matriculados_Total_Anio': str(registro.creditos_matriculados_total_anio).replace('.', ','),
+                'Creditos_Aprobados_Total_Por_Periodo': '0',
+                'Creditos_Matriculados_Movilidad': '0,00',
+                'Rendimiento_Academico_Total_Anio': str(registro.rendimiento_total_anio).replace('.', ','),
+                'Nota_Final_Asignatura': '' if registro.nota_final_asignatura is None else str(registro.nota_final_asignatura),
+            })
+        return pd.DataFrame(filas)
+
+
+class ReconciliacionTests(DatasetLimpioMixin, TestCase):
+
+    def test_filas_identicas(self):
+        resultado = reconciliar(self._fuente(), tam_bloque=5, incluir_solo_db=True)
+        self.assertEqual((resultado['total'], resultado['identicos'], resultado['claves_con_error']), (12, 12, 0))
+        self.assertEqual(list(resultado['discrepancias'].columns), COLUMNAS_REPORTE)
+        self.assertTrue(resultado['discrepancias'].empty)
+
+    def test_valores_distintos_y_claves_de_un_solo_lado(self):
+        fuente = self._fuente()
+        fuente.loc[fuente['Id_Estudiante'] == 'E001', 'Rendimiento_Academico_Total_Anio'] = '5,255'  # dentro de la tolerancia
+        fuente.loc[fuente['Id_Estudiante'] == 'E002', 'Rendimiento_Academico_Total_Anio'] = '99'
+        fuente.loc[fuente['Id_Estudiante'] == 'E003', 'Estado_Abandono'] = 'Abandono'
+        fuente = fuente[fuente['Id_Estudiante'] != 'E011']
+        nueva = fuente.iloc[[0]].assign(Id_Estudiante='E999')
+        fuente = pd.concat([fuente, nueva], ignore_index=True)
+
+        resultado = reconciliar(fuente, tam_bloque=5, incluir_solo_db=True)
+        discrepancias = resultado['discrepancias']
+        resumen = sorted(zip(discrepancias['Id_Estudiante'], discrepancias['tipo'], discrepancias['columna']))
+        self.assertEqual(resumen, [
+            ('E002', 'DIFERENCIA', 'Rendimiento_Academico_Total_Anio'),
+            ('E003', 'DIFERENCIA', 'Estado_Abandono'),
+            ('E011', 'SOLO_EN_DB', ''),
+            ('E999', 'NO_EXISTE_EN_DB', ''),
+        ])
+        fila = discrepancias[discrepancias['Id_Estudiante'] == 'E002'].iloc[0]
+        self.assertEqual((fila['valor_fuente'], fila['valor_db']), ('99.0', '10.25'))
+        self.assertEqual((resultado['total'], resultado['identicos'], resultado['claves_con_error']), (12, 9, 4))
+
+        # Con una muestra (sin incluir_solo_db) lo que falta en la fuente no es un error
+        muestra = reconciliar(fuente, tam_bloque=5)
+        self.assertNotIn('SOLO_EN_DB', set(muestra['discrepancias']['tipo']))
+
+    def test_comparar_frames_por_clave(self):
+        fuente = pd.DataFrame([
+            {'Id_Estudiante': 'E001', 'Id_Asignatura': 'A1', 'Anio_Academico': '2023', 'Nota_Final_Asignatura': '7,50'},
+            {'Id_Estudiante': 'E001', 'Id_Asignatura': 'A2', 'Anio_Academico': '2023', 'Nota_Final_Asignatura': '5'},
+        ])
+        db = pd.DataFrame([
+            {'Id_Estudiante': 'E001', 'Id_Asignatura': 'A1', 'Anio_Academico': 2023, 'Nota_Final_Asignatura': 7.5},
+            {'Id_Estudiante': 'E001', 'Id_Asignatura': 'A1', 'Anio_Academico': 2022, 'Nota_Final_Asignatura': None},
+        ])
+        reglas = [('Nota_Final_Asignatura', 'nota_final_asignatura', 'decimal')]
+        discrepancias, identicos = comparar_frames(fuente, db, reglas, incluir_solo_db=True)
+        self.assertEqual(identicos, 1)
+        self.assertEqual(
+            sorted(discrepancias[['Id_Asignatura', 'Anio_Academico', 'tipo']].values.tolist()),
+            [['A1', 2022, 'SOLO_EN_DB'], ['A2', 2023, 'NO_EXISTE_EN_DB']],
+        )
+
+
+class SincronizacionTests(DatasetLimpioMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Segunda partición (C1 × 2022) con los mismos estudiantes
+        for registro in RegistroAcademicoUniversitario.objects.order_by('id'):
+            registro.pk, registro.anio_academico = None, 2022
+            registro.rendimiento_total_anio -= 1
+            registro.save()
+
+    def test_crc32_de_sqlite_como_zlib(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT CRC32(%s), CRC32(NULL)", ['E001|A1|2023|ñ'])
+            self.assertEqual(cursor.fetchone(), (zlib.crc32('E001|A1|2023|ñ'.encode('utf-8')), None))
+
+    def test_solo_la_particion_modificada_es_diferente(self):
+        fuente = checksums_fuente(self._fuente())
+        self.assertEqual(set(comparar_particiones(fuente, checksums_db())['estado']), {'OK'})
+
+        RegistroAcademicoUniversitario.objects.filter(
+            anio_academico=2022, estudiante__codigo_estudiante='E005'
+        ).update(rendimiento_total_anio=F('rendimiento_total_anio') + 0.01)
+
+        particiones = comparar_particiones(fuente, checksums_db())
+        self.assertEqual(
+            particiones[['Id_Carrera', 'Anio_Academico', 'estado']].values.tolist(),
+            [['C1', 2022, 'DIFERENTE'], ['C1', 2023, 'OK']],
+        )
+
+    def test_comando_reconcilia_solo_la_particion_distinta(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            extracto, reporte = f'{directorio}/extracto.parquet', f'{directorio}/reporte.csv'
+            self._fuente().to_parquet(extracto, index=False)
+            RegistroAcademicoUniversitario.objects.filter(
+                anio_academico=2023, estudiante__codigo_estudiante='E007'
+            ).update(creditos_matriculados_total_anio=48)
+
+            with redirect_stdout(StringIO()) as salida:
+                call_command('verificar_sincronizacion', extracto, '--reporte', reporte)
+            discrepancias = pd.read_csv(reporte, sep=';', dtype=str)
+
+        self.assertIn('Particiones con diferencias: 1', salida.getvalue())
+        self.assertEqual(
+            discrepancias[['Id_Estudiante', 'Anio_Academico', 'columna', 'valor_db']].values.tolist(),
+            [['E007', '2023', 'Creditos_Matriculados_Total_Anio', '48.0']],
+        )
+
+
+class ReportesDetalleTests(DatosKPIMixin, TestCase):
+
+    def _zip(self, contenido):
+        archivo = zipfile.ZipFile(BytesIO(contenido))
+        return {nombre: load_workbook(BytesIO(archivo.read(nombre))).active for nombre in archivo.namelist()}
+
+    def test_trabajo_zip_criticos(self):
+        with tempfile.TemporaryDirectory() as directorio, override_settings(EXPORTACIONES_ROOT=directorio):
+            respuesta = self.client.post(
+                reverse('ml:solicitar_exportacion'), {'tipo': 'reportes_detalle', 'nivel_riesgo': 'Critico'}
+            )
+            with self.assertNumQueries(1):
+                datos = datos_detalle(PrediccionDesercionUniversitaria.objects.filter(nivel_riesgo='Critico'))
+            self.assertTrue(ejecutar_trabajo(respuesta.json()['id']))
+
+            descarga = self.client.get(reverse('ml:descargar_exportacion', args=[respuesta.json()['id']]))
+            self.assertIn('reportes_detalle.zip', descarga['Content-Disposition'])
+            hojas = self._zip(b''.join(descarga.streaming_content))
+
+        self.assertEqual(sorted(hojas), [nombre_reporte(fila) for fila in datos])
+        self.assertEqual(len(hojas), 3)
+        hoja = hojas['detalle_estudiante_E000.xlsx']
+        self.assertEqual(hoja['A1'].value, 'REPORTE DE RIESGO - ESTUDIANTE E000')
+        self.assertEqual(hoja['B3'].value, 'E000')
+
+    def test_pool_de_procesos_igual_que_en_serie(self):
+        datos = datos_detalle(PrediccionDesercionUniversitaria.objects.all())
+        # Suficientes reportes para que se use el pool
+        datos = [{**fila, 'codigo': f'{fila["codigo"]}-{i}'} for i in range(2) for fila in datos]
+        self.assertGreaterEqual(len(datos), MIN_REPORTES_POOL)
+
+        en_serie, en_paralelo = BytesIO(), BytesIO()
+        zip_reportes(datos, en_serie, procesos=1)
+        zip_reportes(datos, en_paralelo, procesos=2)
+
+        serie, paralelo = self._zip(en_serie.getvalue()), self._zip(en_paralelo.getvalue())
+        self.assertEqual(list(serie), list(paralelo))
+        self.assertEqual(
+            [[celda.value for celda in hoja['A']] for hoja in serie.values()],
+            [[celda.value for celda in hoja['A']] for hoja in paralelo.values()],
+        )
+
+
+class EventosAlertasTests(DatosKPIMixin, TestCase):
+
+    def _escribir(self, escritura):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            escritura()
+        return callbacks
+
+    async def test_flujo_envia_lista_y_deltas(self):
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse('alertas:stream_urgentes'))
+        self.assertEqual((respuesta.status_code, respuesta['Content-Type']), (200, 'text/event-stream'))
+
+        flujo = centro_alertas.eventos()
+
+        async def evento():
+            nombre, datos = (await anext(flujo)).strip().split('\n')
+            return nombre.removeprefix('event: '), json.loads(datos.removeprefix('data: '))
+
+        try:
+            self.assertTrue((await anext(flujo)).startswith('retry: '))
+            self.assertEqual(await evento(), ('lista', {'total': 6, 'alertas': await sync_to_async(alertas_urgentes)()}))
+
+            # Cada escritura de alertas llega como delta: resolver una la quita, crear una crítica la añade
+            resuelta = await AlertaEstudiante.objects.filter(prioridad='critica', estado='pendiente').afirst()
+            await sync_to_async(self._escribir)(resuelta.resolver)
+            self.assertEqual(await evento(), ('delta', {'altas': [], 'bajas': [resuelta.pk], 'total': 5}))
+
+            nueva = AlertaEstudiante(
+                estudiante_id=resuelta.estudiante_id, tipo_alerta='manual', titulo='nueva', mensaje='m',
+                prioridad='critica', estado='pendiente',
+            )
+            await sync_to_async(self._escribir)(nueva.save)
+            nombre, delta = await evento()
+            self.assertEqual((nombre, delta['bajas'], delta['total']), ('delta', [], 6))
+            self.assertEqual([alerta['id'] for alerta in delta['altas']], [nueva.pk])
+        finally:
+            await flujo.aclose()
+        self.assertFalse(centro_alertas.hay_suscriptores())
+
+    def test_sin_asgi_ni_oyentes(self):
+        # Con WSGI no hay flujo: el navegador sigue con el sondeo
+        self.assertEqual(self.client.get(reverse('alertas:stream_urgentes')).status_code, 204)
+        # Sin conexiones abiertas las escrituras no recalculan la lista
+        alerta = AlertaEstudiante.objects.filter(prioridad='critica').first()
+        self.assertEqual(self._escribir(alerta.resolver), [])
+
+
+class EstadisticasSQLTests(DatosKPIMixin, TestCase):
+
+    def test_histograma_con_valores_en_los_bordes(self):
+        probabilidades = [0.0, 0.3, 0.7, 1.0, 0.1, 0.2, 0.45, 0.6, 0.8, 0.9, 0.95, 0.05]
+        for prediccion, probabilidad in zip(PrediccionDesercionUniversitaria.objects.order_by('id'), probabilidades):
+            prediccion.probabilidad_desercion = probabilidad
+            prediccion.save(update_fields=['probabilidad_desercion'])
+
+        # Binning en Python al que sustituye: int(v * tramos) y el máximo al último tramo
+        esperado = [0] * 10
+        for probabilidad in probabilidades:
+            esperado[min(int(probabilidad * 10), 9)] += 1
+
+        conteos = histograma_sql(PrediccionDesercionUniversitaria.objects.all(), 'probabilidad_desercion', 0, 1, 10)
+        self.assertEqual(conteos, esperado)
+        self.assertEqual((conteos[3], conteos[7]), (1, 1))
+
+    def test_correlacion_como_np_corrcoef(self):
+        for i, registro in enumerate(RegistroAcademicoUniversitario.objects.order_by('id')):
+            registro.creditos_aprobados_total_anio = 3 * i + i % 4
+            registro.eventos_lms_total = (i * 37) % 50
+            registro.rendimiento_anio_previo_1 = None if i % 3 == 0 else 10 * i - i * i / 2
+            registro.dias_wifi_total = 20  # sin varianza
+            registro.save()
+
+        campos = ['creditos_aprobados_total_anio', 'eventos_lms_total', 'rendimiento_anio_previo_1', 'dias_wifi_total']
+        registros = RegistroAcademicoUniversitario.objects.all()
+        matriz = correlacion_desde_momentos(momentos_sql(registros, campos), campos)
+
+        # Cálculo al que sustituye: NULL como 0 y NaN (sin varianza) como 0
+        filas = [[float(r[c] or 0) for c in campos] for r in registros.values(*campos)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            esperada = np.nan_to_num(np.corrcoef(np.array(filas).T), nan=0.0)
+        np.testing.assert_allclose(np.array(matriz, dtype=float), esperada, atol=1e-12)
+        self.assertEqual(matriz[3], [0, 0, 0, 0])
+
+        # Los momentos de dos particiones suman los de toda la población
+        mitad = Q(estudiante__codigo_estudiante__lt='E006')
+        partes = sumar_momentos([momentos_sql(registros.filter(mitad), campos), momentos_sql(registros.exclude(mitad), campos)])
+        self.assertEqual(partes, momentos_sql(registros, campos))
+        self.assertEqual(correlacion_desde_momentos(momentos_sql(registros.filter(estudiante__codigo_estudiante='E000'), campos), campos), [])
+
+
+class SketchesTests(SimpleTestCase):
+
+    def _error_rango(self, ordenados, estimado, q):
+        """Distancia entre q y el rango (fracción) del valor estimado en los datos reales."""
+        izquierda = np.searchsorted(ordenados, estimado, side='left') / len(ordenados)
+        derecha = np.searchsorted(ordenados, estimado, side='right') / len(ordenados)
+        return 0 if izquierda <= q <= derecha else min(abs(q - izquierda), abs(q - derecha))
+
+    def test_kll_fusionado_y_serializado_da_los_cuartiles(self):
+        rng = np.random.default_rng(7)
+        valores = np.round(rng.lognormal(3, 0.6, 100_000), 2)
+
+        # Un sketch por partición, ida y vuelta por bytes (como en SketchCohorte) y fusión
+        fusionado = KLL(semilla=1)
+        for i, parte in enumerate(np.array_split(valores, 10)):
+            parcial = KLL(semilla=i)
+            for lote in np.array_split(parte, 7):
+                parcial.agregar(lote)
+            fusionado.merge(KLL.desde_bytes(parcial.a_bytes()))
+
+        self.assertEqual(fusionado.n, len(valores))
+        minimo, q1, mediana, q3, maximo = fusionado.cuantiles([0, 0.25, 0.5, 0.75, 1])
+        self.assertEqual((minimo, maximo), (valores.min(), valores.max()))
+
+        ordenados = np.sort(valores)
+        for q, estimado in zip([0.25, 0.5, 0.75], [q1, mediana, q3]):
+            # Error de rango de KLL con k=200: del orden de 1/k
+            self.assertLessEqual(self._error_rango(ordenados, estimado, q), 0.01)
+            self.assertAlmostEqual(estimado, np.percentile(valores, q * 100), delta=0.05 * np.percentile(valores, q * 100))
+
+    def test_kll_ida_y_vuelta_por_bytes(self):
+        kll = KLL(k=50, semilla=3)
+        kll.agregar(np.arange(1000, dtype=float))
+        kll.agregar([np.nan])
+        copia = KLL.desde_bytes(kll.a_bytes())
+
+        self.assertEqual((copia.k, copia.n, copia.minimo, copia.maximo), (50, 1000, 0.0, 999.0))
+        self.assertEqual(len(copia.niveles), len(kll.niveles))
+        for nivel, original in zip(copia.niveles, kll.niveles):
+            np.testing.assert_array_equal(nivel, original)
+        self.assertEqual(copia.cuantiles([0.1, 0.5, 0.9]), kll.cuantiles([0.1, 0.5, 0.9]))
+        self.assertEqual(KLL.desde_bytes(KLL().a_bytes()).cuantiles([0.5]), [None])
+
+    def test_hll_dentro_del_error_esperado(self):
+        rng = np.random.default_rng(11)
+        for tamano in (40, 5_000, 200_000):
+            valores = rng.integers(0, 10 * tamano, size=2 * tamano)
+            hll = HyperLogLog(precision=12)
+            hll.agregar(valores)
+            reales = len(np.unique(valores))
+            # Error típico 1.04 / sqrt(4096) ≈ 1.6 %: se admiten 3 desviaciones
+            self.assertLessEqual(abs(hll.cardinalidad() - reales) / reales, 0.05, tamano)
+
+    def test_hll_fusionado_igual_que_una_pasada(self):
+        valores = [f'E{i % 3000:05d}' for i in range(20_000)] + [None, float('nan')]
+        completo = HyperLogLog()
+        completo.agregar(valores)
+
+        fusionado = HyperLogLog()
+        for inicio in range(0, len(valores), 7_000):
+            parcial = HyperLogLog()
+            parcial.agregar(valores[inicio:inicio + 7_000])
+            fusionado.merge(parcial)
+
+        np.testing.assert_array_equal(fusionado.registros, completo.registros)
+        self.assertEqual(fusionado.cardinalidad(), completo.cardinalidad())
+
+    def test_topk_frecuentes_dentro_de_la_cota(self):
+        rng = np.random.default_rng(13)
+        valores = rng.zipf(1.5, 200_000)
+        reales = pd.Series(valores).value_counts()
+
+        completo = TopK(k=10)
+        completo.agregar(valores)
+        fusionado = TopK(k=10)
+        for parte in np.array_split(valores, 8):
+            parcial = TopK(k=10)
+            parcial.agregar(parte)
+            fusionado.merge(parcial)
+
+        # Count-Min nunca estima por debajo y, con ancho w, se pasa como mucho en e/w·N
+        cota = np.e / completo.cms.ancho * len(valores)
+        for topk in (completo, fusionado):
+            top = topk.top()
+            self.assertEqual([valor for valor, _ in top], reales.index[:10].tolist())
+            for valor, estimada in top:
+                self.assertGreaterEqual(estimada, reales[valor])
+                self.assertLessEqual(estimada - reales[valor], cota)
+
+        np.testing.assert_array_equal(fusionado.cms.tabla, completo.cms.tabla)
+        self.assertEqual(fusionado.top(), completo.top())
+
+
+class PerfiladoTests(TestCase):
+    """15 tipos de acceso con 2, 4, ..., 30 estudiantes y un código distinto por estudiante."""
+
+    @classmethod
+    def setUpTestData(cls):
+        carrera = CarreraUniversitaria.objects.create(codigo_carrera='C1', campus='Valencia')
+        cls.distribucion = {f'T{i:02d}': 2 * (i + 1) for i in range(15)}
+        # Bloques consecutivos de longitud par: la muestra por pk par toma justo la mitad de cada uno
+        EstudianteUniversitario.objects.bulk_create([
+            EstudianteUniversitario(
+                codigo_estudiante=f'{tipo}-{n:02d}', carrera=carrera,
+                anio_ingreso_universidad=2020, anio_inicio_estudios=2020,
+                tipo_acceso_universidad=tipo, nivel_educativo_padre='-', nivel_educativo_madre='-',
+                dedicacion_estudios='TiempoCompleto', estado_abandono='NoAbandono',
+            )
+            for tipo, total in cls.distribucion.items()
+            for n in range(total)
+        ])
+
+    def test_distribucion_completa(self):
+        perfil = perfilar_modelo(EstudianteUniversitario, top_k=10)
+        self.assertEqual(perfil['total'], 240)
+
+        tipo_acceso = perfil['campos']['tipo_acceso_universidad']
+        self.assertTrue(tipo_acceso['distribucion_completa'])
+        self.assertEqual(dict(tipo_acceso['top']), self.distribucion)
+
+        # Un código por estudiante: solo los top_k más frecuentes
+        codigos = perfil['campos']['codigo_estudiante']
+        self.assertFalse(codigos['distribucion_completa'])
+        self.assertEqual(len(codigos['top']), 10)
+
+        salida = StringIO()
+        with redirect_stdout(salida):
+            call_command('verificar_datos', top=10, stdout=StringIO())
+        bloque = salida.getvalue().split('Campo: tipo_acceso_universidad')[1].split('🔹')[0]
+        self.assertIn('Distribución de valores:', bloque)
+        self.assertEqual(bloque.count('•'), 15)
+
+    def test_muestra_extrapola(self):
+        perfil = perfilar_modelo(EstudianteUniversitario, fraccion_muestra=0.5, top_k=10)
+        self.assertEqual(perfil['total'], 240)
+        self.assertEqual(perfil['muestra'], 120)
+
+        tipo_acceso = perfil['campos']['tipo_acceso_universidad']
+        self.assertTrue(tipo_acceso['distribucion_completa'])
+        self.assertEqual(dict(tipo_acceso['top']), self.distribucion)
+        self.assertEqual(tipo_acceso['llenos'], 240)
+
+
+class ConsultasPorVistaTests(DatosKPIMixin, TestCase):
+    """
+    Número de consultas por vista. Las 3 primeras de cada petición son
+    sesión, usuario y perfil; las vistas cacheadas leen además VersionDatos.
+    """
+
+    def test_home(self):
+        # sesión/usuario/perfil + versiones + KPIs + alertas recientes + estudiantes recientes
+        with self.assertNumQueries(7):
+            respuesta = self.client.get(reverse('home'))
+        self.assertEqual(respuesta.context['total_alertas'], 8)
+        self.assertEqual(respuesta.context['total_estudiantes'], 12)
+
+        # Segunda visita servida desde la caché
+        with self.assertNumQueries(4):
+            self.client.get(reverse('home'))
+
+    def test_dashboard_ml(self):
+        # sesión/usuario/perfil + versiones + KPIs + histograma + listado + analistas para asignar
+        with self.assertNumQueries(8):
+            respuesta = self.client.get(reverse('ml:dashboard_ml'))
+        self.assertEqual(respuesta.context['criticos'], 3)
+        self.assertEqual(respuesta.context['total_estudiantes'], 12)
+
+    def test_dashboard_alertas(self):
+        # sesión/usuario/perfil + KPIs + página (el total sale de los KPIs)
+        with self.assertNumQueries(5):
+            respuesta = self.client.get(reverse('alertas:dashboard'))
+        self.assertEqual(respuesta.context['alertas_criticas'], 3)
+        self.assertEqual(respuesta.context['estudiantes_seguimiento'], 6)
+
+    def test_reportes(self):
+        # sesión/usuario/perfil + versiones + KPIs
+        with self.assertNumQueries(5):
+            respuesta = self.client.get(reverse('alertas:reporte'))
+        self.assertEqual(respuesta.context['total_alertas'], 12)
+        self.assertEqual(respuesta.context['alertas_pendientes'], 6)
+
+    def test_alertas_urgentes_condicional(self):
+        url = reverse('alertas:api_urgentes')
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+
+        # Con el ETag vigente: 304 sin consultar alertas (sesión/usuario/perfil + versiones)
+        with self.assertNumQueries(4):
+            no_modificada = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(no_modificada.status_code, 304)
+
+        # Una escritura de alertas incrementa la versión y cambia el ETag
+        AlertaEstudiante.objects.filter(prioridad='critica').first().save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 200)
+
+    def test_listado_seguimiento(self):
+        # sesión/usuario/perfil + KPIs + página (el total sale de los KPIs)
+        with self.assertNumQueries(5):
+            respuesta = self.client.get(reverse('alertas:listado_seguimiento'))
+        self.assertEqual(respuesta.context['total_seguimiento'], 6)
+        self.assertEqual(respuesta.context['con_intervenciones'], 2)
+
+
+class CacheVistasTests(DatosKPIMixin, TestCase):
+
+    def test_escritura_invalida_cache(self):
+        calculos = []
+
+        def calcular():
+            calculos.append(1)
+            return {'total_alertas': AlertaEstudiante.objects.count()}
+
+        self.assertEqual(obtener_o_calcular('home', [VersionDatos.ALERTAS], calcular), {'total_alertas': 12})
+        self.assertEqual(obtener_o_calcular('home', [VersionDatos.ALERTAS], calcular), {'total_alertas': 12})
+        self.assertEqual(len(calculos), 1)
+
+        # Una alerta nueva sube la versión de ALERTAS: la clave cambia y se recalcula
+        version = VersionDatos.actuales()[VersionDatos.ALERTAS]
+        AlertaEstudiante.objects.create(
+            estudiante=EstudianteUniversitario.objects.first(), tipo_alerta='manual', titulo='t', mensaje='m',
+        )
+        self.assertGreater(VersionDatos.actuales()[VersionDatos.ALERTAS], version)
+        self.assertEqual(obtener_o_calcular('home', [VersionDatos.ALERTAS], calcular), {'total_alertas': 13})
+        self.assertEqual(len(calculos), 2)
+        self.assertEqual(estadisticas_cache()['home'], {'aciertos': 1, 'fallos': 2, 'ratio_aciertos': 0.3333})
+
+    def test_lote_de_alertas_incrementa_una_vez(self):
+        AlertaEstudiante.objects.all().delete()
+        version = VersionDatos.actuales()[VersionDatos.ALERTAS]
+
+        # 6 predicciones Alto/Critico: trazabilidades, alertas y fichas guardadas, un solo incremento
+        generar_alertas_desde_predicciones()
+        self.assertEqual(AlertaEstudiante.objects.count(), 6)
+        self.assertEqual(VersionDatos.actuales()[VersionDatos.ALERTAS], version + 1)
+
+    def test_agrupar_incrementos_anidado(self):
+        versiones = VersionDatos.actuales()
+        with VersionDatos.agrupar_incrementos():
+            with VersionDatos.agrupar_incrementos():
+                VersionDatos.incrementar(VersionDatos.ALERTAS)
+            VersionDatos.incrementar(VersionDatos.ALERTAS, VersionDatos.PREDICCIONES)
+            # Nada se escribe hasta cerrar el bloque exterior
+            self.assertEqual(VersionDatos.actuales(), versiones)
+        actuales = VersionDatos.actuales()
+        self.assertEqual(actuales[VersionDatos.ALERTAS], versiones[VersionDatos.ALERTAS] + 1)
+        self.assertEqual(actuales[VersionDatos.PREDICCIONES], versiones.get(VersionDatos.PREDICCIONES, 0) + 1)
+
+
+class DashboardAvanzadoFiltradoTests(TestCase):
+    """El endpoint filtrado lee del cubo y los sketches y coincide con el cálculo directo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('admin_avanzado', password='x')
+        cls.usuario.perfil.rol = 'admin'
+        cls.usuario.perfil.save()
+
+        for codigo, campus in [('C1', 'Valencia'), ('C2', 'Castellon')]:
+            carrera = CarreraUniversitaria.objects.create(codigo_carrera=codigo, campus=campus)
+            asignatura = AsignaturaUniversitaria.objects.create(codigo_asignatura=f'A{codigo}', carrera=carrera, anio_carrera=1)
+            for i in range(20):
+                estudiante = EstudianteUniversitario.objects.create(
+                    codigo_estudiante=f'{codigo}{i:03d}', carrera=carrera,
+                    anio_ingreso_universidad=2018 + i % 3, anio_inicio_estudios=2018 + i % 3,
+                    tipo_acceso_universidad='PAU', nivel_educativo_padre='-', nivel_educativo_madre='-',
+                    dedicacion_estudios='TiempoCompleto' if i % 2 else 'TiempoParcial',
+                    estado_abandono='Abandono' if i % 5 == 0 else 'NoAbandono',
+                )
+                for anio in (2022, 2023):
+                    RegistroAcademicoUniversitario.objects.create(
+                        estudiante=estudiante, asignatura=asignatura, anio_academico=anio,
+                        anio_carrera_minimo=1, anio_carrera_maximo=1,
+                        creditos_matriculados_total_anio=60, creditos_aprobados_total_anio=3 * (i % 20),
+                        rendimiento_total_anio=5 * (i % 20) + (anio - 2022) * 3,
+                        eventos_lms_total=(i * 37 + anio) % 250, visitas_lms_total=i * 7 % 90,
+                        dias_wifi_total=(i * 11) % 60,
+                    )
+        reconstruir_sketches()
+        refrescar_cubo()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def _filtrar(self, **filtros):
+        return self.client.get(reverse('dashboard_avanzado_filtrado'), filtros).json()
+
+    def test_coincide_con_calculo_directo(self):
+        datos = self._filtrar(anio_academico='2023', campus='Valencia', dedicacion='todas', carrera='todas')
+        registros = RegistroAcademicoUniversitario.objects.filter(
+            anio_academico=2023, estudiante__carrera__campus='Valencia', rendimiento_total_anio__gt=0
+        )
+        esperada = correlacion_desde_momentos(momentos_sql(registros, VARIABLES_CORRELACION), VARIABLES_CORRELACION)
+
+        self.assertEqual(datos['total_registros'], registros.count())
+        for fila, fila_esperada in zip(datos['matriz_correlacion'], esperada):
+            for valor, valor_esperado in zip(fila, fila_esperada):
+                self.assertAlmostEqual(valor, valor_esperado, places=9)
+
+        perfiles = dict(zip(datos['perfiles_labels'], datos['perfiles_data']))
+        self.assertEqual(
+            perfiles['alto_rendimiento_activo'],
+            registros.filter(rendimiento_total_anio__gte=70, eventos_lms_total__gte=100).count()
+        )
+        self.assertEqual(sum(perfiles.values()), registros.count())
+
+        caja = datos['box_plot_data']['2019']
+        rendimientos = sorted(registros.filter(
+            estudiante__anio_ingreso_universidad=2019
+        ).values_list('rendimiento_total_anio', flat=True))
+        self.assertAlmostEqual(caja['min'], float(rendimientos[0]))
+        self.assertAlmostEqual(caja['max'], float(rendimientos[-1]))
+
+    def test_serie_temporal_por_cohorte(self):
+        datos = self._filtrar(carrera='C2')
+        self.assertEqual([punto['anio'] for punto in datos['serie_temporal']], ['2018', '2019', '2020'])
+        for punto in datos['serie_temporal']:
+            cohorte = EstudianteUniversitario.objects.filter(
+                carrera__codigo_carrera='C2', anio_ingreso_universidad=int(punto['anio'])
+            )
+            self.assertEqual(punto['total_estudiantes'], cohorte.count())
+            self.assertEqual(punto['abandonos'], cohorte.filter(estado_abandono='Abandono').count())
+
+    def test_no_consulta_registros(self):
+        # sesión/usuario/perfil + versiones + momentos + cohortes + sketches + perfiles
+        with self.assertNumQueries(8):
+            self._filtrar(dedicacion='TiempoCompleto')
+
+    def test_cubo_coincide_con_agregados_directos(self):
+        for anio, campus in [(None, None), ('2023', None), ('2022', 'Castellon')]:
+            datos = datos_dashboard(filtro_celdas(campus=campus), anio=anio)
+
+            estudiantes = EstudianteUniversitario.objects.all()
+            registros = RegistroAcademicoUniversitario.objects.all()
+            if campus:
+                estudiantes = estudiantes.filter(carrera__campus=campus)
+                registros = registros.filter(estudiante__carrera__campus=campus)
+            if anio:
+                registros = registros.filter(anio_academico=int(anio))
+
+            # Las medidas de estudiantes no dependen del año
+            self.assertEqual(datos['kpis']['total_estudiantes'], estudiantes.count())
+            self.assertEqual(datos['kpis']['total_abandonos'], estudiantes.filter(estado_abandono='Abandono').count())
+
+            creditos = registros.filter(creditos_aprobados_total_anio__gt=0).aggregate(media=Avg('creditos_aprobados_total_anio'))
+            self.assertAlmostEqual(datos['kpis']['promedio_creditos'], round(float(creditos['media']), 2))
+
+            tramos = [0] * 10
+            for valor in registros.filter(rendimiento_total_anio__gt=0).values_list('rendimiento_total_anio', flat=True):
+                tramos[min(int(valor // 10), 9)] += 1
+            self.assertEqual(datos['graficos']['rendimiento']['data'], tramos)
+
+            por_asignatura = registros.values('asignatura__codigo_asignatura').annotate(
+                total=Count('estudiante', distinct=True)
+            ).order_by('-total', 'asignatura__codigo_asignatura')
+            self.assertEqual(
+                sorted(zip(datos['graficos']['top_asignaturas']['labels'], datos['graficos']['top_asignaturas']['data'])),
+                sorted((fila['asignatura__codigo_asignatura'], fila['total']) for fila in por_asignatura),
+            )
+
+            celdas = CuboAnalitico.objects.filter(filtro_celdas(campus=campus), anio_academico=int(anio) if anio else None)
+            self.assertEqual(
+                celdas.aggregate(n=Sum('n_registros'), matriculados=Sum('suma_creditos_matriculados')),
+                registros.aggregate(n=Count('id'), matriculados=Sum('creditos_matriculados_total_anio')),
+            )
+
+    def test_reconstruir_solo_particiones_importadas(self):
+        carrera = CarreraUniversitaria.objects.get(codigo_carrera='C1')
+        otras = set(SketchCohorte.objects.exclude(anio_academico=2023, carrera=carrera).values_list('id', flat=True))
+
+        RegistroAcademicoUniversitario.objects.filter(
+            anio_academico=2023, estudiante__carrera=carrera
+        ).update(rendimiento_total_anio=F('rendimiento_total_anio') + 1)
+        escritos = reconstruir_sketches([(2023, carrera.id)])
+
+        reconstruidos = SketchCohorte.objects.filter(anio_academico=2023, carrera=carrera)
+        self.assertEqual(escritos, reconstruidos.count())
+        # Las demás particiones no se tocan
+        self.assertEqual(set(SketchCohorte.objects.exclude(anio_academico=2023, carrera=carrera).values_list('id', flat=True)), otras)
+
+        celdas = ('anio_academico', 'carrera_id', 'dedicacion', 'anio_ingreso', 'n', 'suma', 'suma_cuadrados')
+        parcial = sorted(SketchCohorte.objects.values_list(*celdas))
+        reconstruir_sketches()
+        self.assertEqual(parcial, sorted(SketchCohorte.objects.values_list(*celdas)))
+        self.assertEqual(reconstruir_sketches([]), 0)
+
+    def test_anio_no_valido(self):
+        respuesta = self.client.get(reverse('dashboard_avanzado_filtrado'), {'anio_academico': '2023;'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_serie_cohortes_una_consulta(self):
+        # sesión/usuario/perfil + versiones + consulta agrupada
+        with self.assertNumQueries(5):
+            datos = self.client.get(reverse('api_serie_cohortes'), {'desglose': 'campus'}).json()
+
+        series = {serie['grupo']: serie['puntos'] for serie in datos['series']}
+        self.assertEqual(sorted(series), ['Castellon', 'Valencia'])
+        for punto in series['Valencia']:
+            cohorte = EstudianteUniversitario.objects.filter(
+                carrera__campus='Valencia', anio_ingreso_universidad=int(punto['anio'])
+            )
+            self.assertEqual(punto['total_estudiantes'], cohorte.count())
+            self.assertEqual(punto['abandonos'], cohorte.filter(estado_abandono='Abandono').count())
+            self.assertAlmostEqual(punto['tasa_abandono'] + punto['tasa_retencion'], 100)
+
+        respuesta = self.client.get(reverse('api_serie_cohortes'), {'desglose': 'asignatura'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ActividadLMSTests(DatosKPIMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        estudiantes = list(EstudianteUniversitario.objects.order_by('codigo_estudiante')[:3])
+        cls.estudiante = estudiantes[0]
+        # Octubre sin actividad en el primero; noviembre sin filas en ninguno
+        reemplazar_actividad({
+            estudiante.id: filas_desde_detalle({
+                '2021_09': {'eventos': 10 * (i + 1), 'visitas': 2},
+                '2021_10': {'eventos': 0 if i == 0 else 5},
+                '2021_12': {'eventos': 4, 'minutos': 30.4},
+            })
+            for i, estudiante in enumerate(estudiantes)
+        })
+
+    def test_serie_estudiante_rellena_meses_sin_filas(self):
+        datos = self.client.get(
+            reverse('api_actividad_estudiante', args=[self.estudiante.id]), {'metrica': ['eventos', 'minutos']}
+        ).json()
+        self.assertEqual(datos['meses'], ['2021-09', '2021-10', '2021-11', '2021-12'])
+        self.assertEqual(datos['series'], {'eventos': [10, 0, 0, 4], 'minutos': [0, 0, 0, 30]})
+
+        respuesta = self.client.get(reverse('api_actividad_estudiante', args=[999999]))
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_curva_cohorte_con_variacion_mensual(self):
+        datos = self.client.get(reverse('api_actividad_cohorte'), {'metrica': 'eventos', 'anio_ingreso': '2020'}).json()
+        self.assertEqual(datos['tamano_cohorte'], 12)
+        self.assertEqual(
+            [(punto['mes'], punto['total'], punto['activos'], punto['variacion_pct']) for punto in datos['curva']],
+            [('2021-09', 60, 3, None), ('2021-10', 10, 2, -83.3), ('2021-12', 12, 3, 20.0)],
+        )
+        self.assertEqual(datos['curva'][0]['media'], 5)
+
+        vacia = self.client.get(reverse('api_actividad_cohorte'), {'anio_ingreso': '2019'}).json()
+        self.assertEqual((vacia['tamano_cohorte'], vacia['curva']), (0, []))
+
+    def test_parametros_no_validos(self):
+        url = reverse('api_actividad_cohorte')
+        self.assertEqual(self.client.get(url, {'anio_ingreso': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'metrica': 'clics'}).status_code, 400)
+
+
+class MigracionActividadLMSTests(TransactionTestCase):
+    """0006 pasa el JSON detalle_mensual_lms de los registros a ActividadMensualLMS."""
+
+    antes = [('prototipo', '0005_perfilusuario')]
+    despues = [('prototipo', '0006_actividadmensuallms')]
+
+    def _migrar(self, destino):
+        ejecutor = MigrationExecutor(connection)
+        ejecutor.migrate(destino)
+        return ejecutor.loader.project_state(destino).apps
+
+    def tearDown(self):
+        ejecutor = MigrationExecutor(connection)
+        ejecutor.migrate(ejecutor.loader.graph.leaf_nodes())
+
+    def test_migra_detalle_mensual(self):
+        apps = self._migrar(self.antes)
+        Carrera = apps.get_model('prototipo', 'CarreraUniversitaria')
+        Asignatura = apps.get_model('prototipo', 'AsignaturaUniversitaria')
+        Estudiante = apps.get_model('prototipo', 'EstudianteUniversitario')
+        Registro = apps.get_model('prototipo', 'RegistroAcademicoUniversitario')
+
+        carrera = Carrera.objects.create(codigo_carrera='C1')
+        estudiante = Estudiante.objects.create(
+            codigo_estudiante='E000', carrera=carrera, anio_ingreso_universidad=2020, anio_inicio_estudios=2020,
+        )
+        detalle = {'2021_09': {'eventos': 12, 'visitas': 0, 'minutos': 7.6}, '2021_10': {'wifi_dias': 3}, 'mal': {}}
+        # El LMS es por estudiante: el mismo detalle en dos asignaturas da una sola fila por mes y métrica
+        for codigo in ('A1', 'A2'):
+            Registro.objects.create(
+                estudiante=estudiante, anio_academico=2021, anio_carrera_minimo=1, anio_carrera_maximo=1,
+                asignatura=Asignatura.objects.create(codigo_asignatura=codigo, carrera=carrera, anio_carrera=1),
+                detalle_mensual_lms=detalle,
+            )
+
+        apps = self._migrar(self.despues)
+        Actividad = apps.get_model('prototipo', 'ActividadMensualLMS')
+        self.assertEqual(
+            sorted(Actividad.objects.values_list('estudiante_id', 'mes', 'metrica', 'valor')),
+            [
+                (estudiante.id, date(2021, 9, 1), ActividadMensualLMS.EVENTOS, 12),
+                (estudiante.id, date(2021, 9, 1), ActividadMensualLMS.MINUTOS, 8),
+                (estudiante.id, date(2021, 10, 1), ActividadMensualLMS.DIAS_WIFI, 3),
+            ],
+        )
+
+        # Deshacer 0006 rehace el JSON desde las filas en lugar de dejarlo vacío
+        apps = self._migrar(self.antes)
+        Registro = apps.get_model('prototipo', 'RegistroAcademicoUniversitario')
+        vacio = {'eventos': 0, 'visitas': 0, 'tareas': 0, 'examenes': 0, 'minutos': 0,
+                 'wifi_dias': 0, 'eventos_recursos': 0, 'dias_recursos': 0}
+        esperado = {
+            '2021_09': {**vacio, 'eventos': 12, 'minutos': 8},
+            '2021_10': {**vacio, 'wifi_dias': 3},
+        }
+        self.assertEqual(list(Registro.objects.values_list('detalle_mensual_lms', flat=True)), [esperado, esperado])
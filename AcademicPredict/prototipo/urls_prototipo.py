@@ -18,6 +18,12 @@ urlpatterns = [
     path('dashboard/avanzado/', views.dashboard_avanzado, name='dashboard_avanzado'),
     path('dashboard/avanzado/filtrar/', views.dashboard_avanzado_filtrado, name='dashboard_avanzado_filtrado'),
 
+    path('api/actividad-lms/estudiante/<int:estudiante_id>/', views.api_actividad_estudiante, name='api_actividad_estudiante'),
+    path('api/actividad-lms/cohorte/', views.api_actividad_cohorte, name='api_actividad_cohorte'),
+    path('api/estudiantes/buscar/', views.api_buscar_estudiantes, name='api_buscar_estudiantes'),
+    path('api/cohortes/abandono/', views.api_serie_cohortes, name='api_serie_cohortes'),
+    path('api/cache/estadisticas/', views.api_estadisticas_cache, name='api_estadisticas_cache'),
+
     path('asignar-analista/<int:estudiante_id>/', views_roles.asignar_analista, name='asignar_analista'),
     path('registrar-intervencion/<int:alerta_id>/', views_roles.registrar_intervencion, name='registrar_intervencion'),
     path('marcar-resuelta/<int:alerta_id>/', views_roles.marcar_resuelta, name='marcar_resuelta'),
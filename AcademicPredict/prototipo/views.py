@@ -3,11 +3,11 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from django.db.models import Count, Avg, Q
+from django.db.models import Q
 from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
 import logging
 import json
-import numpy as np
 
 from prototipo.models import (
     CarreraUniversitaria,
@@ -16,10 +16,20 @@ from prototipo.models import (
     RegistroAcademicoUniversitario,
     AlertaEstudiante,
     IntervencionEstudiante,
-    FichaSeguimientoEstudiante
+    FichaSeguimientoEstudiante,
+    VersionDatos,
 )
 
 from prototipo.service.import_service_universidad import ImportadorDatosUniversitarios
+from prototipo.service.staging_columnar import EXTENSIONES_ADMITIDAS
+from prototipo.service.cubo_analitico import datos_dashboard, estadisticas_avanzadas, filtro_celdas, anios_disponibles
+from prototipo.service.actividad_lms import METRICAS_DETALLE, serie_estudiante, curva_cohorte
+from prototipo.service.busqueda_estudiantes import LIMITE_AUTOCOMPLETAR, autocompletar
+from prototipo.service.cohortes import DESGLOSES, serie_abandono_cohortes
+from prototipo.service.cache_vistas import (
+    obtener_o_calcular, alcance_usuario, estadisticas_cache, condicional_por_version, versiones_leidas,
+)
+from prototipo.service.kpis import kpis_combinados
 
 logger = logging.getLogger(__name__)
 
@@ -27,61 +37,51 @@ logger = logging.getLogger(__name__)
 @user_passes_test(lambda u: hasattr(u, 'perfil'))  
 def home(request):
     """Vista principal del sistema."""
-    
-    total_alertas = AlertaEstudiante.objects.filter(
-    estado__in=['pendiente', 'en_revision'],
-    visible=True
-    ).count()
-
-    alertas_criticas = AlertaEstudiante.objects.filter(
-        prioridad='critica',
-        estado__in=['pendiente', 'en_revision'],
-        visible=True
-    ).count()
-
-    estudiantes_seguimiento = FichaSeguimientoEstudiante.objects.filter(
-        en_seguimiento=True
-    ).count()
-
-    total_intervenciones = IntervencionEstudiante.objects.count()
-
-    alertas_recientes = AlertaEstudiante.objects.select_related(
-        'estudiante', 'estudiante__carrera', 'prediccion'
-    ).filter(
-        estado='pendiente',
-        visible=True
-    ).order_by('-prioridad', '-fecha_creacion')[:3]
-
-    estudiantes_recientes = EstudianteUniversitario.objects.select_related(
-        'carrera', 'ficha_seguimiento', 'ficha_seguimiento__tutor_principal'
-    ).filter(
-        ficha_seguimiento__en_seguimiento=True
-    ).order_by('-ficha_seguimiento__fecha_actualizacion')[:5]
-
-    total_carreras = CarreraUniversitaria.objects.count()
-    total_estudiantes = EstudianteUniversitario.objects.count()
-    total_asignaturas = AsignaturaUniversitaria.objects.count()
-    total_registros = RegistroAcademicoUniversitario.objects.count()
 
-    contexto = {
-        # Estadísticas básicas
-        'total_carreras': total_carreras,
-        'total_estudiantes': total_estudiantes,
-        'total_asignaturas': total_asignaturas,
-        'total_registros': total_registros,
-        
-        # Estadísticas de alertas 
-        'total_alertas': total_alertas,
-        'alertas_criticas': alertas_criticas,
-        'estudiantes_seguimiento': estudiantes_seguimiento,
-        'total_intervenciones': total_intervenciones,
-        
-        # Datos para mostrar en home 
-        'alertas_recientes': alertas_recientes,
-        'estudiantes_recientes': estudiantes_recientes,
-        'user_rol': request.user.perfil.rol,
-    }
-    
+    def calcular():
+        # Los ocho contadores de la portada en una sola consulta
+        contadores = kpis_combinados(
+            (AlertaEstudiante.objects.filter(estado__in=['pendiente', 'en_revision'], visible=True), {
+                'total_alertas': None,
+                'alertas_criticas': Q(prioridad='critica'),
+            }),
+            (FichaSeguimientoEstudiante.objects.all(), {'estudiantes_seguimiento': Q(en_seguimiento=True)}),
+            (IntervencionEstudiante.objects.all(), {'total_intervenciones': None}),
+            (CarreraUniversitaria.objects.all(), {'total_carreras': None}),
+            (EstudianteUniversitario.objects.all(), {'total_estudiantes': None}),
+            (AsignaturaUniversitaria.objects.all(), {'total_asignaturas': None}),
+            (RegistroAcademicoUniversitario.objects.all(), {'total_registros': None}),
+        )
+
+        alertas_recientes = list(AlertaEstudiante.objects.select_related(
+            'estudiante', 'estudiante__carrera', 'prediccion'
+        ).filter(
+            estado='pendiente',
+            visible=True
+        ).order_by('-prioridad', '-fecha_creacion')[:3])
+
+        estudiantes_recientes = list(EstudianteUniversitario.objects.select_related(
+            'carrera', 'ficha_seguimiento', 'ficha_seguimiento__tutor_principal'
+        ).filter(
+            ficha_seguimiento__en_seguimiento=True
+        ).order_by('-ficha_seguimiento__fecha_actualizacion')[:5])
+
+        return {
+            **contadores,
+
+            # Datos para mostrar en home
+            'alertas_recientes': alertas_recientes,
+            'estudiantes_recientes': estudiantes_recientes,
+        }
+
+    contexto = obtener_o_calcular(
+        'home',
+        [VersionDatos.ACADEMICO, VersionDatos.ALERTAS],
+        calcular,
+        alcance=alcance_usuario(request.user),
+    )
+    contexto = {**contexto, 'user_rol': request.user.perfil.rol}
+
     return render(request, 'home.html', contexto)
 
 @login_required
@@ -96,8 +96,8 @@ def importar_datos_universidad(request):
         
         archivo = request.FILES['archivo_csv']
         
-        if not archivo.name.endswith('.csv'):
-            messages.error(request, '❌ El archivo debe ser formato CSV (.csv)')
+        if not archivo.name.lower().endswith(EXTENSIONES_ADMITIDAS):
+            messages.error(request, '❌ El archivo debe ser formato CSV (.csv) o Parquet (.parquet)')
             return redirect('importar_datos_universidad')
         
         try:
@@ -169,123 +169,59 @@ def importar_datos_universidad(request):
 @login_required
 @user_passes_test(lambda u: hasattr(u, 'perfil'))
 def dashboard_universidad(request):
-    """Dashboard básico con métricas generales y gráficos."""
+    """Dashboard básico con métricas generales y gráficos (servido desde el cubo analítico)."""
 
     logger.info("📄 Iniciando carga del dashboard...")
 
     user_rol = request.user.perfil.rol
 
-    estudiantes = EstudianteUniversitario.objects.all()
-
+    carrera_rol = None
     if user_rol == 'coordinador_carrera':
-        carrera = request.user.perfil.carrera_asignada
-        if carrera:
-            estudiantes = estudiantes.filter(carrera=carrera)
-        else:
+        carrera_rol = request.user.perfil.carrera_asignada
+        if not carrera_rol:
             messages.error(request, "No tienes carrera asignada")
             return redirect('home')
 
-    # Ahora SÍ usa la variable filtrada:
-    total_estudiantes = estudiantes.count()  # ✅ Usa estudiantes filtrados
-    total_abandonos = estudiantes.filter(estado_abandono='Abandono').count()  # ✅ Filtrados
-    
-    if total_estudiantes > 0:
-        tasa_abandono = (total_abandonos / total_estudiantes) * 100
-    else:
-        tasa_abandono = 0
-    
-    registros_validos = RegistroAcademicoUniversitario.objects.filter(creditos_aprobados_total_anio__gt=0)
-    
-    if registros_validos.exists():
-        promedio_raw = registros_validos.aggregate(prom=Avg('creditos_aprobados_total_anio'))
-        promedio_creditos = float(promedio_raw['prom'] or 0)
-    else:
-        promedio_creditos = 0.0
-    
-    total_carreras = CarreraUniversitaria.objects.count()
-    
-    abandono_stats = estudiantes.values('estado_abandono').annotate(
-        total=Count('id')
-    )
+    def calcular():
+        carreras = CarreraUniversitaria.objects.all()
+        if carrera_rol:
+            carreras = carreras.filter(pk=carrera_rol.pk)
+        return {
+            'datos': datos_dashboard(filtro_celdas(carrera_rol=carrera_rol)),
+            'total_carreras': carreras.count(),
+            'anios_disponibles': list(anios_disponibles()),
+            'carreras_disponibles': list(carreras.values('id', 'codigo_carrera').order_by('codigo_carrera')),
+            'campus_disponibles': list(carreras.values_list('campus', flat=True).distinct().order_by('campus')),
+        }
 
-    abandono_labels = []
-    abandono_data = []
+    resumen = obtener_o_calcular(
+        'dashboard_universidad', [VersionDatos.ACADEMICO], calcular,
+        alcance=alcance_usuario(request.user),
+    )
+    kpis = resumen['datos']['kpis']
+    graficos = resumen['datos']['graficos']
 
-    for stat in abandono_stats:
-        label = 'Desertores' if stat['estado_abandono'] == 'Abandono' else 'Activos'
-        abandono_labels.append(label)
-        abandono_data.append(stat['total'])
-    
-    abandono_por_anio = estudiantes.filter(
-        estado_abandono='Abandono',
-        anio_ingreso_universidad__gt=2000
-    ).values('anio_ingreso_universidad').annotate(
-        total=Count('id')
-    ).order_by('anio_ingreso_universidad')
-    
-    abandono_anio_labels = [str(x['anio_ingreso_universidad']) for x in abandono_por_anio]
-    abandono_anio_data = [x['total'] for x in abandono_por_anio]
-    
-    abandono_por_carrera = estudiantes.filter(
-        estado_abandono='Abandono'
-    ).values('carrera__codigo_carrera').annotate(
-        total=Count('id')
-    ).order_by('-total')[:10]
-    
-    abandono_carrera_labels = [x['carrera__codigo_carrera'] for x in abandono_por_carrera]
-    abandono_carrera_data = [x['total'] for x in abandono_por_carrera]
-    
-    rendimientos_qs = RegistroAcademicoUniversitario.objects.filter(
-        rendimiento_total_anio__gt=0,
-        rendimiento_total_anio__lte=100
-    ).values_list('rendimiento_total_anio', flat=True)
-    
-    conteo_rangos = [0] * 10 
-    rangos_labels = ["0-10%", "10-20%", "20-30%", "30-40%", "40-50%", "50-60%", "60-70%", "70-80%", "80-90%", "90-100%"]
-    
-    for val in rendimientos_qs[:20000]: 
-        v = float(val)
-        idx = int(v // 10)
-        if idx >= 10: idx = 9
-        conteo_rangos[idx] += 1
-        
-    top_asignaturas = RegistroAcademicoUniversitario.objects.values(
-        'asignatura__codigo_asignatura'
-    ).annotate(
-        total=Count('estudiante', distinct=True)
-    ).order_by('-total')[:10]
-    
-    top_asig_labels = [x['asignatura__codigo_asignatura'] for x in top_asignaturas]
-    top_asig_data = [x['total'] for x in top_asignaturas]
-    
-    anios_disponibles = RegistroAcademicoUniversitario.objects.values_list(
-        'anio_academico', flat=True
-    ).distinct().order_by('-anio_academico')
-    
-    carreras_disponibles = CarreraUniversitaria.objects.values('id', 'codigo_carrera').order_by('codigo_carrera')
-    campus_disponibles = CarreraUniversitaria.objects.values_list('campus', flat=True).distinct().order_by('campus')
-    
     contexto = {
-        'total_estudiantes': total_estudiantes,
-        'total_abandonos': total_abandonos,
-        'tasa_abandono': round(tasa_abandono, 2),
-        'promedio_creditos': round(promedio_creditos, 2),
-        'total_carreras': total_carreras,
+        'total_estudiantes': kpis['total_estudiantes'],
+        'total_abandonos': kpis['total_abandonos'],
+        'tasa_abandono': kpis['tasa_abandono'],
+        'promedio_creditos': kpis['promedio_creditos'],
+        'total_carreras': resumen['total_carreras'],
         
-        'abandono_labels': json.dumps(abandono_labels),
-        'abandono_data': json.dumps(abandono_data),
-        'abandono_anio_labels': json.dumps(abandono_anio_labels),
-        'abandono_anio_data': json.dumps(abandono_anio_data),
-        'abandono_carrera_labels': json.dumps(abandono_carrera_labels),
-        'abandono_carrera_data': json.dumps(abandono_carrera_data),
-        'rendimiento_labels': json.dumps(rangos_labels),
-        'rendimiento_data': json.dumps(conteo_rangos),
-        'top_asignaturas_labels': json.dumps(top_asig_labels),
-        'top_asignaturas_data': json.dumps(top_asig_data),
+        'abandono_labels': json.dumps(graficos['abandono_pie']['labels']),
+        'abandono_data': json.dumps(graficos['abandono_pie']['data']),
+        'abandono_anio_labels': json.dumps(graficos['abandono_anio']['labels']),
+        'abandono_anio_data': json.dumps(graficos['abandono_anio']['data']),
+        'abandono_carrera_labels': json.dumps(graficos['abandono_carrera']['labels']),
+        'abandono_carrera_data': json.dumps(graficos['abandono_carrera']['data']),
+        'rendimiento_labels': json.dumps(graficos['rendimiento']['labels']),
+        'rendimiento_data': json.dumps(graficos['rendimiento']['data']),
+        'top_asignaturas_labels': json.dumps(graficos['top_asignaturas']['labels']),
+        'top_asignaturas_data': json.dumps(graficos['top_asignaturas']['data']),
         
-        'anios_disponibles': anios_disponibles,
-        'carreras_disponibles': carreras_disponibles,
-        'campus_disponibles': campus_disponibles,
+        'anios_disponibles': resumen['anios_disponibles'],
+        'carreras_disponibles': resumen['carreras_disponibles'],
+        'campus_disponibles': resumen['campus_disponibles'],
 
         'user_rol': user_rol,
         'puede_importar': user_rol == 'admin',
@@ -293,101 +229,54 @@ def dashboard_universidad(request):
     
     return render(request, 'universidad/dashboard.html', contexto)
 
+PARAMETROS_FILTRO = ('anio_academico', 'carrera', 'campus', 'dedicacion')
+
 @login_required
 @user_passes_test(lambda u: hasattr(u, 'perfil'))
+@gzip_page
+@condicional_por_version('dashboard_filtrado', [VersionDatos.ACADEMICO], PARAMETROS_FILTRO)
 def dashboard_filtrado_ajax(request):
-    """Recibe parámetros GET y devuelve JSON con los datos recalculados."""
+    """Recibe parámetros GET y devuelve JSON con los datos recalculados desde el cubo."""
     
     user_rol = request.user.perfil.rol
     
-    estudiantes_qs = EstudianteUniversitario.objects.all()
-    
+    carrera_rol = None
     if user_rol == 'coordinador_carrera':
-        carrera = request.user.perfil.carrera_asignada
-        if carrera:
-            estudiantes_qs = estudiantes_qs.filter(carrera=carrera)
+        carrera_rol = request.user.perfil.carrera_asignada
 
     anio = request.GET.get('anio_academico')
     carrera = request.GET.get('carrera')
     campus = request.GET.get('campus')
     dedicacion = request.GET.get('dedicacion')
     
-    filtro_estudiante = Q()
-    if carrera and carrera != 'todas':
-        filtro_estudiante &= Q(carrera__codigo_carrera=carrera)
-    if dedicacion and dedicacion != 'todas':
-        filtro_estudiante &= Q(dedicacion_estudios=dedicacion)
-    if campus and campus != 'todos':
-        filtro_estudiante &= Q(carrera__campus=campus)
-        
-    filtro_registro = Q()
-    if anio and anio != 'todos':
-        filtro_registro &= Q(anio_academico=anio)
-    if carrera and carrera != 'todas':
-        filtro_registro &= Q(estudiante__carrera__codigo_carrera=carrera)
-    if dedicacion and dedicacion != 'todas':
-        filtro_registro &= Q(estudiante__dedicacion_estudios=dedicacion)
-    if campus and campus != 'todos':
-        filtro_registro &= Q(estudiante__carrera__campus=campus)
-
-    # 3. Recalcular KPIs (Aquí están las variables que faltaban)
-    total_estudiantes = EstudianteUniversitario.objects.filter(filtro_estudiante).count()
-    
-    total_abandonos = EstudianteUniversitario.objects.filter(filtro_estudiante, estado_abandono='Abandono').count()
-    
-    tasa = (total_abandonos / total_estudiantes * 100) if total_estudiantes > 0 else 0
-    
-    registros_credito = RegistroAcademicoUniversitario.objects.filter(filtro_registro, creditos_aprobados_total_anio__gt=0)
-    promedio_creditos = registros_credito.aggregate(prom=Avg('creditos_aprobados_total_anio'))['prom'] or 0
-    
-    filtros_carreras = Q()
-    if carrera and carrera != 'todas':
-        filtros_carreras &= Q(codigo_carrera=carrera)
-    if campus and campus != 'todos':
-        filtros_carreras &= Q(campus=campus)
-        
-    total_carreras = CarreraUniversitaria.objects.filter(filtros_carreras).count()
-
-    # 4. Recalcular Gráficos
-    abandono_stats = EstudianteUniversitario.objects.filter(filtro_estudiante).values('estado_abandono').annotate(t=Count('id'))
-    pie_labels = ['Desertores' if x['estado_abandono']=='Abandono' else 'Activos' for x in abandono_stats]
-    pie_data = [x['t'] for x in abandono_stats]
-    
-    abandono_anio = EstudianteUniversitario.objects.filter(filtro_estudiante, estado_abandono='Abandono', anio_ingreso_universidad__gt=2000).values('anio_ingreso_universidad').annotate(t=Count('id')).order_by('anio_ingreso_universidad')
-    line_labels = [str(x['anio_ingreso_universidad']) for x in abandono_anio]
-    line_data = [x['t'] for x in abandono_anio]
-    
-    abandono_carrerra = EstudianteUniversitario.objects.filter(filtro_estudiante, estado_abandono='Abandono').values('carrera__codigo_carrera').annotate(t=Count('id')).order_by('-t')[:10]
-    bar_labels = [x['carrera__codigo_carrera'] for x in abandono_carrerra]
-    bar_data = [x['t'] for x in abandono_carrerra]
-
-    rendimiento_valores = RegistroAcademicoUniversitario.objects.filter(filtro_registro, rendimiento_total_anio__gt=0, rendimiento_total_anio__lte=100).values_list('rendimiento_total_anio', flat=True)[:10000]
-    historico_data = [0]*10
-    for valor in rendimiento_valores:
-        idx = int(float(valor) // 10)
-        if idx >= 10: idx = 9
-        historico_data[idx] += 1
-        
-    top_asignatura = RegistroAcademicoUniversitario.objects.filter(filtro_registro).values('asignatura__codigo_asignatura').annotate(t=Count('estudiante', distinct=True)).order_by('-t')[:10]
-    top_asig_labels = [x['asignatura__codigo_asignatura'] for x in top_asignatura]
-    top_asig_data = [x['t'] for x in top_asignatura]
+    def calcular():
+        datos = datos_dashboard(
+            filtro_celdas(carrera=carrera, campus=campus, dedicacion=dedicacion, carrera_rol=carrera_rol),
+            anio=anio
+        )
+
+        filtros_carreras = Q()
+        if carrera_rol:
+            filtros_carreras &= Q(pk=carrera_rol.pk)
+        if carrera and carrera != 'todas':
+            filtros_carreras &= Q(codigo_carrera=carrera)
+        if campus and campus != 'todos':
+            filtros_carreras &= Q(campus=campus)
+
+        datos['kpis']['total_carreras'] = CarreraUniversitaria.objects.filter(filtros_carreras).count()
+        return datos
+
+    datos = obtener_o_calcular(
+        'dashboard_filtrado', [VersionDatos.ACADEMICO], calcular,
+        alcance=alcance_usuario(request.user),
+        filtros={'anio': anio, 'carrera': carrera, 'campus': campus, 'dedicacion': dedicacion},
+        versiones=versiones_leidas(request),
+    )
 
     data = {
         'success': True,
-        'kpis': {
-            'total_estudiantes': total_estudiantes,
-            'total_abandonos': total_abandonos,
-            'tasa_abandono': round(tasa, 2),
-            'promedio_creditos': round(float(promedio_creditos), 2),
-            'total_carreras': total_carreras
-        },
-        'graficos': {
-            'abandono_pie': {'labels': pie_labels, 'data': pie_data},
-            'abandono_anio': {'labels': line_labels, 'data': line_data},
-            'abandono_carrera': {'labels': bar_labels, 'data': bar_data},
-            'rendimiento': {'labels': ["0-10%", "10-20%", "20-30%", "30-40%", "40-50%", "50-60%", "60-70%", "70-80%", "80-90%", "90-100%"], 'data': historico_data},
-            'top_asignaturas': {'labels': top_asig_labels, 'data': top_asig_data}
-        },
+        'kpis': datos['kpis'],
+        'graficos': datos['graficos'],
         'filtros_aplicados': {
             'anio': anio, 'carrera': carrera
         }
@@ -398,169 +287,206 @@ def dashboard_filtrado_ajax(request):
 @login_required
 @user_passes_test(lambda u: u.perfil.rol in ['admin', 'coordinador', 'coordinador_carrera'])
 def dashboard_avanzado(request):
-    """Vista para el dashboard avanzado con análisis estadístico."""
+    """Vista para el dashboard avanzado con análisis estadístico (servido desde el cubo y los sketches)."""
     
     logger.info("🚀 Cargando Dashboard Avanzado...")
 
-    logger.info("📊 Calculando matriz de correlaciones...")
-    
     user_rol = request.user.perfil.rol
 
-    estudiantes = EstudianteUniversitario.objects.all()
-    
+    carrera_rol = None
     if user_rol == 'coordinador_carrera':
-        carrera = request.user.perfil.carrera_asignada
-        if carrera:
-            estudiantes = estudiantes.filter(carrera=carrera)
-
-    variables_modelo = [
-        'creditos_aprobados_total_anio',
-        'creditos_matriculados_total_anio',
-        'rendimiento_total_anio',
-        'eventos_lms_total',
-        'visitas_lms_total',
-        'dias_wifi_total',
-    ]
-    
-    variables_labels = [
-        'Créditos Aprobados',
-        'Créditos Matriculados',
-        'Rendimiento',
-        'Eventos LMS',
-        'Visitas LMS',
-        'Días WiFi'
-    ]
-    
-    registros = RegistroAcademicoUniversitario.objects.filter(
-        rendimiento_total_anio__gt=0
-    ).values(*variables_modelo)[:5000] 
+        carrera_rol = request.user.perfil.carrera_asignada
+
+    def calcular():
+        estudiantes = EstudianteUniversitario.objects.all()
+        carreras = CarreraUniversitaria.objects.all()
+        if carrera_rol:
+            estudiantes = estudiantes.filter(carrera=carrera_rol)
+            carreras = carreras.filter(pk=carrera_rol.pk)
+
+        estadisticas = estadisticas_avanzadas(filtro_celdas(carrera_rol=carrera_rol))
+        if not estadisticas['matriz_correlacion']:
+            logger.warning("⚠️ No hay datos suficientes para correlaciones")
+
+        return {
+            'matriz_correlacion': json.dumps(estadisticas['matriz_correlacion']),
+            'variables_labels': json.dumps(estadisticas['variables_labels']),
+            'box_plot_data': json.dumps(estadisticas['box_plot_data']),
+            'serie_temporal': json.dumps(estadisticas['serie_temporal']),
+            'perfiles_labels': json.dumps(estadisticas['perfiles_labels']),
+            'perfiles_data': json.dumps(estadisticas['perfiles_data']),
+
+            'total_estudiantes': estudiantes.count(),
+            'total_registros': estadisticas['total_registros'],
+
+            'anios_disponibles': list(anios_disponibles()),
+            'carreras_disponibles': list(carreras.values('id', 'codigo_carrera').order_by('codigo_carrera')),
+            'campus_disponibles': list(carreras.values_list('campus', flat=True).distinct().order_by('campus')),
+        }
+
+    contexto = obtener_o_calcular(
+        'dashboard_avanzado', [VersionDatos.ACADEMICO], calcular,
+        alcance=alcance_usuario(request.user),
+    )
+
+    return render(request, 'universidad/dashboard_avanzado.html', contexto)
+
+@login_required
+@user_passes_test(lambda u: u.perfil.rol in ['admin', 'coordinador', 'coordinador_carrera'])
+@gzip_page
+@condicional_por_version('dashboard_avanzado_filtrado', [VersionDatos.ACADEMICO], PARAMETROS_FILTRO)
+def dashboard_avanzado_filtrado(request):
+    """Estadísticas del dashboard avanzado para los filtros GET, en JSON."""
     
-    if registros:
-        data_array = []
-        for r in registros:
-            fila = [float(r[v] or 0) for v in variables_modelo]
-            data_array.append(fila)
-        
-        if len(data_array) > 1:
-            matriz_correlacion = np.corrcoef(np.array(data_array).T).tolist()
-            matriz_correlacion = [[0 if np.isnan(x) else x for x in row] for row in matriz_correlacion]
-        else:
-            matriz_correlacion = []
-            
-        logger.info(f"✅ Matriz calculada con {len(data_array)} registros")
-    else:
-        matriz_correlacion = []
-        logger.warning("⚠️ No hay datos suficientes para correlaciones")
+    user_rol = request.user.perfil.rol
+
+    carrera_rol = None
+    if user_rol == 'coordinador_carrera':
+        carrera_rol = request.user.perfil.carrera_asignada
+
+    anio = request.GET.get('anio_academico')
+    carrera = request.GET.get('carrera')
+    campus = request.GET.get('campus')
+    dedicacion = request.GET.get('dedicacion')
+
+    if anio and anio != 'todos' and not anio.isdigit():
+        return JsonResponse({'success': False, 'error': 'Año académico no válido'}, status=400)
+
+    def calcular():
+        return estadisticas_avanzadas(
+            filtro_celdas(carrera=carrera, campus=campus, dedicacion=dedicacion, carrera_rol=carrera_rol),
+            anio=anio
+        )
+
+    datos = obtener_o_calcular(
+        'dashboard_avanzado_filtrado', [VersionDatos.ACADEMICO], calcular,
+        alcance=alcance_usuario(request.user),
+        filtros={'anio': anio, 'carrera': carrera, 'campus': campus, 'dedicacion': dedicacion},
+        versiones=versiones_leidas(request),
+    )
+
+    return JsonResponse({
+        'success': True,
+        **datos,
+        'filtros_aplicados': {
+            'anio_academico': anio or 'todos',
+            'carrera': carrera or 'todas',
+            'campus': campus or 'todos',
+            'dedicacion': dedicacion or 'todas',
+        }
+    })
+
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'perfil'))
+def api_actividad_estudiante(request, estudiante_id):
+    """Serie mensual LMS de un estudiante (una lista por métrica)."""
     
-    logger.info("📦 Calculando distribuciones por grupo...")
+    estudiantes = EstudianteUniversitario.objects.all()
+    if request.user.perfil.rol == 'coordinador_carrera':
+        estudiantes = estudiantes.filter(carrera=request.user.perfil.carrera_asignada)
     
-    box_plot_data = {}
+    if not estudiantes.filter(pk=estudiante_id).exists():
+        return JsonResponse({'success': False, 'error': 'Estudiante no encontrado'}, status=404)
     
-    anios_ingreso = EstudianteUniversitario.objects.filter(
-        anio_ingreso_universidad__gt=2015
-    ).values_list('anio_ingreso_universidad', flat=True).distinct().order_by('-anio_ingreso_universidad')[:5]
+    metricas = [METRICAS_DETALLE[m] for m in request.GET.getlist('metrica') if m in METRICAS_DETALLE]
     
-    for anio in anios_ingreso:
-        rendimientos = list(RegistroAcademicoUniversitario.objects.filter(
-            estudiante__anio_ingreso_universidad=anio,
-            rendimiento_total_anio__gt=0
-        ).values_list('rendimiento_total_anio', flat=True)[:500])
-        
-        if rendimientos:
-            vals = [float(r) for r in rendimientos]
-            
-            box_plot_data[str(anio)] = {
-                'min': float(np.min(vals)),
-                'q1': float(np.percentile(vals, 25)),
-                'median': float(np.median(vals)),
-                'q3': float(np.percentile(vals, 75)),
-                'max': float(np.max(vals)),
-                'mean': float(np.mean(vals)),
-                'std': float(np.std(vals))
-            }
+    return JsonResponse({'success': True, **serie_estudiante(estudiante_id, metricas or None)})
+
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'perfil'))
+def api_buscar_estudiantes(request):
+    """Autocompletado de códigos de estudiante (prefijo primero, luego fragmento)."""
     
-    logger.info("📈 Analizando series temporales...")
+    estudiantes = EstudianteUniversitario.objects.all()
+    if request.user.perfil.rol == 'coordinador_carrera':
+        estudiantes = estudiantes.filter(carrera=request.user.perfil.carrera_asignada)
     
-    serie_temporal = []
-    anios_serie = sorted(list(anios_ingreso))
+    try:
+        limite = min(max(int(request.GET.get('limite', LIMITE_AUTOCOMPLETAR)), 1), 50)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Límite no válido'}, status=400)
     
-    for anio in anios_serie:
-        total = EstudianteUniversitario.objects.filter(anio_ingreso_universidad=anio).count()
-        abandonos = EstudianteUniversitario.objects.filter(
-            anio_ingreso_universidad=anio, 
-            estado_abandono='Abandono'
-        ).count()
-        
-        tasa = (abandonos / total * 100) if total > 0 else 0
-        
-        serie_temporal.append({
-            'anio': str(anio),
-            'tasa_abandono': round(tasa, 2),
-            'total_estudiantes': total,
-            'abandonos': abandonos
-        })
+    resultados = autocompletar(request.GET.get('q', ''), estudiantes, limite)
+    return JsonResponse({'success': True, 'resultados': resultados})
+
+@login_required
+@user_passes_test(lambda u: hasattr(u, 'perfil'))
+def api_actividad_cohorte(request):
+    """Curva mensual LMS de una cohorte (carrera, año de ingreso, dedicación)."""
     
-    logger.info("👥 Analizando perfiles...")
+    metrica = request.GET.get('metrica', 'eventos')
+    if metrica not in METRICAS_DETALLE:
+        return JsonResponse({'success': False, 'error': f'Métrica no válida: {metrica}'}, status=400)
     
-    perfiles = {
-        'alto_rendimiento_activo': 0,
-        'alto_rendimiento_pasivo': 0,
-        'bajo_rendimiento_activo': 0,
-        'bajo_rendimiento_pasivo': 0,
-    }
+    carrera = request.GET.get('carrera')
+    anio_ingreso = request.GET.get('anio_ingreso')
+    dedicacion = request.GET.get('dedicacion')
     
-    registros_perfiles = RegistroAcademicoUniversitario.objects.filter(
-        rendimiento_total_anio__gt=0
-    ).values('rendimiento_total_anio', 'eventos_lms_total')[:5000]
+    if anio_ingreso and anio_ingreso != 'todos' and not anio_ingreso.isdigit():
+        return JsonResponse({'success': False, 'error': 'Año de ingreso no válido'}, status=400)
     
-    for r in registros_perfiles:
-        rend = float(r['rendimiento_total_anio'] or 0)
-        evts = int(r['eventos_lms_total'] or 0)
-
-        if rend >= 70:
-            if evts >= 100: perfiles['alto_rendimiento_activo'] += 1
-            else: perfiles['alto_rendimiento_pasivo'] += 1
-        else:
-            if evts >= 100: perfiles['bajo_rendimiento_activo'] += 1
-            else: perfiles['bajo_rendimiento_pasivo'] += 1
+    estudiantes = EstudianteUniversitario.objects.all()
+    if request.user.perfil.rol == 'coordinador_carrera':
+        estudiantes = estudiantes.filter(carrera=request.user.perfil.carrera_asignada)
     
-    contexto = {
-        'matriz_correlacion': json.dumps(matriz_correlacion),
-        'variables_labels': json.dumps(variables_labels),
-        'box_plot_data': json.dumps(box_plot_data),
-        'serie_temporal': json.dumps(serie_temporal),
-        'perfiles_labels': json.dumps(list(perfiles.keys())),
-        'perfiles_data': json.dumps(list(perfiles.values())),
-        
-        'total_estudiantes': estudiantes.count(),
-        'total_registros': RegistroAcademicoUniversitario.objects.count(),
-    }
+    if carrera and carrera != 'todas':
+        estudiantes = estudiantes.filter(carrera__codigo_carrera=carrera)
+    if anio_ingreso and anio_ingreso != 'todos':
+        estudiantes = estudiantes.filter(anio_ingreso_universidad=anio_ingreso)
+    if dedicacion and dedicacion != 'todas':
+        estudiantes = estudiantes.filter(dedicacion_estudios=dedicacion)
     
-    return render(request, 'universidad/dashboard_avanzado.html', contexto)
+    return JsonResponse({'success': True, **curva_cohorte(estudiantes, METRICAS_DETALLE[metrica])})
 
 @login_required
-@user_passes_test(lambda u: u.perfil.rol in ['admin', 'coordinador', 'coordinador_carrera'])
-def dashboard_avanzado_filtrado(request):
-    """Aplica filtros al dashboard avanzado y recalcula estadísticas."""
+@user_passes_test(lambda u: hasattr(u, 'perfil'))
+@gzip_page
+@condicional_por_version('serie_cohortes', [VersionDatos.ACADEMICO], ('desglose', 'carrera', 'campus', 'dedicacion'))
+def api_serie_cohortes(request):
+    """Abandono y retención por año de ingreso (todas las cohortes), opcionalmente por carrera o campus."""
+    
+    desglose = request.GET.get('desglose') or None
+    if desglose and desglose not in DESGLOSES:
+        return JsonResponse({'success': False, 'error': f'Desglose no válido: {desglose}'}, status=400)
+    
+    carrera_rol = None
+    if request.user.perfil.rol == 'coordinador_carrera':
+        carrera_rol = request.user.perfil.carrera_asignada
     
-    user_rol = request.user.perfil.rol
-    anio = request.GET.get('anio_academico')
     carrera = request.GET.get('carrera')
     campus = request.GET.get('campus')
     dedicacion = request.GET.get('dedicacion')
     
-    conjunto_consultas = RegistroAcademicoUniversitario.objects.filter(rendimiento_total_anio__gt=0)
+    def calcular():
+        estudiantes = EstudianteUniversitario.objects.all()
+        if carrera_rol:
+            estudiantes = estudiantes.filter(carrera=carrera_rol)
+        if carrera and carrera != 'todas':
+            estudiantes = estudiantes.filter(carrera__codigo_carrera=carrera)
+        if campus and campus != 'todos':
+            estudiantes = estudiantes.filter(carrera__campus=campus)
+        if dedicacion and dedicacion != 'todas':
+            estudiantes = estudiantes.filter(dedicacion_estudios=dedicacion)
+        return serie_abandono_cohortes(estudiantes, desglose)
+    
+    datos = obtener_o_calcular(
+        'serie_cohortes', [VersionDatos.ACADEMICO], calcular,
+        alcance=alcance_usuario(request.user),
+        filtros={'desglose': desglose, 'carrera': carrera, 'campus': campus, 'dedicacion': dedicacion},
+        versiones=versiones_leidas(request),
+    )
     
-    if anio and anio != 'todos':
-        conjunto_consultas = conjunto_consultas.filter(anio_academico=anio)
-    if carrera and carrera != 'todas':
-        conjunto_consultas = conjunto_consultas.filter(estudiante__carrera__codigo_carrera=carrera)
-    if campus and campus != 'todos':
-        conjunto_consultas = conjunto_consultas.filter(estudiante__carrera__campus=campus)
-    if dedicacion and dedicacion != 'todas':
-        conjunto_consultas = conjunto_consultas.filter(estudiante__dedicacion_estudios=dedicacion)
+    return JsonResponse({'success': True, **datos})
 
-    return JsonResponse({'success': True, 'message': 'Filtros aplicados (Lógica pendiente de implementación completa)'})
+@login_required
+@user_passes_test(lambda u: u.perfil.rol == 'admin', login_url='/sin-permiso/')
+def api_estadisticas_cache(request):
+    """Aciertos/fallos de la caché de vistas y versión actual de cada dominio de datos."""
+    return JsonResponse({
+        'success': True,
+        'vistas': estadisticas_cache(),
+        'versiones': VersionDatos.actuales(),
+    })
 
 @login_required
 def sin_permiso(request):
@@ -7,13 +7,17 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
 from django.contrib.auth.models import User
+from django.db.models import Q
 
 from prototipo.models import (
     EstudianteUniversitario,
     AlertaEstudiante,
+    AsignacionAnalista,
     IntervencionEstudiante,
     PrediccionDesercionUniversitaria
 )
+from prototipo.service.kpis import kpis
+from prototipo.service.paginacion import paginar_keyset
 
 
 @login_required
@@ -25,55 +29,38 @@ def asignar_analista(request, estudiante_id):
     """
     if request.method != 'POST':
         messages.error(request, "Método no permitido")
-        return redirect('dashboard_ml')
+        return redirect('ml:dashboard_ml')
     
     estudiante = get_object_or_404(EstudianteUniversitario, id=estudiante_id)
     
-    # Buscar predicción más reciente
-    prediccion = PrediccionDesercionUniversitaria.objects.filter(
-        estudiante=estudiante
-    ).order_by('-fecha_prediccion').first()
-    
-    if not prediccion:
+    if not PrediccionDesercionUniversitaria.objects.filter(estudiante=estudiante).exists():
         messages.error(request, "No hay predicción ML para este estudiante")
-        return redirect('dashboard_ml')
-    
-    # Buscar o crear alerta
-    alerta, created = AlertaEstudiante.objects.get_or_create(
-        estudiante=estudiante,
-        prediccion=prediccion,
-        defaults={
-            'nivel_prioridad': 'Critica' if prediccion.nivel_riesgo == 'Critico' else 'Alta',
-            'estado': 'Pendiente'
-        }
-    )
+        return redirect('ml:dashboard_ml')
     
     # Asignar analista
     analista_id = request.POST.get('analista_id')
     
     if not analista_id:
         messages.error(request, "Debes seleccionar un analista")
-        return redirect('estudiante_detalle_ml', estudiante_id=estudiante_id)
+        return redirect('ml:estudiante_detalle_ml', estudiante_id=estudiante_id)
     
     try:
-        analista = User.objects.get(id=analista_id)
+        analista = User.objects.select_related('perfil').get(id=analista_id)
         
         # Verificar que es analista
         if analista.perfil.rol != 'analista':
             messages.error(request, "El usuario seleccionado no es analista")
-            return redirect('estudiante_detalle_ml', estudiante_id=estudiante_id)
+            return redirect('ml:estudiante_detalle_ml', estudiante_id=estudiante_id)
         
-        alerta.analista_asignado = analista
-        alerta.estado = 'Asignada'
-        alerta.fecha_asignacion = timezone.now()
-        alerta.save()
+        # Desactiva la asignación anterior (si la había) y deja esta como la activa
+        AsignacionAnalista.asignar(estudiante, analista, asignada_por=request.user)
         
-        messages.success(request, f"✅ Caso asignado a {analista.get_full_name()}")
+        messages.success(request, f"✅ Caso asignado a {analista.get_full_name() or analista.username}")
         
-    except User.DoesNotExist:
+    except (User.DoesNotExist, ValueError):
         messages.error(request, "Analista no encontrado")
     
-    return redirect('estudiante_detalle_ml', estudiante_id=estudiante_id)
+    return redirect('ml:estudiante_detalle_ml', estudiante_id=estudiante_id)
 
 
 @login_required
@@ -86,9 +73,9 @@ def registrar_intervencion(request, alerta_id):
     alerta = get_object_or_404(AlertaEstudiante, id=alerta_id)
     
     # Verificar que está asignado a este analista
-    if alerta.analista_asignado != request.user:
+    if not AsignacionAnalista.esta_asignado(request.user, alerta.estudiante_id):
         messages.error(request, "⚠️ Este caso no está asignado a ti")
-        return redirect('dashboard_ml')
+        return redirect('ml:dashboard_ml')
     
     if request.method == 'POST':
         tipo = request.POST.get('tipo_intervencion')
@@ -112,7 +99,7 @@ def registrar_intervencion(request, alerta_id):
             alerta.save()
         
         messages.success(request, "✅ Intervención registrada exitosamente")
-        return redirect('estudiante_detalle_ml', estudiante_id=alerta.estudiante.id)
+        return redirect('ml:estudiante_detalle_ml', estudiante_id=alerta.estudiante.id)
     
     # GET: Mostrar formulario
     contexto = {
@@ -133,18 +120,18 @@ def marcar_resuelta(request, alerta_id):
     """
     if request.method != 'POST':
         messages.error(request, "Método no permitido")
-        return redirect('dashboard_ml')
+        return redirect('ml:dashboard_ml')
     
     alerta = get_object_or_404(AlertaEstudiante, id=alerta_id)
     
     # Verificar permisos
     es_analista_asignado = (request.user.perfil.rol == 'analista' and 
-                           alerta.analista_asignado == request.user)
+                           AsignacionAnalista.esta_asignado(request.user, alerta.estudiante_id))
     es_coordinador = request.user.perfil.rol in ['admin', 'coordinador']
     
     if not (es_analista_asignado or es_coordinador):
         messages.error(request, "⚠️ No tienes permiso para resolver esta alerta")
-        return redirect('dashboard_ml')
+        return redirect('ml:dashboard_ml')
     
     # Marcar como resuelta
     alerta.estado = 'Resuelta'
@@ -152,7 +139,7 @@ def marcar_resuelta(request, alerta_id):
     
     messages.success(request, "✅ Alerta marcada como resuelta")
     
-    return redirect('estudiante_detalle_ml', estudiante_id=alerta.estudiante.id)
+    return redirect('ml:estudiante_detalle_ml', estudiante_id=alerta.estudiante.id)
 
 
 @login_required
@@ -162,20 +149,21 @@ def mis_casos_asignados(request):
     Vista simplificada para analistas: solo sus casos asignados.
     """
     alertas = AlertaEstudiante.objects.filter(
-        analista_asignado=request.user,
-        estado__in=['Asignada', 'EnProceso']
-    ).select_related('estudiante', 'prediccion').order_by('-nivel_prioridad', '-fecha_creacion')
-    
-    # Estadísticas
-    total = alertas.count()
-    criticos = alertas.filter(nivel_prioridad='Critica').count()
-    altos = alertas.filter(nivel_prioridad='Alta').count()
+        estudiante__in=AsignacionAnalista.estudiantes_de(request.user),
+        estado__in=['pendiente', 'en_revision']
+    ).select_related('estudiante', 'prediccion')
+    
+    # Estadísticas (una sola consulta); el total sirve también a la paginación
+    estadisticas = kpis(alertas, total=None, criticos=Q(prioridad='critica'), altos=Q(prioridad='alta'))
+    page_obj = paginar_keyset(
+        alertas, AlertaEstudiante.ORDEN_LISTADO,
+        cursor=request.GET.get('cursor'), tam_pagina=20, total=estadisticas['total'],
+    )
     
     contexto = {
-        'alertas': alertas,
-        'total': total,
-        'criticos': criticos,
-        'altos': altos,
+        'alertas': page_obj,
+        'page_obj': page_obj,
+        **estadisticas,
     }
     
     return render(request, 'roles/mis_casos.html', contexto)
\ No newline at end of file
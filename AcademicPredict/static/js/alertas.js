@@ -3,18 +3,19 @@
 // Calcula posición dinámica del dropdown
 // ============================================
 
-const INTERVALO_ACTUALIZACION = 300000; // 5 minutos
+const INTERVALO_ACTUALIZACION = 300000; // 5 minutos (solo sin flujo SSE)
+const URL_STREAM_ALERTAS = '/alertas/api/urgentes/stream/';
+const ORDEN_PRIORIDAD = { 'critica': 0, 'alta': 1 };
 let intervaloAlertas = null;
+let fuenteAlertas = null;
+let alertasUrgentes = new Map();
 
 document.addEventListener('DOMContentLoaded', function() {
     console.log('🔔 Inicializando sistema de alertas...');
     
-    cargarAlertasUrgentes();
+    conectarAlertasUrgentes();
     configurarDropdown();
     configurarBannerColapsable();
-    
-    // Actualizar cada 5 minutos
-    intervaloAlertas = setInterval(cargarAlertasUrgentes, INTERVALO_ACTUALIZACION);
 });
 
 // ============================================
@@ -197,7 +198,63 @@ function expandirBanner(banner, contenido, btnExpandir) {
 }
 
 // ============================================
-// CARGAR ALERTAS URGENTES
+// ALERTAS URGENTES EN TIEMPO REAL (SSE)
+// ============================================
+
+// El servidor envía la lista al conectar ('lista') y después solo los
+// cambios ('delta': altas, bajas). Sin EventSource, o si el servidor no
+// sirve el flujo (WSGI responde 204), se vuelve al sondeo periódico.
+function conectarAlertasUrgentes() {
+    if (!window.EventSource) {
+        iniciarSondeoAlertas();
+        return;
+    }
+    
+    fuenteAlertas = new EventSource(URL_STREAM_ALERTAS);
+    
+    fuenteAlertas.addEventListener('lista', event => {
+        const data = JSON.parse(event.data);
+        alertasUrgentes = new Map(data.alertas.map(alerta => [alerta.id, alerta]));
+        console.log(`✅ ${data.total} alertas recibidas`);
+        mostrarAlertasUrgentes();
+    });
+    
+    fuenteAlertas.addEventListener('delta', event => {
+        const data = JSON.parse(event.data);
+        data.bajas.forEach(id => alertasUrgentes.delete(id));
+        data.altas.forEach(alerta => alertasUrgentes.set(alerta.id, alerta));
+        console.log(`🔔 Alertas actualizadas (+${data.altas.length} / -${data.bajas.length})`);
+        mostrarAlertasUrgentes();
+    });
+    
+    fuenteAlertas.onerror = () => {
+        // CONNECTING: el navegador reconecta solo y recibe otra vez la lista
+        if (fuenteAlertas.readyState === EventSource.CLOSED) {
+            console.warn('⚠️ Flujo de alertas no disponible, usando sondeo');
+            fuenteAlertas = null;
+            iniciarSondeoAlertas();
+        }
+    };
+}
+
+function mostrarAlertasUrgentes() {
+    // Mismo orden que el servidor: prioridad y después las más recientes
+    const alertas = [...alertasUrgentes.values()].sort((a, b) =>
+        (ORDEN_PRIORIDAD[a.prioridad_codigo] - ORDEN_PRIORIDAD[b.prioridad_codigo]) ||
+        b.fecha_creacion.localeCompare(a.fecha_creacion)
+    );
+    actualizarBadge(alertas.length);
+    renderizarAlertas(alertas);
+}
+
+function iniciarSondeoAlertas() {
+    if (intervaloAlertas) return;
+    cargarAlertasUrgentes();
+    intervaloAlertas = setInterval(cargarAlertasUrgentes, INTERVALO_ACTUALIZACION);
+}
+
+// ============================================
+// CARGAR ALERTAS URGENTES (SONDEO)
 // ============================================
 
 function cargarAlertasUrgentes() {
@@ -361,8 +418,11 @@ function navegarAFicha(codigoEstudiante) {
     window.location.href = `/alertas/estudiante/${codigoEstudiante}/seguimiento/`;
 }
 
-// Limpiar intervalo al salir de la página
+// Limpiar intervalo y flujo al salir de la página
 window.addEventListener('beforeunload', function() {
+    if (fuenteAlertas) {
+        fuenteAlertas.close();
+    }
     if (intervaloAlertas) {
         clearInterval(intervaloAlertas);
         console.log('🛑 Intervalo de alertas detenido');
@@ -203,6 +203,49 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+    // ================================================
+    // AUTOCOMPLETADO DE CÓDIGOS DE ESTUDIANTE
+    // ================================================
+
+    document.querySelectorAll('[data-autocompletar]').forEach(function(input, indice) {
+        const datalist = document.createElement('datalist');
+        datalist.id = 'autocompletar-' + indice;
+        input.after(datalist);
+        input.setAttribute('list', datalist.id);
+        input.setAttribute('autocomplete', 'off');
+
+        let temporizador = null;
+        let peticion = null;
+
+        input.addEventListener('input', function() {
+            clearTimeout(temporizador);
+            const texto = this.value.trim();
+            if (texto.length < 2) {
+                datalist.innerHTML = '';
+                return;
+            }
+
+            temporizador = setTimeout(function() {
+                if (peticion) peticion.abort();
+                peticion = new AbortController();
+
+                fetch(input.dataset.autocompletar + '?q=' + encodeURIComponent(texto), { signal: peticion.signal })
+                    .then(function(response) { return response.json(); })
+                    .then(function(data) {
+                        if (!data.success) return;
+                        datalist.innerHTML = '';
+                        data.resultados.forEach(function(estudiante) {
+                            const opcion = document.createElement('option');
+                            opcion.value = estudiante.codigo;
+                            opcion.label = estudiante.carrera || '';
+                            datalist.appendChild(opcion);
+                        });
+                    })
+                    .catch(function() {});
+            }, 150);
+        });
+    });
+
     // ================================================
     // FORMATO DE FECHAS
     // ================================================
@@ -13,6 +13,10 @@ document.addEventListener('DOMContentLoaded', function() {
         dark: '#2c3e50',
     };
     
+    // Graficos Chart.js actuales (se destruyen al volver a filtrar)
+    let chartSerieTemporal = null;
+    let chartPerfiles = null;
+    
     // ================================================
     // 1. HEATMAP DE CORRELACIONES
     // ================================================
@@ -20,6 +24,8 @@ document.addEventListener('DOMContentLoaded', function() {
     function crearHeatmapCorrelaciones() {
         console.log('Creando heatmap de correlaciones...');
         
+        Plotly.purge('heatmapCorrelaciones');
+        
         if (!matrizCorrelacion || matrizCorrelacion.length === 0) {
             console.warn('No hay datos para el heatmap');
             document.getElementById('heatmapCorrelaciones').innerHTML = 
@@ -29,6 +35,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // FORZAR el tamano del contenedor
         const container = document.getElementById('heatmapCorrelaciones');
+        container.innerHTML = '';
         container.style.minHeight = '600px';
         container.style.height = '600px';
         
@@ -93,19 +100,6 @@ document.addEventListener('DOMContentLoaded', function() {
         
         Plotly.newPlot('heatmapCorrelaciones', data, layout, config);
         
-        // Ajustar al cambiar tamano de ventana
-        window.addEventListener('resize', function() {
-          const graficosPlotly = ['heatmapCorrelaciones', 'boxPlotRendimiento'];
-          
-          graficosPlotly.forEach(function(id) {
-              const el = document.getElementById(id);
-              if (el) {
-                  // Esta función obliga al gráfico a llenar el contenedor padre al 100%
-                  Plotly.Plots.resize(el);
-              }
-          });
-      });
-        
         console.log('Heatmap creado exitosamente con altura forzada');
     }
     
@@ -116,6 +110,8 @@ document.addEventListener('DOMContentLoaded', function() {
     function crearBoxPlots() {
         console.log('Creando box plots...');
         
+        Plotly.purge('boxPlotRendimiento');
+        
         if (!boxPlotData || Object.keys(boxPlotData).length === 0) {
             console.warn('No hay datos para box plots');
             document.getElementById('boxPlotRendimiento').innerHTML = 
@@ -125,6 +121,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // FORZAR el tamano del contenedor
         const container = document.getElementById('boxPlotRendimiento');
+        container.innerHTML = '';
         container.style.minHeight = '500px';
         container.style.height = '500px';
         
@@ -197,19 +194,6 @@ document.addEventListener('DOMContentLoaded', function() {
         
         Plotly.newPlot('boxPlotRendimiento', traces, layout, config);
         
-        // Ajustar al cambiar tamano de ventana
-        window.addEventListener('resize', function() {
-          const graficosPlotly = ['heatmapCorrelaciones', 'boxPlotRendimiento'];
-          
-          graficosPlotly.forEach(function(id) {
-              const el = document.getElementById(id);
-              if (el) {
-                  // Esta función obliga al gráfico a llenar el contenedor padre al 100%
-                  Plotly.Plots.resize(el);
-              }
-          });
-      });
-        
         console.log('Box plots creados exitosamente con altura forzada');
     }
     
@@ -220,6 +204,11 @@ document.addEventListener('DOMContentLoaded', function() {
     function crearSerieTemporal() {
         console.log('Creando serie temporal...');
         
+        if (chartSerieTemporal) {
+            chartSerieTemporal.destroy();
+            chartSerieTemporal = null;
+        }
+        
         if (!serieTemporal || serieTemporal.length === 0) {
             console.warn('No hay datos para serie temporal');
             return;
@@ -245,7 +234,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         const tendencia = labels.map((_, i) => m * i + b);
         
-        new Chart(ctx, {
+        chartSerieTemporal = new Chart(ctx, {
             type: 'line',
             data: {
                 labels: labels,
@@ -342,6 +331,11 @@ document.addEventListener('DOMContentLoaded', function() {
     function crearGraficoPerfiles() {
         console.log('Creando grafico de perfiles...');
         
+        if (chartPerfiles) {
+            chartPerfiles.destroy();
+            chartPerfiles = null;
+        }
+        
         if (!perfilesData || perfilesData.length === 0) {
             console.warn('No hay datos para perfiles');
             return;
@@ -368,7 +362,7 @@ document.addEventListener('DOMContentLoaded', function() {
             colors.danger
         ];
         
-        new Chart(ctx, {
+        chartPerfiles = new Chart(ctx, {
             type: 'doughnut',
             data: {
                 labels: labelsAmigables,
@@ -431,18 +425,74 @@ document.addEventListener('DOMContentLoaded', function() {
         console.log('Grafico de perfiles creado exitosamente');
     }
     
+    // ================================================
+    // 5. FILTROS (AJAX)
+    // ================================================
+    
+    function aplicarFiltros() {
+        const params = new URLSearchParams({
+            anio_academico: document.getElementById('filtroAnioAcademico').value,
+            carrera: document.getElementById('filtroCarrera').value,
+            campus: document.getElementById('filtroCampus').value,
+            dedicacion: document.getElementById('filtroDedicacion').value
+        });
+        
+        console.log('Aplicando filtros: ' + params.toString());
+        
+        fetch('/dashboard/avanzado/filtrar/?' + params.toString())
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('HTTP error! status: ' + response.status);
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (!data.success) {
+                    alert('No se pudieron cargar los datos filtrados');
+                    return;
+                }
+                
+                matrizCorrelacion = data.matriz_correlacion;
+                variablesLabels = data.variables_labels;
+                boxPlotData = data.box_plot_data;
+                serieTemporal = data.serie_temporal;
+                perfilesLabels = data.perfiles_labels;
+                perfilesData = data.perfiles_data;
+                
+                dibujarGraficos();
+                console.log('Dashboard avanzado filtrado (' + data.total_registros + ' registros)');
+            })
+            .catch(error => {
+                console.error('Error al aplicar filtros:', error);
+                alert('Error al aplicar filtros. Por favor, revisa la consola para más detalles.');
+            });
+    }
+    
+    function limpiarFiltros() {
+        document.getElementById('filtroAnioAcademico').value = 'todos';
+        document.getElementById('filtroCarrera').value = 'todas';
+        document.getElementById('filtroCampus').value = 'todos';
+        document.getElementById('filtroDedicacion').value = 'todas';
+        
+        aplicarFiltros();
+    }
+    
     // ================================================
     // INICIALIZAR
     // ================================================
     
+    function dibujarGraficos() {
+        crearHeatmapCorrelaciones();
+        crearBoxPlots();
+        crearSerieTemporal();
+        crearGraficoPerfiles();
+    }
+    
     function inicializarDashboard() {
         console.log('Inicializando visualizaciones con tamanos forzados...');
         
         try {
-            crearHeatmapCorrelaciones();
-            crearBoxPlots();
-            crearSerieTemporal();
-            crearGraficoPerfiles();
+            dibujarGraficos();
             
             console.log('Dashboard Avanzado Cargado - VERSION FORZADA');
         } catch (error) {
@@ -450,6 +500,26 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    // Ajustar los graficos Plotly al cambiar tamano de ventana
+    window.addEventListener('resize', function() {
+        ['heatmapCorrelaciones', 'boxPlotRendimiento'].forEach(function(id) {
+            const el = document.getElementById(id);
+            if (el && el.data) {
+                Plotly.Plots.resize(el);
+            }
+        });
+    });
+    
+    const btnAplicarFiltros = document.getElementById('btnAplicarFiltros');
+    if (btnAplicarFiltros) {
+        btnAplicarFiltros.addEventListener('click', aplicarFiltros);
+    }
+    
+    const btnLimpiarFiltros = document.getElementById('btnLimpiarFiltros');
+    if (btnLimpiarFiltros) {
+        btnLimpiarFiltros.addEventListener('click', limpiarFiltros);
+    }
+    
     // Esperar un momento antes de inicializar
     setTimeout(inicializarDashboard, 100);
     
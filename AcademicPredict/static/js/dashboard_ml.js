@@ -104,8 +104,102 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Animar barras de probabilidad
     animateProbabilityBars();
+    
+    // Histograma de probabilidades
+    renderDistribucionProbabilidad();
+    
+    // Exportaciones en segundo plano
+    document.querySelectorAll('[data-exportacion]').forEach(boton => {
+        boton.addEventListener('click', event => {
+            event.preventDefault();
+            solicitarExportacion(boton);
+        });
+    });
 });
 
+// Encola la exportación con los filtros actuales y descarga el archivo al terminar.
+// Si ya existe una para los mismos datos y filtros, el servidor la devuelve completada.
+function solicitarExportacion(boton) {
+    if (boton.dataset.enCurso) return;
+    boton.dataset.enCurso = '1';
+    const textoOriginal = boton.innerHTML;
+    boton.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Generando...';
+    
+    const filtros = new URLSearchParams(window.location.search);
+    const datos = new FormData();
+    datos.append('tipo', boton.dataset.exportacion);
+    // Algunas exportaciones fijan el nivel (p. ej. reportes de los críticos)
+    datos.append('nivel_riesgo', boton.dataset.nivelRiesgo || filtros.get('nivel_riesgo') || '');
+    datos.append('anomalias', filtros.get('anomalias') || '');
+    
+    const terminar = () => {
+        boton.innerHTML = textoOriginal;
+        delete boton.dataset.enCurso;
+    };
+    
+    const procesar = data => {
+        if (!data.success || data.estado === 'error') {
+            throw new Error(data.error || 'Error generando la exportación');
+        }
+        if (data.url_descarga) {
+            terminar();
+            window.location.href = data.url_descarga;
+            return;
+        }
+        setTimeout(() => {
+            fetch(data.url_estado, { credentials: 'same-origin' })
+                .then(response => response.json())
+                .then(procesar)
+                .catch(fallar);
+        }, 2000);
+    };
+    
+    const fallar = error => {
+        terminar();
+        console.error('Error en la exportación:', error);
+        alert('❌ ' + error.message);
+    };
+    
+    fetch(urlSolicitarExportacion, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': getCookie('csrftoken') },
+        body: datos,
+        credentials: 'same-origin'
+    })
+        .then(response => response.json())
+        .then(procesar)
+        .catch(fallar);
+}
+
+// Histograma de probabilidad de deserción (tramos calculados en el servidor)
+function renderDistribucionProbabilidad() {
+    const ctx = document.getElementById('chartDistribucionProbabilidad');
+    if (!ctx || typeof distribucionLabels === 'undefined') return;
+    
+    new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: distribucionLabels,
+            datasets: [{
+                label: 'Estudiantes',
+                data: distribucionData,
+                backgroundColor: distribucionLabels.map((_, i) =>
+                    i >= 7 ? '#dc3545cc' : i >= 5 ? '#fd7e14cc' : i >= 3 ? '#ffc107cc' : '#28a745cc'
+                ),
+                borderRadius: 5
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: { legend: { display: false } },
+            scales: {
+                y: { beginAtZero: true, ticks: { precision: 0 } }
+            }
+        }
+    });
+}
+
 // Animar KPIs con conteo
 function animateKPIs() {
     const kpiValues = document.querySelectorAll('.kpi-value');
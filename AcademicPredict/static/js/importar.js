@@ -73,8 +73,9 @@ document.addEventListener('DOMContentLoaded', function() {
     
     function validateFile(file) {
         // Validar extensión
-        if (!file.name.endsWith('.csv')) {
-            showAlert('error', 'El archivo debe ser formato CSV (.csv)');
+        const nombre = file.name.toLowerCase();
+        if (!(nombre.endsWith('.csv') || nombre.endsWith('.parquet') || nombre.endsWith('.pq'))) {
+            showAlert('error', 'El archivo debe ser formato CSV (.csv) o Parquet (.parquet)');
             return false;
         }
         
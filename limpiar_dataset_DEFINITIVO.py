@@ -32,6 +32,11 @@ ARCHIVO_DATASET2 = 'dataset_2022_hash.csv'
 SALIDA_DATASET1 = 'dataset_2021_ultra_limpio.csv'
 SALIDA_DATASET2 = 'dataset_2022_ultra_limpio.csv'
 
+# Staging columnar (Parquet tipado) que se deja junto a cada CSV
+STAGING_DATASET1 = 'dataset_2021_ultra_limpio.parquet'
+STAGING_DATASET2 = 'dataset_2022_ultra_limpio.parquet'
+STAGING_ROW_GROUP = 50000
+
 MAPEO_DATASET1 = 'mapeo_completo_2021.csv'
 MAPEO_DATASET2 = 'mapeo_completo_2022.csv'
 
@@ -362,7 +367,44 @@ def limpiar_y_transformar_chunk(chunk):
         raise e
 
 
-def procesar_dataset(archivo_entrada, archivo_salida, archivo_mapeo):
+def tipar_columnas_staging(df):
+    """
+    Tipos reales para el staging Parquet: las columnas cuyo contenido es
+    numérico (con coma decimal) pasan a número y el texto restante, incluidos
+    los Id_*, a categoría (se guarda como diccionario en Parquet).
+    """
+    df = df.copy()
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_datetime64_any_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+            continue
+        texto = serie.astype('string').str.strip()
+        if col.startswith('Id_'):
+            # Los identificadores se mantienen como texto aunque parezcan números
+            df[col] = texto.astype('category')
+            continue
+        numerico = pd.to_numeric(texto.str.replace(',', '.', regex=False), errors='coerce')
+        if numerico.notna().sum() == texto.replace('', pd.NA).notna().sum():
+            df[col] = numerico
+        else:
+            df[col] = texto.astype('category')
+    return df
+
+
+def guardar_staging_parquet(dataset, archivo_staging):
+    # Ordenado por carrera y año: las estadísticas por row-group permiten
+    # saltarse bloques completos al filtrar por esas columnas
+    orden = [col for col in ['Id_Carrera', 'Anio_Academico'] if col in dataset.columns]
+    staging = tipar_columnas_staging(dataset)
+    if orden:
+        staging = staging.sort_values(orden, kind='stable')
+    staging.to_parquet(
+        archivo_staging, engine='pyarrow', compression='zstd',
+        index=False, row_group_size=STAGING_ROW_GROUP
+    )
+
+
+def procesar_dataset(archivo_entrada, archivo_salida, archivo_mapeo, archivo_staging=None):
     print(f"\n{'='*70}")
     print(f"PROCESANDO V2: {archivo_entrada}")
     print(f"{'='*70}\n")
@@ -381,6 +423,10 @@ def procesar_dataset(archivo_entrada, archivo_salida, archivo_mapeo):
         print(f"Guardando dataset...")
         dataset_completo.to_csv(archivo_salida, sep=';', index=False, encoding='utf-8', decimal=',', quoting=1)
         
+        if archivo_staging:
+            print(f"Guardando staging columnar...")
+            guardar_staging_parquet(dataset_completo, archivo_staging)
+        
         print(f"Generando mapeo...")
         generar_archivo_mapeo(archivo_mapeo)
         
@@ -418,9 +464,9 @@ def generar_archivo_mapeo(archivo_salida):
 if __name__ == "__main__":
     print("INICIANDO LIMPIEZA V2")
     
-    exito1 = procesar_dataset(ARCHIVO_DATASET1, SALIDA_DATASET1, MAPEO_DATASET1)
+    exito1 = procesar_dataset(ARCHIVO_DATASET1, SALIDA_DATASET1, MAPEO_DATASET1, STAGING_DATASET1)
     
     if exito1:
         # Reiniciar mapeos para el segundo archivo
         for key in mapeos_globales: mapeos_globales[key] = {}
-        procesar_dataset(ARCHIVO_DATASET2, SALIDA_DATASET2, MAPEO_DATASET2)
\ No newline at end of file
+        procesar_dataset(ARCHIVO_DATASET2, SALIDA_DATASET2, MAPEO_DATASET2, STAGING_DATASET2)
\ No newline at end of file